@@ -2,26 +2,29 @@
 """
 Simple script to extract RLS policies from JSON
 Just paste your JSON when prompted, or save it to a file
+
+The JSON array is parsed one policy at a time and each statement is written
+to the output as soon as it is read, so memory stays flat however large the
+pg_policies export gets. Both policy_sql and create_policy_statement exports
+are accepted (see pgtools/policies.py).
 """
 
-import json
 import sys
 import os
 
+from pgtools import policies
+
 print("=" * 70)
 print("RLS Policies Extractor")
 print("=" * 70)
 print()
 
 # Try to read from file first, then stdin
-json_data = None
-
 if len(sys.argv) > 1:
     # Read from file
     try:
-        with open(sys.argv[1], 'r') as f:
-            json_data = f.read()
-        print(f"✓ Read JSON from: {sys.argv[1]}")
+        source = open(sys.argv[1], 'r', encoding='utf-8')
+        print(f"✓ Reading JSON from: {sys.argv[1]}")
     except FileNotFoundError:
         print(f"❌ File not found: {sys.argv[1]}")
         sys.exit(1)
@@ -30,21 +33,13 @@ else:
     print("📋 Paste your JSON array and press Ctrl+D (or Ctrl+Z on Windows) when done:")
     print("   (Or save JSON to a file and run: python3 create-rls-from-json-simple.py policies.json)")
     print()
-    json_data = sys.stdin.read()
-
-# Parse JSON
-try:
-    policies = json.loads(json_data)
-    print(f"✓ Found {len(policies)} policies")
-except json.JSONDecodeError as e:
-    print(f"❌ Error parsing JSON: {e}")
-    sys.exit(1)
+    source = sys.stdin
 
 # Generate SQL
-header = f"""-- ============================================================================
+header = """-- ============================================================================
 -- ADD ALL RLS POLICIES TO DEV DATABASE
 -- ============================================================================
--- This script adds all {len(policies)} RLS policies from production
+-- This script adds all RLS policies from production
 -- Run this in DEV Supabase SQL Editor
 -- ============================================================================
 -- Note: Policies are wrapped in DO blocks with existence checks
@@ -53,29 +48,31 @@ header = f"""-- ================================================================
 
 """
 
-sql_statements = []
-for i, policy in enumerate(policies, 1):
-    stmt = policy.get('policy_sql', '')
-    if stmt.strip():
-        # Fix {public} to 'public'
-        stmt = stmt.replace('{public}', "'public'")
-        sql_statements.append(stmt)
-        if i % 50 == 0:
-            print(f"   Processed {i}/{len(policies)} policies...")
-
-output = header + '\n\n'.join(sql_statements) + f'\n\n-- ============================================================================\n-- COMPLETED: {len(sql_statements)} policies added\n-- ============================================================================\n'
-
-# Write to file
 output_path = 'database/all-rls-policies-complete.sql'
 os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-with open(output_path, 'w') as f:
-    f.write(output)
+total = 0
+try:
+    with source, open(output_path, 'w') as out:
+        out.write(header)
+        for total, policy in enumerate(policies.iter_json(source), 1):
+            # Re-rendered from the parsed record, so {public} role arrays come out as TO public
+            if total > 1:
+                out.write('\n\n')
+            out.write(policy.guarded_sql())
+            if total % 50 == 0:
+                print(f"   Processed {total} policies...")
+        out.write(f'\n\n-- ============================================================================\n-- COMPLETED: {total} policies added\n-- ============================================================================\n')
+except (ValueError, AttributeError) as e:
+    # json.JSONDecodeError and SQLSyntaxError are ValueErrors; AttributeError means a non-object element
+    print(f"❌ Error parsing JSON: {e}")
+    sys.exit(1)
 
+print(f"✓ Found {total} policies")
 print()
 print("=" * 70)
 print(f"✅ SUCCESS! Generated: {output_path}")
-print(f"   Contains {len(sql_statements)} RLS policies")
+print(f"   Contains {total} RLS policies")
 print("=" * 70)
 print()
 print("📋 NEXT STEP:")
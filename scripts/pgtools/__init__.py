@@ -0,0 +1,5 @@
+"""
+Offline tooling for the Ticketrack Postgres schema and RLS policies.
+
+See scripts/pgtools/README.md for the available commands.
+"""
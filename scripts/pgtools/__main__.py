@@ -0,0 +1,58 @@
+"""
+pgtools command line front end.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools <command> [options]
+    PYTHONPATH=scripts python3 -m pgtools <command> --help
+"""
+
+import importlib
+import sys
+
+# command -> (module, one-line description)
+COMMANDS = {
+    'compile': ('policies', 'parse policy exports / SQL and emit one normalized script'),
+    'diff': ('diff', 'offline prod-vs-dev policy diff with a minimal sync script'),
+    'rls-cost': ('rlscost', 'rank per-row RLS work and emit an initplan rewrite'),
+    'helpers': ('helpers', 'generate STABLE SECURITY DEFINER helpers for repeated predicates'),
+    'merge': ('merge', 'drop duplicate/subsumed permissive policies and merge the rest'),
+    'apply': ('apply', 'apply policies to Postgres in parallel, one transaction per table'),
+    'cache': ('cache', 'inspect or prune the cache of generated policy SQL fragments'),
+    'index': ('index', 'inverted index: what references a table, column or function?'),
+    'catalog': ('catalog', 'offline schema catalog of tables, functions, triggers, policies, views'),
+    'fk-index': ('fkindex', 'CREATE INDEX CONCURRENTLY for unindexed foreign keys and RLS predicate columns'),
+    'dup-index': ('dupindex', 'DROP migration for duplicate, constraint-superseded and prefix-covered indexes'),
+    'plan': ('plan', 'order migrations by what they create and reference, in concurrent waves'),
+    'squash': ('squash', 'one idempotent script of the final schema after replaying every migration'),
+    'drift': ('drift', 'offline drift check: migration replay vs production_schema.sql, with a fix-up script'),
+    'trigger-cost': ('trigcost', 'resolve trigger chains per table and event and rank the per-row cost'),
+    'volatility': ('volatility', 'infer IMMUTABLE/STABLE and PARALLEL SAFE per function; ALTER FUNCTION script'),
+    'partition': ('partition', 'rank time-partitioning candidates; online RANGE-partition migration + maintenance'),
+    'lock-lint': ('locklint', 'classify migration statements by table lock and rewrite/scan; online equivalents'),
+    'synth': ('synth', 'referentially consistent synthetic dataset (orders, tickets, contacts, ...) as COPY text'),
+}
+
+
+def usage():
+    lines = ['usage: python3 -m pgtools <command> [options]', '', 'commands:']
+    width = max(len(name) for name in COMMANDS)
+    for name, (_, description) in COMMANDS.items():
+        lines.append(f'  {name.ljust(width)}  {description}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f'❌ Unknown command: {command}\n\n{usage()}', file=sys.stderr)
+        return 2
+    module = importlib.import_module(f'.{COMMANDS[command][0]}', __package__)
+    return module.main(rest)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
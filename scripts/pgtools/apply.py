@@ -0,0 +1,227 @@
+"""
+Apply compiled RLS policies to a database in parallel, one transaction per table.
+
+STEP_BY_STEP_RLS.md has us paste the generated policy files into the SQL
+editor as one serial script. This command reads the same inputs as
+``pgtools compile`` (JSON exports, generated SQL, production_schema.sql),
+shards them by table and applies the shards concurrently over a bounded
+connection pool. Each table is one transaction: the table is looked up once,
+its existing policy names are read once, and missing policies are created
+(``--replace`` drops and recreates every policy instead). Lock timeouts,
+deadlocks and dropped connections are retried with backoff.
+
+``--local`` starts a throwaway Postgres from the local initdb/pg_ctl (no
+Docker), loads the Supabase auth shim and any ``--init`` files, applies the
+policies and removes the cluster again.
+
+Needs psycopg (or psycopg2): pip install "psycopg[binary]"
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools apply database/all-rls-policies-complete.sql --dsn "$DATABASE_URL"
+    PYTHONPATH=scripts python3 -m pgtools apply production_schema.sql --local --init production_schema.sql --replace
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import cache
+from . import db
+from . import policies as policy_mod
+
+APPLIED = 'applied'
+SKIPPED = 'skipped'     # table does not exist in the target
+FAILED = 'failed'
+
+
+class ShardResult:
+    __slots__ = ('table', 'policies', 'created', 'dropped', 'attempts', 'seconds', 'status', 'error')
+
+    def __init__(self, table, policies):
+        self.table = table
+        self.policies = policies
+        self.created = 0
+        self.dropped = 0
+        self.attempts = 0
+        self.seconds = 0.0
+        self.status = None
+        self.error = None
+
+    def to_dict(self):
+        data = {slot: getattr(self, slot) for slot in self.__slots__}
+        data['table'] = '.'.join(self.table)
+        data['seconds'] = round(self.seconds, 4)
+        return data
+
+
+def apply_shard(conn, table_policies, replace=False, settings=()):
+    """Apply one table's policies in a single transaction; returns (status, created, dropped)."""
+    relation = table_policies[0].qualified_table
+    with db.transaction(conn, settings):
+        found = db.execute(conn, 'SELECT to_regclass(%s)::oid', (relation,))[0][0]
+        if found is None:
+            return SKIPPED, 0, 0
+        existing = {row[0] for row in db.execute(
+            conn, 'SELECT polname FROM pg_policy WHERE polrelid = %s', (found,))}
+        created = dropped = 0
+        for policy in table_policies:
+            if policy.name in existing:
+                if not replace:
+                    continue
+                db.execute(conn, policy.drop_sql())
+                dropped += 1
+            db.execute(conn, policy.create_sql())
+            created += 1
+    return APPLIED, created, dropped
+
+
+def run_shard(pool, table_policies, replace, retries, settings):
+    policy = table_policies[0]
+    result = ShardResult((policy.schema, policy.table), len(table_policies))
+    started = time.perf_counter()
+    while True:
+        result.attempts += 1
+        try:
+            with pool.connection() as conn:
+                result.status, result.created, result.dropped = apply_shard(
+                    conn, table_policies, replace, settings)
+            break
+        except Exception as e:
+            if result.attempts <= retries and db.is_retryable(e):
+                time.sleep(0.2 * 2 ** (result.attempts - 1) * (1 + random.random()))
+                continue
+            result.status = FAILED
+            result.error = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+            break
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def apply_all(dsn, policy_list, jobs, replace=False, retries=3, settings=(), progress=None):
+    """Apply every table shard over a pool of ``jobs`` connections; returns ShardResults."""
+    shards = sorted(policy_mod.group_by_table(policy_list), key=len, reverse=True)
+    pool = db.Pool(dsn, jobs)
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(run_shard, pool, shard, replace, retries, settings)
+                       for shard in shards]
+            for future in as_completed(futures):
+                results.append(future.result())
+                if progress:
+                    progress(results[-1], len(results), len(shards))
+    finally:
+        pool.close()
+    return results
+
+
+def render_report(results, wall):
+    busy = sum(r.seconds for r in results)
+    counts = {status: sum(1 for r in results if r.status == status) for status in (APPLIED, SKIPPED, FAILED)}
+    lines = [
+        f'📊 {len(results)} tables in {wall:.2f}s wall, {busy:.2f}s of shard time '
+        f'(parallelism {busy / wall if wall else 0:.1f}x)',
+        f'   {counts[APPLIED]} applied, {counts[SKIPPED]} skipped (missing table), {counts[FAILED]} failed, '
+        f'{sum(r.created for r in results)} policies created, {sum(r.dropped for r in results)} replaced',
+        '',
+        f'   {"table":<40} {"policies":>8} {"created":>7} {"tries":>5} {"seconds":>8}  status',
+    ]
+    for r in sorted(results, key=lambda r: r.seconds, reverse=True):
+        lines.append(f'   {r.table[1]:<40} {r.policies:>8} {r.created:>7} {r.attempts:>5} '
+                     f'{r.seconds:>8.3f}  {r.status}' + (f': {r.error}' if r.error else ''))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools apply',
+        description='Apply RLS policies to Postgres in parallel, one transaction per table.')
+    parser.add_argument('inputs', nargs='+', help='policy exports or SQL files (anything compile reads)')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--dsn', help='target database (default: $DATABASE_URL)')
+    target.add_argument('--local', action='store_true',
+                        help='start a throwaway local Postgres (initdb/pg_ctl) and apply there')
+    parser.add_argument('--pg-bindir', help='directory with initdb/pg_ctl for --local')
+    parser.add_argument('--init', action='append', default=[], metavar='SQL',
+                        help='SQL file to run before applying (repeatable, in order)')
+    parser.add_argument('--shim', action='store_true',
+                        help='create the Supabase auth schema/roles first (implied by --local)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 4,
+                        help='concurrent tables / pooled connections (default: CPU count)')
+    parser.add_argument('--replace', action='store_true',
+                        help='drop and recreate policies that already exist')
+    parser.add_argument('--retries', type=int, default=3, help='retries per table (default: 3)')
+    parser.add_argument('--lock-timeout', default='5s', help="lock_timeout per table (default: 5s)")
+    parser.add_argument('--report', help='also write the per-table report as JSON')
+    parser.add_argument('--cache', action='store_true',
+                        help='skip tables whose policies were already applied to this DSN (see pgtools cache)')
+    args = parser.parse_args(argv)
+
+    try:
+        policy_list = policy_mod.load(*args.inputs)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    print(f'📋 {len(policy_list)} policies on {len(policy_mod.group_by_table(policy_list))} tables, '
+          f'{args.jobs} connections')
+
+    local = None
+    try:
+        if args.local:
+            local = db.LocalPostgres(args.pg_bindir, max_connections=args.jobs + 10).start()
+            dsn = local.dsn
+            print(f'✓ Started local Postgres on port {local.port}')
+        else:
+            dsn = db.resolve_dsn(args.dsn)
+        conn = db.connect(dsn)   # fail fast on a missing driver or bad DSN
+        try:
+            if args.shim or args.local:
+                db.execute(conn, db.SUPABASE_SHIM)
+            for path, seconds in db.run_files(conn, args.init):
+                print(f'✓ Ran {path} ({seconds:.2f}s)')
+        finally:
+            conn.close()
+
+        def progress(result, done, total):
+            mark = '❌' if result.status == FAILED else '✓'
+            print(f'   {mark} [{done}/{total}] {result.table[1]} ({result.seconds:.2f}s)')
+
+        applied = fingerprints = None
+        if args.cache and not args.local:
+            applied = cache.AppliedState(cache.Cache(), dsn)
+            fingerprints = cache.table_fingerprints(policy_list)
+            current = {t for t, key in fingerprints.items() if applied.is_current(t, key)}
+            policy_list = [p for p in policy_list if '.'.join(p.key[:2]) not in current]
+            print(f'📋 {len(current)} tables unchanged since the last apply, skipped')
+
+        started = time.perf_counter()
+        results = apply_all(dsn, policy_list, args.jobs, args.replace, args.retries,
+                            [('lock_timeout', args.lock_timeout)], progress)
+        wall = time.perf_counter() - started
+        if applied is not None:
+            for result in results:
+                if result.status == APPLIED:
+                    table = '.'.join(result.table)
+                    applied.record(table, fingerprints[table])
+            applied.save()
+    except (db.DatabaseError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f'❌ {type(e).__name__}: {e}', file=sys.stderr)
+        return 1
+    finally:
+        if local is not None:
+            local.stop()
+
+    print()
+    print(render_report(results, wall))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'wall_seconds': round(wall, 4), 'shards': [r.to_dict() for r in results]}, f, indent=2)
+        print(f'\n✓ Wrote {args.report}')
+    return 1 if any(r.status == FAILED for r in results) else 0
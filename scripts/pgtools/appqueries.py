@@ -0,0 +1,146 @@
+"""
+supabase-js query chains in the app code.
+
+Finds every ``supabase.from('table')`` call in the JavaScript/TypeScript
+sources and reads the method chain hanging off it, e.g.
+
+    .from('tickets').select('id, status').eq('event_id', id).order('created_at')
+
+becomes Chain(table='tickets', calls=[('select', "'id, status'"),
+('eq', "'event_id', id"), ('order', "'created_at'")]). The scanner is
+lexical, like the SQL tokenizer: strings, template literals and comments are
+skipped while matching parentheses, nothing is evaluated.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -c "from pgtools import appqueries; print(appqueries.scan()[:3])"
+"""
+
+import glob
+import re
+
+DEFAULT_PATHS = ['src/**/*.js', 'src/**/*.jsx', 'supabase/functions/**/*.ts', 'api/**/*.js']
+
+WRITES = ('insert', 'upsert', 'update', 'delete')
+
+_FROM_RE = re.compile(r'\.from\(\s*([\'"`])([\w.]+)\1\s*\)')
+_METHOD_RE = re.compile(r'\s*(?://[^\n]*\n\s*)*(\??\.)\s*([A-Za-z_]\w*)\s*\(')
+_STRING_RE = re.compile(r'\s*([\'"`])((?:\\.|(?!\1).)*)\1', re.S)
+
+
+class Chain:
+    """One ``.from('table')`` call and the methods chained onto it."""
+    __slots__ = ('path', 'line', 'table', 'calls')
+
+    def __init__(self, path, line, table, calls):
+        self.path = path
+        self.line = line
+        self.table = table
+        self.calls = calls          # [(method, raw argument text)]
+
+    @property
+    def where(self):
+        return f'{self.path}:{self.line}'
+
+    @property
+    def methods(self):
+        return [method for method, _ in self.calls]
+
+    @property
+    def writes(self):
+        return [method for method in self.methods if method in WRITES]
+
+    def args(self, method):
+        """Raw argument text of every call to ``method``."""
+        return [args for name, args in self.calls if name == method]
+
+    def __repr__(self):
+        return f'Chain({self.table!r}, {self.methods!r} at {self.where})'
+
+
+def first_string(args):
+    """The leading string literal of an argument list, or None."""
+    match = _STRING_RE.match(args)
+    return match.group(2) if match else None
+
+
+def _skip_string(text, i):
+    """Index just past the string/template literal starting at text[i]."""
+    quote = text[i]
+    i += 1
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == quote:
+            return i + 1
+        if quote == '`' and text.startswith('${', i):
+            i = _matching(text, i + 1) + 1
+            continue
+        i += 1
+    return i
+
+
+def _matching(text, i):
+    """Index of the bracket closing the one at text[i] (strings and comments skipped)."""
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    stack = [pairs[text[i]]]
+    i += 1
+    while i < len(text) and stack:
+        ch = text[i]
+        if ch in '\'"`':
+            i = _skip_string(text, i)
+            continue
+        if text.startswith('//', i):
+            i = text.find('\n', i)
+            i = len(text) if i < 0 else i
+            continue
+        if text.startswith('/*', i):
+            i = text.find('*/', i)
+            i = len(text) if i < 0 else i + 2
+            continue
+        if ch in pairs:
+            stack.append(pairs[ch])
+        elif ch == stack[-1]:
+            stack.pop()
+            if not stack:
+                return i
+        i += 1
+    return len(text) - 1
+
+
+def scan_text(text, path='<text>'):
+    """Chains in one source text."""
+    chains = []
+    for match in _FROM_RE.finditer(text):
+        pos = match.end()
+        calls = []
+        while True:
+            method = _METHOD_RE.match(text, pos)
+            if not method:
+                break
+            open_paren = method.end() - 1
+            close = _matching(text, open_paren)
+            calls.append((method.group(2), text[open_paren + 1:close].strip()))
+            pos = close + 1
+        line = text.count('\n', 0, match.start()) + 1
+        chains.append(Chain(path, line, match.group(2), calls))
+    return chains
+
+
+def expand(patterns=None):
+    paths = []
+    for pattern in patterns or DEFAULT_PATHS:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if path not in paths and 'node_modules' not in path:
+                paths.append(path)
+    return paths
+
+
+def scan(patterns=None):
+    """Chains in every file matching ``patterns`` (default: the app and edge function sources)."""
+    chains = []
+    for path in expand(patterns):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            chains += scan_text(f.read(), path)
+    return chains
@@ -0,0 +1,292 @@
+"""
+Content-addressed cache for generated policy SQL.
+
+The compiler wrappers used to rewrite database/add-all-rls-policies.sql on
+every run. With the cache, a run whose inputs, format, title and generator
+code all hash the same as last time is skipped outright. Otherwise each
+policy (each table, for --format batched) is rendered into a fragment keyed
+by the hash of its content, so a one-policy change renders and stores one
+fragment and reuses the rest. The assembled file is only replaced when its
+bytes change. ``pgtools apply --cache`` uses the same keys to skip tables
+whose policies were already applied to that database.
+
+Layout (``.pgtools-cache/`` in the working directory, or $PGTOOLS_CACHE):
+    fragments/ab/abcdef....sql    one rendered unit, named by its content key
+    outputs/<path hash>.json      manifest per generated file
+    applied/<dsn hash>.json       per-table keys last applied to a database
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools compile --cache policies.json -o database/add-all-rls-policies.sql
+    PYTHONPATH=scripts python3 -m pgtools cache             # show size
+    PYTHONPATH=scripts python3 -m pgtools cache --prune     # drop unreferenced fragments
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+
+from . import policies as policy_mod
+
+DEFAULT_DIR = '.pgtools-cache'
+
+# Modules whose code decides what the rendered SQL looks like
+_GENERATOR_MODULES = ('policies.py', 'sql.py')
+
+
+@lru_cache(maxsize=None)
+def source_hash(*modules):
+    """Hash of pgtools module sources, so editing the code invalidates what it produced."""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in modules:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def generator_version():
+    return source_hash(*_GENERATOR_MODULES)
+
+
+def _sha256(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def unit_key(unit, fmt):
+    """Content key of one rendered unit (a policy, or a table's policies when batched)."""
+    payload = json.dumps([p.to_dict() for p in unit], sort_keys=True)
+    return _sha256(f'{generator_version()}\0{fmt}\0{payload}')
+
+
+def table_fingerprints(policy_list):
+    """``schema.table`` -> one key over that table's policies, for apply --cache."""
+    return {
+        '.'.join(unit[0].key[:2]): unit_key(unit, 'apply')
+        for unit in policy_mod.group_by_table(policy_list)
+    }
+
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Cache:
+    """Fragment store plus JSON manifests under one directory."""
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get('PGTOOLS_CACHE') or DEFAULT_DIR
+
+    def fragment_path(self, key):
+        return os.path.join(self.root, 'fragments', key[:2], key + '.sql')
+
+    def get_fragment(self, key):
+        try:
+            with open(self.fragment_path(key)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_fragment(self, key, text):
+        _atomic_write(self.fragment_path(key), text)
+
+    def _manifest_path(self, kind, name):
+        return os.path.join(self.root, kind, hashlib.sha1(name.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, kind, name):
+        try:
+            with open(self._manifest_path(kind, name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, kind, name, data):
+        _atomic_write(self._manifest_path(kind, name), json.dumps(data, indent=1, sort_keys=True))
+
+    def manifests(self, kind):
+        directory = os.path.join(self.root, kind)
+        if not os.path.isdir(directory):
+            return
+        for entry in sorted(os.listdir(directory)):
+            if entry.endswith('.json'):
+                with open(os.path.join(directory, entry)) as f:
+                    yield json.load(f)
+
+    def fragments(self):
+        directory = os.path.join(self.root, 'fragments')
+        for dirpath, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith('.sql'):
+                    yield name[:-4], os.path.join(dirpath, name)
+
+    def prune(self):
+        """Delete fragments no output manifest references; returns the count removed."""
+        live = {key for manifest in self.manifests('outputs') for key in manifest.get('fragments', [])}
+        removed = 0
+        for key, path in list(self.fragments()):
+            if key not in live:
+                os.unlink(path)
+                removed += 1
+        return removed
+
+
+class CompileResult:
+    __slots__ = ('output', 'count', 'skipped', 'rendered', 'reused', 'changed')
+
+    def __init__(self, output, count=0, skipped=False):
+        self.output = output
+        self.count = count
+        self.skipped = skipped      # inputs unchanged, nothing parsed or written
+        self.rendered = 0           # fragments rendered and stored this run
+        self.reused = 0             # fragments taken from the cache
+        self.changed = False        # output file bytes changed
+
+    def summary(self):
+        if self.skipped:
+            return f'{self.output} is up to date ({self.count} policies, inputs unchanged)'
+        state = 'updated' if self.changed else 'unchanged'
+        return (f'{self.output} {state}: {self.count} policies, '
+                f'{self.rendered} fragments rendered, {self.reused} reused')
+
+
+def _spool_stdin():
+    fd, path = tempfile.mkstemp(prefix='pgtools-stdin-', suffix='.json')
+    with os.fdopen(fd, 'w') as out:
+        shutil.copyfileobj(sys.stdin, out)
+    return path
+
+
+def inputs_digest(paths, fmt, title):
+    digest = hashlib.sha256(f'{generator_version()}\0{fmt}\0{title}'.encode('utf-8'))
+    for path in paths:
+        digest.update(_file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+def compile_file(inputs, output_path, fmt='guarded', title='ADD ALL RLS POLICIES TO DATABASE', cache=None):
+    """Cached policies.compile_file(); returns a CompileResult.
+
+    JSON output and stdout targets are not cached and always regenerate.
+    """
+    if fmt == 'json' or output_path == '-':
+        count = policy_mod.compile_file(inputs, output_path, fmt, title)
+        result = CompileResult(output_path, count)
+        result.changed = True
+        return result
+
+    cache = cache or Cache()
+    spooled = None
+    if '-' in inputs:
+        spooled = _spool_stdin()
+        inputs = [spooled if path == '-' else path for path in inputs]
+    try:
+        return _compile_cached(inputs, output_path, fmt, title, cache)
+    finally:
+        if spooled:
+            os.unlink(spooled)
+
+
+def _compile_cached(inputs, output_path, fmt, title, cache):
+    name = os.path.abspath(output_path)
+    digest = inputs_digest(inputs, fmt, title)
+    manifest = cache.load('outputs', name)
+    if manifest and manifest['inputs'] == digest and os.path.exists(output_path) \
+            and _file_sha256(output_path) == manifest['output']:
+        return CompileResult(output_path, manifest['count'], skipped=True)
+
+    result = CompileResult(output_path)
+    keys = []
+    parts = []
+    policy_list = (p for path in inputs for p in policy_mod.iter_policies(path))
+    for unit in policy_mod.units(policy_list, fmt):
+        key = unit_key(unit, fmt)
+        text = cache.get_fragment(key)
+        if text is None:
+            text = policy_mod.render_unit(unit, fmt)
+            cache.put_fragment(key, text)
+            result.rendered += 1
+        else:
+            result.reused += 1
+        keys.append(key)
+        parts.append(text)
+        result.count += len(unit)
+
+    script = (policy_mod.script_header(fmt, title) + '\n\n'.join(parts)
+              + policy_mod.footer(f'COMPLETED: {result.count} policies'))
+    script_sha = _sha256(script)
+    if not (os.path.exists(output_path) and _file_sha256(output_path) == script_sha):
+        _atomic_write(output_path, script)
+        result.changed = True
+    cache.save('outputs', name, {
+        'output': script_sha,
+        'inputs': digest,
+        'generator': generator_version(),
+        'format': fmt,
+        'count': result.count,
+        'fragments': keys,
+    })
+    return result
+
+
+class AppliedState:
+    """Per-table keys last applied to one database, keyed by a hash of its DSN."""
+
+    def __init__(self, cache, dsn):
+        self.cache = cache
+        self.name = dsn
+        self.tables = (cache.load('applied', dsn) or {}).get('tables', {})
+
+    def is_current(self, table, key):
+        return self.tables.get(table) == key
+
+    def record(self, table, key):
+        self.tables[table] = key
+
+    def save(self):
+        self.cache.save('applied', self.name, {'tables': self.tables})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools cache',
+        description='Inspect or clean the content-addressed cache of generated policy SQL.')
+    parser.add_argument('--dir', help=f'cache directory (default: $PGTOOLS_CACHE or {DEFAULT_DIR})')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--prune', action='store_true', help='delete fragments no output references')
+    action.add_argument('--clear', action='store_true', help='delete the whole cache')
+    args = parser.parse_args(argv)
+
+    cache = Cache(args.dir)
+    if args.clear:
+        shutil.rmtree(cache.root, ignore_errors=True)
+        print(f'✓ Removed {cache.root}')
+        return 0
+    if args.prune:
+        print(f'✓ Pruned {cache.prune()} unreferenced fragments')
+
+    fragments = list(cache.fragments())
+    size = sum(os.path.getsize(path) for _, path in fragments)
+    outputs = list(cache.manifests('outputs'))
+    print(f'📊 {cache.root}: {len(fragments)} fragments ({size / 1024:.0f} KiB), '
+          f'{len(outputs)} generated files, {len(list(cache.manifests("applied")))} databases')
+    return 0
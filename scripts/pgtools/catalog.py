@@ -0,0 +1,1552 @@
+"""
+Offline schema catalog built from our SQL files, no database needed.
+
+Replays production_schema.sql, database/*.sql and supabase/migrations/*.sql
+(or any files given) statement by statement, the way Postgres would run
+them, and keeps the resulting state as typed objects: tables with their
+columns, constraints (including foreign keys), indexes, triggers and RLS
+policies, plus functions, views and extensions. CREATE / ALTER / DROP are
+honoured in order, DDL inside DO blocks is applied too, and every object
+remembers the file:line that defined it. Statements the parser does not
+understand become warnings instead of errors.
+
+The parsed catalog is stored as a compact binary snapshot under
+.pgtools-cache/catalog/ (one per input set) and reused while the inputs'
+mtime/size and the parser code are unchanged, so other commands can call
+``catalog.load()`` and get the whole schema in a few milliseconds.
+
+``--missing`` answers what compare-databases.js, identify-missing-functions.js
+and identify-missing-triggers.js needed two live databases for: which tables,
+columns, functions, triggers and views of a reference schema the inputs lack.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools catalog                  # summary
+    PYTHONPATH=scripts python3 -m pgtools catalog orders 'is_admin()'
+    PYTHONPATH=scripts python3 -m pgtools catalog --input 'database/*.sql' --input 'supabase/migrations/*.sql' \\
+        --missing production_schema.sql
+Python:
+    from pgtools import catalog
+    cat = catalog.load()
+    cat.table('orders').columns['status'].type
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+from . import cache
+from . import policies as policy_mod
+from . import sql
+from .index import DEFAULT_INPUTS, expand_inputs
+
+MAGIC = b'PGTCAT01'
+_HEADER = struct.Struct('<8sI')   # magic, header JSON length
+
+# Modules whose code decides what the catalog contains
+_PARSER_MODULES = ('catalog.py', 'sql.py', 'policies.py')
+
+PRIMARY, UNIQUE, FOREIGN, CHECK, EXCLUDE = 'p', 'u', 'f', 'c', 'x'
+
+NAMEDATALEN = 63
+
+_TYPE_ALIASES = {
+    'int': 'integer', 'int4': 'integer', 'int2': 'smallint', 'int8': 'bigint',
+    'serial': 'integer', 'serial4': 'integer', 'smallserial': 'smallint', 'serial2': 'smallint',
+    'bigserial': 'bigint', 'serial8': 'bigint',
+    'bool': 'boolean', 'float4': 'real', 'float8': 'double precision', 'float': 'double precision',
+    'varchar': 'character varying', 'char': 'character', 'bpchar': 'character',
+    'decimal': 'numeric', 'timestamptz': 'timestamp with time zone', 'timetz': 'time with time zone',
+}
+_SERIAL = frozenset(('serial', 'serial4', 'smallserial', 'serial2', 'bigserial', 'serial8'))
+
+# Words ending a column's type inside a column definition
+_TYPE_STOP = frozenset(('CONSTRAINT', 'NOT', 'NULL', 'DEFAULT', 'PRIMARY', 'UNIQUE', 'REFERENCES',
+                        'CHECK', 'GENERATED', 'COLLATE'))
+# Words ending a column constraint (DEFAULT expression, etc.)
+_COLUMN_STOP = _TYPE_STOP - {'COLLATE'}
+_CONSTRAINT_START = ('CONSTRAINT', 'PRIMARY', 'UNIQUE', 'FOREIGN', 'CHECK', 'EXCLUDE')
+
+# Words that start a function option after the RETURNS clause
+_FUNCTION_OPTIONS = frozenset(('LANGUAGE', 'IMMUTABLE', 'STABLE', 'VOLATILE', 'SECURITY', 'AS',
+                               'PARALLEL', 'COST', 'ROWS', 'SET', 'STRICT', 'CALLED', 'LEAKPROOF',
+                               'NOT', 'WINDOW', 'BEGIN', 'EXTERNAL', 'SUPPORT', 'TRANSFORM', 'RETURNS'))
+# Type words that are never argument names: ``(character varying)`` has no name
+_TYPE_LEADERS = frozenset(('character', 'double', 'timestamp', 'time', 'bit', 'interval',
+                           'national', 'varchar', 'char'))
+_ARG_MODES = ('IN', 'OUT', 'INOUT', 'VARIADIC')
+
+# PL/pgSQL words after which a DO body may start a DDL statement
+_BLOCK_WORDS = ('BEGIN', 'THEN', 'ELSE', 'LOOP')
+
+
+def _text(tokens, a, b):
+    """Source of tokens[a:b] with whitespace collapsed, comments and needless quotes dropped."""
+    out = []
+    for k in range(a, b):
+        tok = tokens[k]
+        if k > a and tok.start > tokens[k - 1].end:
+            out.append(' ')
+        out.append(sql.quote_ident(sql.ident_value(tok)) if tok.kind == sql.QIDENT else tok.text)
+    return ''.join(out)
+
+
+def normalize_type(text):
+    """Postgres' canonical spelling of a type: ``"varchar"(20)`` -> ``character varying(20)``."""
+    if '"' not in text:
+        text = text.lower()
+    text = re.sub(r'\s*([(),\[\]])\s*', r'\1', text)
+    text = re.sub(r'\)(?=\w)', ') ', text)
+    text = re.sub(r'^(?:public|pg_catalog)\.', '', text)
+    match = re.match(r'([a-z_][a-z0-9_]*)(.*)\Z', text, re.S)
+    if not match:
+        return text
+    base, rest = match.groups()
+    base = _TYPE_ALIASES.get(base, base)
+    if base in ('timestamp', 'time') and 'with' not in rest:
+        size, _, tail = rest.partition(')') if rest.startswith('(') else ('', '', rest)
+        size = size + ')' if size else ''
+        return f'{base}{size} without time zone{tail}'
+    return base + rest
+
+
+def _default_name(table, columns, suffix):
+    """Constraint name Postgres generates: <table>_<cols>_<suffix>, cut to NAMEDATALEN."""
+    name = '_'.join((table,) + tuple(columns))
+    return f'{name[:NAMEDATALEN - len(suffix) - 1]}_{suffix}'
+
+
+# ---------------------------------------------------------------------------
+# Catalog objects
+# ---------------------------------------------------------------------------
+
+class Column:
+    __slots__ = ('name', 'type', 'not_null', 'default', 'generated', 'identity', 'comment')
+
+    def __init__(self, name, type_, not_null=False, default=None):
+        self.name = name
+        self.type = type_
+        self.not_null = not_null
+        self.default = default
+        self.generated = None     # GENERATED ALWAYS AS (expr) STORED
+        self.identity = None      # 'ALWAYS' / 'BY DEFAULT'
+        self.comment = None
+
+    def sql(self):
+        out = f'{sql.quote_ident(self.name)} {self.type}'
+        if self.identity:
+            out += f' GENERATED {self.identity} AS IDENTITY'
+        if self.generated:
+            out += f' GENERATED ALWAYS AS ({self.generated}) STORED'
+        if self.default is not None:
+            out += f' DEFAULT {self.default}'
+        if self.not_null:
+            out += ' NOT NULL'
+        return out
+
+
+class Constraint:
+    __slots__ = ('name', 'kind', 'columns', 'ref_table', 'ref_columns', 'on_delete', 'on_update',
+                 'expr', 'deferrable', 'source')
+
+    def __init__(self, name, kind, columns=(), source=None):
+        self.name = name
+        self.kind = kind
+        self.columns = tuple(columns)
+        self.ref_table = None       # (schema, table) for foreign keys
+        self.ref_columns = ()
+        self.on_delete = None
+        self.on_update = None
+        self.expr = None            # CHECK expression or EXCLUDE body
+        self.deferrable = None
+        self.source = source
+
+    def definition(self):
+        cols = ', '.join(sql.quote_ident(c) for c in self.columns)
+        if self.kind == PRIMARY:
+            out = f'PRIMARY KEY ({cols})'
+        elif self.kind == UNIQUE:
+            out = f'UNIQUE ({cols})'
+        elif self.kind == FOREIGN:
+            out = f'FOREIGN KEY ({cols}) REFERENCES {sql.qualified(*self.ref_table)}'
+            if self.ref_columns:
+                out += ' (' + ', '.join(sql.quote_ident(c) for c in self.ref_columns) + ')'
+            if self.on_update:
+                out += f' ON UPDATE {self.on_update}'
+            if self.on_delete:
+                out += f' ON DELETE {self.on_delete}'
+        elif self.kind == CHECK:
+            out = f'CHECK ({self.expr})'
+        else:
+            out = f'EXCLUDE {self.expr}'
+        if self.deferrable:
+            out += f' {self.deferrable}'
+        return out
+
+
+class Index:
+    __slots__ = ('name', 'schema', 'table', 'keys', 'columns', 'unique', 'method', 'where',
+                 'include', 'constraint', 'source')
+
+    def __init__(self, name, schema, table, keys, columns, unique=False, method='btree', source=None):
+        self.name = name
+        self.schema = schema
+        self.table = table
+        self.keys = tuple(keys)         # key text as written, 'created_at DESC', '(lower(email))'
+        self.columns = tuple(columns)   # column name per key, None for expressions
+        self.unique = unique
+        self.method = method
+        self.where = None
+        self.include = ()
+        self.constraint = None          # name of the PRIMARY KEY / UNIQUE constraint behind it
+        self.source = source
+
+    def sql(self):
+        out = (f'CREATE {"UNIQUE " if self.unique else ""}INDEX {sql.quote_ident(self.name)} '
+               f'ON {sql.qualified(self.schema, self.table)} USING {self.method} ({", ".join(self.keys)})')
+        if self.include:
+            out += ' INCLUDE (' + ', '.join(sql.quote_ident(c) for c in self.include) + ')'
+        if self.where:
+            out += f' WHERE {self.where}'
+        return out
+
+
+class Function:
+    __slots__ = ('schema', 'name', 'kind', 'args', 'arg_types', 'returns', 'language', 'volatility',
+                 'security_definer', 'parallel', 'strict', 'leakproof', 'config', 'body',
+                 'definition', 'comment', 'source')
+
+    def __init__(self, schema, name, kind='function'):
+        self.schema = schema
+        self.name = name
+        self.kind = kind                # 'function' / 'procedure'
+        self.args = []                  # (mode, name, type, default)
+        self.arg_types = ()             # identity: types of the IN/INOUT/VARIADIC arguments
+        self.returns = None
+        self.language = None
+        self.volatility = 'VOLATILE'
+        self.security_definer = False
+        self.parallel = 'UNSAFE'
+        self.strict = False
+        self.leakproof = False
+        self.config = {}                # SET name = value
+        self.body = None
+        self.definition = None          # CREATE statement as written
+        self.comment = None
+        self.source = None
+
+    @property
+    def key(self):
+        return (self.schema, self.name, self.arg_types)
+
+    @property
+    def signature(self):
+        return f'{sql.qualified(self.schema, self.name)}({", ".join(self.arg_types)})'
+
+
+class Trigger:
+    __slots__ = ('name', 'schema', 'table', 'timing', 'events', 'update_columns', 'level', 'when',
+                 'function', 'arguments', 'constraint', 'source')
+
+    def __init__(self, name, schema, table):
+        self.name = name
+        self.schema = schema
+        self.table = table
+        self.timing = None              # BEFORE / AFTER / INSTEAD OF
+        self.events = ()                # INSERT / UPDATE / DELETE / TRUNCATE
+        self.update_columns = ()        # UPDATE OF ...
+        self.level = 'STATEMENT'
+        self.when = None
+        self.function = None            # (schema, name)
+        self.arguments = ''
+        self.constraint = False
+        self.source = None
+
+    def sql(self):
+        events = []
+        for event in self.events:
+            if event == 'UPDATE' and self.update_columns:
+                event += ' OF ' + ', '.join(sql.quote_ident(c) for c in self.update_columns)
+            events.append(event)
+        out = (f'CREATE {"CONSTRAINT " if self.constraint else ""}TRIGGER {sql.quote_ident(self.name)} '
+               f'{self.timing} {" OR ".join(events)} ON {sql.qualified(self.schema, self.table)} '
+               f'FOR EACH {self.level}')
+        if self.when:
+            out += f' WHEN ({self.when})'
+        return out + f' EXECUTE FUNCTION {sql.qualified(*self.function)}({self.arguments})'
+
+
+class View:
+    __slots__ = ('schema', 'name', 'query', 'materialized', 'comment', 'source')
+
+    def __init__(self, schema, name, query, materialized=False, source=None):
+        self.schema = schema
+        self.name = name
+        self.query = query
+        self.materialized = materialized
+        self.comment = None
+        self.source = source
+
+
+class Table:
+    __slots__ = ('schema', 'name', 'columns', 'constraints', 'indexes', 'triggers', 'policies',
+                 'rls_enabled', 'rls_forced', 'partition_by', 'partition_of', 'comment', 'source')
+
+    def __init__(self, schema, name, source=None):
+        self.schema = schema
+        self.name = name
+        self.columns = {}        # name -> Column, in definition order
+        self.constraints = {}    # name -> Constraint
+        self.indexes = {}        # name -> Index
+        self.triggers = {}       # name -> Trigger
+        self.policies = {}       # name -> policies.Policy
+        self.rls_enabled = False
+        self.rls_forced = False
+        self.partition_by = None
+        self.partition_of = None
+        self.comment = None
+        self.source = source
+
+    @property
+    def key(self):
+        return (self.schema, self.name)
+
+    @property
+    def primary_key(self):
+        for constraint in self.constraints.values():
+            if constraint.kind == PRIMARY:
+                return constraint
+        return None
+
+    @property
+    def foreign_keys(self):
+        return [c for c in self.constraints.values() if c.kind == FOREIGN]
+
+    def drop_column(self, name):
+        """Drop a column with what Postgres drops along with it (indexes, constraints)."""
+        self.columns.pop(name, None)
+        for cname, constraint in list(self.constraints.items()):
+            if name in constraint.columns:
+                del self.constraints[cname]
+        for iname, index in list(self.indexes.items()):
+            if name in index.columns or name in index.include:
+                del self.indexes[iname]
+
+    def rename_column(self, old, new):
+        self.columns = {(new if name == old else name): col for name, col in self.columns.items()}
+        if new in self.columns:
+            self.columns[new].name = new
+
+        def swap(names):
+            return tuple(new if n == old else n for n in names)
+
+        for constraint in self.constraints.values():
+            constraint.columns = swap(constraint.columns)
+        for index in self.indexes.values():
+            index.columns = swap(index.columns)
+            index.keys = tuple(new if k == old else k for k in index.keys)
+        for trigger in self.triggers.values():
+            trigger.update_columns = swap(trigger.update_columns)
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+class Catalog:
+    """Schema state after running a list of SQL files in order."""
+
+    def __init__(self):
+        self.tables = {}         # (schema, name) -> Table
+        self.functions = {}      # (schema, name, arg types) -> Function
+        self.views = {}          # (schema, name) -> View
+        self.extensions = {}     # name -> schema
+        self.sources = []
+        self.warnings = []       # (file:line, message)
+        self._origin = None
+
+    # -- lookups ----------------------------------------------------------
+
+    @staticmethod
+    def _key(name, default_schema='public'):
+        if isinstance(name, tuple):
+            return name
+        schema, _, rel = (name if '"' in name else name.lower()).replace('"', '').rpartition('.')
+        return (schema or default_schema, rel)
+
+    def table(self, name):
+        return self.tables.get(self._key(name))
+
+    def view(self, name):
+        return self.views.get(self._key(name))
+
+    def functions_named(self, name):
+        schema, fname = self._key(name)
+        return [f for key, f in self.functions.items() if key[:2] == (schema, fname)]
+
+    def function(self, name, arg_types=None):
+        """The function ``name`` with these argument types, or its only overload."""
+        matches = self.functions_named(name)
+        if arg_types is not None:
+            arg_types = tuple(normalize_type(t) for t in arg_types)
+            matches = [f for f in matches if f.arg_types == arg_types]
+        return matches[0] if len(matches) == 1 else None
+
+    def policies(self):
+        for table in self.tables.values():
+            yield from table.policies.values()
+
+    def indexes(self):
+        for table in self.tables.values():
+            yield from table.indexes.values()
+
+    def triggers(self):
+        for table in self.tables.values():
+            yield from table.triggers.values()
+
+    def foreign_keys(self):
+        """(Table, Constraint) for every foreign key."""
+        for table in self.tables.values():
+            for constraint in table.foreign_keys:
+                yield table, constraint
+
+    def summary(self):
+        return {
+            'tables': len(self.tables),
+            'columns': sum(len(t.columns) for t in self.tables.values()),
+            'constraints': sum(len(t.constraints) for t in self.tables.values()),
+            'foreign keys': sum(1 for _ in self.foreign_keys()),
+            'indexes': sum(1 for _ in self.indexes()),
+            'functions': len(self.functions),
+            'triggers': sum(1 for _ in self.triggers()),
+            'policies': sum(1 for _ in self.policies()),
+            'views': len(self.views),
+            'extensions': len(self.extensions),
+        }
+
+    # -- replay -----------------------------------------------------------
+
+    def warn(self, message):
+        self.warnings.append((self._origin, message))
+
+    def apply_file(self, path):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            self.apply_sql(f.read(), path)
+        self.sources.append(path)
+
+    def apply_sql(self, text, origin='<sql>'):
+        line = 1
+        pos = 0
+        for stmt in sql.split_statements(text):
+            line += text.count('\n', pos, stmt.start)
+            pos = stmt.start
+            self._origin = f'{origin}:{line}'
+            self._apply(stmt.text, stmt.tokens)
+
+    def _apply(self, text, tokens, quiet=False):
+        try:
+            handler = self._handler(tokens)
+            if handler:
+                handler(text, tokens)
+        except (sql.SQLSyntaxError, IndexError, KeyError, ValueError) as e:
+            if not quiet:
+                self.warn(f'{" ".join(t.upper for t in tokens[:3])}: {e or type(e).__name__}')
+
+    def _handler(self, tokens):
+        first = tokens[0]
+        if first.is_kw('DO'):
+            return self._do
+        if first.is_kw('COMMENT'):
+            return self._comment
+        verb = first.upper
+        if verb not in ('CREATE', 'ALTER', 'DROP'):
+            return None
+        i = 1
+        while i < len(tokens) and tokens[i].is_kw('OR', 'REPLACE', 'UNIQUE', 'TEMP', 'TEMPORARY',
+                                                   'UNLOGGED', 'RECURSIVE', 'CONSTRAINT', 'MATERIALIZED'):
+            i += 1
+        kind = tokens[i].upper if i < len(tokens) else ''
+        return getattr(self, f'_{verb.lower()}_{kind.lower()}', None)
+
+    def _do(self, text, tokens):
+        for tok in tokens[1:]:
+            if tok.kind == sql.DOLLAR:
+                self._apply_body(sql.dollar_body(tok))
+
+    def _apply_body(self, body):
+        """DDL statements inside a PL/pgSQL block, including EXECUTE 'literal'."""
+        for stmt in sql.split_statements(body):
+            tokens = stmt.tokens
+            for k, tok in enumerate(tokens):
+                if k and not tokens[k - 1].is_kw(*_BLOCK_WORDS):
+                    continue
+                if tok.is_kw('CREATE', 'ALTER', 'DROP', 'COMMENT'):
+                    self._apply(stmt.text, tokens[k:], quiet=True)
+                    break
+                if tok.is_kw('EXECUTE') and len(tokens) == k + 2 and tokens[k + 1].kind == sql.STRING:
+                    self._apply_body(sql.string_value(tokens[k + 1]))
+                    break
+
+    # -- tables -----------------------------------------------------------
+
+    def _create_table(self, text, tokens):
+        i = sql.find_keywords(tokens, 'TABLE') + 1
+        if_not_exists = sql.find_keywords(tokens[i:i + 3], 'IF', 'NOT', 'EXISTS') == 0
+        if if_not_exists:
+            i += 3
+        key, i = sql.parse_qualified_name(tokens, i)
+        if key in self.tables:
+            if not if_not_exists:
+                self.warn(f'table {key[1]} already exists')
+            return
+        table = Table(*key, source=self._origin)
+        if i < len(tokens) and tokens[i].is_kw('PARTITION') and tokens[i + 1].is_kw('OF'):
+            parent, i = sql.parse_qualified_name(tokens, i + 2)
+            table.partition_of = parent
+            if parent in self.tables:
+                for col in self.tables[parent].columns.values():
+                    table.columns[col.name] = Column(col.name, col.type, col.not_null, col.default)
+        elif i < len(tokens) and tokens[i].is_op('('):
+            close = sql.matching_paren(tokens, i)
+            for start, end in sql.split_commas(tokens, i + 1, close):
+                if start == end or tokens[start].is_kw('LIKE'):
+                    continue
+                if tokens[start].is_kw(*_CONSTRAINT_START):
+                    self._add_constraint(table, tokens, start, end)
+                else:
+                    self._add_column(table, tokens, start, end)
+            i = close + 1
+        else:
+            self.warn(f'table {key[1]} created without a column list')
+        k = sql.find_keywords(tokens, 'PARTITION', 'BY', start=i)
+        if k != -1:
+            table.partition_by = _text(tokens, k + 2, len(tokens))
+        self.tables[key] = table
+
+    def _add_column(self, table, tokens, start, end):
+        name = sql.ident_value(tokens[start])
+        stop = start + 1
+        depth = 0
+        while stop < end:
+            tok = tokens[stop]
+            if tok.is_op('('):
+                depth += 1
+            elif tok.is_op(')'):
+                depth -= 1
+            elif depth == 0 and tok.kind == sql.WORD and tok.upper in _TYPE_STOP:
+                break
+            stop += 1
+        raw_type = _text(tokens, start + 1, stop)
+        column = Column(name, normalize_type(raw_type))
+        base = raw_type.lower().replace('"', '')
+        if base in _SERIAL:
+            column.default = f"nextval('{_default_name(table.name, (name,), 'seq')}'::regclass)"
+            column.not_null = True
+        table.columns[name] = column
+        self._column_constraints(table, column, tokens, stop, end)
+
+    def _column_constraints(self, table, column, tokens, i, end):
+        cname = None
+        while i < end:
+            tok = tokens[i]
+            if tok.is_kw('CONSTRAINT'):
+                cname = sql.ident_value(tokens[i + 1])
+                i += 2
+                continue
+            if tok.is_kw('NOT') and i + 1 < end and tokens[i + 1].is_kw('NULL'):
+                column.not_null = True
+                i += 2
+            elif tok.is_kw('NULL'):
+                column.not_null = False
+                i += 1
+            elif tok.is_kw('DEFAULT'):
+                j = _expression_end(tokens, i + 2, end)
+                column.default = _text(tokens, i + 1, j)
+                i = j
+            elif tok.is_kw('COLLATE'):
+                i += 2
+            elif tok.is_kw('GENERATED'):
+                j = i + 1
+                if tokens[j].is_kw('ALWAYS'):
+                    mode, j = 'ALWAYS', j + 1
+                else:
+                    mode, j = 'BY DEFAULT', j + 2
+                j += 1   # AS
+                if tokens[j].is_kw('IDENTITY'):
+                    column.identity = mode
+                    column.not_null = True
+                    j += 1
+                    if j < end and tokens[j].is_op('('):
+                        j = sql.matching_paren(tokens, j) + 1
+                else:
+                    close = sql.matching_paren(tokens, j)
+                    column.generated = _text(tokens, j + 1, close)
+                    j = close + 1
+                    if j < end and tokens[j].is_kw('STORED'):
+                        j += 1
+                i = j
+            elif tok.is_kw('PRIMARY', 'UNIQUE', 'REFERENCES', 'CHECK'):
+                constraint, i = self._constraint_body(table, tokens, i, end, cname, (column.name,))
+                self._register_constraint(table, constraint)
+                if constraint.kind == PRIMARY:
+                    column.not_null = True
+                cname = None
+                continue
+            else:
+                i += 1
+            cname = None
+
+    def _add_constraint(self, table, tokens, start, end):
+        name = None
+        if tokens[start].is_kw('CONSTRAINT'):
+            name = sql.ident_value(tokens[start + 1])
+            start += 2
+        constraint, _ = self._constraint_body(table, tokens, start, end, name, ())
+        self._register_constraint(table, constraint)
+        if constraint.kind == PRIMARY:
+            for col in constraint.columns:
+                if col in table.columns:
+                    table.columns[col].not_null = True
+        return constraint
+
+    def _constraint_body(self, table, tokens, i, end, name, columns):
+        """Parse PRIMARY KEY / UNIQUE / [FOREIGN KEY] REFERENCES / CHECK / EXCLUDE at tokens[i]."""
+        tok = tokens[i]
+        if tok.is_kw('PRIMARY'):
+            kind, i = PRIMARY, i + 2
+        elif tok.is_kw('UNIQUE'):
+            kind, i = UNIQUE, i + 1
+            if i < end and tokens[i].is_kw('NULLS'):
+                i += 3 if tokens[i + 1].is_kw('NOT') else 2
+        elif tok.is_kw('FOREIGN'):
+            kind, i = FOREIGN, i + 2
+        elif tok.is_kw('REFERENCES'):
+            kind = FOREIGN
+        elif tok.is_kw('CHECK'):
+            kind = CHECK
+        elif tok.is_kw('EXCLUDE'):
+            kind = EXCLUDE
+        else:
+            raise sql.SQLSyntaxError(f'unknown constraint {tok.text!r}')
+
+        constraint = Constraint(name, kind, columns, source=self._origin)
+        if kind in (PRIMARY, UNIQUE, FOREIGN) and i < end and tokens[i].is_op('('):
+            close = sql.matching_paren(tokens, i)
+            constraint.columns = _name_list(tokens, i + 1, close)
+            i = close + 1
+        if kind == FOREIGN:
+            if not tokens[i].is_kw('REFERENCES'):
+                raise sql.SQLSyntaxError('FOREIGN KEY without REFERENCES')
+            constraint.ref_table, i = sql.parse_qualified_name(tokens, i + 1)
+            if i < end and tokens[i].is_op('('):
+                close = sql.matching_paren(tokens, i)
+                constraint.ref_columns = _name_list(tokens, i + 1, close)
+                i = close + 1
+        elif kind == CHECK:
+            close = sql.matching_paren(tokens, i + 1)
+            constraint.expr = _text(tokens, i + 2, close)
+            i = close + 1
+        elif kind == EXCLUDE:
+            j = i + 1
+            while j < end and not tokens[j].is_kw('DEFERRABLE', 'INITIALLY', 'NOT'):
+                j += 1
+            constraint.expr = _text(tokens, i + 1, j)
+            i = j
+
+        flags = []
+        while i < end:
+            tok = tokens[i]
+            if tok.is_kw('ON') and i + 2 < end and tokens[i + 1].is_kw('DELETE', 'UPDATE'):
+                j = i + 2
+                action = [tokens[j].upper]
+                if tokens[j].is_kw('NO', 'SET'):
+                    j += 1
+                    action.append(tokens[j].upper)
+                j += 1
+                if j < end and tokens[j].is_op('('):
+                    j = sql.matching_paren(tokens, j) + 1
+                setattr(constraint, 'on_delete' if tokens[i + 1].is_kw('DELETE') else 'on_update',
+                        ' '.join(action))
+                i = j
+            elif tok.is_kw('MATCH'):
+                i += 2
+            elif tok.is_kw('NOT') and i + 1 < end and tokens[i + 1].is_kw('DEFERRABLE'):
+                i += 2
+            elif tok.is_kw('DEFERRABLE'):
+                flags.append('DEFERRABLE')
+                i += 1
+            elif tok.is_kw('INITIALLY'):
+                flags.append(f'INITIALLY {tokens[i + 1].upper}')
+                i += 2
+            elif tok.is_kw('NOT') and i + 1 < end and tokens[i + 1].is_kw('VALID'):
+                i += 2
+            elif tok.is_kw('NO') and i + 1 < end and tokens[i + 1].is_kw('INHERIT'):
+                i += 2
+            elif tok.is_kw('USING', 'INCLUDE', 'WITH'):
+                i += 1
+                while i < end and not tokens[i].is_op('(') and not tokens[i].is_kw(*_COLUMN_STOP):
+                    i += 1
+                if i < end and tokens[i].is_op('('):
+                    i = sql.matching_paren(tokens, i) + 1
+            else:
+                break
+        if flags:
+            constraint.deferrable = ' '.join(flags)
+
+        if constraint.name is None:
+            suffix = {PRIMARY: 'pkey', UNIQUE: 'key', FOREIGN: 'fkey', CHECK: 'check', EXCLUDE: 'excl'}[kind]
+            constraint.name = _default_name(table.name, () if kind == PRIMARY else constraint.columns, suffix)
+        return constraint, i
+
+    def _register_constraint(self, table, constraint):
+        table.constraints[constraint.name] = constraint
+        if constraint.kind in (PRIMARY, UNIQUE):
+            index = Index(constraint.name, table.schema, table.name,
+                          [sql.quote_ident(c) for c in constraint.columns], constraint.columns,
+                          unique=True, source=constraint.source)
+            index.constraint = constraint.name
+            table.indexes[index.name] = index
+
+    def _drop_constraint(self, table, name):
+        table.constraints.pop(name, None)
+        index = table.indexes.get(name)
+        if index is not None and index.constraint == name:
+            del table.indexes[name]
+
+    def _alter_table(self, text, tokens):
+        i = 2
+        if_exists = sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0
+        if if_exists:
+            i += 2
+        if tokens[i].is_kw('ONLY'):
+            i += 1
+        if tokens[i].is_kw('ALL'):
+            return
+        key, i = sql.parse_qualified_name(tokens, i)
+        table = self.tables.get(key)
+        if table is None:
+            if key in self.views:
+                return
+            if not if_exists:
+                self.warn(f'ALTER TABLE on unknown table {key[1]}')
+            return
+        for start, end in sql.split_commas(tokens, i, len(tokens)):
+            self._alter_action(table, tokens, start, end)
+
+    def _alter_action(self, table, tokens, i, end):
+        tok = tokens[i]
+        if tok.is_kw('ADD'):
+            i += 1
+            if tokens[i].is_kw(*_CONSTRAINT_START):
+                self._add_constraint(table, tokens, i, end)
+                return
+            if tokens[i].is_kw('COLUMN'):
+                i += 1
+            if sql.find_keywords(tokens[i:i + 3], 'IF', 'NOT', 'EXISTS') == 0:
+                i += 3
+                if sql.ident_value(tokens[i]) in table.columns:
+                    return
+            self._add_column(table, tokens, i, end)
+        elif tok.is_kw('DROP'):
+            i += 1
+            if tokens[i].is_kw('CONSTRAINT'):
+                i += 1
+                if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+                    i += 2
+                self._drop_constraint(table, sql.ident_value(tokens[i]))
+                return
+            if tokens[i].is_kw('COLUMN'):
+                i += 1
+            if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+                i += 2
+            if sql.is_name(tokens[i]):
+                table.drop_column(sql.ident_value(tokens[i]))
+        elif tok.is_kw('ALTER'):
+            i += 1
+            if tokens[i].is_kw('COLUMN'):
+                i += 1
+            column = table.columns.get(sql.ident_value(tokens[i]))
+            if column is None:
+                self.warn(f'ALTER COLUMN on unknown column {table.name}.{sql.ident_value(tokens[i])}')
+                return
+            self._alter_column(column, tokens, i + 1, end)
+        elif tok.is_kw('RENAME'):
+            i += 1
+            if tokens[i].is_kw('TO'):
+                self._rename_table(table, sql.ident_value(tokens[i + 1]))
+            elif tokens[i].is_kw('CONSTRAINT'):
+                old, new = sql.ident_value(tokens[i + 1]), sql.ident_value(tokens[i + 3])
+                if old in table.constraints:
+                    constraint = table.constraints.pop(old)
+                    constraint.name = new
+                    table.constraints[new] = constraint
+                    if old in table.indexes:
+                        index = table.indexes.pop(old)
+                        index.name = index.constraint = new
+                        table.indexes[new] = index
+            else:
+                if tokens[i].is_kw('COLUMN'):
+                    i += 1
+                table.rename_column(sql.ident_value(tokens[i]), sql.ident_value(tokens[i + 2]))
+        elif tok.is_kw('ENABLE') and sql.find_keywords(tokens[i:end], 'ROW', 'LEVEL', 'SECURITY') == 1:
+            table.rls_enabled = True
+        elif tok.is_kw('DISABLE') and sql.find_keywords(tokens[i:end], 'ROW', 'LEVEL', 'SECURITY') == 1:
+            table.rls_enabled = False
+        elif tok.is_kw('FORCE'):
+            table.rls_forced = True
+        elif tok.is_kw('NO') and tokens[i + 1].is_kw('FORCE'):
+            table.rls_forced = False
+        elif tok.is_kw('ATTACH') and tokens[i + 1].is_kw('PARTITION'):
+            child, _ = sql.parse_qualified_name(tokens, i + 2)
+            if child in self.tables:
+                self.tables[child].partition_of = table.key
+        elif tok.is_kw('DETACH') and tokens[i + 1].is_kw('PARTITION'):
+            child, _ = sql.parse_qualified_name(tokens, i + 2)
+            if child in self.tables:
+                self.tables[child].partition_of = None
+
+    def _alter_column(self, column, tokens, i, end):
+        tok = tokens[i]
+        if tok.is_kw('TYPE') or (tok.is_kw('SET') and tokens[i + 1].is_kw('DATA')):
+            i += 1 if tok.is_kw('TYPE') else 3
+            j = i
+            while j < end and not tokens[j].is_kw('USING', 'COLLATE'):
+                j += 1
+            column.type = normalize_type(_text(tokens, i, j))
+        elif tok.is_kw('SET') and tokens[i + 1].is_kw('DEFAULT'):
+            column.default = _text(tokens, i + 2, end)
+        elif tok.is_kw('DROP') and tokens[i + 1].is_kw('DEFAULT'):
+            column.default = None
+        elif tok.is_kw('SET') and tokens[i + 1].is_kw('NOT'):
+            column.not_null = True
+        elif tok.is_kw('DROP') and tokens[i + 1].is_kw('NOT'):
+            column.not_null = False
+        elif tok.is_kw('DROP') and tokens[i + 1].is_kw('IDENTITY'):
+            column.identity = None
+        elif tok.is_kw('ADD') and tokens[i + 1].is_kw('GENERATED'):
+            column.identity = 'ALWAYS' if tokens[i + 2].is_kw('ALWAYS') else 'BY DEFAULT'
+
+    def _rename_table(self, table, new):
+        old_key = table.key
+        del self.tables[old_key]
+        table.name = new
+        for index in table.indexes.values():
+            index.table = new
+        for trigger in table.triggers.values():
+            trigger.table = new
+        for name, policy in table.policies.items():
+            table.policies[name] = policy.replace(table=new)
+        self.tables[table.key] = table
+        for other in self.tables.values():
+            for constraint in other.foreign_keys:
+                if constraint.ref_table == old_key:
+                    constraint.ref_table = table.key
+
+    def _drop_table(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        cascade = tokens[-1].is_kw('CASCADE')
+        for start, end in sql.split_commas(tokens, i, len(tokens)):
+            key, _ = sql.parse_qualified_name(tokens, start)
+            if self.tables.pop(key, None) is not None and cascade:
+                for other in self.tables.values():
+                    for constraint in other.foreign_keys:
+                        if constraint.ref_table == key:
+                            del other.constraints[constraint.name]
+
+    # -- indexes ----------------------------------------------------------
+
+    def _create_index(self, text, tokens):
+        unique = tokens[1].is_kw('UNIQUE')
+        i = sql.find_keywords(tokens, 'INDEX') + 1
+        if tokens[i].is_kw('CONCURRENTLY'):
+            i += 1
+        if_not_exists = sql.find_keywords(tokens[i:i + 3], 'IF', 'NOT', 'EXISTS') == 0
+        if if_not_exists:
+            i += 3
+        name = None
+        if not tokens[i].is_kw('ON'):
+            name = sql.ident_value(tokens[i])
+            i += 1
+        i += 1
+        if tokens[i].is_kw('ONLY'):
+            i += 1
+        key, i = sql.parse_qualified_name(tokens, i)
+        table = self.tables.get(key)
+        if table is None:
+            if key not in self.views:
+                self.warn(f'index {name} on unknown table {key[1]}')
+            return
+        method = 'btree'
+        if tokens[i].is_kw('USING'):
+            method = tokens[i + 1].text.lower().strip('"')
+            i += 2
+        close = sql.matching_paren(tokens, i)
+        keys, columns = [], []
+        for start, end in sql.split_commas(tokens, i + 1, close):
+            keys.append(_text(tokens, start, end))
+            plain = sql.is_name(tokens[start]) and not (
+                start + 1 < end and tokens[start + 1].kind == sql.OP)
+            columns.append(sql.ident_value(tokens[start]) if plain else None)
+        unknown = [c for c in columns if c is not None and c not in table.columns]
+        if unknown:
+            self.warn(f'index {name} on unknown column {key[1]}.{unknown[0]}')
+            return
+        if name is None:
+            name = _default_name(key[1], [c or 'expr' for c in columns], 'idx')
+        if name in table.indexes:
+            if not if_not_exists:
+                self.warn(f'index {name} already exists')
+            return
+        index = Index(name, key[0], key[1], keys, columns, unique, method, source=self._origin)
+        i = close + 1
+        while i < len(tokens):
+            tok = tokens[i]
+            if tok.is_kw('INCLUDE'):
+                close = sql.matching_paren(tokens, i + 1)
+                index.include = _name_list(tokens, i + 2, close)
+                i = close + 1
+            elif tok.is_kw('WHERE'):
+                index.where = _text(tokens, i + 1, len(tokens))
+                break
+            elif tok.is_kw('WITH') and tokens[i + 1].is_op('('):
+                i = sql.matching_paren(tokens, i + 1) + 1
+            else:
+                i += 1
+        table.indexes[name] = index
+
+    def _find_index(self, key):
+        for table in self.tables.values():
+            if table.schema == key[0] and key[1] in table.indexes:
+                return table
+        return None
+
+    def _drop_index(self, text, tokens):
+        i = 2
+        if tokens[i].is_kw('CONCURRENTLY'):
+            i += 1
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        for start, _ in sql.split_commas(tokens, i, len(tokens)):
+            key, _ = sql.parse_qualified_name(tokens, start)
+            table = self._find_index(key)
+            if table is not None:
+                del table.indexes[key[1]]
+
+    def _alter_index(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        key, i = sql.parse_qualified_name(tokens, i)
+        table = self._find_index(key)
+        if table is not None and sql.find_keywords(tokens[i:i + 2], 'RENAME', 'TO') == 0:
+            index = table.indexes.pop(key[1])
+            index.name = sql.ident_value(tokens[i + 2])
+            table.indexes[index.name] = index
+
+    # -- functions --------------------------------------------------------
+
+    def _create_function(self, text, tokens, kind='function'):
+        i = sql.find_keywords(tokens, kind.upper()) + 1
+        (schema, name), i = sql.parse_qualified_name(tokens, i)
+        function = Function(schema, name, kind)
+        function.source = self._origin
+        close = sql.matching_paren(tokens, i)
+        function.args = _parse_args(tokens, i + 1, close)
+        function.arg_types = tuple(t for mode, _, t, _ in function.args if mode != 'OUT')
+        function.definition = text[tokens[0].start:tokens[-1].end]
+        i = close + 1
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            if tok.is_kw('RETURNS') and not tokens[i + 1].is_kw('NULL'):
+                j = i + 1
+                depth = 0
+                while j < n:
+                    if tokens[j].is_op('('):
+                        depth += 1
+                    elif tokens[j].is_op(')'):
+                        depth -= 1
+                    elif depth == 0 and tokens[j].kind == sql.WORD and tokens[j].upper in _FUNCTION_OPTIONS:
+                        break
+                    j += 1
+                if tokens[i + 1].is_kw('SETOF'):
+                    function.returns = 'SETOF ' + normalize_type(_text(tokens, i + 2, j))
+                elif tokens[i + 1].is_kw('TABLE'):
+                    function.returns = 'TABLE' + _text(tokens, i + 2, j)
+                else:
+                    function.returns = normalize_type(_text(tokens, i + 1, j))
+                i = j
+                continue
+            i = self._function_option(function, tokens, i)
+        self.functions[function.key] = function
+
+    def _create_procedure(self, text, tokens):
+        self._create_function(text, tokens, 'procedure')
+
+    def _function_option(self, function, tokens, i):
+        """Apply the option at tokens[i] (CREATE or ALTER FUNCTION); returns the next index."""
+        tok = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        if tok.is_kw('LANGUAGE'):
+            function.language = sql.ident_value(nxt)
+            return i + 2
+        if tok.is_kw('IMMUTABLE', 'STABLE', 'VOLATILE'):
+            function.volatility = tok.upper
+        elif tok.is_kw('SECURITY') or (tok.is_kw('EXTERNAL') and nxt is not None and nxt.is_kw('SECURITY')):
+            j = i + (2 if tok.is_kw('EXTERNAL') else 1)
+            function.security_definer = tokens[j].is_kw('DEFINER')
+            return j + 1
+        elif tok.is_kw('PARALLEL'):
+            function.parallel = nxt.upper
+            return i + 2
+        elif tok.is_kw('STRICT') or (tok.is_kw('RETURNS') and nxt is not None and nxt.is_kw('NULL')):
+            function.strict = True
+            return i + (1 if tok.is_kw('STRICT') else 5)
+        elif tok.is_kw('CALLED'):
+            function.strict = False
+            return i + 4
+        elif tok.is_kw('LEAKPROOF'):
+            function.leakproof = True
+        elif tok.is_kw('NOT') and nxt is not None and nxt.is_kw('LEAKPROOF'):
+            function.leakproof = False
+            return i + 2
+        elif tok.is_kw('SET') and nxt is not None and sql.is_name(nxt):
+            j = i + 2
+            if j < len(tokens) and tokens[j].is_kw('FROM'):
+                function.config[sql.ident_value(nxt)] = 'FROM CURRENT'
+                return j + 2
+            j += 1   # TO / =
+            k = j + 1
+            while k + 1 < len(tokens) and tokens[k].is_op(','):
+                k += 2
+            function.config[sql.ident_value(nxt)] = _text(tokens, j, k)
+            return k
+        elif tok.is_kw('RESET'):
+            if nxt is not None and nxt.is_kw('ALL'):
+                function.config.clear()
+            elif nxt is not None:
+                function.config.pop(sql.ident_value(nxt), None)
+            return i + 2
+        elif tok.is_kw('AS') and nxt is not None:
+            if nxt.kind == sql.DOLLAR:
+                function.body = sql.dollar_body(nxt)
+            elif nxt.kind == sql.STRING:
+                function.body = sql.string_value(nxt)
+            return i + 2
+        elif tok.is_kw('BEGIN') and nxt is not None and nxt.is_kw('ATOMIC'):
+            function.body = _text(tokens, i, len(tokens))
+            return len(tokens)
+        elif tok.is_kw('COST', 'ROWS', 'SUPPORT'):
+            return i + 2
+        return i + 1
+
+    def _function_ref(self, tokens, i):
+        """Functions named by ``name[(args)]`` at tokens[i]; returns (matches, next index)."""
+        (schema, name), i = sql.parse_qualified_name(tokens, i)
+        candidates = [f for key, f in self.functions.items() if key[:2] == (schema, name)]
+        if i < len(tokens) and tokens[i].is_op('('):
+            close = sql.matching_paren(tokens, i)
+            types = tuple(t for mode, _, t, _ in _parse_args(tokens, i + 1, close) if mode != 'OUT')
+            exact = [f for f in candidates if f.arg_types == types]
+            candidates = exact or (candidates if len(candidates) == 1 else [])
+            i = close + 1
+        return candidates, i
+
+    def _alter_function(self, text, tokens):
+        matches, i = self._function_ref(tokens, 2)
+        if not matches:
+            self.warn(f'ALTER FUNCTION on unknown function {_text(tokens, 2, i)}')
+            return
+        function = matches[0]
+        if tokens[i].is_kw('RENAME'):
+            del self.functions[function.key]
+            function.name = sql.ident_value(tokens[i + 2])
+            self.functions[function.key] = function
+            return
+        if tokens[i].is_kw('OWNER', 'DEPENDS', 'NO'):
+            return
+        while i < len(tokens):
+            i = self._function_option(function, tokens, i)
+
+    _alter_procedure = _alter_function
+
+    def _drop_function(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        for start, end in sql.split_commas(tokens, i, len(tokens)):
+            (schema, name), j = sql.parse_qualified_name(tokens, start)
+            if j < end and tokens[j].is_op('('):
+                matches, _ = self._function_ref(tokens, start)
+            else:
+                matches = [f for key, f in self.functions.items() if key[:2] == (schema, name)]
+            for function in matches:
+                self.functions.pop(function.key, None)
+
+    _drop_procedure = _drop_function
+
+    # -- triggers ---------------------------------------------------------
+
+    def _create_trigger(self, text, tokens):
+        i = sql.find_keywords(tokens, 'TRIGGER')
+        name = sql.ident_value(tokens[i + 1])
+        i += 2
+        timing = tokens[i].upper
+        i += 1
+        if timing == 'INSTEAD':
+            timing, i = 'INSTEAD OF', i + 1
+        events, update_columns = [], ()
+        while not tokens[i].is_kw('ON'):
+            if tokens[i].is_kw('INSERT', 'UPDATE', 'DELETE', 'TRUNCATE'):
+                events.append(tokens[i].upper)
+            elif tokens[i].is_kw('OF'):
+                j = i + 1
+                while not tokens[j].is_kw('OR', 'ON'):
+                    j += 1
+                update_columns = _name_list(tokens, i + 1, j)
+                i = j
+                continue
+            i += 1
+        key, i = sql.parse_qualified_name(tokens, i + 1)
+        table = self.tables.get(key)
+        if table is None:
+            if key not in self.views:
+                self.warn(f'trigger {name} on unknown table {key[1]}')
+            return
+        trigger = Trigger(name, key[0], key[1])
+        trigger.source = self._origin
+        trigger.constraint = sql.find_keywords(tokens[:4], 'CONSTRAINT') != -1
+        trigger.timing = timing
+        trigger.events = tuple(events)
+        trigger.update_columns = update_columns
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            if tok.is_kw('FOR'):
+                i += 1
+                if tokens[i].is_kw('EACH'):
+                    i += 1
+                trigger.level = tokens[i].upper
+            elif tok.is_kw('WHEN') and tokens[i + 1].is_op('('):
+                close = sql.matching_paren(tokens, i + 1)
+                trigger.when = _text(tokens, i + 2, close)
+                i = close
+            elif tok.is_kw('EXECUTE'):
+                trigger.function, j = sql.parse_qualified_name(tokens, i + 2)
+                close = sql.matching_paren(tokens, j)
+                trigger.arguments = _text(tokens, j + 1, close)
+                break
+            i += 1
+        table.triggers[name] = trigger
+
+    def _drop_trigger(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        name = sql.ident_value(tokens[i])
+        key, _ = sql.parse_qualified_name(tokens, i + 2)
+        table = self.tables.get(key)
+        if table is not None:
+            table.triggers.pop(name, None)
+
+    # -- policies ---------------------------------------------------------
+
+    def _create_policy(self, text, tokens):
+        policy = policy_mod.parse_create_policy(text, tokens, 0)
+        table = self.tables.get((policy.schema, policy.table))
+        if table is None:
+            self.warn(f'policy {policy.name!r} on unknown table {policy.table}')
+            return
+        if policy.name in table.policies:
+            self.warn(f'policy {policy.name!r} on {policy.table} already exists')
+        table.policies[policy.name] = policy
+
+    def _drop_policy(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        name = sql.ident_value(tokens[i])
+        key, _ = sql.parse_qualified_name(tokens, i + 2)
+        table = self.tables.get(key)
+        if table is not None:
+            table.policies.pop(name, None)
+
+    def _alter_policy(self, text, tokens):
+        name = sql.ident_value(tokens[2])
+        key, i = sql.parse_qualified_name(tokens, 4)
+        table = self.tables.get(key)
+        policy = table.policies.get(name) if table is not None else None
+        if policy is None:
+            self.warn(f'ALTER POLICY on unknown policy {name!r}')
+            return
+        changes = {}
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            if tok.is_kw('RENAME'):
+                changes['name'] = sql.ident_value(tokens[i + 2])
+                i += 3
+            elif tok.is_kw('TO'):
+                j = i + 1
+                roles = []
+                while j < n and not tokens[j].is_kw('USING', 'WITH'):
+                    if not tokens[j].is_op(','):
+                        roles.append(sql.ident_value(tokens[j]))
+                    j += 1
+                changes['roles'] = roles
+                i = j
+            elif tok.is_kw('USING') or (tok.is_kw('WITH') and tokens[i + 1].is_kw('CHECK')):
+                j = i + (1 if tok.is_kw('USING') else 2)
+                close = sql.matching_paren(tokens, j)
+                changes['using' if tok.is_kw('USING') else 'with_check'] = \
+                    text[tokens[j + 1].start:tokens[close - 1].end]
+                i = close + 1
+            else:
+                i += 1
+        del table.policies[name]
+        policy = policy.replace(**changes)
+        table.policies[policy.name] = policy
+
+    # -- views, extensions, comments --------------------------------------
+
+    def _create_view(self, text, tokens):
+        materialized = sql.find_keywords(tokens[:4], 'MATERIALIZED') != -1
+        i = sql.find_keywords(tokens, 'VIEW') + 1
+        if sql.find_keywords(tokens[i:i + 3], 'IF', 'NOT', 'EXISTS') == 0:
+            i += 3
+        key, i = sql.parse_qualified_name(tokens, i)
+        as_at = i
+        while not tokens[as_at].is_kw('AS'):
+            as_at = sql.matching_paren(tokens, as_at) + 1 if tokens[as_at].is_op('(') else as_at + 1
+        end = len(tokens)
+        for tail in (('WITH', 'NO', 'DATA'), ('WITH', 'DATA'), ('WITH', 'CHECK', 'OPTION'),
+                     ('WITH', 'CASCADED', 'CHECK', 'OPTION'), ('WITH', 'LOCAL', 'CHECK', 'OPTION')):
+            if sql.find_keywords(tokens[end - len(tail):], *tail) == 0:
+                end -= len(tail)
+                break
+        query = text[tokens[as_at + 1].start:tokens[end - 1].end]
+        self.views[key] = View(*key, query, materialized, source=self._origin)
+
+    def _drop_view(self, text, tokens):
+        i = sql.find_keywords(tokens, 'VIEW') + 1
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        for start, _ in sql.split_commas(tokens, i, len(tokens)):
+            key, _ = sql.parse_qualified_name(tokens, start)
+            self.views.pop(key, None)
+
+    def _alter_view(self, text, tokens):
+        i = sql.find_keywords(tokens, 'VIEW') + 1
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        key, i = sql.parse_qualified_name(tokens, i)
+        if key in self.views and sql.find_keywords(tokens[i:i + 2], 'RENAME', 'TO') == 0:
+            view = self.views.pop(key)
+            view.name = sql.ident_value(tokens[i + 2])
+            self.views[(view.schema, view.name)] = view
+
+    def _create_extension(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 3], 'IF', 'NOT', 'EXISTS') == 0:
+            i += 3
+        name = sql.ident_value(tokens[i])
+        k = sql.find_keywords(tokens, 'SCHEMA', start=i)
+        self.extensions[name] = sql.ident_value(tokens[k + 1]) if k != -1 else 'public'
+
+    def _drop_extension(self, text, tokens):
+        i = 2
+        if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+            i += 2
+        self.extensions.pop(sql.ident_value(tokens[i]), None)
+
+    def _comment(self, text, tokens):
+        i = sql.find_keywords(tokens, 'IS')
+        value = tokens[i + 1]
+        comment = sql.string_value(value) if value.kind == sql.STRING else None
+        kind = tokens[2].upper
+        if kind == 'COLUMN':
+            (first, second), j = sql.parse_qualified_name(tokens, 3)
+            if tokens[j].is_op('.'):
+                key, column = (first, second), sql.ident_value(tokens[j + 1])
+            else:
+                key, column = ('public', first), second
+            table = self.tables.get(key)
+            if table is not None and column in table.columns:
+                table.columns[column].comment = comment
+        elif kind == 'TABLE':
+            key, _ = sql.parse_qualified_name(tokens, 3)
+            if key in self.tables:
+                self.tables[key].comment = comment
+        elif kind in ('VIEW', 'MATERIALIZED'):
+            key, _ = sql.parse_qualified_name(tokens, 3 if kind == 'VIEW' else 4)
+            if key in self.views:
+                self.views[key].comment = comment
+        elif kind in ('FUNCTION', 'PROCEDURE'):
+            matches, _ = self._function_ref(tokens, 3)
+            for function in matches:
+                function.comment = comment
+
+
+def _expression_end(tokens, i, end):
+    """End of an expression starting before tokens[i]: the next top-level column keyword."""
+    depth = 0
+    while i < end:
+        tok = tokens[i]
+        if tok.is_op('(', '['):
+            depth += 1
+        elif tok.is_op(')', ']'):
+            depth -= 1
+        elif depth == 0 and tok.kind == sql.WORD and tok.upper in _COLUMN_STOP \
+                and not (tok.is_kw('NULL') and tokens[i - 1].is_kw('IS', 'NOT')):
+            break
+        i += 1
+    return min(i, end)
+
+
+def _name_list(tokens, start, end):
+    return tuple(sql.ident_value(tokens[a]) for a, b in sql.split_commas(tokens, start, end) if a < b)
+
+
+def _parse_args(tokens, start, end):
+    """Function arguments as (mode, name, normalized type, default text)."""
+    args = []
+    for a, b in sql.split_commas(tokens, start, end):
+        if a == b:
+            continue
+        mode = 'IN'
+        if tokens[a].is_kw(*_ARG_MODES) and b - a > 1:
+            mode = tokens[a].upper
+            a += 1
+        default = None
+        for k in range(a, b):
+            if tokens[k].is_kw('DEFAULT') or tokens[k].is_op('='):
+                default = _text(tokens, k + 1, b)
+                b = k
+                break
+        name = None
+        if b - a > 1 and sql.is_name(tokens[a]) and sql.is_name(tokens[a + 1]) \
+                and not (tokens[a].kind == sql.WORD and tokens[a].text.lower() in _TYPE_LEADERS):
+            name = sql.ident_value(tokens[a])
+            a += 1
+        args.append((mode, name, normalize_type(_text(tokens, a, b)), default))
+    return args
+
+
+# ---------------------------------------------------------------------------
+# Building, snapshots and comparison
+# ---------------------------------------------------------------------------
+
+def build(paths):
+    """Parse ``paths`` in order into a fresh Catalog."""
+    catalog = Catalog()
+    for path in paths:
+        catalog.apply_file(path)
+    return catalog
+
+
+def parser_version():
+    return cache.source_hash(*_PARSER_MODULES)
+
+
+def _stamps(paths):
+    stamps = []
+    for path in paths:
+        st = os.stat(path)
+        stamps.append([path, st.st_mtime_ns, st.st_size])
+    return stamps
+
+
+def snapshot_path(paths, root=None):
+    """Snapshot file for this ordered list of inputs."""
+    digest = hashlib.sha1('\0'.join(os.path.abspath(p) for p in paths).encode('utf-8')).hexdigest()
+    return os.path.join(root or cache.Cache().root, 'catalog', digest[:16] + '.bin')
+
+
+def save(catalog, path, stamps):
+    header = json.dumps({'version': parser_version(), 'files': stamps}).encode('utf-8')
+    payload = zlib.compress(pickle.dumps(catalog, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(header)))
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_snapshot(path, stamps=None):
+    """Catalog stored at ``path``; None when missing, corrupt or stale for ``stamps``."""
+    try:
+        with open(path, 'rb') as f:
+            magic, length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                return None
+            header = json.loads(f.read(length))
+            if header['version'] != parser_version() or (stamps is not None and header['files'] != stamps):
+                return None
+            return pickle.loads(zlib.decompress(f.read()))
+    except (OSError, ValueError, struct.error, zlib.error, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def load(inputs=None, rebuild=False, snapshot=True):
+    """Catalog of ``inputs`` (paths or globs, default: all repo SQL), from the snapshot when current."""
+    paths = expand_inputs(inputs or DEFAULT_INPUTS)
+    stamps = _stamps(paths)
+    path = snapshot_path(paths)
+    if snapshot and not rebuild:
+        catalog = read_snapshot(path, stamps)
+        if catalog is not None:
+            return catalog
+    catalog = build(paths)
+    if snapshot:
+        save(catalog, path, stamps)
+    return catalog
+
+
+def missing(reference, target):
+    """Objects of ``reference`` that ``target`` lacks, as {kind: [name, ...]}."""
+    result = {'tables': [], 'columns': [], 'functions': [], 'triggers': [], 'views': [], 'policies': []}
+    for key, table in sorted(reference.tables.items()):
+        other = target.tables.get(key)
+        if other is None:
+            result['tables'].append(sql.qualified(*key))
+            continue
+        result['columns'] += [f'{table.name}.{c}' for c in table.columns if c not in other.columns]
+        result['triggers'] += [f'{name} ON {table.name}' for name in sorted(table.triggers)
+                               if name not in other.triggers]
+        result['policies'] += [f'{name!r} ON {table.name}' for name in sorted(table.policies)
+                               if name not in other.policies]
+    have = {key[:2] for key in target.functions}
+    result['functions'] = sorted({f.signature for key, f in reference.functions.items() if key[:2] not in have})
+    result['views'] = sorted(sql.qualified(*key) for key in reference.views if key not in target.views)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+_KIND_NAMES = {PRIMARY: 'PRIMARY KEY', UNIQUE: 'UNIQUE', FOREIGN: 'FOREIGN KEY', CHECK: 'CHECK',
+               EXCLUDE: 'EXCLUDE'}
+
+
+def describe_table(table):
+    lines = [f'📋 table {sql.qualified(table.schema, table.name)}  ({table.source})'
+             + ('  [RLS]' if table.rls_enabled else '')]
+    if table.partition_by:
+        lines.append(f'   PARTITION BY {table.partition_by}')
+    width = max((len(c) for c in table.columns), default=0)
+    for column in table.columns.values():
+        extra = ' NOT NULL' if column.not_null else ''
+        if column.default is not None:
+            extra += f' DEFAULT {column.default}'
+        lines.append(f'   {column.name:<{width}}  {column.type}{extra}')
+    for constraint in table.constraints.values():
+        lines.append(f'   {_KIND_NAMES[constraint.kind]:<11} {constraint.name}: {constraint.definition()}')
+    for index in table.indexes.values():
+        if index.constraint is None:
+            lines.append(f'   INDEX       {index.name}: {"UNIQUE " if index.unique else ""}{index.method} '
+                         f'({", ".join(index.keys)})' + (f' WHERE {index.where}' if index.where else ''))
+    for trigger in table.triggers.values():
+        lines.append(f'   TRIGGER     {trigger.name}: {trigger.timing} {" OR ".join(trigger.events)} '
+                     f'FOR EACH {trigger.level} -> {sql.qualified(*trigger.function)}()')
+    for policy in table.policies.values():
+        lines.append(f'   POLICY      {policy.name} [{policy.command} TO {", ".join(policy.roles)}]')
+    return lines
+
+
+def describe_function(function):
+    flags = [function.volatility, f'PARALLEL {function.parallel}']
+    if function.security_definer:
+        flags.append('SECURITY DEFINER')
+    if function.strict:
+        flags.append('STRICT')
+    return [f'📋 {function.kind} {function.signature} RETURNS {function.returns}  ({function.source})',
+            f'   LANGUAGE {function.language} ' + ' '.join(flags)]
+
+
+def describe(catalog, term):
+    term = term.strip()
+    if term.endswith(')'):
+        name = term[:term.index('(')]
+        functions = catalog.functions_named(name)
+        return [line for f in functions for line in describe_function(f)] or [f'❌ no function {name}']
+    table = catalog.table(term)
+    if table is not None:
+        return describe_table(table)
+    view = catalog.view(term)
+    if view is not None:
+        kind = 'materialized view' if view.materialized else 'view'
+        return [f'📋 {kind} {sql.qualified(view.schema, view.name)}  ({view.source})', f'   {view.query}']
+    functions = catalog.functions_named(term)
+    if functions:
+        return [line for f in functions for line in describe_function(f)]
+    return [f'❌ nothing named {term}']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools catalog',
+        description='Offline schema catalog parsed from our SQL files, cached as a binary snapshot.')
+    parser.add_argument('terms', nargs='*', help="table, view or func() to describe")
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='SQL files/globs in run order (default: production_schema.sql, database/*.sql, '
+                             'supabase/migrations/*.sql)')
+    parser.add_argument('--missing', action='append', metavar='GLOB',
+                        help='list objects of this reference schema the inputs lack (repeatable)')
+    parser.add_argument('--rebuild', action='store_true', help='ignore the snapshot and re-parse')
+    parser.add_argument('--warnings', action='store_true', help='show statements the parser skipped')
+    parser.add_argument('--json', action='store_true', help='print --missing results as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        started = time.perf_counter()
+        catalog = load(args.inputs, args.rebuild)
+        elapsed = time.perf_counter() - started
+        reference = load(args.missing, args.rebuild) if args.missing else None
+    except (OSError, ValueError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    if not catalog.sources:
+        print('❌ No SQL files to parse', file=sys.stderr)
+        return 1
+
+    if reference is not None:
+        result = missing(reference, catalog)
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return 0
+        for kind, names in result.items():
+            print(f'📋 {len(names)} {kind} missing')
+            for name in names:
+                print(f'   ✗ {name}')
+        return 0
+
+    if args.terms:
+        for term in args.terms:
+            print('\n'.join(describe(catalog, term)))
+        return 0
+
+    counts = ', '.join(f'{n} {kind}' for kind, n in catalog.summary().items())
+    print(f'✓ {len(catalog.sources)} files: {counts} ({elapsed * 1000:.0f} ms)')
+    if catalog.warnings:
+        print(f'   {len(catalog.warnings)} statements skipped or ignored'
+              + ('' if args.warnings else ' (--warnings to list)'))
+    if args.warnings:
+        for origin, message in catalog.warnings:
+            print(f'   ⚠ {origin}: {message}')
+    return 0
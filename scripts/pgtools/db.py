@@ -0,0 +1,311 @@
+"""
+Database plumbing for the pgtools commands that talk to Postgres.
+
+Everything else in pgtools is offline; this module is only imported by
+commands that need a connection. It provides
+  * connect(dsn)      - psycopg 3 if installed, else psycopg2 (autocommit on)
+  * Pool              - bounded, thread-safe connection pool
+  * transaction()     - explicit BEGIN/COMMIT/ROLLBACK that works on both drivers
+  * LocalPostgres     - throwaway cluster from the local initdb/pg_ctl binaries
+                        (no Docker), removed again on exit
+  * SUPABASE_SHIM     - the auth schema and API roles our policies reference,
+                        for plain Postgres clusters
+
+The DSN is taken from --dsn or $DATABASE_URL.
+"""
+
+import glob
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# SQLSTATEs worth retrying: serialization failure, deadlock, lock timeout,
+# statement cancelled by timeout, too many connections
+RETRYABLE = frozenset(('40001', '40P01', '55P03', '57014', '53300'))
+
+SUPABASE_SHIM = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN CREATE ROLE anon NOLOGIN; END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN CREATE ROLE authenticated NOLOGIN; END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN CREATE ROLE service_role NOLOGIN BYPASSRLS; END IF;
+END $$;
+
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE SCHEMA IF NOT EXISTS extensions;
+
+CREATE TABLE IF NOT EXISTS auth.users (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    email text,
+    raw_user_meta_data jsonb DEFAULT '{}'::jsonb,
+    created_at timestamptz DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS uuid LANGUAGE sql STABLE AS $$
+    SELECT nullif(coalesce(current_setting('request.jwt.claim.sub', true),
+                           current_setting('request.jwt.claims', true)::jsonb ->> 'sub'), '')::uuid
+$$;
+
+CREATE OR REPLACE FUNCTION auth.role() RETURNS text LANGUAGE sql STABLE AS $$
+    SELECT nullif(coalesce(current_setting('request.jwt.claim.role', true),
+                           current_setting('request.jwt.claims', true)::jsonb ->> 'role'), '')::text
+$$;
+
+CREATE OR REPLACE FUNCTION auth.email() RETURNS text LANGUAGE sql STABLE AS $$
+    SELECT nullif(coalesce(current_setting('request.jwt.claim.email', true),
+                           current_setting('request.jwt.claims', true)::jsonb ->> 'email'), '')::text
+$$;
+
+CREATE OR REPLACE FUNCTION auth.jwt() RETURNS jsonb LANGUAGE sql STABLE AS $$
+    SELECT coalesce(nullif(current_setting('request.jwt.claims', true), ''), '{}')::jsonb
+$$;
+"""
+
+
+class DatabaseError(RuntimeError):
+    """Connection or driver problem, with the driver's message."""
+
+
+def _driver():
+    try:
+        import psycopg
+        return psycopg
+    except ImportError:
+        pass
+    try:
+        import psycopg2
+        return psycopg2
+    except ImportError:
+        raise DatabaseError('this command needs a Postgres driver: pip install "psycopg[binary]" '
+                            '(or psycopg2-binary)') from None
+
+
+def resolve_dsn(dsn):
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise DatabaseError('no database given: pass --dsn or set DATABASE_URL')
+    return dsn
+
+
+def connect(dsn):
+    """Autocommit connection; callers manage transactions with transaction()."""
+    driver = _driver()
+    try:
+        conn = driver.connect(dsn)
+    except driver.Error as e:
+        raise DatabaseError(str(e).strip()) from e
+    conn.autocommit = True
+    return conn
+
+
+def sqlstate(error):
+    """SQLSTATE of a driver exception (psycopg: .sqlstate, psycopg2: .pgcode)."""
+    return getattr(error, 'sqlstate', None) or getattr(error, 'pgcode', None)
+
+
+def is_retryable(error):
+    """Deadlocks, lock timeouts and dropped connections are worth another attempt."""
+    code = sqlstate(error)
+    if code is not None:
+        return code in RETRYABLE or code.startswith('08')
+    return type(error).__name__ in ('OperationalError', 'InterfaceError')
+
+
+def is_connection_error(error):
+    code = sqlstate(error)
+    if code is not None:
+        return code.startswith('08')
+    return type(error).__name__ in ('OperationalError', 'InterfaceError')
+
+
+def execute(conn, statement, params=None):
+    with conn.cursor() as cur:
+        cur.execute(statement, params)
+        return cur.fetchall() if cur.description else None
+
+
+@contextmanager
+def transaction(conn, settings=()):
+    """BEGIN ... COMMIT on an autocommit connection, ROLLBACK on any error.
+
+    ``settings`` are (name, value) pairs applied for this transaction only.
+    """
+    execute(conn, 'BEGIN')
+    try:
+        for name, value in settings:
+            execute(conn, 'SELECT set_config(%s, %s, true)', (name, str(value)))
+        yield conn
+    except BaseException:
+        try:
+            execute(conn, 'ROLLBACK')
+        except Exception:
+            pass
+        raise
+    execute(conn, 'COMMIT')
+
+
+class Pool:
+    """At most ``size`` connections to ``dsn``, opened on demand and shared across threads."""
+
+    def __init__(self, dsn, size):
+        self.dsn = dsn
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                new = True
+            else:
+                new = False
+        if not new:
+            return self._idle.get()
+        try:
+            return connect(self.dsn)
+        except BaseException:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception as e:
+            self.release(conn, broken=is_connection_error(e) or getattr(conn, 'closed', False))
+            raise
+        self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            self._opened -= 1
+
+
+def find_bindir(bindir=None):
+    """Directory holding initdb and pg_ctl: explicit, on PATH, pg_config, or the Debian layout."""
+    candidates = [bindir] if bindir else []
+    on_path = shutil.which('initdb')
+    if on_path:
+        candidates.append(os.path.dirname(on_path))
+    pg_config = shutil.which('pg_config')
+    if pg_config:
+        result = subprocess.run([pg_config, '--bindir'], capture_output=True, text=True)
+        candidates.append(result.stdout.strip())
+    candidates += sorted(glob.glob('/usr/lib/postgresql/*/bin'), reverse=True)
+    candidates += sorted(glob.glob('/opt/homebrew/opt/postgresql*/bin'), reverse=True)
+    candidates += sorted(glob.glob('/usr/local/opt/postgresql*/bin'), reverse=True)
+    for directory in candidates:
+        if directory and os.path.exists(os.path.join(directory, 'initdb')) \
+                and os.path.exists(os.path.join(directory, 'pg_ctl')):
+            return directory
+    raise DatabaseError('initdb/pg_ctl not found: install PostgreSQL or pass --pg-bindir')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class LocalPostgres:
+    """Throwaway Postgres cluster in a temp directory, reachable over a private unix socket.
+
+    Durability is switched off (fsync, synchronous_commit, full_page_writes):
+    the cluster only lives for one run.
+    """
+
+    def __init__(self, bindir=None, max_connections=100, keep=False):
+        self.bindir = find_bindir(bindir)
+        self.max_connections = max_connections
+        self.keep = keep
+        self.root = None
+        self.port = None
+
+    def _run(self, *args):
+        result = subprocess.run([os.path.join(self.bindir, args[0]), *args[1:]],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise DatabaseError(f'{args[0]} failed: {(result.stderr or result.stdout).strip()}')
+        return result.stdout
+
+    @property
+    def data_dir(self):
+        return os.path.join(self.root, 'data')
+
+    @property
+    def dsn(self):
+        return f'host={self.root} port={self.port} user=postgres dbname=postgres'
+
+    def start(self):
+        self.root = tempfile.mkdtemp(prefix='pgtools-pg-')
+        self.port = _free_port()
+        self._run('initdb', '-D', self.data_dir, '-U', 'postgres', '-A', 'trust',
+                  '-E', 'UTF8', '--no-sync')
+        options = (f"-p {self.port} -k {self.root} -c listen_addresses='' "
+                   f'-c max_connections={self.max_connections} -c fsync=off '
+                   '-c synchronous_commit=off -c full_page_writes=off')
+        self._run('pg_ctl', '-D', self.data_dir, '-o', options, '-l',
+                  os.path.join(self.root, 'postgres.log'), '-w', 'start')
+        return self
+
+    def stop(self):
+        if self.root is None:
+            return
+        try:
+            self._run('pg_ctl', '-D', self.data_dir, '-m', 'fast', '-w', 'stop')
+        finally:
+            if not self.keep:
+                shutil.rmtree(self.root, ignore_errors=True)
+            self.root = None
+
+    def __enter__(self):
+        try:
+            return self.start()
+        except BaseException:
+            self.stop()
+            raise
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_files(conn, paths):
+    """Execute whole SQL files on ``conn`` in order; returns seconds per file."""
+    timings = []
+    for path in paths:
+        with open(path) as f:
+            text = f.read()
+        started = time.perf_counter()
+        execute(conn, text)
+        timings.append((path, time.perf_counter() - started))
+    return timings
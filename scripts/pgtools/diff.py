@@ -0,0 +1,335 @@
+"""
+Offline RLS policy diff: compare two policy exports without touching a database.
+
+Replaces the live round trips in scripts/compare-rls-policies.js and
+scripts/compare-and-generate-rls.js. Each policy body is normalized
+(whitespace, identifier quoting, casts, redundant parentheses) and hashed,
+then the two sides are compared in one linear pass keyed on
+(schema, table, name). The output is the minimal script that turns TARGET
+into SOURCE: DROP for policies only in TARGET, CREATE for policies only in
+SOURCE, ALTER POLICY (or DROP + CREATE) for changed ones, and RENAME when a
+policy body moved to a new name on the same table.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools diff prod-policies.json dev-policies.json
+    PYTHONPATH=scripts python3 -m pgtools diff production_schema.sql dev.json -o database/sync-rls.sql
+"""
+
+import argparse
+import hashlib
+import sys
+
+from . import policies as policy_mod
+from . import sql
+
+# Keywords after which a parenthesised group is plain grouping, not call syntax
+_GROUPING_WORDS = frozenset('''
+    and or not where when then else case select on having by return is
+'''.split())
+
+# Operators/keywords that make a parenthesised group non-atomic
+_EXPR_WORDS = frozenset('''
+    and or not is in like ilike similar between select from where exists
+    case when then else end any all some distinct null
+'''.split())
+
+# pg_dump and pg_policies spell some cast targets differently
+_TYPE_ALIASES = {
+    ('character', 'varying'): 'varchar',
+    ('timestamp', 'with', 'time', 'zone'): 'timestamptz',
+    ('timestamp', 'without', 'time', 'zone'): 'timestamp',
+    ('time', 'with', 'time', 'zone'): 'timetz',
+    ('integer',): 'int4',
+    ('int',): 'int4',
+    ('bigint',): 'int8',
+    ('smallint',): 'int2',
+    ('boolean',): 'bool',
+    ('double', 'precision'): 'float8',
+}
+
+
+def _norm_token(tok):
+    if tok.kind == sql.WORD:
+        return tok.text.lower()
+    if tok.kind == sql.QIDENT:
+        name = sql.ident_value(tok)
+        quoted = sql.quote_ident(name)
+        return name if quoted == name else quoted
+    return tok.text
+
+
+def _tree(tokens):
+    """Nest tokens into lists at parentheses."""
+    stack = [[]]
+    for tok in tokens:
+        if tok.is_op('('):
+            stack.append([])
+        elif tok.is_op(')') and len(stack) > 1:
+            group = stack.pop()
+            stack[-1].append(group)
+        else:
+            stack[-1].append(_norm_token(tok))
+    while len(stack) > 1:
+        group = stack.pop()
+        stack[-1].append(group)
+    return stack[0]
+
+
+def _is_name(item):
+    return isinstance(item, str) and (item[0].isalpha() or item[0] in '_"')
+
+
+def _is_atomic(group):
+    for k, item in enumerate(group):
+        if isinstance(item, list):
+            if k == 0 or not _is_name(group[k - 1]):
+                return False
+        elif item in ('.', '::'):
+            continue
+        elif item in _EXPR_WORDS:
+            return False
+        elif not (_is_name(item) or item[0].isdigit() or item[0] == "'"):
+            return False
+    return True
+
+
+def _is_call(items, k):
+    if k == 0:
+        return False
+    prev = items[k - 1]
+    return _is_name(prev) and prev not in _GROUPING_WORDS
+
+
+def _simplify(items):
+    out = []
+    k = 0
+    while k < len(items):
+        item = items[k]
+        if isinstance(item, list):
+            group = _simplify(item)
+            while len(group) == 1 and isinstance(group[0], list):
+                group = group[0]
+            if group and not _is_call(out, len(out)) and _is_atomic(group):
+                out.extend(group)
+            else:
+                out.append(group)
+        elif item == 'public' and k + 2 < len(items) and items[k + 1] == '.' \
+                and (not out or out[-1] != '.'):
+            # Unqualified and public-qualified names resolve the same for us
+            k += 2
+            continue
+        elif item == '::':
+            out.append(item)
+            k += 1
+            for words, alias in _TYPE_ALIASES.items():
+                if tuple(items[k:k + len(words)]) == words:
+                    out.append(alias)
+                    k += len(words)
+                    break
+            continue
+        else:
+            out.append(item)
+        k += 1
+    while len(out) == 1 and isinstance(out[0], list):
+        out = out[0]
+    return out
+
+
+def _render(items):
+    out = []
+    prev = None
+    for item in items:
+        text = f'({_render(item)})' if isinstance(item, list) else item
+        tight = prev is not None and (
+            prev in ('.', '::', '[') or text in ('.', '::', ',', '[', ']')
+            or (isinstance(item, list) and _is_name(prev) and prev not in _GROUPING_WORDS and prev not in _EXPR_WORDS))
+        if out and not tight:
+            out.append(' ')
+        out.append(text)
+        prev = item if isinstance(item, str) else ')'
+    return ''.join(out)
+
+
+def expr_tree(text):
+    """Normalized expression as nested lists (one list per parenthesised group)."""
+    return _simplify(_tree(sql.tokenize(text)))
+
+
+def render_tree(items):
+    return _render(items)
+
+
+def split_top(items, word):
+    """Split a normalized tree on a top-level keyword ('and' / 'or')."""
+    parts = [[]]
+    for item in items:
+        if item == word:
+            parts.append([])
+        else:
+            parts[-1].append(item)
+    return [part[0] if len(part) == 1 and isinstance(part[0], list) else part for part in parts]
+
+
+def normalize_expr(text):
+    """Canonical text for a policy expression, stable across pg_dump/pg_policies spelling."""
+    if text is None:
+        return None
+    return _render(expr_tree(text))
+
+
+def body_key(policy):
+    """Everything that defines what a policy does, minus its name."""
+    return '|'.join((
+        'P' if policy.permissive else 'R',
+        policy.command,
+        ','.join(sorted(policy.roles)),
+        normalize_expr(policy.using) or '',
+        normalize_expr(policy.with_check) or '',
+    ))
+
+
+def fingerprint(policy):
+    return hashlib.sha1(body_key(policy).encode('utf-8')).hexdigest()
+
+
+class PolicyDiff:
+    """Result of comparing SOURCE (desired) against TARGET (current)."""
+
+    __slots__ = ('added', 'removed', 'changed', 'renamed', 'unchanged')
+
+    def __init__(self):
+        self.added = []      # Policy only in source
+        self.removed = []    # Policy only in target
+        self.changed = []    # (target Policy, source Policy)
+        self.renamed = []    # (target Policy, source Policy), same body
+        self.unchanged = 0
+
+    def is_empty(self):
+        return not (self.added or self.removed or self.changed or self.renamed)
+
+    def summary(self):
+        return (f'{len(self.added)} added, {len(self.removed)} removed, '
+                f'{len(self.changed)} changed, {len(self.renamed)} renamed, '
+                f'{self.unchanged} unchanged')
+
+
+def _index(policy_list):
+    indexed = {}
+    for policy in policy_list:
+        indexed[policy.key] = (policy, fingerprint(policy))
+    return indexed
+
+
+def diff(source, target):
+    """Compare two iterables of Policy; later duplicates of a key win."""
+    src = _index(source)
+    dst = _index(target)
+    result = PolicyDiff()
+
+    only_src = []
+    for key, (policy, digest) in src.items():
+        current = dst.get(key)
+        if current is None:
+            only_src.append((policy, digest))
+        elif current[1] == digest:
+            result.unchanged += 1
+        else:
+            result.changed.append((current[0], policy))
+
+    # A removed policy whose body reappears under a new name on the same table is a rename
+    orphans = {}
+    for key, (policy, digest) in dst.items():
+        if key not in src:
+            orphans.setdefault((policy.schema, policy.table, digest), []).append(policy)
+    for policy, digest in only_src:
+        candidates = orphans.get((policy.schema, policy.table, digest))
+        if candidates:
+            result.renamed.append((candidates.pop(), policy))
+        else:
+            result.added.append(policy)
+    for remaining in orphans.values():
+        result.removed.extend(remaining)
+
+    result.added.sort(key=lambda p: p.key)
+    result.removed.sort(key=lambda p: p.key)
+    result.changed.sort(key=lambda pair: pair[1].key)
+    result.renamed.sort(key=lambda pair: pair[1].key)
+    return result
+
+
+def alter_sql(old, new):
+    """ALTER POLICY turning ``old`` into ``new``, or None if it needs DROP + CREATE."""
+    if old.permissive != new.permissive or old.command != new.command:
+        return None
+    # ALTER POLICY cannot remove a USING or WITH CHECK clause
+    if (old.using is not None and new.using is None) or \
+            (old.with_check is not None and new.with_check is None):
+        return None
+    parts = [f'ALTER POLICY {sql.quote_ident_always(new.name)} ON {new.qualified_table}']
+    if sorted(old.roles) != sorted(new.roles):
+        parts.append(f'    TO {", ".join(policy_mod.role_sql(r) for r in new.roles)}')
+    if normalize_expr(old.using) != normalize_expr(new.using):
+        parts.append(f'    USING ({new.using})')
+    if normalize_expr(old.with_check) != normalize_expr(new.with_check):
+        parts.append(f'    WITH CHECK ({new.with_check})')
+    return '\n'.join(parts) + ';'
+
+
+def render(result, drop_extra=True):
+    """Minimal migration script for a PolicyDiff, wrapped in one transaction."""
+    out = [policy_mod.header(
+        'SYNC RLS POLICIES (generated by pgtools diff)',
+        [result.summary()],
+    ).rstrip('\n'), '', 'BEGIN;']
+
+    if drop_extra and result.removed:
+        out += ['', '-- Removed policies']
+        out += [p.drop_sql() for p in result.removed]
+    if result.renamed:
+        out += ['', '-- Renamed policies']
+        out += [f'ALTER POLICY {sql.quote_ident_always(old.name)} ON {new.qualified_table} '
+                f'RENAME TO {sql.quote_ident_always(new.name)};' for old, new in result.renamed]
+    if result.changed:
+        out += ['', '-- Changed policies']
+        for old, new in result.changed:
+            statement = alter_sql(old, new)
+            if statement is None:
+                statement = old.drop_sql() + '\n' + new.create_sql()
+            out += [statement, '']
+        out.pop()
+    if result.added:
+        out += ['', '-- Added policies']
+        for policy in result.added:
+            out += [policy.create_sql(), '']
+        out.pop()
+    out += ['', 'COMMIT;', '']
+    return '\n'.join(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools diff',
+        description='Diff two policy exports offline and emit the minimal sync script.')
+    parser.add_argument('source', help='desired state, e.g. the production export')
+    parser.add_argument('target', help='current state, e.g. the dev export')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--keep-extra', action='store_true',
+                        help='do not drop policies that only exist in TARGET')
+    args = parser.parse_args(argv)
+
+    try:
+        result = diff(policy_mod.iter_policies(args.source),
+                      policy_mod.iter_policies(args.target))
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    script = render(result, drop_extra=not args.keep_extra)
+    if args.output == '-':
+        sys.stdout.write(script)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(script)
+        print(f'✓ Generated {args.output}')
+    print(f'📊 {result.summary()}', file=sys.stderr)
+    return 0
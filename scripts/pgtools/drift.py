@@ -0,0 +1,432 @@
+"""
+Offline schema drift check: migration replay vs the production snapshot.
+
+scripts/compare-databases.sql, compare-db-simple.js and verify-db-sync.sql
+find drift by querying two live projects. This replays the migration files
+into the schema catalog (pgtools.catalog), parses production_schema.sql
+into another, and compares the two object by object: extensions, tables,
+columns (type, default, NOT NULL), constraints, indexes, functions
+(signature, options, body), views, triggers, row level security and
+policies (compared as in ``pgtools diff``).
+
+The output is a drift report and a fix-up script that brings a database
+built from the migrations to the production state. Objects that only the
+migrations create are listed in the script as commented-out drops; pass
+--drop-extra to drop them. Renamed constraints and indexes (same definition,
+new name) become RENAMEs. Nothing touches the network, so the check can run
+on every commit (--check exits 1 on drift).
+
+The migrations replay in ``pgtools plan`` order. They do not create the core
+tables on their own (see ``pgtools plan --no-baseline``); ``--baseline``
+replays them on top of production_schema.sql instead, which shows what the
+migrations would still change in production.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools drift
+    PYTHONPATH=scripts python3 -m pgtools drift --baseline -o database/fix-schema-drift.sql
+    PYTHONPATH=scripts python3 -m pgtools drift supabase/migrations/*.sql --json
+    PYTHONPATH=scripts python3 -m pgtools drift --baseline --check
+"""
+
+import argparse
+import json
+import sys
+
+from . import catalog as catalog_mod
+from . import diff as diff_mod
+from . import dupindex
+from . import index as index_mod
+from . import plan as plan_mod
+from . import policies as policy_mod
+from . import squash
+from . import sql
+
+MISSING = 'missing'     # in production, not produced by the migrations
+EXTRA = 'extra'         # produced by the migrations, not in production
+CHANGED = 'changed'
+RENAMED = 'renamed'
+
+# Fix-up order; drops of extra objects run first, in reverse
+PHASES = ('extension', 'table', 'column', 'constraint', 'function', 'view', 'foreign key',
+          'index', 'trigger', 'rls', 'policy')
+
+
+class Drift:
+    __slots__ = ('kind', 'name', 'change', 'detail', 'fix')
+
+    def __init__(self, kind, name, change, detail='', fix=''):
+        self.kind = kind
+        self.name = name
+        self.change = change
+        self.detail = detail
+        self.fix = fix
+
+    def to_dict(self):
+        return {'kind': self.kind, 'name': self.name, 'change': self.change, 'detail': self.detail}
+
+
+def default_inputs(baseline=False):
+    """The migrations in planned order, optionally after production_schema.sql."""
+    plan = plan_mod.build(None, plan_mod.DEFAULT_BASELINE)
+    paths = [m.path for wave in plan.waves for unit in wave for m in unit]
+    return ([b.path for b in plan.baseline] if baseline else []) + paths
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def _norm(text):
+    return diff_mod.normalize_expr(text) if text else None
+
+
+def _column_state(column):
+    return (column.type, _norm(column.default), column.not_null, _norm(column.generated), column.identity)
+
+
+def _constraint_state(constraint):
+    action = {None: 'NO ACTION'}
+    return (constraint.kind, constraint.columns, constraint.ref_table, constraint.ref_columns,
+            action.get(constraint.on_delete, constraint.on_delete),
+            action.get(constraint.on_update, constraint.on_update),
+            _norm(constraint.expr), constraint.deferrable)
+
+
+def _function_state(function):
+    state = squash._function_state(function)
+    return state[:-1] + (' '.join(state[-1].split()),)
+
+
+def _view_state(view):
+    return (view.materialized, ' '.join(view.query.lower().split()))
+
+
+def _matched(prod, repl, state):
+    """Pair two name -> object maps: (missing, extra, changed, renamed) by name, then by state."""
+    missing = {name: obj for name, obj in prod.items() if name not in repl}
+    extra = {name: obj for name, obj in repl.items() if name not in prod}
+    changed = [(repl[name], obj) for name, obj in prod.items()
+               if name in repl and state(repl[name]) != state(obj)]
+    renamed = []
+    by_state = {}
+    for name, obj in extra.items():
+        by_state.setdefault(state(obj), []).append(name)
+    for name, obj in list(missing.items()):
+        candidates = by_state.get(state(obj))
+        if candidates:
+            old = candidates.pop()
+            renamed.append((extra.pop(old), obj))
+            del missing[name]
+    return list(missing.values()), list(extra.values()), changed, renamed
+
+
+def _drop(statement, drop_extra):
+    return statement if drop_extra else '-- ' + statement.replace('\n', '\n-- ')
+
+
+def compare_tables(prod, repl, drop_extra=False):
+    out = []
+    for key, table in prod.tables.items():
+        name = sql.qualified(*key)
+        other = repl.tables.get(key)
+        if other is None:
+            out.append(Drift('table', name, MISSING, f'{len(table.columns)} columns', squash.table_sql(table)))
+            continue
+        for cname, column in table.columns.items():
+            theirs = other.columns.get(cname)
+            if theirs is None:
+                out.append(Drift('column', f'{name}.{cname}', MISSING, column.sql(),
+                                 f'ALTER TABLE {name} ADD COLUMN IF NOT EXISTS {column.sql()};'))
+            elif _column_state(theirs) != _column_state(column):
+                out.append(Drift('column', f'{name}.{cname}', CHANGED, f'{theirs.sql()} -> {column.sql()}',
+                                 _alter_column(name, theirs, column)))
+        for cname, column in other.columns.items():
+            if cname not in table.columns:
+                out.append(Drift('column', f'{name}.{cname}', EXTRA, column.sql(), _drop(
+                    f'ALTER TABLE {name} DROP COLUMN IF EXISTS {sql.quote_ident(cname)};', drop_extra)))
+        out += _compare_constraints(name, table, other, drop_extra)
+        out += _compare_indexes(name, table, other, drop_extra)
+        out += _compare_triggers(name, table, other, drop_extra)
+        if (table.rls_enabled, table.rls_forced) != (other.rls_enabled, other.rls_forced):
+            fix = [f'ALTER TABLE {name} {"ENABLE" if table.rls_enabled else "DISABLE"} ROW LEVEL SECURITY;']
+            if table.rls_forced != other.rls_forced:
+                fix.append(f'ALTER TABLE {name} {"" if table.rls_forced else "NO "}FORCE ROW LEVEL SECURITY;')
+            out.append(Drift('rls', name, CHANGED,
+                             f'enabled {other.rls_enabled} -> {table.rls_enabled}, '
+                             f'forced {other.rls_forced} -> {table.rls_forced}', '\n'.join(fix)))
+    for key, table in repl.tables.items():
+        if key not in prod.tables:
+            name = sql.qualified(*key)
+            out.append(Drift('table', name, EXTRA, f'{len(table.columns)} columns',
+                             _drop(f'DROP TABLE IF EXISTS {name};', drop_extra)))
+    # a table missing from the replay also lacks its indexes, triggers and RLS
+    for key, table in prod.tables.items():
+        if key not in repl.tables:
+            name = sql.qualified(*key)
+            empty = catalog_mod.Table(*key)
+            out += [d for d in _compare_constraints(name, table, empty, drop_extra) if d.kind == 'foreign key']
+            out += _compare_indexes(name, table, empty, drop_extra)
+            out += _compare_triggers(name, table, empty, drop_extra)
+            if table.rls_enabled:
+                out.append(Drift('rls', name, CHANGED, 'enabled False -> True',
+                                 f'ALTER TABLE {name} ENABLE ROW LEVEL SECURITY;'))
+    return out
+
+
+def _alter_column(table, old, new):
+    column = sql.quote_ident(new.name)
+    prefix = f'ALTER TABLE {table} ALTER COLUMN {column}'
+    out = []
+    if old.type != new.type:
+        out.append(f'{prefix} TYPE {new.type} USING {column}::{new.type};')
+    if _norm(old.default) != _norm(new.default):
+        out.append(f'{prefix} SET DEFAULT {new.default};' if new.default is not None else f'{prefix} DROP DEFAULT;')
+    if old.not_null != new.not_null:
+        out.append(f'{prefix} {"SET" if new.not_null else "DROP"} NOT NULL;')
+    if (_norm(old.generated), old.identity) != (_norm(new.generated), new.identity):
+        out.append(f'-- {table}.{new.name}: generated/identity differs, recreate the column by hand')
+    return '\n'.join(out)
+
+
+def _compare_constraints(name, table, other, drop_extra):
+    out = []
+    missing, extra, changed, renamed = _matched(table.constraints, other.constraints, _constraint_state)
+
+    def kind(c):
+        return 'foreign key' if c.kind == catalog_mod.FOREIGN else 'constraint'
+
+    def add(c):
+        if c.kind == catalog_mod.FOREIGN:
+            return squash.foreign_keys_sql(table, [c])
+        return f'ALTER TABLE {name} ADD CONSTRAINT {sql.quote_ident(c.name)} {c.definition()};'
+
+    def drop(c):
+        return f'ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {sql.quote_ident(c.name)};'
+
+    out += [Drift(kind(c), f'{name}.{c.name}', MISSING, c.definition(), add(c)) for c in missing]
+    out += [Drift(kind(c), f'{name}.{c.name}', EXTRA, c.definition(), _drop(drop(c), drop_extra)) for c in extra]
+    out += [Drift(kind(new), f'{name}.{new.name}', CHANGED, f'{old.definition()} -> {new.definition()}',
+                  drop(old) + '\n' + add(new)) for old, new in changed]
+    out += [Drift(kind(new), f'{name}.{new.name}', RENAMED, f'was {old.name}',
+                  f'ALTER TABLE {name} RENAME CONSTRAINT {sql.quote_ident(old.name)} TO {sql.quote_ident(new.name)};')
+            for old, new in renamed]
+    return out
+
+
+def _compare_indexes(name, table, other, drop_extra):
+    def plain(t):
+        return {n: i for n, i in t.indexes.items() if i.constraint is None}
+
+    def state(index):
+        return (index.unique,) + dupindex.shape(index)
+
+    out = []
+    missing, extra, changed, renamed = _matched(plain(table), plain(other), state)
+
+    def drop(index):
+        return f'DROP INDEX IF EXISTS {sql.qualified(index.schema, index.name)};'
+
+    out += [Drift('index', i.name, MISSING, i.sql(), squash.index_sql(i)) for i in missing]
+    out += [Drift('index', i.name, EXTRA, i.sql(), _drop(drop(i), drop_extra)) for i in extra]
+    out += [Drift('index', new.name, CHANGED, f'{old.sql()} -> {new.sql()}', drop(old) + '\n' + squash.index_sql(new))
+            for old, new in changed]
+    out += [Drift('index', new.name, RENAMED, f'was {old.name}',
+                  f'ALTER INDEX {sql.qualified(old.schema, old.name)} RENAME TO {sql.quote_ident(new.name)};')
+            for old, new in renamed]
+    return out
+
+
+def _compare_triggers(name, table, other, drop_extra):
+    out = []
+    for tname, trigger in table.triggers.items():
+        theirs = other.triggers.get(tname)
+        if theirs is None:
+            out.append(Drift('trigger', f'{name}.{tname}', MISSING, trigger.sql(), squash.trigger_sql(trigger)))
+        elif ' '.join(theirs.sql().lower().split()) != ' '.join(trigger.sql().lower().split()):
+            out.append(Drift('trigger', f'{name}.{tname}', CHANGED, f'{theirs.sql()} -> {trigger.sql()}',
+                             squash.trigger_sql(trigger)))
+    for tname in other.triggers:
+        if tname not in table.triggers:
+            out.append(Drift('trigger', f'{name}.{tname}', EXTRA, '', _drop(
+                f'DROP TRIGGER IF EXISTS {sql.quote_ident(tname)} ON {name};', drop_extra)))
+    return out
+
+
+def compare_functions(prod, repl, drop_extra=False):
+    out = []
+    for key, function in prod.functions.items():
+        theirs = repl.functions.get(key)
+        if theirs is None:
+            out.append(Drift('function', function.signature, MISSING, function.source or '',
+                             squash.function_sql(function)))
+        elif _function_state(theirs) != _function_state(function):
+            fields = ('returns', 'language', 'volatility', 'security definer', 'parallel', 'strict', 'config', 'body')
+            what = [f for f, a, b in zip(fields, _function_state(theirs), _function_state(function)) if a != b]
+            fix = squash.function_sql(function)
+            if theirs.returns != function.returns:
+                fix = f'DROP {function.kind.upper()} IF EXISTS {function.signature};\n' + fix
+            out.append(Drift('function', function.signature, CHANGED, ', '.join(what), fix))
+    for key, function in repl.functions.items():
+        if key not in prod.functions:
+            out.append(Drift('function', function.signature, EXTRA, function.source or '', _drop(
+                f'DROP {function.kind.upper()} IF EXISTS {function.signature};', drop_extra)))
+    return out
+
+
+def compare_views(prod, repl, drop_extra=False):
+    out = []
+    for key, view in prod.views.items():
+        name = sql.qualified(*key)
+        theirs = repl.views.get(key)
+        if theirs is None:
+            out.append(Drift('view', name, MISSING, '', squash.view_sql(view)))
+        elif _view_state(theirs) != _view_state(view):
+            kind = 'MATERIALIZED VIEW' if theirs.materialized else 'VIEW'
+            out.append(Drift('view', name, CHANGED, 'query differs',
+                             f'DROP {kind} IF EXISTS {name};\n' + squash.view_sql(view)))
+    for key, view in repl.views.items():
+        if key not in prod.views:
+            kind = 'MATERIALIZED VIEW' if view.materialized else 'VIEW'
+            name = sql.qualified(*key)
+            out.append(Drift('view', name, EXTRA, '', _drop(f'DROP {kind} IF EXISTS {name};', drop_extra)))
+    return out
+
+
+def compare_policies(prod, repl, drop_extra=False):
+    result = diff_mod.diff(prod.policies(), repl.policies())
+    out = []
+    for policy in result.added:
+        out.append(Drift('policy', f'{policy.qualified_table}.{policy.name}', MISSING, policy.command,
+                         policy.create_sql()))
+    for policy in result.removed:
+        out.append(Drift('policy', f'{policy.qualified_table}.{policy.name}', EXTRA, policy.command,
+                         _drop(policy.drop_sql(), drop_extra)))
+    for old, new in result.changed:
+        statement = diff_mod.alter_sql(old, new) or old.drop_sql() + '\n' + new.create_sql()
+        out.append(Drift('policy', f'{new.qualified_table}.{new.name}', CHANGED, new.command, statement))
+    for old, new in result.renamed:
+        out.append(Drift('policy', f'{new.qualified_table}.{new.name}', RENAMED, f'was {old.name}',
+                         f'ALTER POLICY {sql.quote_ident_always(old.name)} ON {new.qualified_table} '
+                         f'RENAME TO {sql.quote_ident_always(new.name)};'))
+    return out
+
+
+def compare_extensions(prod, repl, drop_extra=False):
+    out = [Drift('extension', name, MISSING, schema,
+                 f'CREATE EXTENSION IF NOT EXISTS {sql.quote_ident_always(name)}'
+                 + ('' if schema == 'public' else f' WITH SCHEMA {sql.quote_ident(schema)}') + ';')
+           for name, schema in prod.extensions.items() if name not in repl.extensions]
+    out += [Drift('extension', name, EXTRA, schema,
+                  _drop(f'DROP EXTENSION IF EXISTS {sql.quote_ident_always(name)};', drop_extra))
+            for name, schema in repl.extensions.items() if name not in prod.extensions]
+    return out
+
+
+def compare(prod, repl, drop_extra=False):
+    """Every difference between production (desired) and the replay (current)."""
+    out = []
+    for check in (compare_extensions, compare_tables, compare_functions, compare_views, compare_policies):
+        out += check(prod, repl, drop_extra)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def _counts(drifts):
+    counts = {}
+    for d in drifts:
+        counts.setdefault(d.kind, {}).setdefault(d.change, 0)
+        counts[d.kind][d.change] += 1
+    return counts
+
+
+def report(drifts, verbose=False, limit=10):
+    if not drifts:
+        return '✓ No drift: the migrations reproduce production_schema.sql'
+    counts = _counts(drifts)
+    lines = [f'📊 {len(drifts)} differences between production and the migration replay', '']
+    for kind in PHASES:
+        if kind in counts:
+            parts = ', '.join(f'{n} {change}' for change, n in sorted(counts[kind].items()))
+            lines.append(f'   {kind:<12} {parts}')
+    for kind in PHASES:
+        items = [d for d in drifts if d.kind == kind]
+        if not items:
+            continue
+        lines += ['', f'📋 {kind}:']
+        shown = items if verbose else items[:limit]
+        for d in shown:
+            lines.append(f'   {d.change:<8} {d.name}' + (f'  ({d.detail})' if d.detail else ''))
+        if len(shown) < len(items):
+            lines.append(f'   ... {len(items) - len(shown)} more (--verbose)')
+    return '\n'.join(lines)
+
+
+def render(drifts, drop_extra=False):
+    counts = _counts(drifts)
+    summary = '; '.join(f'{kind}: ' + ', '.join(f'{n} {c}' for c, n in sorted(counts[kind].items()))
+                        for kind in PHASES if kind in counts)
+    notes = ['Brings a database built from the migrations to the production schema.']
+    if not drop_extra:
+        notes.append('Objects only the migrations create are left; their drops are commented out.')
+    out = [policy_mod.header('FIX SCHEMA DRIFT (generated by pgtools drift)', [summary or 'no drift'], notes)
+           .rstrip('\n'), '', 'BEGIN;', '', 'SET LOCAL check_function_bodies = false;']
+    order = {kind: n for n, kind in enumerate(PHASES)}
+    drops = sorted((d for d in drifts if d.change == EXTRA), key=lambda d: -order[d.kind])
+    rest = sorted((d for d in drifts if d.change != EXTRA), key=lambda d: order[d.kind])
+    for d in drops + rest:
+        if d.fix:
+            out += ['', f'-- {d.kind} {d.name}: {d.change}', d.fix]
+    out += ['', 'COMMIT;']
+    out.append(policy_mod.footer(f'COMPLETED: {len(drifts)} differences').rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools drift',
+        description='Replay the migrations offline and diff the result against production_schema.sql.')
+    parser.add_argument('inputs', nargs='*', metavar='GLOB',
+                        help='migrations in run order (default: database/*.sql and supabase/migrations/*.sql '
+                             'in pgtools plan order)')
+    parser.add_argument('--production', default='production_schema.sql',
+                        help='production snapshot (default: production_schema.sql)')
+    parser.add_argument('--baseline', action='store_true',
+                        help='replay the migrations on top of the production snapshot')
+    parser.add_argument('-o', '--output', help='write the fix-up script here')
+    parser.add_argument('--drop-extra', action='store_true',
+                        help='drop objects that only the migrations create (commented out by default)')
+    parser.add_argument('--json', action='store_true', help='print the differences as JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='list every difference')
+    parser.add_argument('--check', action='store_true', help='exit 1 when there is any drift')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.inputs:
+            paths = index_mod.expand_inputs(args.inputs)
+            if args.baseline:
+                paths = [args.production] + [p for p in paths if p != args.production]
+        else:
+            paths = default_inputs(args.baseline)
+        if not paths:
+            raise ValueError(f'no SQL files match {" ".join(args.inputs)}')
+        prod = catalog_mod.load([args.production])
+        repl = catalog_mod.load(paths)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    drifts = compare(prod, repl, args.drop_extra)
+    if args.json:
+        json.dump({'production': args.production, 'replayed': paths,
+                   'differences': [d.to_dict() for d in drifts]}, sys.stdout, indent=2)
+        print()
+    else:
+        print(report(drifts, args.verbose))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(render(drifts, args.drop_extra))
+        print(f'✓ Generated {args.output}', file=sys.stderr)
+    return 1 if args.check and drifts else 0
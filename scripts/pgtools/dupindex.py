@@ -0,0 +1,265 @@
+"""
+Redundant and prefix-covered index detector.
+
+Indexes have been added piecemeal by the database/*.sql fix-up files and the
+supabase migrations, and every extra index is one more write on every order
+and ticket insert. From the schema catalog this finds indexes that are
+
+  * exact duplicates     - same table, method, keys, predicate and INCLUDE as
+                           another index (the earlier one is kept)
+  * superseded           - same keys as a PRIMARY KEY / UNIQUE constraint,
+                           whose index already serves every lookup
+  * prefix-covered       - a non-unique btree whose keys are a strict left
+                           prefix of another btree with the same predicate,
+                           e.g. (event_id) next to (event_id, status)
+
+and writes a ``DROP INDEX CONCURRENTLY`` migration plus a report with each
+drop's estimated size and the index writes it saves per insert. Constraint
+indexes and UNIQUE indexes are never dropped: they enforce something.
+
+Sizes are estimates: rows per table come from --sizes (row counts or size
+classes, as for rls-cost; classes stand for 1M / 10k / 100 rows) and entry
+width from the column types.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools dup-index
+    PYTHONPATH=scripts python3 -m pgtools dup-index --sizes sizes.json -o database/drop-redundant-indexes.sql
+    PYTHONPATH=scripts python3 -m pgtools dup-index --input production_schema.sql
+"""
+
+import argparse
+import json
+import re
+import sys
+
+from . import catalog as catalog_mod
+from . import diff as diff_mod
+from . import policies as policy_mod
+from . import rlscost
+from . import sql
+
+DUPLICATE = 'duplicate'
+SUPERSEDED = 'superseded by constraint'
+PREFIX = 'prefix-covered'
+
+# Nominal rows behind each size class when --sizes gives no count
+NOMINAL_ROWS = {'large': 1_000_000, 'medium': 10_000, 'small': 100}
+
+# Average stored width in bytes of common types; anything else counts as 16
+_TYPE_WIDTH = {
+    'boolean': 1, 'smallint': 2, 'integer': 4, 'bigint': 8, 'real': 4, 'double precision': 8,
+    'uuid': 16, 'date': 4, 'timestamp with time zone': 8, 'timestamp without time zone': 8,
+    'time without time zone': 8, 'numeric': 8, 'text': 24, 'inet': 8,
+}
+_ENTRY_OVERHEAD = 12       # index tuple header + line pointer
+_PAGE_FILL = 0.9           # default btree leaf fillfactor
+
+_ORDER_RE = re.compile(r'\s+(asc|desc)?\s*(nulls\s+(?:first|last))?\s*\Z', re.I)
+
+
+def _norm_key(key):
+    """Canonical key text: expression normalized, ASC and default NULLS ordering dropped."""
+    match = _ORDER_RE.search(key)
+    direction = nulls = ''
+    if match and match.group(0).strip():
+        direction = (match.group(1) or '').lower()
+        nulls = re.sub(r'\s+', ' ', (match.group(2) or '').lower())
+        key = key[:match.start()]
+    if nulls == ('nulls first' if direction == 'desc' else 'nulls last'):
+        nulls = ''
+    base = diff_mod.normalize_expr(key.strip())
+    return ' '.join(part for part in (base, '' if direction == 'asc' else direction, nulls) if part)
+
+
+def shape(index):
+    """Everything that decides what an index can serve, minus its name and uniqueness."""
+    return (index.method, tuple(_norm_key(k) for k in index.keys),
+            diff_mod.normalize_expr(index.where) if index.where else None, tuple(index.include))
+
+
+def _droppable(index):
+    return index.constraint is None and not index.unique
+
+
+class Finding:
+    __slots__ = ('table', 'index', 'reason', 'kept', 'rows', 'bytes')
+
+    def __init__(self, table, index, reason, kept):
+        self.table = table
+        self.index = index
+        self.reason = reason
+        self.kept = kept
+        self.rows = 0
+        self.bytes = 0
+
+    def to_dict(self):
+        return {
+            'table': f'{self.table.schema}.{self.table.name}',
+            'index': self.index.name,
+            'definition': self.index.sql(),
+            'reason': self.reason,
+            'kept': self.kept.name,
+            'source': self.index.source,
+            'estimated_rows': self.rows,
+            'estimated_bytes': self.bytes,
+        }
+
+
+def entry_width(table, index):
+    width = _ENTRY_OVERHEAD
+    for column in index.columns + tuple(index.include):
+        col = table.columns.get(column) if column else None
+        if col is None:
+            width += 16
+            continue
+        base = col.type.split('(')[0]
+        if base == 'character varying' and '(' in col.type:
+            width += min(int(re.sub(r'\D', '', col.type) or 32), 32)
+        else:
+            width += _TYPE_WIDTH.get(base, 16)
+    return width
+
+
+def table_rows(table, sizes=None):
+    value = (sizes or {}).get(table.name)
+    if isinstance(value, (int, float)):
+        return int(value)
+    return NOMINAL_ROWS[rlscost.size_class(table.name, sizes)]
+
+
+def find_redundant(table):
+    """Findings for one table; each dropped index is reported once, against the index kept."""
+    indexes = list(table.indexes.values())   # definition order: earlier indexes win ties
+    shapes = {index.name: shape(index) for index in indexes}
+    dropped = set()
+    findings = []
+
+    def keeper_rank(index):
+        return (index.constraint is None, not index.unique)
+
+    for index in indexes:
+        same = [other for other in indexes if other is not index and other.name not in dropped
+                and shapes[other.name] == shapes[index.name]]
+        if not same or not _droppable(index):
+            continue
+        kept = min(same, key=keeper_rank)
+        if keeper_rank(kept) == keeper_rank(index) and indexes.index(kept) > indexes.index(index):
+            continue   # the later plain duplicate is the one to drop
+        reason = SUPERSEDED if kept.constraint or kept.unique else DUPLICATE
+        findings.append(Finding(table, index, reason, kept))
+        dropped.add(index.name)
+
+    # longest keys first, so a prefix is always reported against an index that stays
+    for index in sorted(indexes, key=lambda i: -len(i.keys)):
+        if index.name in dropped or not _droppable(index) or index.method != 'btree' or index.include:
+            continue
+        method, keys, where, _ = shapes[index.name]
+        for other in indexes:
+            if other is index or other.name in dropped or other.method != 'btree':
+                continue
+            o_method, o_keys, o_where, _ = shapes[other.name]
+            if o_where == where and len(o_keys) > len(keys) and o_keys[:len(keys)] == keys:
+                findings.append(Finding(table, index, PREFIX, other))
+                dropped.add(index.name)
+                break
+    return findings
+
+
+def analyze(catalog, sizes=None):
+    findings = []
+    for table in catalog.tables.values():
+        rows = table_rows(table, sizes)
+        for finding in find_redundant(table):
+            finding.rows = rows
+            finding.bytes = int(rows * entry_width(table, finding.index) / _PAGE_FILL)
+            findings.append(finding)
+    findings.sort(key=lambda f: (-f.bytes, f.table.name, f.index.name))
+    return findings
+
+
+def _size(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024 or unit == 'GiB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+
+
+def _write_cost(catalog, findings):
+    """(table, indexes before, indexes after) for every table losing an index."""
+    per_table = {}
+    for finding in findings:
+        per_table.setdefault(finding.table.key, []).append(finding)
+    out = []
+    for key, items in per_table.items():
+        table = catalog.tables[key]
+        out.append((table, len(table.indexes), len(table.indexes) - len(items)))
+    return sorted(out, key=lambda t: (-(t[1] - t[2]), t[0].name))
+
+
+def render(findings):
+    total = sum(f.bytes for f in findings)
+    out = [policy_mod.header(
+        'DROP REDUNDANT INDEXES (generated by pgtools dup-index)',
+        [f'{len(findings)} indexes that another index or constraint already covers,',
+         f'about {_size(total)} at the assumed row counts.',
+         'DROP INDEX CONCURRENTLY cannot run inside a transaction block: run this',
+         'file as-is. Each drop is preceded by the statement that restores it.'],
+    ).rstrip('\n')]
+    for finding in findings:
+        index, kept = finding.index, finding.kept
+        covered_by = f'constraint {kept.constraint}' if kept.constraint else f'index {kept.name}'
+        out += ['', f'-- {finding.table.name}: {index.name} is {finding.reason} ({covered_by}: '
+                    f'{", ".join(kept.keys)}), ~{_size(finding.bytes)}',
+                f'-- defined at {index.source}',
+                f'-- restore: {index.sql()};',
+                f'DROP INDEX CONCURRENTLY IF EXISTS {sql.qualified(index.schema, index.name)};']
+    out.append(policy_mod.footer(f'COMPLETED: {len(findings)} indexes dropped').rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+def report(catalog, findings):
+    counts = {reason: sum(1 for f in findings if f.reason == reason) for reason in (DUPLICATE, SUPERSEDED, PREFIX)}
+    lines = [f'📊 {len(findings)} redundant indexes: {counts[DUPLICATE]} duplicates, '
+             f'{counts[SUPERSEDED]} superseded by constraints, {counts[PREFIX]} prefix-covered; '
+             f'~{_size(sum(f.bytes for f in findings))} at the assumed row counts', '']
+    width = max((len(f.index.name) for f in findings), default=0)
+    for f in findings:
+        lines.append(f'   {_size(f.bytes):>10}  {f.index.name.ljust(width)}  {f.reason:<24} '
+                     f'kept: {f.kept.name} ({", ".join(f.kept.keys)})')
+    lines += ['', '📋 Index writes per INSERT (and per non-HOT UPDATE), before -> after:']
+    for table, before, after in _write_cost(catalog, findings):
+        lines.append(f'   {table.name:<40} {before:>3} -> {after:<3} '
+                     f'({(before - after) / before:.0%} fewer index writes)')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools dup-index',
+        description='Find duplicate, constraint-superseded and prefix-covered indexes; emit a DROP migration.')
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='schema SQL files/globs in run order (default: production_schema.sql, '
+                             'database/*.sql, supabase/migrations/*.sql)')
+    parser.add_argument('--sizes', help='JSON map of table -> row count or size class')
+    parser.add_argument('-o', '--output', help='write the DROP INDEX CONCURRENTLY migration here')
+    parser.add_argument('--json', action='store_true', help='print the findings as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = catalog_mod.load(args.inputs)
+        sizes = rlscost.load_sizes(args.sizes) if args.sizes else None
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    findings = analyze(catalog, sizes)
+    if args.json:
+        json.dump([f.to_dict() for f in findings], sys.stdout, indent=2)
+        print()
+    else:
+        print(report(catalog, findings))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(render(findings))
+        print(f'✓ Generated {args.output}', file=sys.stderr)
+    return 0
@@ -0,0 +1,331 @@
+"""
+Missing foreign-key and RLS-predicate index advisor.
+
+Postgres indexes the referenced side of a foreign key (the primary key) but
+never the referencing columns. Every join on an unindexed FK column and every
+DELETE / key UPDATE of the parent row (the FK check, and the CASCADE / SET
+NULL action) then scans the child table. RLS has the same problem: a policy
+filtering on ``organizer_id`` or looking up ``organizer_team_members.user_id``
+in a subquery runs for every query against the table.
+
+Built on the schema catalog, this lists every foreign key and every column an
+RLS policy filters on that has no index with those columns in the lead, ranks
+them by an estimated benefit (table size class x how the column is used) and
+writes a ``CREATE INDEX CONCURRENTLY`` migration in that order.
+
+Benefit points per use (multiplied by the table's size class weight from
+rls-cost: large 100, medium 10, small 1):
+    foreign key          2   joins to the parent
+    parent delete check  2   every DELETE / key UPDATE on the parent scans the child
+    ON DELETE action     1   CASCADE / SET NULL / SET DEFAULT also rewrites the rows
+    RLS predicate        3   per policy filtering on the column
+    RLS subquery lookup  5   per policy looking the column up inside a subquery
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools fk-index
+    PYTHONPATH=scripts python3 -m pgtools fk-index -o database/add-missing-fk-indexes.sql
+    PYTHONPATH=scripts python3 -m pgtools fk-index --input production_schema.sql --input 'supabase/migrations/*.sql'
+"""
+
+import argparse
+import json
+import sys
+
+from . import catalog as catalog_mod
+from . import policies as policy_mod
+from . import rlscost
+from . import sql
+
+DEFAULT_INPUTS = ['production_schema.sql']
+
+FOREIGN_KEY = 'foreign key'
+PARENT_DELETE = 'parent delete check'
+DELETE_ACTION = 'on delete action'
+RLS_PREDICATE = 'rls predicate'
+RLS_LOOKUP = 'rls subquery lookup'
+
+POINTS = {FOREIGN_KEY: 2, PARENT_DELETE: 2, DELETE_ACTION: 1, RLS_PREDICATE: 3, RLS_LOOKUP: 5}
+
+# Column types a plain btree index does not help an RLS filter on
+_UNINDEXED_TYPES = ('boolean', 'json', 'jsonb')
+
+
+def is_covered(table, columns):
+    """True when a btree index leads with exactly ``columns`` (in any order).
+
+    Partial indexes count only for ``WHERE col IS NOT NULL`` on a leading
+    column, which every equality lookup on that column satisfies.
+    """
+    wanted = set(columns)
+    for index in table.indexes.values():
+        if index.method != 'btree' or set(index.columns[:len(wanted)]) != wanted:
+            continue
+        if index.where is None or index.where.strip('()').lower() in {f'{c} is not null' for c in wanted}:
+            return True
+    return False
+
+
+class Candidate:
+    """One index to add: a table's column list and why it is worth having."""
+
+    __slots__ = ('table', 'columns', 'reasons', 'points', 'size')
+
+    def __init__(self, table, columns, size):
+        self.table = table
+        self.columns = tuple(columns)
+        self.reasons = []     # (kind, detail)
+        self.points = 0
+        self.size = size
+
+    def add(self, kind, detail):
+        self.reasons.append((kind, detail))
+        self.points += POINTS[kind]
+
+    @property
+    def score(self):
+        return rlscost.SIZE_CLASSES[self.size] * self.points
+
+    @property
+    def name(self):
+        base = '_'.join(('idx', self.table.name) + self.columns)
+        name = base[:catalog_mod.NAMEDATALEN]
+        if name in self.table.indexes:
+            name = base[:catalog_mod.NAMEDATALEN - 3] + '_fk'
+        return name
+
+    def sql(self):
+        cols = ', '.join(sql.quote_ident(c) for c in self.columns)
+        return (f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {sql.quote_ident(self.name)}\n'
+                f'    ON {sql.qualified(self.table.schema, self.table.name)} ({cols});')
+
+    def to_dict(self):
+        return {
+            'table': f'{self.table.schema}.{self.table.name}',
+            'columns': list(self.columns),
+            'index': self.name,
+            'size': self.size,
+            'score': self.score,
+            'reasons': [f'{kind}: {detail}' for kind, detail in self.reasons],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Columns RLS policies filter on
+# ---------------------------------------------------------------------------
+
+def _table_refs(catalog, tokens, a, b, match):
+    """Aliases -> table keys for FROM/JOIN lists in tokens[a:b] (not in nested subqueries).
+
+    Returns (aliases, indices of the tokens that name tables or aliases).
+    """
+    aliases = {}
+    used = set()
+    i = a
+    while i < b:
+        tok = tokens[i]
+        if tok.is_op('(') and i in match:
+            i = match[i] + 1
+            continue
+        if not tok.is_kw('FROM', 'JOIN') or (tok.is_kw('FROM') and i and tokens[i - 1].is_kw('DISTINCT')):
+            i += 1
+            continue
+        i += 1
+        while i < b and sql.is_name(tokens[i]):
+            try:
+                key, j = sql.parse_qualified_name(tokens, i)
+            except sql.SQLSyntaxError:
+                break
+            used.update(range(i, j))
+            if j < b and tokens[j].is_op('('):
+                break   # set-returning function
+            aliases[key[1]] = key
+            if j < b and tokens[j].is_kw('AS'):
+                j += 1
+            if j < b and tokens[j].kind in (sql.WORD, sql.QIDENT) and not (
+                    tokens[j].kind == sql.WORD and tokens[j].text.lower() in rlscost._SYNTAX_WORDS):
+                aliases[sql.ident_value(tokens[j])] = key
+                used.add(j)
+                j += 1
+            if j < b and tokens[j].is_op(','):
+                i = j + 1
+                continue
+            i = j
+            break
+    return aliases, used
+
+
+def _resolve(catalog, scopes, column):
+    """Table key of a bare column: the innermost scope with a table that has it."""
+    for scope in reversed(scopes):
+        for key in scope.values():
+            table = catalog.tables.get(key)
+            if table is not None and column in table.columns:
+                return key
+    return None
+
+
+def _walk(catalog, tokens, a, b, match, scopes, found):
+    aliases, used = _table_refs(catalog, tokens, a, b, match)
+    scopes = scopes + [aliases] if aliases else scopes
+    depth = len(scopes) - 1
+    hits = set()
+    _scan(catalog, tokens, a, b, match, scopes, used, hits, found)
+    # Outer columns inside a subquery are correlation values, not filters on their table
+    local = set(scopes[-1].values())
+    hits = {(key, col) for key, col in hits if key in local}
+    # A subquery that can already look its table up through an index (the primary key, a
+    # user_id index) only filters the rows found; its other columns need no index of their own
+    if depth > 0:
+        for key in local:
+            table = catalog.tables.get(key)
+            if table is not None and any(k == key and is_covered(table, (col,)) for k, col in hits):
+                hits = {(k, col) for k, col in hits if k != key}
+    found.update((key, col, depth > 0) for key, col in hits)
+
+
+def _scan(catalog, tokens, a, b, match, scopes, used, hits, found):
+    """Record the columns read in tokens[a:b] into ``hits``; subqueries recurse into _walk."""
+    i = a
+    while i < b:
+        tok = tokens[i]
+        if tok.is_op('(') and i in match and i + 1 < b and tokens[i + 1].is_kw('SELECT', 'WITH'):
+            _walk(catalog, tokens, i + 1, match[i], match, scopes, found)
+            i = match[i] + 1
+            continue
+        if i in used or not sql.is_name(tok) or (i and tokens[i - 1].is_op('.', '::')) \
+                or (tok.kind == sql.WORD and tok.text.lower() in sql.RESERVED):
+            i += 1
+            continue
+        name = sql.ident_value(tok)
+        if i + 2 < b and tokens[i + 1].is_op('.') and sql.is_name(tokens[i + 2]):
+            if i + 3 < b and tokens[i + 3].is_op('(', '.'):
+                i += 3
+                continue   # schema.function(...) / schema.table.column
+            key = next((s[name] for s in reversed(scopes) if name in s), None)
+            if key is None and ('public', name) in catalog.tables:
+                key = ('public', name)
+            column = sql.ident_value(tokens[i + 2])
+            table = catalog.tables.get(key)
+            if table is not None and column in table.columns:
+                hits.add((key, column))
+            i += 3
+            continue
+        if i + 1 < b and tokens[i + 1].is_op('('):
+            i += 1
+            continue   # function call
+        key = _resolve(catalog, scopes, name)
+        if key is not None:
+            hits.add((key, name))
+        i += 1
+
+
+def predicate_columns(catalog, policy):
+    """(table key, column, in a subquery) for every column a policy's expressions read."""
+    found = set()
+    own = {policy.table: (policy.schema, policy.table)}
+    for expr in (policy.using, policy.with_check):
+        if expr:
+            tokens = sql.tokenize(expr)
+            _walk(catalog, tokens, 0, len(tokens), sql.paren_map(tokens), [own], found)
+    return found
+
+
+def _indexable(column):
+    return column.type not in _UNINDEXED_TYPES and not column.type.endswith(']')
+
+
+# ---------------------------------------------------------------------------
+# Advice
+# ---------------------------------------------------------------------------
+
+def advise(catalog, sizes=None):
+    """Candidates for missing indexes, highest estimated benefit first."""
+    candidates = {}
+
+    def candidate(table, columns):
+        key = (table.key, frozenset(columns))
+        if key not in candidates:
+            candidates[key] = Candidate(table, columns, rlscost.size_class(table.name, sizes))
+        return candidates[key]
+
+    for table, fk in catalog.foreign_keys():
+        if not fk.columns or is_covered(table, fk.columns):
+            continue
+        target = f'{fk.ref_table[1]}({", ".join(fk.ref_columns) or "id"})'
+        entry = candidate(table, fk.columns)
+        entry.add(FOREIGN_KEY, f'{fk.name} -> {target}')
+        entry.add(PARENT_DELETE, f'deleting from {fk.ref_table[1]}')
+        if fk.on_delete in ('CASCADE', 'SET NULL', 'SET DEFAULT'):
+            entry.add(DELETE_ACTION, f'ON DELETE {fk.on_delete}')
+
+    for policy in catalog.policies():
+        for key, column_name, in_subquery in sorted(predicate_columns(catalog, policy)):
+            table = catalog.tables[key]
+            column = table.columns[column_name]
+            if not _indexable(column) or is_covered(table, (column_name,)):
+                continue
+            where = f'{policy.name!r} on {policy.table}'
+            candidate(table, (column_name,)).add(RLS_LOOKUP if in_subquery else RLS_PREDICATE, where)
+
+    return sorted(candidates.values(), key=lambda c: (-c.score, c.table.name, c.columns))
+
+
+def render(candidates):
+    total = sum(c.score for c in candidates)
+    out = [policy_mod.header(
+        'ADD MISSING FOREIGN KEY / RLS PREDICATE INDEXES (generated by pgtools fk-index)',
+        [f'{len(candidates)} indexes, ordered by estimated benefit (total score {total}).',
+         'CREATE INDEX CONCURRENTLY does not block writes but cannot run inside a',
+         'transaction block: run this file as-is, not wrapped in BEGIN/COMMIT.'],
+    ).rstrip('\n')]
+    for rank, entry in enumerate(candidates, 1):
+        out += ['', f'-- {rank}. {entry.table.name} ({", ".join(entry.columns)}): '
+                    f'score {entry.score} ({entry.size} table)']
+        out += [f'--    {kind}: {detail}' for kind, detail in entry.reasons]
+        out.append(entry.sql())
+    out.append(policy_mod.footer(f'COMPLETED: {len(candidates)} indexes').rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+def report(candidates, limit=None):
+    fks = sum(1 for c in candidates if any(kind == FOREIGN_KEY for kind, _ in c.reasons))
+    lines = [f'📊 {len(candidates)} missing indexes: {fks} on foreign keys, '
+             f'{len(candidates) - fks} on RLS-only predicate columns', '',
+             f'{"rank":>4}  {"score":>5}  {"size":<6}  table / columns']
+    for rank, entry in enumerate(candidates[:limit], 1):
+        kinds = sorted({kind for kind, _ in entry.reasons}, key=list(POINTS).index)
+        lines.append(f'{rank:>4}  {entry.score:>5}  {entry.size:<6}  '
+                     f'{entry.table.name}({", ".join(entry.columns)})  [{", ".join(kinds)}]')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools fk-index',
+        description='List foreign keys and RLS predicate columns without a leading-column index.')
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='schema SQL files/globs in run order (default: production_schema.sql)')
+    parser.add_argument('--sizes', help='JSON map of table -> size class or row count')
+    parser.add_argument('-o', '--output', help='write the CREATE INDEX CONCURRENTLY migration here')
+    parser.add_argument('--json', action='store_true', help='print the candidates as JSON')
+    parser.add_argument('--limit', type=int, default=None, help='show only the top N in the report')
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = catalog_mod.load(args.inputs or DEFAULT_INPUTS)
+        sizes = rlscost.load_sizes(args.sizes) if args.sizes else None
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    candidates = advise(catalog, sizes)
+    if args.json:
+        json.dump([c.to_dict() for c in candidates[:args.limit]], sys.stdout, indent=2)
+        print()
+    else:
+        print(report(candidates, args.limit))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(render(candidates))
+        print(f'✓ Generated {args.output}', file=sys.stderr)
+    return 0
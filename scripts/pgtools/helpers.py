@@ -0,0 +1,414 @@
+"""
+Generate STABLE SECURITY DEFINER helpers for repeated RLS predicates.
+
+Hundreds of policies repeat the same current-user subqueries: "is admin",
+"organizers I own", "owns organizer X", "team member of organizer X". This
+module finds every sub-SELECT that depends on auth.uid(), abstracts the
+outer-row references of correlated ones into parameters, and turns each
+shape that repeats at least --min-uses times into a helper function in the
+style of database/harden-security-definer-functions.sql:
+
+    CREATE OR REPLACE FUNCTION public.rls_is_admin()
+    RETURNS boolean LANGUAGE sql SECURITY DEFINER STABLE SET search_path = public
+    AS $$ SELECT EXISTS (...) $$;
+
+Policies are then rewritten to call the helpers. Parameterless helpers are
+wrapped as ``(SELECT public.rls_is_admin())`` so they run once per statement.
+Helpers get an ``rls_`` prefix so they never collide with the hand-written
+is_admin(uuid) / get_user_organizer_ids(uuid) functions, whose semantics differ.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools helpers -o database/rls-helpers.sql
+    PYTHONPATH=scripts python3 -m pgtools helpers policies.json --format guarded -o out.sql
+"""
+
+import argparse
+import json
+import re
+import sys
+
+from . import diff as diff_mod
+from . import policies as policy_mod
+from . import rlscost
+from . import sql
+
+DEFAULT_INPUTS = ['database/add-missing-rls-policies.sql', 'database/all-rls-policies-complete.sql']
+
+EXISTS = 'exists'   # EXISTS (SELECT ...) -> boolean helper
+SET = 'set'         # x IN (SELECT ...) / = ANY (SELECT ...) -> SETOF helper
+
+# Readable names for the shapes we know we have; anything else gets a generated name
+KNOWN_NAMES = {
+    (EXISTS, 'select 1 from profiles where ((profiles.id = auth.uid()) and (profiles.is_admin = true))'):
+        'rls_is_admin',
+    (EXISTS, "select 1 from profiles where ((profiles.id = auth.uid()) and (profiles.role::text = 'admin'::text))"):
+        'rls_has_admin_role',
+    (SET, 'select organizers.id from organizers where (organizers.user_id = auth.uid())'):
+        'rls_owned_organizer_ids',
+    (SET, 'select organizers.id from organizers where (organizers.user_id = auth.uid()) union '
+          'select organizer_team_members.organizer_id from organizer_team_members where '
+          "((organizer_team_members.user_id = auth.uid()) and (organizer_team_members.status = 'active'::text))"):
+        'rls_member_organizer_ids',
+    (SET, 'select promoters.id from promoters where (promoters.user_id = auth.uid())'):
+        'rls_promoter_ids',
+    (EXISTS, 'select 1 from organizers where ((organizers.id = $1) and (organizers.user_id = auth.uid()))'):
+        'rls_owns_organizer',
+    (EXISTS, 'select 1 from finance_users where ((finance_users.user_id = auth.uid()) and (finance_users.is_active = true))'):
+        'rls_is_finance_user',
+}
+
+_TYPE_STOP = frozenset('''
+    default not null primary references constraint check unique generated collate
+'''.split())
+
+
+def column_types(*paths):
+    """Map (table, column) -> SQL type text from CREATE TABLE statements."""
+    types = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        for stmt in sql.split_statements(text):
+            tokens = stmt.tokens
+            i = sql.find_keywords(tokens[:3], 'CREATE', 'TABLE')
+            if i != 0:
+                continue
+            j = 2
+            if sql.find_keywords(tokens[j:j + 3], 'IF', 'NOT', 'EXISTS') == 0:
+                j += 3
+            try:
+                (_, table), j = sql.parse_qualified_name(tokens, j)
+            except sql.SQLSyntaxError:
+                continue
+            if j >= len(tokens) or not tokens[j].is_op('('):
+                continue
+            close = sql.matching_paren(tokens, j)
+            for start, end in sql.split_commas(tokens, j + 1, close):
+                if end - start < 2 or not sql.is_name(tokens[start]) or \
+                        tokens[start].is_kw('CONSTRAINT', 'PRIMARY', 'UNIQUE', 'FOREIGN', 'CHECK', 'EXCLUDE', 'LIKE'):
+                    continue
+                stop = start + 1
+                while stop < end and not tokens[stop].is_kw(*(w.upper() for w in _TYPE_STOP)):
+                    stop += 1
+                type_text = stmt.text[tokens[start + 1].start:tokens[stop - 1].end]
+                types[(table, sql.ident_value(tokens[start]))] = re.sub(r'"([a-z_][a-z0-9_]*)"', r'\1', type_text)
+    return types
+
+
+def _has_auth_call(tokens, start, end):
+    for k in range(start, end - 3):
+        if sql.is_name(tokens[k]) and sql.ident_value(tokens[k]) == 'auth' and tokens[k + 1].is_op('.') \
+                and tokens[k + 3].is_op('('):
+            return True
+    return False
+
+
+class Occurrence:
+    """One replaceable sub-SELECT inside one policy expression."""
+
+    __slots__ = ('kind', 'template', 'body', 'args', 'arg_columns', 'select_column',
+                 'span', 'table')
+
+    def __init__(self, kind, template, body, args, arg_columns, select_column, span, table):
+        self.kind = kind
+        self.template = template          # normalized text with $n for outer references
+        self.body = body                  # source text with p_<column> parameters
+        self.args = args                  # outer-reference source text per parameter
+        self.arg_columns = arg_columns    # (qualifier, column) per parameter
+        self.select_column = select_column
+        self.span = span                  # (start, end) offsets replaced in the expression
+        self.table = table                # policy table, to type outer references
+
+    @property
+    def key(self):
+        return (self.kind, self.template)
+
+
+def find_occurrences(text, table):
+    """Outermost auth-dependent EXISTS / IN sub-SELECTs in one expression."""
+    if not text:
+        return []
+    tokens = sql.tokenize(text)
+    match = sql.paren_map(tokens)
+    found = []
+    taken_until = -1
+    for i in range(len(tokens)):
+        if i <= taken_until or not rlscost.is_subquery(tokens, match, i):
+            continue
+        close = match[i]
+        prev = tokens[i - 1] if i else None
+        if prev is not None and prev.is_kw('EXISTS'):
+            kind = EXISTS
+            span = (prev.start, tokens[close].end)
+        elif prev is not None and prev.is_kw('IN', 'ANY'):
+            kind = SET
+            span = (tokens[i + 1].start, tokens[close - 1].end)
+        else:
+            continue
+        if not _has_auth_call(tokens, i + 1, close):
+            continue
+        refs, ambiguous = rlscost.outer_references(tokens, i + 1, close)
+        if ambiguous:
+            continue
+        occurrence = _abstract(text, tokens, i + 1, close, refs, kind, span, table)
+        if occurrence is not None:
+            found.append(occurrence)
+            taken_until = close
+    return found
+
+
+def _abstract(text, tokens, start, end, refs, kind, span, table):
+    """Replace outer references by $n (template) and p_<column> (body)."""
+    params = {}
+    template_parts, body_parts = [], []
+    pos = tokens[start].start
+    arg_columns = []
+    for k in refs:
+        if k + 2 >= end or not sql.is_name(tokens[k + 2]):
+            return None
+        qualifier = sql.ident_value(tokens[k])
+        column = sql.ident_value(tokens[k + 2])
+        if (qualifier, column) not in params:
+            params[(qualifier, column)] = len(params) + 1
+            arg_columns.append((qualifier, column))
+        n = params[(qualifier, column)]
+        chunk = text[pos:tokens[k].start]
+        template_parts += [chunk, f'${n}']
+        body_parts += [chunk, _param_name(column, n, arg_columns)]
+        pos = tokens[k + 2].end
+    tail = text[pos:tokens[end - 1].end]
+    template_parts.append(tail)
+    body_parts.append(tail)
+
+    args = [f'{sql.quote_ident(q)}.{sql.quote_ident(c)}' for q, c in arg_columns]
+    select_column = None
+    if kind == SET and start + 1 < end:
+        # First select-list item: alias.column or column
+        k = start + 1
+        if k + 2 < end and tokens[k + 1].is_op('.'):
+            select_column = (sql.ident_value(tokens[k]), sql.ident_value(tokens[k + 2]))
+        elif sql.is_name(tokens[k]):
+            select_column = (None, sql.ident_value(tokens[k]))
+    return Occurrence(kind, diff_mod.normalize_expr(''.join(template_parts)), ''.join(body_parts).strip(),
+                      args, arg_columns, select_column, span, table)
+
+
+def _param_name(column, n, arg_columns):
+    names = [c for _, c in arg_columns[:n]]
+    return f'p_{column}' if names.count(column) == 1 else f'p_{column}_{n}'
+
+
+class Helper:
+    __slots__ = ('name', 'kind', 'template', 'body', 'params', 'returns', 'uses')
+
+    def __init__(self, name, kind, template, body, params, returns):
+        self.name = name
+        self.kind = kind
+        self.template = template
+        self.body = body
+        self.params = params        # [(name, type)]
+        self.returns = returns
+        self.uses = 0
+
+    def signature(self):
+        return f'public.{self.name}({", ".join(t for _, t in self.params)})'
+
+    def create_sql(self):
+        params = ', '.join(f'{n} {t}' for n, t in self.params)
+        lines = [line.strip() for line in self.body.splitlines() if line.strip()]
+        if self.kind == EXISTS:
+            body = 'SELECT EXISTS (\n    ' + '\n    '.join(lines) + '\n  )'
+        else:
+            body = '\n  '.join(lines)
+        return (f'CREATE OR REPLACE FUNCTION public.{self.name}({params})\n'
+                f'RETURNS {self.returns} LANGUAGE sql SECURITY DEFINER STABLE SET search_path = public\n'
+                f'AS $$\n  {body};\n$$;')
+
+    def call_sql(self, args):
+        call = f'public.{self.name}({", ".join(args)})'
+        if self.kind == SET:
+            return f'SELECT {call}'
+        # Parameterless checks become a cached initplan
+        return f'(SELECT {call})' if not args else call
+
+
+def _guess_type(column):
+    return 'uuid' if column == 'id' or column.endswith('_id') else 'text'
+
+
+def _column_type(types, table, column):
+    return types.get((table, column)) or _guess_type(column)
+
+
+def _from_aliases(body):
+    """alias -> table for ``FROM table alias`` / ``JOIN table alias`` in a helper body."""
+    tokens = sql.tokenize(body)
+    aliases = {}
+    for k, tok in enumerate(tokens):
+        if not tok.is_kw('FROM', 'JOIN'):
+            continue
+        j = k + 1
+        while j < len(tokens) and tokens[j].is_op('('):
+            j += 1
+        if j < len(tokens) and sql.is_name(tokens[j]):
+            try:
+                (_, table), j = sql.parse_qualified_name(tokens, j)
+            except sql.SQLSyntaxError:
+                continue
+            if j < len(tokens) and tokens[j].is_kw('AS'):
+                j += 1
+            aliases.setdefault(table, table)
+            if j < len(tokens) and sql.is_name(tokens[j]) and not (
+                    tokens[j].kind == sql.WORD and tokens[j].text.lower() in sql.RESERVED):
+                aliases[sql.ident_value(tokens[j])] = table
+    return aliases
+
+
+def _generated_name(occurrence, taken):
+    tables = list(dict.fromkeys(_from_aliases(occurrence.body).values()))
+    base = f'rls_{tables[0] if tables else "predicate"}'
+    if occurrence.kind == SET:
+        base += '_ids'
+    else:
+        base += '_access' if occurrence.args else '_check'
+    name = base
+    n = 2
+    while name in taken:
+        name = f'{base}_{n}'
+        n += 1
+    return name
+
+
+def build_helpers(policy_list, types=None, min_uses=3, names=None):
+    """Pick helper shapes used at least ``min_uses`` times; returns (helpers by key, occurrences)."""
+    types = types or {}
+    occurrences = {}
+    counts = {}
+    for policy in policy_list:
+        for attr in ('using', 'with_check'):
+            found = find_occurrences(getattr(policy, attr), policy.table)
+            occurrences[(policy.key, attr)] = found
+            for occ in found:
+                counts[occ.key] = counts.get(occ.key, 0) + 1
+
+    helpers = {}
+    taken = set()
+    first = {}
+    for found in occurrences.values():
+        for occ in found:
+            first.setdefault(occ.key, occ)
+    for key, occ in sorted(first.items(), key=lambda item: (-counts[item[0]], item[0])):
+        if counts[key] < min_uses:
+            continue
+        name = KNOWN_NAMES.get(key)
+        if name is None or name in taken:
+            name = _generated_name(occ, taken)
+        if names and name in names:
+            name = names[name]
+        taken.add(name)
+        aliases = _from_aliases(occ.body)
+        # Outer references are qualified by the policy table in deparsed SQL
+        params = [(_param_name(column, n, occ.arg_columns), _column_type(types, occ.table, column))
+                  for n, (_, column) in enumerate(occ.arg_columns, 1)]
+        if occ.kind == EXISTS:
+            returns = 'boolean'
+        elif occ.select_column is not None:
+            qualifier, column = occ.select_column
+            table = aliases.get(qualifier, qualifier) if qualifier else None
+            returns = 'SETOF ' + _column_type(types, table, column)
+        else:
+            returns = 'SETOF uuid'
+        helpers[key] = Helper(name, occ.kind, occ.template, occ.body, params, returns)
+    return helpers, occurrences
+
+
+def rewrite(policy_list, helpers, occurrences):
+    """Return [(old Policy, new Policy)] for every policy that now calls a helper."""
+    changed = []
+    for policy in policy_list:
+        updates = {}
+        for attr in ('using', 'with_check'):
+            text = getattr(policy, attr)
+            edits = [occ for occ in occurrences.get((policy.key, attr), ()) if occ.key in helpers]
+            if not edits:
+                continue
+            out = []
+            pos = 0
+            for occ in sorted(edits, key=lambda o: o.span):
+                helper = helpers[occ.key]
+                helper.uses += 1
+                out += [text[pos:occ.span[0]], helper.call_sql(occ.args)]
+                pos = occ.span[1]
+            out.append(text[pos:])
+            updates[attr] = ''.join(out)
+        if updates:
+            changed.append((policy, policy.replace(**updates)))
+    return changed
+
+
+def render(helpers, changed, fmt='alter'):
+    total_before = sum(len(old.create_sql()) for old, _ in changed)
+    total_after = sum(len(new.create_sql()) for _, new in changed)
+    out = [policy_mod.header(
+        'RLS HELPER FUNCTIONS (generated by pgtools helpers)',
+        [f'{len(helpers)} STABLE SECURITY DEFINER helpers replace repeated subqueries',
+         f'in {len(changed)} policies ({total_before:,} -> {total_after:,} bytes of policy SQL).'],
+    ).rstrip('\n'), '', 'BEGIN;', '']
+    for helper in sorted(helpers.values(), key=lambda h: h.name):
+        out += [f'-- Used by {helper.uses} policies', helper.create_sql(), '']
+    for helper in sorted(helpers.values(), key=lambda h: h.name):
+        out.append(f'REVOKE ALL ON FUNCTION {helper.signature()} FROM PUBLIC;')
+        out.append(f'GRANT EXECUTE ON FUNCTION {helper.signature()} TO authenticated, anon, service_role;')
+    out.append('')
+    for old, new in sorted(changed, key=lambda pair: pair[1].key):
+        if fmt == 'alter':
+            out.append(diff_mod.alter_sql(old, new) or old.drop_sql() + '\n' + new.create_sql())
+        elif fmt == 'plain':
+            out.append(old.drop_sql() + '\n' + new.create_sql())
+        else:
+            out.append(new.guarded_sql())
+        out.append('')
+    out += ['COMMIT;', '']
+    return '\n'.join(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools helpers',
+        description='Turn repeated current-user RLS subqueries into STABLE SECURITY DEFINER helpers.')
+    parser.add_argument('inputs', nargs='*', default=DEFAULT_INPUTS,
+                        help='policy exports or SQL files (default: the database/ RLS policy scripts)')
+    parser.add_argument('--schema', action='append', default=None,
+                        help='SQL file(s) with CREATE TABLE statements for parameter types '
+                             '(default: production_schema.sql)')
+    parser.add_argument('--min-uses', type=int, default=3,
+                        help='minimum repetitions before a subquery becomes a helper (default: 3)')
+    parser.add_argument('--names', help='JSON map renaming generated helpers')
+    parser.add_argument('--format', choices=('alter', 'plain', 'guarded'), default='alter',
+                        help='ALTER POLICY (default), DROP + CREATE, or guarded DO blocks')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    try:
+        policy_list = list({p.key: p for p in policy_mod.load(*args.inputs)}.values())
+        types = column_types(*(args.schema or ['production_schema.sql']))
+        names = None
+        if args.names:
+            with open(args.names, 'r', encoding='utf-8') as f:
+                names = json.load(f)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    helpers, occurrences = build_helpers(policy_list, types, args.min_uses, names)
+    changed = rewrite(policy_list, helpers, occurrences)
+    script = render(helpers, changed, args.format)
+    if args.output == '-':
+        sys.stdout.write(script)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(script)
+        print(f'✓ Generated {args.output}')
+    for helper in sorted(helpers.values(), key=lambda h: -h.uses):
+        print(f'   {helper.uses:>4}× {helper.signature()}', file=sys.stderr)
+    return 0
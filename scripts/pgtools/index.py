@@ -0,0 +1,600 @@
+"""
+Inverted index of schema objects and the tables, columns and functions they reference.
+
+Parses production_schema.sql, database/*.sql and supabase/migrations/*.sql
+once and records, for every statement, the object it defines or touches
+(table, function, trigger, policy, view, index, or a plain ALTER/INSERT/DO
+statement) and the terms it references:
+
+    t:<table>          FROM / JOIN / UPDATE / INTO / REFERENCES / ON <table>
+    c:<table>.<col>    alias.col resolved through FROM aliases, table.col, column definitions
+    w:<word>           bare identifiers (unqualified columns)
+    n:<col>            NEW.col / OLD.col inside trigger functions
+    fn:<name>          function calls (schema-qualified unless public)
+    d:<kind>:<name>    definitions
+
+"What touches orders.status?" is then c:orders.status, plus w:status on
+objects that also reference t:orders, plus trigger functions reading
+NEW/OLD.status that fire on orders.
+
+The index is one binary file (default .pgtools-cache/schema.idx) with a
+sorted key directory that is binary-searched through mmap, so a lookup
+reads a few pages instead of loading the index. Per-file parse results are
+kept next to it; on every query the input files are stat()ed and only files
+whose mtime or size changed are parsed again.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools index orders.status
+    PYTHONPATH=scripts python3 -m pgtools index orders --kind policy --kind trigger
+    PYTHONPATH=scripts python3 -m pgtools index 'is_admin()'
+    PYTHONPATH=scripts python3 -m pgtools index --rebuild
+"""
+
+import argparse
+import bisect
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from . import cache
+from . import rlscost
+from . import sql
+
+DEFAULT_INPUTS = ['production_schema.sql', 'database/*.sql', 'supabase/migrations/*.sql']
+DEFAULT_INDEX = os.path.join('.pgtools-cache', 'schema.idx')
+
+MAGIC = b'PGTIDX01'
+_HEADER = struct.Struct('<8sIIQQQQQQ')   # magic, keys, objects, section offsets, files length
+_KEY_ENTRY = struct.Struct('<IIII')       # key offset, key length, postings offset, postings count
+_OBJ_ENTRY = struct.Struct('<II')         # object offset, object length
+
+# Statements that do not touch schema objects worth indexing
+_SKIP = frozenset(('BEGIN', 'COMMIT', 'ROLLBACK', 'SET', 'RESET', 'GRANT', 'REVOKE',
+                   'ANALYZE', 'VACUUM', 'NOTIFY', 'START', 'END'))
+
+# Words that are never column names: SQL syntax plus PL/pgSQL control words
+_NOT_WORDS = rlscost._SYNTAX_WORDS | frozenset('''
+    begin declare if elsif return returns language raise notice exception perform
+    loop exit continue while found record trigger new old values set insert update
+    delete exists coalesce nullif greatest least security definer invoker stable
+    immutable volatile plpgsql sql replace function procedure execute each statement
+    before after instead of if_exists cascade restrict also strict info warning
+    get diagnostics row_count sqlstate sqlerrm message detail hint using no action
+    skip locked nowait
+    integer int bigint smallint numeric decimal text varchar character char boolean
+    bool uuid jsonb json date timestamptz serial bigserial real double
+    now interval current_setting true false void setof
+'''.split())
+
+# Schemas whose objects we qualify in keys; everything else is folded into public
+_KEEP_SCHEMAS = frozenset(('auth', 'storage', 'extensions', 'cron', 'net', 'pg_catalog', 'vault'))
+
+# Modules whose code decides what gets indexed
+_EXTRACTOR_MODULES = ('index.py', 'sql.py', 'rlscost.py')
+
+_TABLE_WORDS = ('FROM', 'JOIN', 'UPDATE', 'INTO', 'REFERENCES', 'TRUNCATE')
+
+
+def _qname(schema, name):
+    return name if schema == 'public' or schema not in _KEEP_SCHEMAS else f'{schema}.{name}'
+
+
+def _line_starts(text):
+    starts = [0]
+    find = text.find
+    i = find('\n')
+    while i != -1:
+        starts.append(i + 1)
+        i = find('\n', i + 1)
+    return starts
+
+
+# ---------------------------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------------------------
+
+def references(tokens, keys, aliases=None):
+    """Add the t:/c:/w:/n:/fn: terms referenced by ``tokens`` to ``keys``."""
+    aliases = {} if aliases is None else aliases
+    n = len(tokens)
+    for i, tok in enumerate(tokens):
+        if tok.kind == sql.DOLLAR:
+            references(sql.tokenize(sql.dollar_body(tok)), keys, aliases)
+            continue
+        if tok.kind == sql.WORD and tok.upper in _TABLE_WORDS and not _is_expression_from(tokens, i):
+            _table_list(tokens, i + 1, keys, aliases, tok.upper)
+            continue
+        if not sql.is_name(tok) or (i and tokens[i - 1].is_op('.', '::')):
+            continue
+        name = sql.ident_value(tok)
+        nxt = tokens[i + 1] if i + 1 < n else None
+        if nxt is not None and nxt.is_op('.') and i + 2 < n and sql.is_name(tokens[i + 2]):
+            second = sql.ident_value(tokens[i + 2])
+            after = tokens[i + 3] if i + 3 < n else None
+            if after is not None and after.is_op('('):
+                keys.add('fn:' + _qname(name, second))
+            elif after is not None and after.is_op('.') and i + 4 < n and sql.is_name(tokens[i + 4]):
+                keys.add(f'c:{second}.{sql.ident_value(tokens[i + 4])}')   # schema.table.column
+            elif name in ('new', 'old'):
+                keys.add('n:' + second)
+            elif name in aliases:
+                keys.add(f'c:{aliases[name]}.{second}')
+            elif name not in _KEEP_SCHEMAS and name != 'public':
+                keys.add(f'c:{name}.{second}')
+        elif nxt is not None and nxt.is_op('('):
+            if tok.kind == sql.QIDENT or name not in _NOT_WORDS:
+                keys.add('fn:' + name)
+        elif tok.kind == sql.QIDENT or name not in _NOT_WORDS:
+            keys.add('w:' + name)
+    return keys
+
+
+def _is_expression_from(tokens, i):
+    """FROM inside IS DISTINCT FROM / EXTRACT(x FROM y) / SUBSTRING(x FROM n) is not a table list."""
+    if not tokens[i].is_kw('FROM'):
+        return False
+    if i and tokens[i - 1].is_kw('DISTINCT'):
+        return True
+    return any(tokens[k].is_kw('EXTRACT', 'SUBSTRING', 'TRIM', 'OVERLAY', 'POSITION')
+               for k in range(max(0, i - 4), i))
+
+
+def _is_table_name(tok):
+    return tok.kind == sql.QIDENT or (tok.kind == sql.WORD and tok.text.lower() not in _NOT_WORDS)
+
+
+def _table_list(tokens, i, keys, aliases, keyword):
+    """Tables named after FROM/JOIN/...: ``a [AS] x, b y`` (skips ONLY / LATERAL / subqueries)."""
+    n = len(tokens)
+    while i < n:
+        i = _skip_words(tokens, i, 'ONLY', 'LATERAL', 'TABLE', 'IF', 'EXISTS')
+        if i >= n or not _is_table_name(tokens[i]):
+            return
+        (schema, name), j = sql.parse_qualified_name(tokens, i)
+        table = _qname(schema, name)
+        if j < n and tokens[j].is_op('('):
+            if keyword in ('FROM', 'JOIN'):
+                return   # set-returning function; picked up as fn: by the main loop
+            # INSERT INTO t (a, b) / REFERENCES t (id)
+            close = sql.matching_paren(tokens, j)
+            keys.update(f'c:{table}.{sql.ident_value(t)}' for t in tokens[j + 1:close] if sql.is_name(t))
+            keys.add('t:' + table)
+            return
+        keys.add('t:' + table)
+        aliases[name] = table
+        if j < n and tokens[j].is_kw('AS'):
+            j += 1
+        if j < n and _is_table_name(tokens[j]):
+            aliases[sql.ident_value(tokens[j])] = table
+            j += 1
+        if j < n and tokens[j].is_op(','):
+            i = j + 1
+            continue
+        return
+
+
+def _skip_words(tokens, i, *words):
+    while i < len(tokens) and tokens[i].is_kw(*words):
+        i += 1
+    return i
+
+
+def classify(tokens):
+    """(kind, name, own table or None, extra keys, tokens to scan for references)."""
+    first = tokens[0].upper
+    if first == 'CREATE':
+        i = _skip_words(tokens, 1, 'OR', 'REPLACE', 'UNIQUE', 'TEMP', 'TEMPORARY', 'UNLOGGED',
+                        'MATERIALIZED', 'CONSTRAINT', 'RECURSIVE')
+        what = tokens[i].upper if i < len(tokens) else ''
+        if what == 'TABLE':
+            return _create_table(tokens, i + 1)
+        if what in ('FUNCTION', 'PROCEDURE'):
+            (schema, name), j = sql.parse_qualified_name(tokens, i + 1)
+            fn = _qname(schema, name)
+            body = [t for t in tokens[j:] if t.kind == sql.DOLLAR]
+            scan = [tok for b in body for tok in sql.tokenize(sql.dollar_body(b))]
+            if not body:   # BEGIN ATOMIC / RETURN expr bodies
+                k = sql.find_keywords(tokens, 'RETURNS', start=j)
+                scan = tokens[k + 2:] if k != -1 else []
+            return 'function', fn, None, {'d:function:' + fn}, scan
+        if what == 'TRIGGER':
+            name = sql.ident_value(tokens[i + 1])
+            on = sql.find_keywords(tokens, 'ON', start=i + 2)
+            (schema, table), _ = sql.parse_qualified_name(tokens, on + 1)
+            table = _qname(schema, table)
+            extra = {'d:trigger:' + name}
+            k = sql.find_keywords(tokens, 'EXECUTE', start=on)
+            fn = None
+            if k != -1:
+                (fschema, fname), _ = sql.parse_qualified_name(tokens, _skip_words(tokens, k + 1, 'FUNCTION', 'PROCEDURE'))
+                fn = _qname(fschema, fname)
+                extra.add('fn:' + fn)
+            of = sql.find_keywords(tokens, 'UPDATE', 'OF', start=i + 2)
+            if of != -1 and of < on:
+                extra.update(f'c:{table}.{sql.ident_value(t)}' for t in tokens[of + 2:on] if sql.is_name(t))
+            return 'trigger', f'{table}.{name}', table, extra, tokens[on + 1:k if k != -1 else None], fn
+        if what == 'POLICY':
+            name = sql.ident_value(tokens[i + 1])
+            (schema, table), j = sql.parse_qualified_name(tokens, i + 3)
+            table = _qname(schema, table)
+            return 'policy', f'{table}.{sql.quote_ident(name)}', table, set(), tokens[j:]
+        if what == 'VIEW':
+            i = _skip_words(tokens, i + 1, 'IF', 'NOT', 'EXISTS')
+            (schema, name), j = sql.parse_qualified_name(tokens, i)
+            view = _qname(schema, name)
+            return 'view', view, None, {'d:table:' + view}, tokens[j:]
+        if what == 'INDEX':
+            i = _skip_words(tokens, i + 1, 'CONCURRENTLY', 'IF', 'NOT', 'EXISTS')
+            on = sql.find_keywords(tokens, 'ON', start=i)
+            name = sql.ident_value(tokens[i]) if i < on else ''
+            (schema, table), j = sql.parse_qualified_name(tokens, _skip_words(tokens, on + 1, 'ONLY'))
+            table = _qname(schema, table)
+            return 'index', name or f'{table}(unnamed)', table, {'d:index:' + name}, tokens[j:]
+        return what.lower() or 'create', '', None, set(), tokens[i + 1:]
+    if first == 'ALTER' and len(tokens) > 1 and tokens[1].is_kw('TABLE'):
+        i = _skip_words(tokens, 2, 'IF', 'EXISTS', 'ONLY')
+        (schema, table), j = sql.parse_qualified_name(tokens, i)
+        table = _qname(schema, table)
+        extra = set()
+        for k in range(j, len(tokens) - 1):
+            if tokens[k].is_kw('ADD', 'ALTER', 'DROP', 'RENAME') and not tokens[k + 1].is_kw('CONSTRAINT'):
+                m = _skip_words(tokens, k + 1, 'COLUMN', 'IF', 'NOT', 'EXISTS')
+                if m < len(tokens) and sql.is_name(tokens[m]) and not tokens[m].is_kw(
+                        'CONSTRAINT', 'PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK', 'TO'):
+                    extra.add(f'c:{table}.{sql.ident_value(tokens[m])}')
+        return 'alter table', table, table, extra, tokens[j:]
+    if first == 'DO':
+        return 'do', '', None, set(), tokens[1:]
+    return first.lower() or tokens[0].text, '', None, set(), tokens[1:]
+
+
+def _create_table(tokens, i):
+    i = _skip_words(tokens, i, 'IF', 'NOT', 'EXISTS')
+    (schema, name), j = sql.parse_qualified_name(tokens, i)
+    table = _qname(schema, name)
+    extra = {'d:table:' + table}
+    if j < len(tokens) and tokens[j].is_op('('):
+        close = sql.matching_paren(tokens, j)
+        depth = 0
+        at_start = True
+        for tok in tokens[j + 1:close]:
+            if tok.is_op('('):
+                depth += 1
+            elif tok.is_op(')'):
+                depth -= 1
+            elif depth == 0 and tok.is_op(','):
+                at_start = True
+                continue
+            elif at_start and depth == 0 and sql.is_name(tok) and not tok.is_kw(
+                    'CONSTRAINT', 'PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK', 'EXCLUDE', 'LIKE'):
+                extra.add(f'c:{table}.{sql.ident_value(tok)}')
+            at_start = False
+    return 'table', table, table, extra, tokens[j:]
+
+
+def extract(text):
+    """Index records for one SQL file: [kind, name, line, detail, sorted keys]."""
+    lines = _line_starts(text)
+    records = []
+    for stmt in sql.split_statements(text):
+        tokens = stmt.tokens
+        if tokens[0].upper in _SKIP:
+            continue
+        try:
+            kind, name, table, extra, scan, *rest = classify(tokens)
+        except (sql.SQLSyntaxError, IndexError):
+            kind, name, table, extra, scan, rest = tokens[0].text.lower(), '', None, set(), tokens, []
+        keys = references(scan, set(extra))
+        if table:
+            keys.add('t:' + table)
+        if kind == 'table':
+            keys = {k for k in keys if not k.startswith('w:')}   # columns are exact c: keys
+        detail = {'tables': sorted(k[2:] for k in keys if k.startswith('t:'))}
+        if rest and rest[0]:
+            detail['calls'] = rest[0]
+        records.append([kind, name, bisect.bisect_right(lines, stmt.start), detail, sorted(keys)])
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Building and storage
+# ---------------------------------------------------------------------------
+
+def expand_inputs(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.sql')
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths += [p for p in matches if os.path.isfile(p) and p not in paths]
+    return paths
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+class Index:
+    """Read-only view of an index file, mmapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:   # empty file
+            self._file.close()
+            raise ValueError(f'{path}: empty index')
+        (magic, self.n_keys, self.n_objects, self._keys_off, self._objs_off,
+         self._post_off, self._blob_off, files_off, files_len) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path}: not a pgtools index')
+        meta = json.loads(self._map[files_off:files_off + files_len])
+        self.version = meta['version']
+        self.files = meta['files']
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _key_at(self, k):
+        key_off, key_len, post_off, count = _KEY_ENTRY.unpack_from(self._map, self._keys_off + k * _KEY_ENTRY.size)
+        start = self._blob_off + key_off
+        return self._map[start:start + key_len], post_off, count
+
+    def postings(self, key):
+        """Sorted object ids referencing ``key``, by binary search over the key directory."""
+        target = key.encode('utf-8')
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.n_keys:
+            return array('I')
+        found, post_off, count = self._key_at(lo)
+        if found != target:
+            return array('I')
+        start = self._post_off + post_off * 4
+        ids = array('I')
+        ids.frombytes(self._map[start:start + count * 4])
+        return ids
+
+    def object(self, obj_id):
+        """[kind, name, file, line, detail] for an object id."""
+        off, length = _OBJ_ENTRY.unpack_from(self._map, self._objs_off + obj_id * _OBJ_ENTRY.size)
+        start = self._blob_off + off
+        return json.loads(self._map[start:start + length])
+
+
+def write_index(path, files, per_file):
+    """Merge per-file records into one index file, written atomically."""
+    objects = []
+    postings = {}
+    for name in sorted(per_file):
+        for kind, obj_name, line, detail, keys in per_file[name]:
+            obj_id = len(objects)
+            objects.append(json.dumps([kind, obj_name, name, line, detail], separators=(',', ':')).encode('utf-8'))
+            for key in keys:
+                postings.setdefault(key, []).append(obj_id)
+
+    blob = bytearray()
+    key_dir = bytearray()
+    post = array('I')
+    for key in sorted(postings, key=lambda k: k.encode('utf-8')):
+        encoded = key.encode('utf-8')
+        key_dir += _KEY_ENTRY.pack(len(blob), len(encoded), len(post), len(postings[key]))
+        blob += encoded
+        post.extend(postings[key])
+    obj_dir = bytearray()
+    for encoded in objects:
+        obj_dir += _OBJ_ENTRY.pack(len(blob), len(encoded))
+        blob += encoded
+    files_blob = json.dumps({'version': extractor_version(), 'files': files},
+                            sort_keys=True).encode('utf-8')
+
+    keys_off = _HEADER.size
+    objs_off = keys_off + len(key_dir)
+    post_off = objs_off + len(obj_dir)
+    blob_off = post_off + len(post) * 4
+    files_off = blob_off + len(blob)
+    header = _HEADER.pack(MAGIC, len(postings), len(objects), keys_off, objs_off,
+                          post_off, blob_off, files_off, len(files_blob))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(header)
+        f.write(key_dir)
+        f.write(obj_dir)
+        f.write(post.tobytes())
+        f.write(blob)
+        f.write(files_blob)
+    os.replace(tmp, path)
+    return len(objects), len(postings)
+
+
+def extractor_version():
+    return cache.source_hash(*_EXTRACTOR_MODULES)
+
+
+def _sidecar(index_path, source):
+    digest = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()
+    return os.path.join(os.path.dirname(index_path) or '.', 'index', digest + '.json')
+
+
+def build(index_path, paths, rebuild=False):
+    """Bring the index up to date; returns (parsed files, total files, seconds)."""
+    started = time.perf_counter()
+    old = {}
+    if not rebuild and os.path.exists(index_path):
+        try:
+            current = Index(index_path)
+            if current.version == extractor_version():
+                old = current.files
+            current.close()
+        except ValueError:
+            old = {}
+    files = {}
+    per_file = {}
+    parsed = 0
+    for path in paths:
+        stamp = _stamp(path)
+        files[path] = stamp
+        sidecar = _sidecar(index_path, path)
+        records = None
+        if old.get(path) == stamp and os.path.exists(sidecar):
+            with open(sidecar) as f:
+                records = json.load(f)
+        if records is None:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                records = extract(f.read())
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            with open(sidecar, 'w') as f:
+                json.dump(records, f, separators=(',', ':'))
+            parsed += 1
+        per_file[path] = records
+    if parsed or set(old) != set(files) or not os.path.exists(index_path):
+        write_index(index_path, files, per_file)
+    return parsed, len(paths), time.perf_counter() - started
+
+
+def is_current(index, paths):
+    if index.version != extractor_version() or set(index.files) != set(paths):
+        return False
+    return all(index.files[path] == _stamp(path) for path in paths)
+
+
+def open_index(index_path, paths, rebuild=False):
+    """Open the index, first re-parsing any input whose mtime/size changed."""
+    if not rebuild and os.path.exists(index_path):
+        try:
+            index = Index(index_path)
+            if is_current(index, paths):
+                return index, 0
+            index.close()
+        except ValueError:
+            pass
+    parsed, _, _ = build(index_path, paths, rebuild)
+    return Index(index_path), parsed
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def _normalize_term(term):
+    term = term.strip().replace('"', '').lower()
+    if term.startswith('public.'):
+        term = term[len('public.'):]
+    return term
+
+
+def lookup(index, term):
+    """Objects touching ``term`` ('table', 'table.column', 'func()' or 'schema.func()').
+
+    Returns {object id: exact}; ``exact`` is False for unqualified column
+    matches in objects that reference more than one table.
+    """
+    term = _normalize_term(term)
+    if term.endswith('()'):
+        name = term[:-2]
+        return dict.fromkeys(set(index.postings('fn:' + name)) | set(index.postings('d:function:' + name)), True)
+    if '.' not in term:
+        ids = (set(index.postings('t:' + term)) | set(index.postings('fn:' + term))
+               | set(index.postings('d:table:' + term)) | set(index.postings('d:function:' + term)))
+        return dict.fromkeys(ids, True)
+
+    table, column = term.rsplit('.', 1)
+    hits = dict.fromkeys(set(index.postings(f'c:{table}.{column}'))
+                         | set(index.postings('fn:' + term)) | set(index.postings('t:' + term)), True)
+    on_table = set(index.postings('t:' + table))
+    for obj_id in on_table & set(index.postings('w:' + column)):
+        if obj_id not in hits:
+            hits[obj_id] = len(index.object(obj_id)[4].get('tables', ())) <= 1
+    # Trigger functions reading NEW.col / OLD.col, for triggers on this table
+    readers = set(index.postings('n:' + column))
+    if readers:
+        for obj_id in on_table:
+            kind, _, _, _, detail = index.object(obj_id)
+            if kind == 'trigger' and detail.get('calls'):
+                for fn_id in set(index.postings('d:function:' + detail['calls'])) & readers:
+                    hits[fn_id] = True
+    return hits
+
+
+_KIND_ORDER = ('table', 'view', 'index', 'policy', 'trigger', 'function', 'alter table')
+
+
+def render_hits(index, hits, kinds=None):
+    objects = [index.object(i) + [exact] for i, exact in hits.items()]
+    if kinds:
+        objects = [o for o in objects if o[0] in kinds]
+    rank = {kind: n for n, kind in enumerate(_KIND_ORDER)}
+    objects.sort(key=lambda o: (rank.get(o[0], len(rank)), o[1], o[2], o[3]))
+    lines = []
+    for kind, name, path, line, _, exact in objects:
+        lines.append(f'  {" " if exact else "?"} {kind:<12} {name or "-":<58} {path}:{line}')
+    return objects, lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools index',
+        description='Inverted index of schema objects: what references a table, column or function?')
+    parser.add_argument('terms', nargs='*', help="table, table.column, or func() to look up")
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='SQL files/globs to index (default: production_schema.sql, database/*.sql, '
+                             'supabase/migrations/*.sql)')
+    parser.add_argument('--index', default=DEFAULT_INDEX, help=f'index file (default: {DEFAULT_INDEX})')
+    parser.add_argument('--kind', action='append', help='only show these object kinds (repeatable)')
+    parser.add_argument('--rebuild', action='store_true', help='re-parse every file')
+    parser.add_argument('--json', action='store_true', help='print hits as JSON')
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs or DEFAULT_INPUTS)
+    if not paths:
+        print('❌ No SQL files to index', file=sys.stderr)
+        return 1
+    try:
+        started = time.perf_counter()
+        index, parsed = open_index(args.index, paths, args.rebuild)
+        opened = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    try:
+        if not args.terms:
+            print(f'✓ {args.index}: {len(paths)} files ({parsed} parsed now), '
+                  f'{index.n_objects} objects, {index.n_keys} terms ({opened * 1000:.0f} ms)')
+            return 0
+        results = {}
+        for term in args.terms:
+            started = time.perf_counter()
+            hits = lookup(index, term)
+            objects, lines = render_hits(index, hits, args.kind)
+            elapsed = (time.perf_counter() - started) * 1000
+            results[term] = [dict(zip(('kind', 'name', 'file', 'line'), o[:4]), exact=o[5]) for o in objects]
+            if not args.json:
+                maybe = sum(1 for o in objects if not o[5])
+                print(f'📋 {term}: {len(objects)} objects, {maybe} via an unqualified column in a '
+                      f'multi-table statement (?) ({elapsed:.1f} ms)')
+                print('\n'.join(lines) if lines else '  (nothing)')
+        if args.json:
+            print(json.dumps(results, indent=2))
+    finally:
+        index.close()
+    return 0
@@ -0,0 +1,69 @@
+"""
+Incremental reader for large top-level JSON arrays (pg_policies exports).
+"""
+
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array read from a text stream."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        # Drop what has already been consumed before growing the buffer
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError("expected a JSON array")
+    pos += 1
+
+    skip_ws()
+    if pos < len(buf) and buf[pos] == ']':
+        return
+
+    while True:
+        skip_ws()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof or not fill():
+                    raise
+                continue
+            # A scalar cut off at the buffer edge can decode "successfully"
+            if end == len(buf) and not eof and fill():
+                continue
+            break
+        pos = end
+        yield item
+
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == ',':
+            pos += 1
+        elif buf[pos] == ']':
+            return
+        else:
+            raise ValueError(f"expected ',' or ']' in JSON array, got {buf[pos]!r}")
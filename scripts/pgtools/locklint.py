@@ -0,0 +1,947 @@
+"""
+Lock-impact linter for migration files.
+
+Some of the database/*.sql files add columns with a ``gen_random_uuid()``
+default, add foreign keys and CHECKs without ``NOT VALID`` or build indexes
+without ``CONCURRENTLY``. On a busy table each of these holds a lock that
+blocks writes (or reads too) while the whole table is scanned or rewritten,
+and checkout stalls behind it.
+
+This classifies every statement of a migration, DDL inside DO blocks
+included, by
+
+  * lock level   - the table lock Postgres takes (ACCESS EXCLUSIVE ... ROW
+                   EXCLUSIVE) and what application traffic it blocks
+  * work         - catalog only, full scan, rewrite, index build, or every
+                   row (an UPDATE / DELETE without WHERE)
+  * table state  - new (created by the linted files), existing, or already
+                   applied (production_schema.sql has the object, so the
+                   statement is a no-op there), with the size class from
+                   rls-cost (--sizes, or name heuristics)
+
+and proposes the online equivalent: CONCURRENTLY, NOT VALID + VALIDATE,
+CREATE UNIQUE INDEX CONCURRENTLY + USING INDEX, a validated CHECK before
+SET NOT NULL, or a batched backfill.
+
+Severity:
+    danger   a lock that blocks writes held while an existing medium or large
+             table is scanned, rewritten or indexed; an UPDATE / DELETE of
+             every row of a large table; a statement that fails outright
+             (CONCURRENTLY inside a transaction, NOT NULL without a default)
+    warning  the same on a small table; a file that locks existing tables
+             without setting lock_timeout first (the ALTER waits behind long
+             queries and every query queues behind the ALTER)
+    ok       everything else
+
+With --check the exit status is 1 when anything reaches --fail-on (danger by
+default). A ``-- lock-lint: ok`` comment before or inside a statement
+accepts it.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools lock-lint
+    PYTHONPATH=scripts python3 -m pgtools lock-lint supabase/migrations/2026*.sql --check
+    PYTHONPATH=scripts python3 -m pgtools lock-lint database/add_*.sql --sizes sizes.json -v
+    PYTHONPATH=scripts python3 -m pgtools lock-lint --json
+"""
+
+import argparse
+import json
+import sys
+
+from . import catalog as catalog_mod
+from . import drift
+from . import index as index_mod
+from . import rlscost
+from . import sql
+from . import volatility
+
+# Table lock modes, weakest first
+LOCKS = ('ACCESS SHARE', 'ROW SHARE', 'ROW EXCLUSIVE', 'SHARE UPDATE EXCLUSIVE', 'SHARE',
+         'SHARE ROW EXCLUSIVE', 'EXCLUSIVE', 'ACCESS EXCLUSIVE')
+_BLOCKS_WRITES = LOCKS.index('SHARE')
+_BLOCKS_READS = LOCKS.index('ACCESS EXCLUSIVE')
+
+METADATA = 'catalog only'
+SCAN = 'full scan'
+REWRITE = 'rewrite'
+BUILD = 'index build'
+ROWS = 'every row'
+FAILS = 'fails'
+_HEAVY = (SCAN, REWRITE, BUILD, ROWS)
+
+NEW = 'new'
+EXISTING = 'existing'
+UNKNOWN = 'not in production'      # linted as existing
+APPLIED = 'applied'                # no-op against production_schema.sql
+
+OK = 'ok'
+WARNING = 'warning'
+DANGER = 'danger'
+SEVERITIES = (OK, WARNING, DANGER)
+_ICONS = {DANGER: '❌', WARNING: '⚠', OK: '✓'}
+
+ALLOW = 'lock-lint: ok'
+
+# Files the Supabase CLI applies inside one transaction each
+_IMPLICIT_TRANSACTION = ('supabase/migrations/',)
+
+_BATCH = 10_000
+
+_DDL_HEADS = ('CREATE', 'ALTER', 'DROP', 'REINDEX', 'VACUUM', 'CLUSTER', 'REFRESH', 'TRUNCATE', 'LOCK')
+
+
+def blocks(lock):
+    """What application traffic a table lock blocks."""
+    level = LOCKS.index(lock)
+    if level >= _BLOCKS_READS:
+        return 'reads and writes'
+    if level >= _BLOCKS_WRITES:
+        return 'writes'
+    return 'nothing'
+
+
+class Finding:
+    """One table lock a migration statement takes."""
+    __slots__ = ('path', 'line', 'table', 'action', 'lock', 'work', 'state', 'size', 'severity',
+                 'fix', 'notes', 'allowed')
+
+    def __init__(self, path, line, table, action, lock, work=METADATA, fix=None, notes=None):
+        self.path = path
+        self.line = line
+        self.table = table           # (schema, name)
+        self.action = action
+        self.lock = lock
+        self.work = work
+        self.state = EXISTING
+        self.size = 'medium'
+        self.severity = OK
+        self.fix = fix               # online equivalent (SQL), if there is one
+        self.notes = list(notes or ())
+        self.allowed = False
+
+    @property
+    def where(self):
+        return f'{self.path}:{self.line}'
+
+    @property
+    def live(self):
+        """True when the statement touches a table that already has data."""
+        return self.state in (EXISTING, UNKNOWN)
+
+    def grade(self):
+        if self.work == FAILS:
+            severity = DANGER
+        elif not self.live:
+            severity = OK
+        elif self.work in _HEAVY and LOCKS.index(self.lock) >= _BLOCKS_WRITES:
+            severity = WARNING if self.size == 'small' else DANGER
+        elif self.work == ROWS:
+            severity = {'large': DANGER, 'medium': WARNING}.get(self.size, OK)
+        else:
+            severity = OK
+        if self.allowed and severity != OK:
+            self.notes.append(f'{severity} accepted by a "-- {ALLOW}" comment')
+            severity = OK
+        self.severity = severity
+        return severity
+
+    def to_dict(self):
+        return {'file': self.path, 'line': self.line, 'table': '.'.join(self.table) if self.table else None,
+                'action': self.action, 'lock': self.lock, 'blocks': blocks(self.lock), 'work': self.work,
+                'state': self.state, 'size_class': self.size, 'severity': self.severity,
+                'online': self.fix, 'notes': self.notes}
+
+
+# ---------------------------------------------------------------------------
+# Statement helpers
+# ---------------------------------------------------------------------------
+
+def _text(stmt_text, tokens, a, b):
+    """Source text of tokens[a:b]."""
+    if a >= b:
+        return ''
+    return stmt_text[tokens[a].start:tokens[b - 1].end]
+
+
+def _skip(tokens, i, *words):
+    """Index past the keyword sequence ``words`` at tokens[i], or i if it is not there."""
+    if sql.find_keywords(tokens[i:i + len(words)], *words) == 0:
+        return i + len(words)
+    return i
+
+
+def _top_level(tokens, start, end, *words):
+    """Index of the first top-level keyword in ``words`` within tokens[start:end], or -1."""
+    depth = 0
+    for k in range(start, end):
+        tok = tokens[k]
+        if tok.is_op('(', '['):
+            depth += 1
+        elif tok.is_op(')', ']'):
+            depth -= 1
+        elif depth == 0 and tok.is_kw(*words):
+            return k
+    return -1
+
+
+def _calls(tokens, start, end):
+    """Names of the functions called in tokens[start:end]."""
+    names = []
+    for k in range(start, end - 1):
+        if tokens[k].kind == sql.WORD and tokens[k + 1].is_op('('):
+            name = tokens[k].text.lower()
+            if k >= 2 and tokens[k - 1].is_op('.'):
+                name = f'{tokens[k - 2].text.lower()}.{name}'
+            names.append(name)
+    return names
+
+
+def _volatile(catalog, tokens, start, end):
+    """The first VOLATILE call in an expression (evaluated per row as a column default), or None."""
+    for name in _calls(tokens, start, end):
+        base = name.rpartition('.')[2]
+        if name in volatility._VOLATILE_CALLS or base in volatility._VOLATILE_CALLS:
+            return name
+        functions = catalog.functions_named(name)
+        if functions and any(f.volatility == 'VOLATILE' for f in functions):
+            return name
+    return None
+
+
+def _varchar_length(type_):
+    if type_ == 'character varying':
+        return float('inf')
+    if type_.startswith('character varying('):
+        return int(type_[18:-1])
+    return None
+
+
+def _numeric(type_):
+    if type_ == 'numeric':
+        return (float('inf'), None)
+    if type_.startswith('numeric('):
+        parts = type_[8:-1].split(',')
+        return (int(parts[0]), int(parts[1]) if len(parts) > 1 else 0)
+    return None
+
+
+def binary_coercible(old, new):
+    """True when ALTER COLUMN TYPE old -> new needs no rewrite."""
+    if old == new:
+        return True
+    if new == 'text' and (old == 'text' or _varchar_length(old) is not None):
+        return True
+    old_len, new_len = _varchar_length(old), _varchar_length(new)
+    if old == 'text' and new_len == float('inf'):
+        return True
+    if old_len is not None and new_len is not None:
+        return new_len >= old_len
+    old_num, new_num = _numeric(old), _numeric(new)
+    if old_num and new_num:
+        return new_num[1] is None or (new_num[0] >= old_num[0] and new_num[1] == old_num[1])
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Online equivalents
+# ---------------------------------------------------------------------------
+
+def _not_valid_fix(qname, name, body):
+    cname = sql.quote_ident(name)
+    return (f'ALTER TABLE {qname} ADD CONSTRAINT {cname} {body} NOT VALID;\n'
+            f'ALTER TABLE {qname} VALIDATE CONSTRAINT {cname};')
+
+
+def _not_null_fix(qname, table, column):
+    check = sql.quote_ident(catalog_mod._default_name(table, (column,), 'not_null'))
+    col = sql.quote_ident(column)
+    return (f'ALTER TABLE {qname} ADD CONSTRAINT {check} CHECK ({col} IS NOT NULL) NOT VALID;\n'
+            f'ALTER TABLE {qname} VALIDATE CONSTRAINT {check};\n'
+            f'ALTER TABLE {qname} ALTER COLUMN {col} SET NOT NULL;  -- uses the CHECK, no scan\n'
+            f'ALTER TABLE {qname} DROP CONSTRAINT {check};')
+
+
+def _batch_hint(qname, table, assignment=None):
+    key = ', '.join(sql.quote_ident(c) for c in (table.primary_key.columns if table and table.primary_key
+                                                    else ('id',)))
+    action = f'UPDATE {qname} SET {assignment}' if assignment else f'DELETE FROM {qname}'
+    return (f'-- repeat, one transaction per batch, until no rows are affected:\n'
+            f'{action}\n'
+            f'WHERE ({key}) IN (SELECT {key} FROM {qname} WHERE <not yet done> LIMIT {_BATCH});')
+
+
+# ---------------------------------------------------------------------------
+# Linter
+# ---------------------------------------------------------------------------
+
+class Linter:
+    """Lints migration files in order against the production catalog."""
+
+    def __init__(self, production, sizes=None):
+        self.production = production
+        self.sizes = sizes
+        self.created = set()       # tables created by the linted files
+        self.findings = []
+        self.files = []
+
+    # -- bookkeeping ------------------------------------------------------
+
+    def _table(self, key):
+        return self.production.table(key)
+
+    def _add(self, finding, state=None):
+        key = finding.table
+        if state:
+            finding.state = state
+        elif key in self.created:
+            finding.state = NEW
+        elif self._table(key) is None and self.production.view(key) is None:
+            finding.state = UNKNOWN
+        finding.size = rlscost.size_class(key[1], self.sizes) if key else 'small'
+        finding.allowed = self._allowed
+        finding.grade()
+        self.findings.append(finding)
+        if finding.live and LOCKS.index(finding.lock) >= _BLOCKS_WRITES and finding.size != 'small' \
+                and not self._lock_timeout and self._queue is None:
+            self._queue = finding
+        return finding
+
+    # -- files ------------------------------------------------------------
+
+    def lint_file(self, path):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            self.lint_sql(f.read(), path)
+
+    def lint_sql(self, text, path='<sql>'):
+        self.files.append(path)
+        implicit = any(prefix in path.replace('\\', '/') for prefix in _IMPLICIT_TRANSACTION)
+        self._path = path
+        self._in_tx = implicit
+        self._implicit = implicit
+        self._lock_timeout = False
+        self._queue = None
+        line = 1
+        pos = prev_end = 0
+        for stmt in sql.split_statements(text):
+            line += text.count('\n', pos, stmt.start)
+            pos = stmt.start
+            self._line = line
+            self._allowed = ALLOW in text[prev_end:stmt.end]
+            prev_end = stmt.end
+            try:
+                self._statement(stmt.text, stmt.tokens)
+            except (sql.SQLSyntaxError, IndexError, ValueError):
+                pass
+        if self._queue is not None:
+            first = self._queue
+            warning = Finding(path, first.line, first.table, 'no lock_timeout', first.lock,
+                              fix="SET lock_timeout = '5s';  -- first statement of the file; retry on timeout",
+                              notes=['a lock that waits behind a long query makes every later query on '
+                                     'the table wait too'])
+            warning.state, warning.size, warning.severity = first.state, first.size, WARNING
+            self.findings.append(warning)
+
+    def _statement(self, text, tokens, in_block=False):
+        first = tokens[0]
+        if first.is_kw('BEGIN', 'START') and not in_block:
+            self._in_tx = True
+        elif first.is_kw('COMMIT', 'END', 'ROLLBACK') and not in_block:
+            self._in_tx = self._implicit
+        elif first.is_kw('SET') and any(t.kind == sql.WORD and t.text.lower() == 'lock_timeout'
+                                         for t in tokens[1:3]):
+            self._lock_timeout = True
+        elif first.is_kw('SELECT') and any(t.kind == sql.STRING and sql.string_value(t) == 'lock_timeout'
+                                            for t in tokens):
+            self._lock_timeout = True
+        elif first.is_kw('DO'):
+            for tok in tokens[1:]:
+                if tok.kind == sql.DOLLAR:
+                    self._block(sql.dollar_body(tok))
+        elif first.is_kw('UPDATE', 'DELETE') and not in_block:
+            self._dml(text, tokens)
+        elif first.is_kw(*_DDL_HEADS):
+            self._ddl(text, tokens, in_block)
+
+    def _block(self, body):
+        """DDL inside a PL/pgSQL block, including EXECUTE 'literal'."""
+        for stmt in sql.split_statements(body):
+            tokens = stmt.tokens
+            for k, tok in enumerate(tokens):
+                if k and not tokens[k - 1].is_kw(*catalog_mod._BLOCK_WORDS):
+                    continue
+                if tok.is_kw(*_DDL_HEADS):
+                    try:
+                        self._statement(stmt.text, tokens[k:], in_block=True)
+                    except (sql.SQLSyntaxError, IndexError, ValueError):
+                        pass
+                    break
+                if tok.is_kw('EXECUTE') and len(tokens) == k + 2 and tokens[k + 1].kind == sql.STRING:
+                    self._block(sql.string_value(tokens[k + 1]))
+                    break
+
+    def _ddl(self, text, tokens, in_block):
+        verb = tokens[0].upper
+        i = 1
+        while i < len(tokens) and tokens[i].is_kw('OR', 'REPLACE', 'UNIQUE', 'TEMP', 'TEMPORARY', 'UNLOGGED',
+                                                   'CONSTRAINT', 'MATERIALIZED'):
+            i += 1
+        kind = tokens[i].upper if i < len(tokens) else ''
+        if verb in ('REINDEX', 'VACUUM', 'CLUSTER', 'REFRESH', 'TRUNCATE', 'LOCK'):
+            handler = getattr(self, f'_{verb.lower()}')
+        else:
+            handler = getattr(self, f'_{verb.lower()}_{kind.lower()}', None)
+        if handler:
+            handler(text, tokens, in_block)
+
+    def _finding(self, table, action, lock, work=METADATA, fix=None, notes=None):
+        return Finding(self._path, self._line, table, action, lock, work, fix, notes)
+
+    # -- tables -----------------------------------------------------------
+
+    def _create_table(self, text, tokens, in_block):
+        i = sql.find_keywords(tokens, 'TABLE') + 1
+        i = _skip(tokens, i, 'IF', 'NOT', 'EXISTS')
+        key, i = sql.parse_qualified_name(tokens, i)
+        if self._table(key) is not None and sql.find_keywords(tokens, 'IF', 'NOT', 'EXISTS') >= 0:
+            return
+        self.created.add(key)
+        for k, tok in enumerate(tokens):
+            if tok.is_kw('REFERENCES'):
+                parent, _ = sql.parse_qualified_name(tokens, k + 1)
+                if parent != key:
+                    self._add(self._finding(parent, f'foreign key from new table {key[1]}', 'SHARE ROW EXCLUSIVE'))
+
+    def _drop_table(self, text, tokens, in_block):
+        i = _skip(tokens, 2, 'IF', 'EXISTS')
+        for a, b in sql.split_commas(tokens, i, len(tokens)):
+            if sql.is_name(tokens[a]) and not tokens[a].is_kw('CASCADE', 'RESTRICT'):
+                key, _ = sql.parse_qualified_name(tokens, a)
+                if self._table(key) is None and key not in self.created:
+                    continue
+                self.created.discard(key)
+                self._add(self._finding(key, 'DROP TABLE', 'ACCESS EXCLUSIVE'))
+
+    def _truncate(self, text, tokens, in_block):
+        i = _skip(tokens, 1, 'TABLE')
+        i = _skip(tokens, i, 'ONLY')
+        key, _ = sql.parse_qualified_name(tokens, i)
+        self._add(self._finding(key, 'TRUNCATE', 'ACCESS EXCLUSIVE'))
+
+    def _lock(self, text, tokens, in_block):
+        i = _skip(tokens, 1, 'TABLE')
+        i = _skip(tokens, i, 'ONLY')
+        key, i = sql.parse_qualified_name(tokens, i)
+        mode = 'ACCESS EXCLUSIVE'
+        if i < len(tokens) and tokens[i].is_kw('IN'):
+            words = [t.upper for t in tokens[i + 1:] if not t.is_kw('MODE', 'NOWAIT')]
+            mode = ' '.join(words) if ' '.join(words) in LOCKS else mode
+        self._add(self._finding(key, 'LOCK TABLE', mode))
+
+    def _alter_table(self, text, tokens, in_block):
+        i = _skip(tokens, 2, 'IF', 'EXISTS')
+        i = _skip(tokens, i, 'ONLY')
+        if tokens[i].is_kw('ALL'):
+            return
+        key, i = sql.parse_qualified_name(tokens, i)
+        if self.production.view(key) is not None:
+            return
+        for start, end in sql.split_commas(tokens, i, len(tokens)):
+            if start < end:
+                self._alter_action(text, tokens, key, start, end)
+
+    def _alter_action(self, text, tokens, key, i, end):
+        table = self._table(key)
+        qname = sql.qualified(*key)
+        tok = tokens[i]
+        action = _text(text, tokens, i, min(end, i + 4)).upper()
+        if tok.is_kw('ADD'):
+            j = _skip(tokens, i + 1, 'COLUMN') if not tokens[i + 1].is_kw(*catalog_mod._CONSTRAINT_START) else i + 1
+            if tokens[j].is_kw(*catalog_mod._CONSTRAINT_START):
+                self._add_constraint(text, tokens, key, table, j, end)
+            else:
+                self._add_column(text, tokens, key, table, j, end)
+        elif tok.is_kw('ALTER'):
+            j = _skip(tokens, i + 1, 'COLUMN')
+            self._alter_column(text, tokens, key, table, j, end)
+        elif tok.is_kw('VALIDATE'):
+            self._add(self._finding(key, action, 'SHARE UPDATE EXCLUSIVE', SCAN,
+                                    notes=['scans without blocking reads or writes']))
+        elif tok.is_kw('DROP'):
+            j = i + 1
+            if tokens[j].is_kw('CONSTRAINT'):
+                j = _skip(tokens, j + 1, 'IF', 'EXISTS')
+                name = sql.ident_value(tokens[j])
+                constraint = table.constraints.get(name) if table else None
+                notes = []
+                if constraint is not None and constraint.kind == catalog_mod.FOREIGN:
+                    notes.append(f'also locks {constraint.ref_table[1]} (ACCESS EXCLUSIVE)')
+                finding = self._finding(key, f'DROP CONSTRAINT {name}', 'ACCESS EXCLUSIVE', notes=notes)
+                self._add(finding, APPLIED if table is not None and constraint is None
+                          and key not in self.created else None)
+            else:
+                j = _skip(tokens, _skip(tokens, j, 'COLUMN'), 'IF', 'EXISTS')
+                name = sql.ident_value(tokens[j])
+                gone = table is not None and name not in table.columns and key not in self.created
+                self._add(self._finding(key, f'DROP COLUMN {name}', 'ACCESS EXCLUSIVE'), APPLIED if gone else None)
+        elif tok.is_kw('ENABLE', 'DISABLE') and tokens[i + 1].is_kw('TRIGGER'):
+            self._add(self._finding(key, action, 'SHARE ROW EXCLUSIVE'))
+        elif tok.is_kw('SET') and tokens[i + 1].is_kw('TABLESPACE', 'LOGGED', 'UNLOGGED'):
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE', REWRITE,
+                                    notes=['no online equivalent in core Postgres; pg_repack can do it']))
+        elif (tok.is_kw('SET', 'RESET') and tokens[i + 1].is_op('(')) or tok.is_kw('CLUSTER') \
+                or (tok.is_kw('SET') and tokens[i + 1].is_kw('WITHOUT')):
+            self._add(self._finding(key, action, 'SHARE UPDATE EXCLUSIVE'))
+        elif tok.is_kw('ATTACH'):
+            child, _ = sql.parse_qualified_name(tokens, i + 2)
+            self._add(self._finding(key, f'ATTACH PARTITION {child[1]}', 'SHARE UPDATE EXCLUSIVE', SCAN,
+                                    notes=[f'{child[1]} is locked ACCESS EXCLUSIVE and scanned unless a CHECK '
+                                           'constraint already proves the bounds']))
+        elif tok.is_kw('DETACH'):
+            concurrent = _top_level(tokens, i, end, 'CONCURRENTLY') >= 0
+            self._add(self._finding(key, action, 'SHARE UPDATE EXCLUSIVE' if concurrent else 'ACCESS EXCLUSIVE'))
+        elif tok.is_kw('RENAME'):
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE',
+                                    notes=['queries using the old name fail from the commit on']))
+        else:
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE'))
+
+    def _add_column(self, text, tokens, key, table, i, end):
+        if_not_exists = sql.find_keywords(tokens[i:i + 3], 'IF', 'NOT', 'EXISTS') == 0
+        i = _skip(tokens, i, 'IF', 'NOT', 'EXISTS')
+        name = sql.ident_value(tokens[i])
+        qname = sql.qualified(*key)
+        col = sql.quote_ident(name)
+        stop = _top_level(tokens, i + 1, end, *catalog_mod._TYPE_STOP)
+        stop = end if stop < 0 else stop
+        raw_type = _text(text, tokens, i + 1, stop)
+        action = f'ADD COLUMN {name} {raw_type}'
+        if table is not None and name in table.columns and key not in self.created:
+            notes = [] if if_not_exists else ['fails: the column already exists in production']
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE', notes=notes), APPLIED)
+            return
+        default = _top_level(tokens, stop, end, 'DEFAULT')
+        default_end = catalog_mod._expression_end(tokens, default + 1, end) if default >= 0 else -1
+        default_sql = _text(text, tokens, default + 1, default_end) if default >= 0 else None
+        not_null = _top_level(tokens, stop, end, 'NOT') >= 0 and \
+            tokens[_top_level(tokens, stop, end, 'NOT') + 1].is_kw('NULL')
+        volatile = _volatile(self.production, tokens, default + 1, default_end) if default >= 0 else None
+        serial = raw_type.lower().replace('"', '') in catalog_mod._SERIAL
+        generated = _top_level(tokens, stop, end, 'GENERATED')
+        notes = []
+        lock, work, fix = 'ACCESS EXCLUSIVE', METADATA, None
+        if volatile or serial or generated >= 0:
+            work = REWRITE
+            if volatile:
+                notes.append(f'DEFAULT {volatile}() is evaluated for every existing row')
+                fix = (f'ALTER TABLE {qname} ADD COLUMN {col} {raw_type};\n'
+                       f'ALTER TABLE {qname} ALTER COLUMN {col} SET DEFAULT {default_sql};\n'
+                       + _batch_hint(qname, table, f'{col} = {default_sql}'))
+                if not_null:
+                    fix += '\n' + _not_null_fix(qname, key[1], name)
+            else:
+                notes.append('serial, identity and stored generated columns fill every existing row')
+            if table is not None and table.indexes:
+                notes.append(f'the rewrite rebuilds {len(table.indexes)} indexes')
+        elif not_null and default < 0:
+            work = FAILS if key not in self.created else METADATA
+            notes.append('NOT NULL without a DEFAULT fails as soon as the table has rows')
+            fix = (f'ALTER TABLE {qname} ADD COLUMN {col} {raw_type} DEFAULT <constant> NOT NULL;'
+                   '  -- constant defaults are catalog-only')
+        if _top_level(tokens, stop, end, 'UNIQUE', 'PRIMARY') >= 0 and work == METADATA:
+            work = BUILD
+            notes.append('the UNIQUE / PRIMARY KEY index is built under ACCESS EXCLUSIVE')
+            index = sql.quote_ident(catalog_mod._default_name(key[1], (name,), 'key'))
+            fix = (f'ALTER TABLE {qname} ADD COLUMN {col} {raw_type};\n'
+                   f'CREATE UNIQUE INDEX CONCURRENTLY {index} ON {qname} ({col});\n'
+                   f'ALTER TABLE {qname} ADD CONSTRAINT {index} UNIQUE USING INDEX {index};')
+        elif _top_level(tokens, stop, end, 'CHECK') >= 0 and default >= 0 and work == METADATA:
+            work = SCAN
+            notes.append('the CHECK is tested against every existing row')
+            check = _top_level(tokens, stop, end, 'CHECK')
+            check_end = sql.matching_paren(tokens, check + 1) + 1
+            name_at = _top_level(tokens, stop, check, 'CONSTRAINT')
+            cname = sql.ident_value(tokens[name_at + 1]) if name_at >= 0 else \
+                catalog_mod._default_name(key[1], (name,), 'check')
+            fix = (f'ALTER TABLE {qname} ADD COLUMN {col} {raw_type} DEFAULT {default_sql};\n'
+                   + _not_valid_fix(qname, cname, _text(text, tokens, check, check_end)))
+        references = _top_level(tokens, stop, end, 'REFERENCES')
+        if references >= 0:
+            parent, _ = sql.parse_qualified_name(tokens, references + 1)
+            notes.append(f'also locks {parent[1]} (SHARE ROW EXCLUSIVE)')
+        self._add(self._finding(key, action, lock, work, fix, notes))
+
+    def _add_constraint(self, text, tokens, key, table, i, end):
+        qname = sql.qualified(*key)
+        name = None
+        if tokens[i].is_kw('CONSTRAINT'):
+            name = sql.ident_value(tokens[i + 1])
+            i += 2
+        kind = tokens[i].upper
+        not_valid = sql.find_keywords(tokens[i:end], 'NOT', 'VALID')
+        body_end = i + not_valid if not_valid >= 0 else end
+        body = _text(text, tokens, i, body_end)
+        columns = ()
+        if kind in ('PRIMARY', 'UNIQUE', 'FOREIGN'):
+            open_paren = i + (2 if kind in ('PRIMARY', 'FOREIGN') else 1)
+            if open_paren < end and tokens[open_paren].is_op('('):
+                close = sql.matching_paren(tokens, open_paren)
+                columns = catalog_mod._name_list(tokens, open_paren + 1, close)
+        suffix = {'PRIMARY': 'pkey', 'UNIQUE': 'key', 'FOREIGN': 'fkey', 'CHECK': 'check',
+                  'EXCLUDE': 'excl'}.get(kind, kind.lower())
+        name = name or catalog_mod._default_name(key[1], columns, suffix)
+        action = f'ADD CONSTRAINT {name} {" ".join(t.upper for t in tokens[i:i + 2] if t.kind == sql.WORD)}'
+        if table is not None and name in table.constraints and key not in self.created:
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE'), APPLIED)
+            return
+        notes = []
+        lock, work, fix = 'ACCESS EXCLUSIVE', METADATA, None
+        if kind == 'FOREIGN':
+            lock = 'SHARE ROW EXCLUSIVE'
+            references = sql.find_keywords(tokens[i:end], 'REFERENCES')
+            if references >= 0:
+                parent, _ = sql.parse_qualified_name(tokens, i + references + 1)
+                notes.append(f'also locks {parent[1]} (SHARE ROW EXCLUSIVE)')
+        if sql.find_keywords(tokens[i:end], 'USING', 'INDEX') >= 0:
+            pass
+        elif kind in ('FOREIGN', 'CHECK'):
+            if not_valid < 0:
+                work = SCAN
+                fix = _not_valid_fix(qname, name, body)
+            else:
+                notes.append('existing rows are checked later by VALIDATE CONSTRAINT')
+        elif kind in ('PRIMARY', 'UNIQUE'):
+            work = BUILD
+            index = sql.quote_ident(name)
+            cols = ', '.join(sql.quote_ident(c) for c in columns)
+            constraint = 'PRIMARY KEY' if kind == 'PRIMARY' else 'UNIQUE'
+            fix = (f'CREATE UNIQUE INDEX CONCURRENTLY {index} ON {qname} ({cols});\n'
+                   f'ALTER TABLE {qname} ADD CONSTRAINT {index} {constraint} USING INDEX {index};')
+            if kind == 'PRIMARY':
+                nullable = [c for c in columns if table is None or c not in table.columns
+                            or not table.columns[c].not_null]
+                if nullable:
+                    notes.append(f'{", ".join(nullable)} must be NOT NULL first (validated CHECK, then SET NOT NULL)')
+        elif kind == 'EXCLUDE':
+            work = BUILD
+            notes.append('no online equivalent: EXCLUDE constraints cannot use an existing index')
+        self._add(self._finding(key, action, lock, work, fix, notes))
+
+    def _alter_column(self, text, tokens, key, table, i, end):
+        name = sql.ident_value(tokens[i])
+        qname = sql.qualified(*key)
+        column = table.columns.get(name) if table else None
+        live = key not in self.created
+        i += 1
+        tok = tokens[i]
+        if tok.is_kw('TYPE') or (tok.is_kw('SET') and tokens[i + 1].is_kw('DATA')):
+            i += 1 if tok.is_kw('TYPE') else 3
+            using = _top_level(tokens, i, end, 'USING', 'COLLATE')
+            raw_type = _text(text, tokens, i, end if using < 0 else using)
+            new_type = catalog_mod.normalize_type(raw_type)
+            action = f'ALTER COLUMN {name} TYPE {raw_type}'
+            if column is not None and live and column.type == new_type and using < 0:
+                self._add(self._finding(key, action, 'ACCESS EXCLUSIVE'), APPLIED)
+                return
+            if column is not None and using < 0 and binary_coercible(column.type, new_type):
+                self._add(self._finding(key, action, 'ACCESS EXCLUSIVE',
+                                        notes=[f'{column.type} -> {new_type} is binary coercible: no rewrite']))
+                return
+            notes = []
+            if column is not None:
+                notes.append(f'{column.type} -> {new_type} rewrites the table')
+            indexes = [ix for ix in table.indexes.values() if name in ix.columns] if table else []
+            if indexes:
+                notes.append(f'and rebuilds {len(indexes)} index{"es" if len(indexes) > 1 else ""} on {name}')
+            shadow = sql.quote_ident(f'{name}_new')
+            fix = (f'ALTER TABLE {qname} ADD COLUMN {shadow} {raw_type};\n'
+                   f'-- keep {shadow} in step with {name} from a trigger, backfill it in batches,\n'
+                   f'-- then in one short transaction drop {name} and rename {shadow} to {name}')
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE', REWRITE, fix, notes))
+        elif tok.is_kw('SET') and tokens[i + 1].is_kw('NOT'):
+            action = f'ALTER COLUMN {name} SET NOT NULL'
+            if column is not None and column.not_null and live:
+                self._add(self._finding(key, action, 'ACCESS EXCLUSIVE'), APPLIED)
+                return
+            self._add(self._finding(key, action, 'ACCESS EXCLUSIVE', SCAN,
+                                    _not_null_fix(qname, key[1], name),
+                                    ['every row is checked for NULL under ACCESS EXCLUSIVE']))
+        elif tok.is_kw('SET') and tokens[i + 1].is_kw('STATISTICS'):
+            self._add(self._finding(key, f'ALTER COLUMN {name} SET STATISTICS', 'SHARE UPDATE EXCLUSIVE'))
+        else:
+            words = ' '.join(t.upper for t in tokens[i:min(end, i + 2)] if t.kind == sql.WORD)
+            self._add(self._finding(key, f'ALTER COLUMN {name} {words}', 'ACCESS EXCLUSIVE'))
+
+    # -- indexes ----------------------------------------------------------
+
+    def _index_table(self, schema, name):
+        for table in self.production.tables.values():
+            if table.schema == schema and name in table.indexes:
+                return table
+        return None
+
+    def _create_index(self, text, tokens, in_block):
+        unique = tokens[1].is_kw('UNIQUE')
+        i = sql.find_keywords(tokens, 'INDEX') + 1
+        concurrent = tokens[i].is_kw('CONCURRENTLY')
+        i = _skip(tokens, i + 1 if concurrent else i, 'IF', 'NOT', 'EXISTS')
+        on = _top_level(tokens, i, len(tokens), 'ON')
+        name = sql.ident_value(tokens[i]) if i < on else None
+        key, _ = sql.parse_qualified_name(tokens, _skip(tokens, on + 1, 'ONLY'))
+        action = f'CREATE {"UNIQUE " if unique else ""}INDEX {"CONCURRENTLY " if concurrent else ""}{name or ""}'
+        table = self._table(key)
+        if name and table is not None and name in table.indexes and key not in self.created:
+            lock = 'SHARE UPDATE EXCLUSIVE' if concurrent else 'SHARE'
+            self._add(self._finding(key, action.rstrip(), lock), APPLIED)
+            return
+        if concurrent:
+            finding = self._finding(key, action.rstrip(), 'SHARE UPDATE EXCLUSIVE', BUILD)
+            if in_block or self._in_tx:
+                finding.work = FAILS
+                finding.notes.append('CREATE INDEX CONCURRENTLY cannot run inside a transaction block'
+                                     + (' (DO block)' if in_block else ''))
+                finding.fix = 'run it on its own, outside BEGIN ... COMMIT and outside the migration transaction'
+            self._add(finding)
+            return
+        stmt = text[tokens[0].start:tokens[-1].end]
+        at = tokens[sql.find_keywords(tokens, 'INDEX')].end - tokens[0].start
+        fix = f'{stmt[:at]} CONCURRENTLY{stmt[at:]};'
+        notes = []
+        if self._in_tx or in_block:
+            notes.append('CONCURRENTLY has to run outside a transaction block: move it to its own step')
+        self._add(self._finding(key, action.rstrip(), 'SHARE', BUILD, fix, notes))
+
+    def _drop_index(self, text, tokens, in_block):
+        i = 2
+        concurrent = tokens[i].is_kw('CONCURRENTLY')
+        i = _skip(tokens, i + 1 if concurrent else i, 'IF', 'EXISTS')
+        for a, b in sql.split_commas(tokens, i, len(tokens)):
+            if not sql.is_name(tokens[a]) or tokens[a].is_kw('CASCADE', 'RESTRICT'):
+                continue
+            (schema, name), _ = sql.parse_qualified_name(tokens, a)
+            table = self._index_table(schema, name)
+            if table is None:
+                continue
+            lock = 'SHARE UPDATE EXCLUSIVE' if concurrent else 'ACCESS EXCLUSIVE'
+            fix = None if concurrent else f'DROP INDEX CONCURRENTLY IF EXISTS {sql.qualified(schema, name)};'
+            finding = self._finding(table.key, f'DROP INDEX {"CONCURRENTLY " if concurrent else ""}{name}', lock,
+                                    fix=fix)
+            if concurrent and (in_block or self._in_tx):
+                finding.work = FAILS
+                finding.notes.append('DROP INDEX CONCURRENTLY cannot run inside a transaction block')
+            self._add(finding)
+
+    def _reindex(self, text, tokens, in_block):
+        i = 1
+        if tokens[i].is_op('('):
+            i = sql.matching_paren(tokens, i) + 1
+        what = tokens[i].upper
+        concurrent = tokens[i + 1].is_kw('CONCURRENTLY')
+        (schema, name), _ = sql.parse_qualified_name(tokens, i + (2 if concurrent else 1))
+        if what == 'INDEX':
+            table = self._index_table(schema, name)
+            key = table.key if table else (schema, name)
+        elif what == 'TABLE':
+            key = (schema, name)
+        else:
+            return
+        action = f'REINDEX {what} {"CONCURRENTLY " if concurrent else ""}{name}'
+        fix = None if concurrent else f'REINDEX {what} CONCURRENTLY {sql.qualified(schema, name)};'
+        finding = self._finding(key, action, 'SHARE UPDATE EXCLUSIVE' if concurrent else 'SHARE',
+                                BUILD, fix, [] if concurrent else ['the index itself is locked ACCESS EXCLUSIVE, '
+                                                                   'so queries that would use it wait'])
+        if not concurrent:
+            finding.lock = 'ACCESS EXCLUSIVE' if what == 'INDEX' else 'SHARE'
+        elif in_block or self._in_tx:
+            finding.work = FAILS
+            finding.notes.append('REINDEX CONCURRENTLY cannot run inside a transaction block')
+        self._add(finding)
+
+    # -- maintenance ------------------------------------------------------
+
+    def _vacuum(self, text, tokens, in_block):
+        full = any(t.is_kw('FULL') for t in tokens[1:4])
+        names = [k for k, t in enumerate(tokens[1:], 1) if sql.is_name(t)
+                 and not t.is_kw('FULL', 'ANALYZE', 'VERBOSE', 'FREEZE')]
+        if not names:
+            return
+        key, _ = sql.parse_qualified_name(tokens, names[0])
+        if full:
+            self._add(self._finding(key, 'VACUUM FULL', 'ACCESS EXCLUSIVE', REWRITE,
+                                    notes=['pg_repack rebuilds the table without the long lock']))
+
+    def _cluster(self, text, tokens, in_block):
+        if len(tokens) < 2 or not sql.is_name(tokens[1]):
+            return
+        key, _ = sql.parse_qualified_name(tokens, _skip(tokens, 1, 'VERBOSE'))
+        self._add(self._finding(key, 'CLUSTER', 'ACCESS EXCLUSIVE', REWRITE,
+                                notes=['pg_repack --order-by rebuilds the table without the long lock']))
+
+    def _refresh(self, text, tokens, in_block):
+        i = sql.find_keywords(tokens, 'VIEW') + 1
+        concurrent = tokens[i].is_kw('CONCURRENTLY')
+        key, _ = sql.parse_qualified_name(tokens, i + 1 if concurrent else i)
+        if concurrent:
+            self._add(self._finding(key, 'REFRESH MATERIALIZED VIEW CONCURRENTLY', 'EXCLUSIVE', REWRITE,
+                                    notes=['reads continue during the refresh']), EXISTING)
+            return
+        fix = f'REFRESH MATERIALIZED VIEW CONCURRENTLY {sql.qualified(*key)};  -- needs a UNIQUE index on the view'
+        self._add(self._finding(key, 'REFRESH MATERIALIZED VIEW', 'ACCESS EXCLUSIVE', REWRITE, fix), EXISTING)
+
+    # -- triggers and policies --------------------------------------------
+
+    def _on_table(self, tokens, start=0):
+        on = sql.find_keywords(tokens, 'ON', start=start)
+        key, _ = sql.parse_qualified_name(tokens, on + 1)
+        return key
+
+    def _create_trigger(self, text, tokens, in_block):
+        key = self._on_table(tokens, sql.find_keywords(tokens, 'TRIGGER'))
+        name = sql.ident_value(tokens[sql.find_keywords(tokens, 'TRIGGER') + 1])
+        self._add(self._finding(key, f'CREATE TRIGGER {name}', 'SHARE ROW EXCLUSIVE'))
+
+    def _drop_trigger(self, text, tokens, in_block):
+        i = _skip(tokens, 2, 'IF', 'EXISTS')
+        key = self._on_table(tokens, i)
+        self._add(self._finding(key, f'DROP TRIGGER {sql.ident_value(tokens[i])}', 'ACCESS EXCLUSIVE'))
+
+    def _policy(self, verb, tokens, i):
+        key = self._on_table(tokens, i + 1)
+        self._add(self._finding(key, f'{verb} POLICY {sql.ident_value(tokens[i])}', 'ACCESS EXCLUSIVE'))
+
+    def _create_policy(self, text, tokens, in_block):
+        self._policy('CREATE', tokens, 2)
+
+    def _alter_policy(self, text, tokens, in_block):
+        self._policy('ALTER', tokens, 2)
+
+    def _drop_policy(self, text, tokens, in_block):
+        self._policy('DROP', tokens, _skip(tokens, 2, 'IF', 'EXISTS'))
+
+    # -- data changes -----------------------------------------------------
+
+    def _dml(self, text, tokens):
+        update = tokens[0].is_kw('UPDATE')
+        i = 1 if update else _skip(tokens, 1, 'FROM')
+        i = _skip(tokens, i, 'ONLY')
+        key, _ = sql.parse_qualified_name(tokens, i)
+        if _top_level(tokens, i, len(tokens), 'WHERE') >= 0:
+            return
+        table = self._table(key)
+        qname = sql.qualified(*key)
+        if update:
+            set_at = _top_level(tokens, i, len(tokens), 'SET')
+            stop = _top_level(tokens, set_at + 1, len(tokens), 'FROM', 'RETURNING')
+            assignment = _text(text, tokens, set_at + 1, len(tokens) if stop < 0 else stop)
+            fix = _batch_hint(qname, table, assignment)
+        else:
+            fix = f'TRUNCATE {qname};  -- if nothing references it; otherwise\n' + _batch_hint(qname, table)
+        self._add(self._finding(key, 'UPDATE without WHERE' if update else 'DELETE without WHERE',
+                                'ROW EXCLUSIVE', ROWS, fix,
+                                ['one transaction locks every row, writes a new version of each and '
+                                 'holds back vacuum until it commits']))
+
+
+def lint(paths, production, sizes=None):
+    linter = Linter(production, sizes)
+    for path in paths:
+        linter.lint_file(path)
+    return linter
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def _counts(findings):
+    return {s: sum(1 for f in findings if f.severity == s) for s in SEVERITIES}
+
+
+def _describe(finding):
+    table = finding.table[1] if finding.table else '-'
+    head = f'{_ICONS[finding.severity]} {finding.where}  {table}  {finding.action}'
+    facts = [f'{finding.lock} (blocks {blocks(finding.lock)})', finding.work, f'{finding.size} table']
+    if finding.state != EXISTING:
+        facts.append(finding.state)
+    lines = [head, '     ' + ' · '.join(facts)]
+    lines += [f'     {note}' for note in finding.notes]
+    if finding.fix:
+        fix = finding.fix.splitlines()
+        lines.append(f'     online: {fix[0]}')
+        lines += [f'             {line}' for line in fix[1:]]
+    return lines
+
+
+def report(linter, verbose=False):
+    findings = linter.findings
+    counts = _counts(findings)
+    files = len({f.path for f in findings})
+    lines = [f'📊 {len(findings)} table locks in {files} of {len(linter.files)} files: '
+             f'{counts[DANGER]} danger, {counts[WARNING]} warning, {counts[OK]} ok', '']
+    for severity in (DANGER, WARNING):
+        for finding in findings:
+            if finding.severity == severity:
+                lines += _describe(finding)
+                lines.append('')
+    if verbose:
+        lines.append('📋 ok')
+        for finding in findings:
+            if finding.severity == OK:
+                table = finding.table[1] if finding.table else '-'
+                lines.append(f'   {finding.where}  {table}  {finding.action}  [{finding.lock}, {finding.work}, '
+                             f'{finding.state}]')
+        lines.append('')
+    by_lock = {}
+    for finding in findings:
+        if finding.state != APPLIED:
+            by_lock[finding.lock] = by_lock.get(finding.lock, 0) + 1
+    lines.append('locks taken (applied statements excluded):')
+    for lock in reversed(LOCKS):
+        if lock in by_lock:
+            lines.append(f'   {lock:<24} {by_lock[lock]:>5}   blocks {blocks(lock)}')
+    applied = sum(1 for f in findings if f.state == APPLIED)
+    if applied:
+        lines.append(f'{applied} statements are no-ops against production_schema.sql (already applied).')
+    if not verbose:
+        lines.append('-v lists the ok statements.')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools lock-lint',
+        description='Classify migration statements by table lock, rewrite/scan and table size; '
+                    'propose online equivalents.')
+    parser.add_argument('inputs', nargs='*', metavar='GLOB',
+                        help='migrations to lint, in run order (default: database/*.sql and '
+                             'supabase/migrations/*.sql in pgtools plan order)')
+    parser.add_argument('--production', default='production_schema.sql',
+                        help='production snapshot for table state and sizes (default: production_schema.sql)')
+    parser.add_argument('--sizes', help='JSON map of table -> row count or size class')
+    parser.add_argument('--check', action='store_true', help='exit 1 when a finding reaches --fail-on')
+    parser.add_argument('--fail-on', choices=(WARNING, DANGER), default=DANGER,
+                        help='lowest severity that fails --check (default: danger)')
+    parser.add_argument('--json', action='store_true', help='print the findings as JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='also list the ok statements')
+    args = parser.parse_args(argv)
+
+    try:
+        paths = index_mod.expand_inputs(args.inputs) if args.inputs else drift.default_inputs()
+        if not paths:
+            raise ValueError(f'no SQL files match {" ".join(args.inputs)}')
+        production = catalog_mod.load([args.production])
+        sizes = rlscost.load_sizes(args.sizes) if args.sizes else None
+        linter = lint(paths, production, sizes)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    if args.json:
+        json.dump({'production': args.production, 'files': linter.files,
+                   'counts': _counts(linter.findings),
+                   'findings': [f.to_dict() for f in linter.findings]}, sys.stdout, indent=2)
+        print()
+    else:
+        print(report(linter, args.verbose))
+    threshold = SEVERITIES.index(args.fail_on)
+    failed = any(SEVERITIES.index(f.severity) >= threshold for f in linter.findings)
+    return 1 if args.check and failed else 0
@@ -0,0 +1,248 @@
+"""
+Duplicate and overlapping PERMISSIVE policy merger.
+
+Postgres ORs every PERMISSIVE policy that applies to a (table, command, role)
+and evaluates all of them for every row. We keep accumulating overlapping
+ones (see supabase/migrations/20260321_fix_duplicate_policies.sql). This
+module groups the parsed policy set per table and finds:
+
+  * exact duplicates  - same command, roles and normalized USING/WITH CHECK
+  * subsumed policies - another policy on the same table already allows
+                        everything this one allows (broader roles/command and
+                        a condition it implies, e.g. ``true`` or a conjunct)
+  * mergeable groups  - several remaining policies with the same command and
+                        roles, folded into one policy whose USING / WITH CHECK
+                        is the OR of the members
+
+and writes a migration that drops the redundant policies and replaces each
+group with a single policy, plus an equivalence report explaining each step.
+Implication is checked syntactically on normalized expressions, so it only
+ever under-reports; nothing is dropped unless it is provably redundant.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools merge production_schema.sql -o database/merge-duplicate-policies.sql
+    PYTHONPATH=scripts python3 -m pgtools merge --replay database/master_migration.sql supabase/migrations/*.sql
+"""
+
+import argparse
+import sys
+from functools import lru_cache
+
+from . import diff as diff_mod
+from . import policies as policy_mod
+from . import sql
+
+# Commands each policy command applies to
+EFFECTIVE = {
+    'ALL': frozenset(('SELECT', 'INSERT', 'UPDATE', 'DELETE')),
+    'SELECT': frozenset(('SELECT',)),
+    'INSERT': frozenset(('INSERT',)),
+    'UPDATE': frozenset(('UPDATE',)),
+    'DELETE': frozenset(('DELETE',)),
+}
+READS = frozenset(('SELECT', 'UPDATE', 'DELETE'))    # commands checking USING
+WRITES = frozenset(('INSERT', 'UPDATE'))             # commands checking WITH CHECK
+
+DUPLICATE = 'duplicate'
+SUBSUMED = 'subsumed'
+
+
+@lru_cache(maxsize=None)
+def _tree(norm):
+    return diff_mod.expr_tree(norm)
+
+
+@lru_cache(maxsize=None)
+def _parts(norm, word):
+    tree = _tree(norm)
+    if word == 'and' and ('or' in tree or 'between' in tree):
+        return frozenset((norm,))
+    return frozenset(diff_mod.render_tree(part) for part in diff_mod.split_top(tree, word))
+
+
+def implies(a, b):
+    """True when normalized condition ``a`` provably implies ``b`` (None means false)."""
+    if a is None or a == 'false' or b == 'true' or a == b:
+        return True
+    if b is None:
+        return False
+    # (x AND y) implies x
+    if _parts(b, 'and') <= _parts(a, 'and'):
+        return True
+    # x implies (x OR y); (x OR y) implies b when each side does
+    b_any = _parts(b, 'or')
+    a_any = _parts(a, 'or')
+    if len(b_any) > 1 and (a in b_any or a_any <= b_any):
+        return True
+    if len(a_any) > 1:
+        return all(any(_parts(d, 'and') >= _parts(e, 'and') for e in b_any) for d in a_any)
+    return False
+
+
+class Conditions:
+    """Normalized read (USING) and write (WITH CHECK, defaulting to USING) conditions."""
+
+    __slots__ = ('policy', 'commands', 'roles', 'read', 'write')
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.commands = EFFECTIVE[policy.command]
+        self.roles = frozenset(policy.roles)
+        self.read = diff_mod.normalize_expr(policy.using)
+        self.write = diff_mod.normalize_expr(policy.with_check) if policy.with_check is not None else self.read
+
+
+def covers(broad, narrow):
+    """True when ``broad`` allows every row ``narrow`` allows, for every command/role of ``narrow``."""
+    if not (broad.policy.permissive and narrow.policy.permissive):
+        return False
+    if not ('public' in broad.roles or narrow.roles <= broad.roles):
+        return False
+    if not narrow.commands <= broad.commands:
+        return False
+    if narrow.commands & READS and not implies(narrow.read, broad.read):
+        return False
+    if narrow.commands & WRITES and not implies(narrow.write, broad.write):
+        return False
+    return True
+
+
+class TablePlan:
+    __slots__ = ('table', 'redundant', 'merges')
+
+    def __init__(self, table):
+        self.table = table
+        self.redundant = []   # (Policy, reason, covering Policy)
+        self.merges = []      # (members, merged Policy)
+
+    def is_empty(self):
+        return not (self.redundant or self.merges)
+
+
+def plan_table(table, policy_list):
+    plan = TablePlan(table)
+    conds = sorted((Conditions(p) for p in policy_list if p.permissive), key=lambda c: c.policy.name)
+    dropped = set()
+    for narrow in conds:
+        for broad in conds:
+            if broad is narrow or broad.policy.name in dropped or not covers(broad, narrow):
+                continue
+            mutual = covers(narrow, broad)
+            if mutual and narrow.policy.name < broad.policy.name:
+                continue  # keep the alphabetically first of two equivalent policies
+            same = diff_mod.body_key(broad.policy) == diff_mod.body_key(narrow.policy)
+            plan.redundant.append((narrow.policy, DUPLICATE if same else SUBSUMED, broad.policy))
+            dropped.add(narrow.policy.name)
+            break
+
+    groups = {}
+    for cond in conds:
+        if cond.policy.name not in dropped:
+            groups.setdefault((cond.policy.command, cond.roles), []).append(cond.policy)
+    taken = {c.policy.name for c in conds if c.policy.name not in dropped}
+    for (command, roles), members in groups.items():
+        if len(members) > 1:
+            name = merged_name(table[1], command, roles, len(groups) > 1)
+            if name in taken:
+                name = members[0].name
+            taken.add(name)
+            plan.merges.append((members, merge_group(members, name)))
+    return plan
+
+
+def merged_name(table, command, roles, by_role):
+    """``<table>_<command>``, as in the *_select_policy names of our migrations."""
+    name = f'{table}_{command.lower()}'
+    if by_role and roles != {'public'}:
+        name += '_' + '_'.join(sorted(roles))
+    return name
+
+
+def merge_group(members, name):
+    """One policy equivalent to OR-ing ``members`` (same table, command and roles)."""
+    usings = [p.using for p in members if p.using is not None]
+    using = ' OR '.join(f'({u})' for u in usings) if usings else None
+    if all(p.with_check is None for p in members):
+        with_check = None
+    else:
+        checks = [p.with_check if p.with_check is not None else p.using for p in members]
+        with_check = ' OR '.join(f'({c})' for c in checks if c is not None) or None
+    if len(usings) == 1:
+        using = usings[0]
+    return members[0].replace(name=name, using=using, with_check=with_check)
+
+
+def plan(policy_list):
+    by_table = {}
+    for policy in policy_list:
+        by_table.setdefault((policy.schema, policy.table), []).append(policy)
+    plans = [plan_table(table, members) for table, members in sorted(by_table.items())]
+    return [p for p in plans if not p.is_empty()]
+
+
+def render(plans):
+    dropped = sum(len(p.redundant) for p in plans)
+    merged = sum(len(members) for p in plans for members, _ in p.merges)
+    out = [policy_mod.header(
+        'MERGE DUPLICATE / OVERLAPPING RLS POLICIES (generated by pgtools merge)',
+        [f'{dropped} redundant policies dropped, {merged} policies merged into '
+         f'{sum(len(p.merges) for p in plans)} across {len(plans)} tables.',
+         'Each step is provably equivalent; see the comments per table.'],
+    ).rstrip('\n'), '', 'BEGIN;']
+    for table_plan in plans:
+        out += ['', f'-- === {table_plan.table[1].upper()} ===']
+        for policy, reason, by in table_plan.redundant:
+            verb = 'duplicates' if reason == DUPLICATE else 'is subsumed by'
+            out.append(f'-- {sql.quote_ident_always(policy.name)} {verb} {sql.quote_ident_always(by.name)}')
+            out.append(policy.drop_sql())
+        for members, merged in table_plan.merges:
+            names = ', '.join(sql.quote_ident_always(p.name) for p in members)
+            out.append(f'-- Merged {len(members)} {merged.command} policies for '
+                       f'{", ".join(merged.roles)}: {names}')
+            out += [p.drop_sql() for p in members]
+            out.append(merged.create_sql())
+    out += ['', 'COMMIT;', '']
+    return '\n'.join(out)
+
+
+def report(plans):
+    lines = [f'📊 {len(plans)} tables with redundant or mergeable permissive policies', '']
+    for table_plan in plans:
+        lines.append(f'{table_plan.table[1]}')
+        for policy, reason, by in table_plan.redundant:
+            what = 'exact duplicate of' if reason == DUPLICATE else 'subsumed by'
+            lines.append(f'   ✗ [{policy.command}] "{policy.name}" — {what} "{by.name}" [{by.command}]')
+        for members, merged in table_plan.merges:
+            lines.append(f'   ⇒ [{merged.command} → {", ".join(merged.roles)}] '
+                         f'{len(members)} policies OR-ed into "{merged.name}": '
+                         + ', '.join(f'"{p.name}"' for p in members))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools merge',
+        description='Drop duplicate/subsumed permissive policies and merge the rest per table, command and role.')
+    parser.add_argument('inputs', nargs='*', default=['production_schema.sql'],
+                        help='policy exports or SQL files (default: production_schema.sql)')
+    parser.add_argument('--replay', action='store_true',
+                        help='treat inputs as migrations run in order, honouring DROP POLICY')
+    parser.add_argument('-o', '--output', help='write the merge migration here')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.replay:
+            policy_list = policy_mod.replay(*args.inputs)
+        else:
+            policy_list = list({p.key: p for p in policy_mod.load(*args.inputs)}.values())
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    plans = plan(policy_list)
+    print(report(plans))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(render(plans))
+        print(f'\n✓ Generated {args.output}')
+    return 0
@@ -0,0 +1,696 @@
+"""
+Partitioning advisor and DDL generator for append-heavy tables.
+
+Tracking events, feed interactions, IoT sensor readings and the audit/finance
+logs only ever grow, as plain heap tables. Their indexes grow with them,
+autovacuum rescans them end to end, and retention is a DELETE that touches
+every expired row. Range partitioning by time keeps the hot month small and
+turns retention into ``DROP TABLE`` of an old partition.
+
+The advisor ranks candidates from the schema catalog and the code that writes
+to them:
+
+  * a timestamp column to partition on (default now(), NOT NULL, used in
+    .gte()/.lt()/.order() filters in the app, indexed)
+  * the write pattern: supabase-js .insert/.update/.delete calls in src/ and
+    supabase/functions/, and INSERT/UPDATE/DELETE in SQL function bodies
+  * table size class and log-like names (_events, _logs, _readings, ...)
+  * blockers: incoming foreign keys (a partitioned table can only be
+    referenced through a unique key that includes the partition key) and
+    UNIQUE constraints that would have to be widened
+
+For each chosen table it writes a script that psql runs top to bottom:
+
+  1. the partitioned copy (PRIMARY KEY / UNIQUE widened with the key) with
+     its first partitions, and a trigger that mirrors writes into it
+  2. a batched backfill that commits per time window
+  3. a short swap transaction: reconcile deletes that raced the backfill,
+     compare row counts, rename, move triggers/policies/views over
+  4. a pg_cron schedule for ``maintain_time_partitions``, the shared
+     maintenance function that pre-creates partitions and drops expired ones
+
+The old table is kept as ``<table>_unpartitioned`` until dropped by hand.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools partition
+    PYTHONPATH=scripts python3 -m pgtools partition -o database/partition-append-tables.sql
+    PYTHONPATH=scripts python3 -m pgtools partition --table sensor_readings --interval sensor_readings=day \\
+        --retention sensor_readings='3 months' -o database/partition-sensor-readings.sql
+"""
+
+import argparse
+import copy
+import json
+import re
+import sys
+
+from . import appqueries
+from . import catalog as catalog_mod
+from . import policies as policy_mod
+from . import rlscost
+from . import sql
+from . import squash
+from . import trigcost
+
+INTERVALS = ('day', 'week', 'month')
+
+_TIME_TYPES = ('timestamp with time zone', 'timestamp without time zone', 'date')
+_KEY_NAMES = ('created_at', 'reading_timestamp', 'occurred_at', 'logged_at', 'recorded_at',
+              'timestamp', 'event_time', 'first_event_at', 'transaction_date', 'entry_date')
+_RANGE_METHODS = ('gte', 'gt', 'lte', 'lt', 'order', 'range')
+_APPEND_SUFFIXES = ('_events', '_event_interactions', '_interactions', '_logs', '_log', '_audit',
+                    '_audit_log', '_audit_logs', '_readings', '_history', '_clicks', '_views',
+                    '_transactions', '_entries', '_attempts')
+
+# Default (partition interval, retention) by kind of table; None keeps every partition
+_FINANCE = ('financial_transactions_log', 'ledger_entries', 'escrow_transactions',
+            'settlement_transactions', 'finance_audit_log', 'communication_credit_transactions')
+_POLICY = (
+    (lambda name: name in _FINANCE, 'month', None),
+    (lambda name: name.endswith('_readings'), 'day', '3 months'),
+    (lambda name: 'audit' in name or name.endswith(('_log', '_logs', '_attempts', '_history')),
+     'month', '24 months'),
+    (lambda name: True, 'month', '13 months'),
+)
+
+_PREMAKE = 3                # partitions created ahead of now()
+_BACKFILL_STEP = {'day': '1 hour', 'week': '6 hours', 'month': '1 day'}
+_SCORE_THRESHOLD = 3       # listed
+_READY_SCORE = 6           # generated by default
+
+
+class Candidate:
+    """One table considered for range partitioning."""
+    __slots__ = ('table', 'key', 'key_reasons', 'inserts', 'updates', 'deletes', 'size', 'log_like',
+                 'blockers', 'widened', 'notes', 'score', 'interval', 'retention')
+
+    def __init__(self, table):
+        self.table = table
+        self.key = None
+        self.key_reasons = []
+        self.inserts = []           # call sites: path:line or function name
+        self.updates = []
+        self.deletes = []
+        self.size = 'medium'
+        self.log_like = False
+        self.blockers = []
+        self.widened = []
+        self.notes = []
+        self.score = 0
+        self.interval = 'month'
+        self.retention = None
+
+    @property
+    def name(self):
+        return self.table.name
+
+    @property
+    def append_only(self):
+        return bool(self.inserts) and not self.updates
+
+    @property
+    def unique_widened(self):
+        return [name for name in self.widened if self.table.constraints[name].kind == catalog_mod.UNIQUE]
+
+    @property
+    def ready(self):
+        return (self.key is not None and not self.blockers and not self.unique_widened
+                and (self.log_like or self.size == 'large') and self.score >= _READY_SCORE)
+
+    def to_dict(self):
+        return {
+            'table': f'{self.table.schema}.{self.table.name}',
+            'score': self.score,
+            'key': self.key,
+            'key_reasons': self.key_reasons,
+            'interval': self.interval,
+            'retention': self.retention,
+            'size_class': self.size,
+            'log_like': self.log_like,
+            'inserts': self.inserts,
+            'updates': self.updates,
+            'deletes': self.deletes,
+            'append_only': self.append_only,
+            'blockers': self.blockers,
+            'widened_constraints': self.widened,
+            'notes': self.notes,
+            'ready': self.ready,
+        }
+
+
+def write_sites(catalog, chains):
+    """table name -> {'insert'/'update'/'delete': [call sites]} from app code and SQL functions."""
+    sites = {}
+    for chain in chains:
+        for method in chain.writes:
+            kind = 'insert' if method == 'upsert' else method
+            sites.setdefault(chain.table, {}).setdefault(kind, []).append(chain.where)
+            if method == 'upsert':
+                sites[chain.table].setdefault('update', []).append(chain.where + ' (upsert)')
+    for function in catalog.functions.values():
+        if function.language not in ('sql', 'plpgsql'):
+            continue
+        for event, table, _, _ in trigcost.dml_targets(sql.tokenize(function.body or '')):
+            sites.setdefault(table[1], {}).setdefault(event.lower(), []).append(f'{function.name}()')
+    return sites
+
+
+def _range_columns(chains, table):
+    """Columns the app filters or orders ``table`` by with range methods, with counts."""
+    counts = {}
+    for chain in chains:
+        if chain.table != table:
+            continue
+        for method, args in chain.calls:
+            if method in _RANGE_METHODS:
+                column = appqueries.first_string(args)
+                if column:
+                    counts[column] = counts.get(column, 0) + 1
+    return counts
+
+
+def choose_key(table, chains):
+    """(column, reasons) for the best time column of ``table``, or (None, [])."""
+    ranges = _range_columns(chains, table.name)
+    indexed = {index.columns[0] for index in table.indexes.values() if index.columns}
+    best = None
+    for column in table.columns.values():
+        if column.type not in _TIME_TYPES or column.generated:
+            continue
+        reasons = []
+        score = 0
+        default = (column.default or '').lower()
+        if 'now()' in default or 'current_timestamp' in default:
+            score += 3
+            reasons.append('defaults to now()')
+        if column.not_null:
+            score += 2
+            reasons.append('NOT NULL')
+        if ranges.get(column.name):
+            score += 2 * ranges[column.name]
+            reasons.append(f'{ranges[column.name]} range filter/order call(s) in the app')
+        if column.name in indexed:
+            score += 1
+            reasons.append('indexed')
+        if column.name in _KEY_NAMES:
+            score += 1
+        if column.name.startswith(('updated', 'last_', 'deleted', 'expires', 'scheduled', 'next_')):
+            score -= 4              # changes after insert: rows would move between partitions
+        if best is None or score > best[0]:
+            best = (score, column.name, reasons)
+    if best is None or best[0] < 2:
+        return None, []
+    return best[1], best[2]
+
+
+def _covers(constraint_columns, key):
+    return key in constraint_columns
+
+
+def analyze(catalog, chains=None, sizes=None, overrides=None):
+    """Candidates ranked by score; ``overrides`` maps table -> {'interval', 'retention'}."""
+    chains = appqueries.scan() if chains is None else chains
+    sites = write_sites(catalog, chains)
+    referencing = {}
+    for child, fk in catalog.foreign_keys():
+        if fk.ref_table:
+            referencing.setdefault(catalog_mod.Catalog._key(fk.ref_table), []).append((child, fk))
+    out = []
+    for table in catalog.tables.values():
+        if table.partition_by or table.partition_of:
+            continue
+        cand = Candidate(table)
+        cand.key, cand.key_reasons = choose_key(table, chains)
+        if cand.key is None:
+            continue
+        writes = sites.get(table.name, {})
+        cand.inserts = writes.get('insert', [])
+        cand.updates = writes.get('update', [])
+        cand.deletes = writes.get('delete', [])
+        cand.size = rlscost.size_class(table.name, sizes)
+        log_like = cand.log_like = table.name.endswith(_APPEND_SUFFIXES)
+        ranges = _range_columns(chains, table.name)
+        reads = [c for c in chains if c.table == table.name and not c.writes]
+        cand.score = ({'large': 3, 'medium': 1, 'small': -3}[cand.size] + 3 * log_like
+                      + (3 if cand.append_only else 0) - min(len(cand.updates), 2)
+                      + (2 if ranges.get(cand.key) else -2 if reads else 0))
+        if reads and not ranges.get(cand.key):
+            cand.notes.append(f'none of the {len(reads)} app reads filter on {cand.key}: '
+                              f'they would probe every partition')
+        for child, fk in referencing.get(table.key, ()):
+            if child.key != table.key:
+                cand.blockers.append(f'{child.name}.{fk.name} references {table.name} '
+                                     f'({", ".join(fk.ref_columns or ("id",))})')
+        for constraint in table.constraints.values():
+            if constraint.kind in (catalog_mod.PRIMARY, catalog_mod.UNIQUE) \
+                    and not _covers(constraint.columns, cand.key):
+                cand.widened.append(constraint.name)
+                if constraint.kind == catalog_mod.UNIQUE:
+                    cand.score -= 2
+                    cand.notes.append(f'UNIQUE ({", ".join(constraint.columns)}) becomes unique per '
+                                      f'{cand.key}: enforce global uniqueness in the writer')
+        for index in table.indexes.values():
+            if index.unique and index.constraint is None and cand.key not in index.columns:
+                cand.notes.append(f'unique index {index.name} becomes unique per {cand.key}')
+        if cand.updates:
+            cand.notes.append(f'{len(cand.updates)} UPDATE site(s): filter on {cand.key} too, or '
+                              f'every partition is probed')
+        key_column = table.columns[cand.key]
+        if not key_column.not_null:
+            cand.notes.append(f'{cand.key} is nullable: NULLs are copied as now() and the column '
+                              f'becomes NOT NULL')
+        for rule, interval, retention in _POLICY:
+            if rule(table.name):
+                cand.interval, cand.retention = interval, retention
+                break
+        settings = (overrides or {}).get(table.name, {})
+        cand.interval = settings.get('interval', cand.interval)
+        cand.retention = settings.get('retention', cand.retention)
+        if cand.score >= _SCORE_THRESHOLD or table.name in (overrides or {}):
+            out.append(cand)
+    out.sort(key=lambda c: (-c.score, c.name))
+    return out
+
+
+# -- DDL ---------------------------------------------------------------------
+
+MAINTENANCE_SQL = '''\
+CREATE OR REPLACE FUNCTION public.maintain_time_partitions(
+    p_parent regclass,
+    p_interval text DEFAULT 'month',
+    p_premake integer DEFAULT 3,
+    p_retention interval DEFAULT NULL,
+    p_from timestamptz DEFAULT NULL
+)
+RETURNS SETOF text
+LANGUAGE plpgsql
+SET search_path = public, pg_catalog
+SET TimeZone = 'UTC'
+AS $$
+DECLARE
+    v_step interval := ('1 ' || p_interval)::interval;
+    v_start timestamptz := date_trunc(p_interval, COALESCE(p_from, now()));
+    v_stop timestamptz := date_trunc(p_interval, now()) + v_step * (p_premake + 1);
+    v_schema text;
+    v_table text;
+    v_name text;
+    v_child regclass;
+    v_upper timestamptz;
+BEGIN
+    IF p_interval NOT IN ('day', 'week', 'month') THEN
+        RAISE EXCEPTION 'maintain_time_partitions: unsupported interval %', p_interval;
+    END IF;
+    SELECT n.nspname, c.relname INTO v_schema, v_table
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = p_parent;
+
+    -- Pre-create partitions up to p_premake intervals ahead
+    WHILE v_start < v_stop LOOP
+        v_name := v_table || '_p' || to_char(v_start, CASE p_interval
+            WHEN 'day' THEN 'YYYYMMDD' WHEN 'week' THEN 'IYYY"w"IW' ELSE 'YYYYMM' END);
+        IF to_regclass(format('%I.%I', v_schema, v_name)) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                           v_schema, v_name, p_parent, v_start, v_start + v_step);
+            RETURN NEXT 'created ' || v_name;
+        END IF;
+        v_start := v_start + v_step;
+    END LOOP;
+
+    -- Retention: detach and drop partitions whose upper bound has expired
+    IF p_retention IS NOT NULL THEN
+        FOR v_child, v_upper IN
+            SELECT c.oid::regclass,
+                   (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamptz
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = p_parent
+            ORDER BY 2
+        LOOP
+            IF v_upper IS NOT NULL AND v_upper <= now() - p_retention THEN
+                EXECUTE format('ALTER TABLE %s DETACH PARTITION %s', p_parent, v_child);
+                EXECUTE format('DROP TABLE %s', v_child);
+                RETURN NEXT 'dropped ' || v_child::text;
+            END IF;
+        END LOOP;
+    END IF;
+END;
+$$;
+
+COMMENT ON FUNCTION public.maintain_time_partitions(regclass, text, integer, interval, timestamptz) IS
+    'Pre-creates time range partitions and drops the ones past retention (pgtools partition)';'''
+
+
+def _q(name):
+    return sql.quote_ident(name)
+
+
+def _suffix(name, suffix):
+    """Append ``suffix`` keeping the identifier within 63 bytes."""
+    return name[:63 - len(suffix)] + suffix
+
+
+def _call(cand, parent, premake=_PREMAKE, start=None):
+    retention = sql.quote_literal(cand.retention) if cand.retention else 'NULL'
+    args = [parent if parent.startswith("'") else sql.quote_literal(parent),
+            sql.quote_literal(cand.interval), str(premake), retention]
+    if start:
+        args.append(start)
+    return f'public.maintain_time_partitions({", ".join(args)})'
+
+
+def _create_table(cand, new_name):
+    table = cand.table
+    key = cand.key
+    lines = []
+    for column in table.columns.values():
+        if column.name == key and not column.not_null:
+            column = copy.copy(column)
+            column.not_null = True
+        lines.append(column.sql())
+    for constraint in table.constraints.values():
+        if constraint.kind in (catalog_mod.PRIMARY, catalog_mod.UNIQUE):
+            widened = copy.copy(constraint)
+            if key not in widened.columns:
+                widened.columns = widened.columns + (key,)
+            name = _suffix(constraint.name, '_p')
+        else:
+            widened = constraint
+            name = constraint.name
+        lines.append(f'CONSTRAINT {_q(name)} {widened.definition()}')
+    body = ',\n    '.join(lines)
+    return (f'CREATE TABLE {sql.qualified(table.schema, new_name)} (\n    {body}\n)'
+            f' PARTITION BY RANGE ({_q(key)});')
+
+
+def _create_indexes(cand, new_name):
+    out = []
+    for index in cand.table.indexes.values():
+        if index.constraint is not None:
+            continue
+        keys = list(index.keys)
+        if index.unique and cand.key not in index.columns:
+            keys.append(_q(cand.key))
+        out.append(f'CREATE {"UNIQUE " if index.unique else ""}INDEX {_q(_suffix(index.name, "_p"))} '
+                   f'ON {sql.qualified(cand.table.schema, new_name)}'
+                   f'{" USING " + index.method if index.method != "btree" else ""} ({", ".join(keys)})'
+                   + (f' INCLUDE ({", ".join(_q(c) for c in index.include)})' if index.include else '')
+                   + (f' WHERE {index.where}' if index.where else '') + ';')
+    return out
+
+
+def _columns(cand):
+    return [c.name for c in cand.table.columns.values() if not c.generated]
+
+
+def _select_list(cand, prefix=''):
+    out = []
+    for name in _columns(cand):
+        ref = f'{prefix}{_q(name)}'
+        out.append(f'COALESCE({ref}, now())' if name == cand.key
+                   and not cand.table.columns[name].not_null else ref)
+    return ', '.join(out)
+
+
+def _mirror(cand, new_name, tombstones):
+    schema, name = cand.table.schema, cand.table.name
+    fn = sql.qualified(schema, _suffix(name, '_partition_sync'))
+    target = sql.qualified(schema, new_name)
+    cols = ', '.join(_q(c) for c in _columns(cand))
+    return [
+        f'CREATE TABLE {sql.qualified(schema, tombstones)} (id uuid PRIMARY KEY);',
+        '',
+        f'CREATE OR REPLACE FUNCTION {fn}()',
+        'RETURNS trigger',
+        'LANGUAGE plpgsql',
+        'AS $$',
+        'BEGIN',
+        "    IF TG_OP IN ('UPDATE', 'DELETE') THEN",
+        f'        DELETE FROM {target} WHERE id = OLD.id;',
+        f'        INSERT INTO {sql.qualified(schema, tombstones)} (id) VALUES (OLD.id) ON CONFLICT DO NOTHING;',
+        '    END IF;',
+        "    IF TG_OP IN ('INSERT', 'UPDATE') THEN",
+        f'        INSERT INTO {target} ({cols})',
+        f'        VALUES ({_select_list(cand, "NEW.")})',
+        '        ON CONFLICT DO NOTHING;',
+        '    END IF;',
+        '    RETURN NULL;',
+        'END;',
+        '$$;',
+        '',
+        f'CREATE TRIGGER {_q(_suffix(name, "_partition_sync"))}',
+        f'    AFTER INSERT OR UPDATE OR DELETE ON {sql.qualified(schema, name)}',
+        f'    FOR EACH ROW EXECUTE FUNCTION {fn}();',
+    ]
+
+
+def _backfill(cand, new_name):
+    schema, name = cand.table.schema, cand.table.name
+    source = sql.qualified(schema, name)
+    target = sql.qualified(schema, new_name)
+    key = _q(cand.key)
+    cols = ', '.join(_q(c) for c in _columns(cand))
+    step = _BACKFILL_STEP[cand.interval]
+    return [
+        '-- Runs outside a transaction block: each window commits on its own.',
+        'DO $$',
+        'DECLARE',
+        '    v_lo timestamptz;',
+        '    v_hi timestamptz;',
+        '    v_rows bigint;',
+        'BEGIN',
+        f'    SELECT min({key}), max({key}) INTO v_lo, v_hi FROM {source};',
+        '    WHILE v_lo <= v_hi LOOP',
+        f'        INSERT INTO {target} ({cols})',
+        f'        SELECT {_select_list(cand)} FROM {source}',
+        f"        WHERE {key} >= v_lo AND {key} < v_lo + interval '{step}'",
+        '        ON CONFLICT DO NOTHING;',
+        '        GET DIAGNOSTICS v_rows = ROW_COUNT;',
+        f"        RAISE NOTICE '{name}: % rows from %', v_rows, v_lo;",
+        '        COMMIT;',
+        f"        v_lo := v_lo + interval '{step}';",
+        '    END LOOP;',
+        f'    INSERT INTO {target} ({cols})',
+        f'    SELECT {_select_list(cand)} FROM {source} WHERE {key} IS NULL',
+        '    ON CONFLICT DO NOTHING;',
+        'END;',
+        '$$;',
+    ]
+
+
+def _swap(cand, catalog, new_name, tombstones):
+    table = cand.table
+    schema, name = table.schema, table.name
+    old_name = _suffix(name, '_unpartitioned')
+    old = sql.qualified(schema, name)
+    new = sql.qualified(schema, new_name)
+    key = _q(cand.key)
+    out = ['BEGIN;', '', f'LOCK TABLE {old} IN ACCESS EXCLUSIVE MODE;', '',
+           '-- Rows the backfill copied after they were deleted or moved in the source',
+           f'DELETE FROM {new} n USING {sql.qualified(schema, tombstones)} t',
+           f'WHERE n.id = t.id AND NOT EXISTS (',
+           f'    SELECT 1 FROM {old} o WHERE o.id = n.id AND (o.{key} = n.{key} OR o.{key} IS NULL));',
+           '',
+           'DO $$',
+           'DECLARE',
+           '    v_old bigint;',
+           '    v_new bigint;',
+           'BEGIN',
+           f'    SELECT count(*) INTO v_old FROM {old};',
+           f'    SELECT count(*) INTO v_new FROM {new};',
+           '    IF v_old <> v_new THEN',
+           f"        RAISE EXCEPTION '{name}: % rows in the source, % in the partitioned copy', v_old, v_new;",
+           '    END IF;',
+           'END;',
+           '$$;',
+           '',
+           f'DROP TRIGGER {_q(_suffix(name, "_partition_sync"))} ON {old};',
+           f'DROP FUNCTION {sql.qualified(schema, _suffix(name, "_partition_sync"))}();',
+           f'DROP TABLE {sql.qualified(schema, tombstones)};',
+           '']
+    # move the names over: old objects get _unpartitioned, the copies lose _p
+    out.append(f'ALTER TABLE {old} RENAME TO {_q(old_name)};')
+    for constraint in table.constraints.values():
+        if constraint.kind in (catalog_mod.PRIMARY, catalog_mod.UNIQUE):
+            out.append(f'ALTER TABLE {sql.qualified(schema, old_name)} RENAME CONSTRAINT {_q(constraint.name)} '
+                       f'TO {_q(_suffix(constraint.name, "_unpartitioned"))};')
+    for index in table.indexes.values():
+        if index.constraint is None:
+            out.append(f'ALTER INDEX {sql.qualified(schema, index.name)} '
+                       f'RENAME TO {_q(_suffix(index.name, "_unpartitioned"))};')
+    out.append(f'ALTER TABLE {new} RENAME TO {_q(name)};')
+    for constraint in table.constraints.values():
+        if constraint.kind in (catalog_mod.PRIMARY, catalog_mod.UNIQUE):
+            out.append(f'ALTER TABLE {old} RENAME CONSTRAINT {_q(_suffix(constraint.name, "_p"))} '
+                       f'TO {_q(constraint.name)};')
+    for index in table.indexes.values():
+        if index.constraint is None:
+            out.append(f'ALTER INDEX {sql.qualified(schema, _suffix(index.name, "_p"))} '
+                       f'RENAME TO {_q(index.name)};')
+    for column in table.columns.values():
+        match = re.search(r"nextval\('([^']+)'", column.default or '')
+        if match:
+            out.append(f'ALTER SEQUENCE {match.group(1)} OWNED BY {old}.{_q(column.name)};')
+
+    if table.rls_enabled or table.rls_forced or table.policies:
+        out.append('')
+        if table.rls_enabled:
+            out.append(f'ALTER TABLE {old} ENABLE ROW LEVEL SECURITY;')
+        if table.rls_forced:
+            out.append(f'ALTER TABLE {old} FORCE ROW LEVEL SECURITY;')
+        for policy in table.policies.values():
+            out.append(policy.create_sql())
+    if table.triggers:
+        out.append('')
+        for trigger in table.triggers.values():
+            out.append(trigger.sql() + ';')
+    views = [v for v in catalog.views.values() if re.search(rf'\b{re.escape(name)}\b', v.query or '')]
+    if views:
+        out += ['', '-- Views are bound to the table they were created on: re-point them']
+        for view in views:
+            if view.materialized:
+                out.append(f'-- materialized view {view.name} still reads {old_name}: recreate it by hand')
+            else:
+                out.append(squash.view_sql(view))
+    out += ['', 'COMMIT;']
+    return out
+
+
+def render(catalog, candidates):
+    out = [policy_mod.header(
+        'TIME PARTITIONING (generated by pgtools partition)',
+        [f'{len(candidates)} tables: {", ".join(c.name for c in candidates)}.',
+         'Run with psql -v ON_ERROR_STOP=1 -f: the backfill commits per window and',
+         'cannot run inside a transaction block. Each table is copied online: a',
+         'trigger mirrors writes while the backfill runs, then a short swap',
+         'transaction checks row counts and renames. The old table stays behind',
+         'as <table>_unpartitioned until you drop it.'],
+    ).rstrip('\n'), '', '-- Shared maintenance function', '', MAINTENANCE_SQL]
+    for cand in candidates:
+        name = cand.name
+        new_name = _suffix(name, '_partitioned')
+        tombstones = _suffix(name, '_partition_tombstones')
+        parent = f'{cand.table.schema}.{new_name}'
+        retention = cand.retention or 'kept forever'
+        out += ['', policy_mod.RULE,
+                f'-- {name}: RANGE ({cand.key}), one partition per {cand.interval}, retention {retention}',
+                f'-- defined at {cand.table.source}',
+                policy_mod.RULE]
+        for note in cand.notes:
+            out.append(f'-- note: {note}')
+        out += ['', '-- 1. Partitioned copy, first partitions and the write mirror', '', 'BEGIN;', '',
+                _create_table(cand, new_name), '']
+        out += _create_indexes(cand, new_name)
+        start = f'(SELECT min({_q(cand.key)})::timestamptz FROM {sql.qualified(cand.table.schema, name)})'
+        out += ['', f'SELECT {_call(cand, parent, start=start)};', '']
+        out += _mirror(cand, new_name, tombstones)
+        out += ['', 'COMMIT;', '', '-- 2. Backfill', '']
+        out += _backfill(cand, new_name)
+        out += ['', '-- 3. Swap', '']
+        out += _swap(cand, catalog, new_name, tombstones)
+        out += ['', '-- 4. Maintenance', '',
+                "DO $$",
+                'BEGIN',
+                "    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN",
+                f"        PERFORM cron.schedule('partitions-{name}', '15 3 * * *',",
+                f"            $cmd$SELECT {_call(cand, f'{cand.table.schema}.{name}')}$cmd$);",
+                '    ELSE',
+                f"        RAISE NOTICE 'pg_cron not installed: schedule SELECT "
+                f"{_call(cand, f'{cand.table.schema}.{name}').replace(chr(39), chr(39) * 2)} daily';",
+                '    END IF;',
+                'END;',
+                '$$;',
+                '',
+                f'-- After verifying: DROP TABLE {sql.qualified(cand.table.schema, _suffix(name, "_unpartitioned"))};']
+    out.append(policy_mod.footer(f'COMPLETED: {len(candidates)} tables partitioned').rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+def report(candidates, verbose=False):
+    ready = [c for c in candidates if c.ready]
+    lines = [f'📊 {len(candidates)} partitioning candidates, {len(ready)} ready '
+             f'(append-heavy, time-filtered, no incoming foreign keys, no UNIQUE to widen)', '',
+             f'   {"table":<36} {"score":>5}  {"key":<20} {"per":<6} {"retention":<10} '
+             f'{"ins":>4} {"upd":>4} {"del":>4}  status']
+    for cand in candidates:
+        status = ('ready' if cand.ready else f'blocked ({len(cand.blockers)} FK)' if cand.blockers
+                  else 'review: UNIQUE' if cand.unique_widened else 'review')
+        lines.append(f'   {cand.name:<36} {cand.score:>5}  {cand.key:<20} {cand.interval:<6} '
+                     f'{cand.retention or "keep":<10} {len(cand.inserts):>4} {len(cand.updates):>4} '
+                     f'{len(cand.deletes):>4}  {status}')
+        if verbose:
+            lines.append(f'      key: {"; ".join(cand.key_reasons)}')
+            for blocker in cand.blockers:
+                lines.append(f'      ❌ {blocker}')
+            for note in cand.notes:
+                lines.append(f'      ⚠ {note}')
+    lines += ['', 'score: size class + log-like name + append-only writes + reads filtering on the key',
+              '       - UPDATE sites - UNIQUE constraints to widen;',
+              'ins/upd/del: write sites in the app and in SQL functions. -v shows blockers and notes.']
+    return '\n'.join(lines)
+
+
+def _pairs(items, what):
+    out = {}
+    for item in items or ():
+        table, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f'expected TABLE={what.upper()}, got {item!r}')
+        out[table] = value
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools partition',
+        description='Rank time-partitioning candidates and generate an online migration to RANGE partitions.')
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='schema SQL files/globs in run order (default: production_schema.sql, '
+                             'database/*.sql, supabase/migrations/*.sql)')
+    parser.add_argument('--code', action='append', metavar='GLOB',
+                        help=f'app sources to scan for writes (default: {", ".join(appqueries.DEFAULT_PATHS)})')
+    parser.add_argument('--sizes', help='JSON map of table -> row count or size class')
+    parser.add_argument('--table', action='append', help='generate DDL for this table (default: every ready one)')
+    parser.add_argument('--interval', action='append', metavar='TABLE=day|week|month',
+                        help='partition interval for a table')
+    parser.add_argument('--retention', action='append', metavar="TABLE='N months'",
+                        help="retention for a table ('none' keeps every partition)")
+    parser.add_argument('-o', '--output', help='write the partitioning script here')
+    parser.add_argument('--json', action='store_true', help='print the candidates as JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show key reasons, blockers and notes')
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = catalog_mod.load(args.inputs)
+        sizes = rlscost.load_sizes(args.sizes) if args.sizes else None
+        overrides = {}
+        for table, value in _pairs(args.interval, 'interval').items():
+            if value not in INTERVALS:
+                raise ValueError(f'interval for {table} must be one of {", ".join(INTERVALS)}')
+            overrides.setdefault(table, {})['interval'] = value
+        for table, value in _pairs(args.retention, 'retention').items():
+            overrides.setdefault(table, {})['retention'] = None if value.lower() == 'none' else value
+        for table in args.table or ():
+            if catalog.table(table) is None:
+                raise ValueError(f'unknown table {table}')
+            overrides.setdefault(table, {})
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    candidates = analyze(catalog, appqueries.scan(args.code), sizes, overrides)
+    if args.json:
+        json.dump([c.to_dict() for c in candidates], sys.stdout, indent=2)
+        print()
+    else:
+        print(report(candidates, args.verbose))
+
+    if args.output:
+        chosen = [c for c in candidates if c.name in args.table] if args.table else \
+            [c for c in candidates if c.ready]
+        for cand in chosen:
+            if cand.blockers:
+                print(f'⚠ {cand.name}: {len(cand.blockers)} incoming foreign key(s) must be dropped first',
+                      file=sys.stderr)
+        with open(args.output, 'w') as f:
+            f.write(render(catalog, chosen))
+        print(f'✓ Generated {args.output} ({len(chosen)} tables)', file=sys.stderr)
+    return 0
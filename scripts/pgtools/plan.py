@@ -0,0 +1,650 @@
+"""
+Dependency-graph migration planner.
+
+database/MIGRATION_ORDER.md and database/master_migration.sql spell out the
+run order by hand, and they cover a handful of the files in database/. This
+command works the order out from the SQL instead. Each migration file is
+parsed for what it creates:
+
+    table:<name>            CREATE TABLE / VIEW, ALTER TABLE ... RENAME TO
+    column:<table>.<col>    column definitions, ADD COLUMN, RENAME COLUMN ... TO
+    function:<name>         CREATE FUNCTION / PROCEDURE
+    type:<name>             CREATE TYPE / DOMAIN
+    trigger: policy: index: (only used to keep two files that create the same
+                             object out of one wave)
+
+and for what it needs: the tables it alters, indexes, references, selects
+from or inserts into; indexed, altered and referenced columns; trigger
+functions; functions called from policies, views, SQL-language functions and
+DO blocks; and types used anywhere. PL/pgSQL function bodies are bound late,
+so their references are not dependencies. DDL inside DO blocks (including
+EXECUTE 'literal') counts as created.
+
+A file depends on the first file (in input order) that creates something it
+needs and does not create itself. Files in a dependency cycle are reported
+and run as one serial unit. The DAG is layered into waves: every file in a
+wave depends only on earlier waves, and no two files in a wave create the
+same object, so a wave can run concurrently. Needs that nothing creates are
+reported as missing producers; auth/storage/extensions objects and pg_*
+catalogs count as provided by the platform.
+
+The baseline schema (production_schema.sql unless --baseline/--no-baseline)
+is loaded before the first wave, as docs/SYNC_PRODUCTION_TO_DEV.md does for a
+new environment; whatever it creates needs no producer. The core tables
+(events, orders, organizers, ...) are only created there.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools plan
+    PYTHONPATH=scripts python3 -m pgtools plan --format markdown -o database/MIGRATION_ORDER.md
+    PYTHONPATH=scripts python3 -m pgtools plan --format psql -o bootstrap.sql
+    PYTHONPATH=scripts python3 -m pgtools plan --no-baseline --strict
+    PYTHONPATH=scripts python3 -m pgtools plan --dsn "$DATABASE_URL" --shim -j 8
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import index as index_mod
+from . import policies as policy_mod
+from . import sql
+
+DEFAULT_INPUTS = ['database/*.sql', 'supabase/migrations/*.sql']
+DEFAULT_BASELINE = ['production_schema.sql']
+
+# Statement starts whose dependencies do not matter for ordering
+_IGNORE = index_mod._SKIP | frozenset(('DROP', 'TRUNCATE', 'REINDEX', 'CLUSTER', 'LISTEN'))
+_BLOCK_WORDS = ('BEGIN', 'THEN', 'ELSE', 'LOOP')
+_NOT_COLUMN = ('CONSTRAINT', 'PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK', 'EXCLUDE', 'TO')
+
+# information_schema views, which pgtools.index folds into the public schema
+_INFORMATION_SCHEMA = frozenset((
+    'tables', 'columns', 'views', 'triggers', 'routines', 'schemata', 'parameters', 'sequences',
+    'table_constraints', 'key_column_usage', 'constraint_column_usage', 'referential_constraints',
+    'check_constraints', 'role_table_grants', 'table_privileges', 'enabled_roles'))
+
+# Created objects two concurrent files must not both create; columns are
+# serialized by the table lock instead
+_CONFLICTS = ('table', 'function', 'type', 'trigger', 'policy', 'index')
+
+
+def is_external(obj):
+    """Objects the platform provides: Supabase schemas and the system catalogs."""
+    kind, _, name = obj.partition(':')
+    if kind == 'column':
+        name = name.rsplit('.', 1)[0]
+    return (name.startswith('pg_') or name.split('.')[0] in index_mod._KEEP_SCHEMAS
+            or (kind in ('table', 'column') and name in _INFORMATION_SCHEMA))
+
+
+class Migration:
+    __slots__ = ('path', 'order', 'provides', 'requires')
+
+    def __init__(self, path, order):
+        self.path = path
+        self.order = order
+        self.provides = {}      # object -> first line
+        self.requires = {}      # object -> (first line, hard)
+
+    def provide(self, obj, line):
+        self.provides.setdefault(obj, line)
+
+    def require(self, obj, line, hard):
+        old = self.requires.get(obj)
+        if old is None:
+            self.requires[obj] = (line, hard)
+        elif hard and not old[1]:
+            self.requires[obj] = (old[0], True)
+
+    def __repr__(self):
+        return f'Migration({self.path!r})'
+
+
+# ---------------------------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------------------------
+
+def _qualified(tokens, i):
+    (schema, name), j = sql.parse_qualified_name(tokens, i)
+    return index_mod._qname(schema, name), j
+
+
+def _need_refs(m, keys, line, hard, tables=True):
+    """t:/c:/fn:/w: reference keys from pgtools.index turned into requirements."""
+    for key in keys:
+        kind, _, name = key.partition(':')
+        if kind == 't' and tables:
+            m.require('table:' + name, line, hard)
+        elif kind == 'c':
+            m.require('column:' + name, line, False)
+        elif kind == 'fn':
+            m.require('function:' + name, line, False)
+        elif kind == 'w':
+            m.require('type:' + name, line, False)
+
+
+def _index_columns(tokens, j, table):
+    """Plain column keys and INCLUDE columns of CREATE INDEX ... ON table <j>."""
+    if j < len(tokens) and tokens[j].is_kw('USING'):
+        j += 2
+    columns = []
+    while j < len(tokens) and tokens[j].is_op('('):
+        close = sql.matching_paren(tokens, j)
+        for start, end in sql.split_commas(tokens, j + 1, close):
+            if start < end and sql.is_name(tokens[start]) and not (
+                    start + 1 < end and tokens[start + 1].is_op('(', '.', '::')):
+                columns.append(f'column:{table}.{sql.ident_value(tokens[start])}')
+        j = close + 1
+        if j < len(tokens) and tokens[j].is_kw('INCLUDE'):
+            j += 1
+        else:
+            break
+    return columns
+
+
+def _alter_table(m, tokens, j, table, line, hard):
+    n = len(tokens)
+    for k in range(j, n - 1):
+        tok = tokens[k]
+        if k > j and not tokens[k - 1].is_op(','):
+            continue   # actions start the statement tail or follow a comma
+        if tok.is_kw('ADD'):
+            c = index_mod._skip_words(tokens, k + 1, 'COLUMN', 'IF', 'NOT', 'EXISTS')
+            if c < n and sql.is_name(tokens[c]) and not tokens[c].is_kw(*_NOT_COLUMN):
+                m.provide(f'column:{table}.{sql.ident_value(tokens[c])}', line)
+        elif tok.is_kw('ALTER'):
+            c = index_mod._skip_words(tokens, k + 1, 'COLUMN')
+            if c < n and sql.is_name(tokens[c]) and not tokens[c].is_kw('CONSTRAINT'):
+                m.require(f'column:{table}.{sql.ident_value(tokens[c])}', line, hard)
+        elif tok.is_kw('RENAME'):
+            if tokens[k + 1].is_kw('TO'):
+                name, _ = _qualified(tokens, k + 2)
+                m.provide('table:' + name, line)
+                continue
+            if tokens[k + 1].is_kw('CONSTRAINT'):
+                continue
+            c = index_mod._skip_words(tokens, k + 1, 'COLUMN')
+            to = sql.find_keywords(tokens, 'TO', start=c)
+            if to != -1 and to + 1 < n:
+                m.require(f'column:{table}.{sql.ident_value(tokens[c])}', line, hard)
+                m.provide(f'column:{table}.{sql.ident_value(tokens[to + 1])}', line)
+
+
+def _language(tokens):
+    k = sql.find_keywords(tokens, 'LANGUAGE')
+    return sql.ident_value(tokens[k + 1]).lower() if k != -1 and k + 1 < len(tokens) else ''
+
+
+def scan_statement(m, tokens, line, hard=True):
+    """Record what one statement creates and needs on Migration ``m``."""
+    first = tokens[0].upper
+    if first in _IGNORE:
+        return
+    if first == 'DO':
+        for tok in tokens[1:]:
+            if tok.kind == sql.DOLLAR:
+                _scan_block(m, sql.dollar_body(tok), line)
+        return
+    if first == 'CREATE':
+        i = index_mod._skip_words(tokens, 1, 'OR', 'REPLACE')
+        if i < len(tokens) and tokens[i].is_kw('TYPE', 'DOMAIN'):
+            name, j = _qualified(tokens, i + 1)
+            m.provide('type:' + name, line)
+            _need_refs(m, index_mod.references(tokens[j:], set()), line, False, tables=False)
+            return
+    try:
+        kind, name, table, extra, scan, *rest = index_mod.classify(tokens)
+    except (sql.SQLSyntaxError, IndexError):
+        return
+
+    if kind == 'table':
+        m.provide('table:' + name, line)
+        for key in extra:
+            if key.startswith('c:'):
+                m.provide('column:' + key[2:], line)
+        keys = index_mod.references(scan, set())
+        for key in keys:
+            if key.startswith('t:') and key[2:] != name:
+                m.require('table:' + key[2:], line, hard)
+            elif key.startswith('c:') and not key.startswith(f'c:{name}.'):
+                m.require('column:' + key[2:], line, hard)
+        _need_refs(m, {k for k in keys if k[:2] in ('fn', 'w:')}, line, False)
+    elif kind == 'function':
+        m.provide('function:' + name, line)
+        dollar = next((k for k, t in enumerate(tokens) if t.kind == sql.DOLLAR), len(tokens))
+        _need_refs(m, {k for k in index_mod.references(tokens[:dollar], set()) if k.startswith('w:')}, line, False)
+        if _language(tokens) == 'sql':
+            _need_refs(m, index_mod.references(scan, set()), line, hard)
+    elif kind == 'trigger':
+        m.provide('trigger:' + name, line)
+        m.require('table:' + table, line, hard)
+        if rest and rest[0]:
+            m.require('function:' + rest[0], line, hard)
+        _need_refs(m, {k for k in extra if k.startswith('c:')}, line, False)
+    elif kind in ('policy', 'view'):
+        m.provide(('policy:' if kind == 'policy' else 'table:') + name, line)
+        if table:
+            m.require('table:' + table, line, hard)
+        _need_refs(m, index_mod.references(scan, set()), line, hard)
+    elif kind == 'index':
+        m.provide('index:' + name, line)
+        m.require('table:' + table, line, hard)
+        on = sql.find_keywords(tokens, 'ON')
+        _, j = _qualified(tokens, index_mod._skip_words(tokens, on + 1, 'ONLY'))
+        for column in _index_columns(tokens, j, table):
+            m.require(column, line, hard)
+    elif kind == 'alter table':
+        m.require('table:' + table, line, hard)
+        _, j = _qualified(tokens, index_mod._skip_words(tokens, 2, 'IF', 'EXISTS', 'ONLY'))
+        _alter_table(m, tokens, j, table, line, hard)
+        keys = index_mod.references(tokens[j:], set())
+        for key in keys:
+            if key.startswith('t:') and key[2:] != table:
+                m.require('table:' + key[2:], line, hard)
+            elif key.startswith('c:') and not key.startswith(f'c:{table}.'):
+                m.require('column:' + key[2:], line, hard)
+    elif kind in ('insert', 'update', 'delete', 'select', 'with', 'comment', 'alter'):
+        _need_refs(m, index_mod.references(scan, set()), line, hard)
+
+
+def _scan_block(m, body, line):
+    """DDL inside a PL/pgSQL block, plus the block's references as soft needs."""
+    for stmt in sql.split_statements(body):
+        tokens = stmt.tokens
+        for k, tok in enumerate(tokens):
+            if k and not tokens[k - 1].is_kw(*_BLOCK_WORDS):
+                continue
+            if tok.is_kw('CREATE', 'ALTER'):
+                scan_statement(m, tokens[k:], line, hard=False)
+                break
+            if tok.is_kw('EXECUTE') and len(tokens) == k + 2 and tokens[k + 1].kind == sql.STRING:
+                _scan_block(m, sql.string_value(tokens[k + 1]), line)
+                break
+        else:
+            _need_refs(m, index_mod.references(tokens, set()), line, False)
+
+
+def extract(path, order=0):
+    m = Migration(path, order)
+    with open(path) as f:
+        text = f.read()
+    lines = index_mod._line_starts(text)
+    for stmt in sql.split_statements(text):
+        try:
+            scan_statement(m, stmt.tokens, bisect.bisect_right(lines, stmt.start))
+        except (sql.SQLSyntaxError, IndexError, KeyError, ValueError):
+            continue
+    return m
+
+
+# ---------------------------------------------------------------------------
+# Graph
+# ---------------------------------------------------------------------------
+
+class Plan:
+    """Dependency edges, cycles, missing producers and waves for a set of migrations."""
+
+    def __init__(self, migrations, baseline=()):
+        self.migrations = migrations
+        self.baseline = baseline
+        self.edges = {m.path: {} for m in migrations}      # path -> {dependency path: [(object, line)]}
+        self.missing = []                                   # (migration, object, line)
+        self.producers = {}
+        self.cycles = []
+        self.waves = []
+        self._link()
+        self._layer()
+
+    def _link(self):
+        provided = set()
+        for b in self.baseline:
+            provided.update(b.provides)
+        for m in self.migrations:
+            for obj in m.provides:
+                self.producers.setdefault(obj, []).append(m)
+        tables = {obj for obj in self.producers if obj.startswith('table:')} | \
+            {obj for obj in provided if obj.startswith('table:')}
+        for m in self.migrations:
+            for obj, (line, hard) in sorted(m.requires.items()):
+                if obj in m.provides or obj in provided:
+                    continue
+                producers = self.producers.get(obj)
+                if producers:
+                    self.edges[m.path].setdefault(producers[0].path, []).append((obj, line))
+                elif hard and not is_external(obj):
+                    if obj.startswith('column:') and 'table:' + obj[7:].rsplit('.', 1)[0] not in tables:
+                        continue   # the table itself is what is missing, or external
+                    self.missing.append((m, obj, line))
+
+    def _components(self):
+        """Tarjan's strongly connected components, in dependency order."""
+        order = {m.path: m.order for m in self.migrations}
+        index, low, stack, on_stack, out = {}, {}, [], set(), []
+        counter = [0]
+
+        def visit(v):
+            # iterative DFS: (node, iterator over its dependencies)
+            work = [(v, iter(sorted(self.edges[v], key=order.get)))]
+            index[v] = low[v] = counter[0]
+            counter[0] += 1
+            stack.append(v)
+            on_stack.add(v)
+            while work:
+                node, deps = work[-1]
+                for dep in deps:
+                    if dep not in index:
+                        index[dep] = low[dep] = counter[0]
+                        counter[0] += 1
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(sorted(self.edges[dep], key=order.get))))
+                        break
+                    if dep in on_stack:
+                        low[node] = min(low[node], index[dep])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            w = stack.pop()
+                            on_stack.discard(w)
+                            component.append(w)
+                            if w == node:
+                                break
+                        out.append(sorted(component, key=order.get))
+
+        for m in self.migrations:
+            if m.path not in index:
+                visit(m.path)
+        return out
+
+    def _layer(self):
+        by_path = {m.path: m for m in self.migrations}
+        components = self._components()
+        unit_of = {}
+        for n, component in enumerate(components):
+            for path in component:
+                unit_of[path] = n
+            if len(component) > 1:
+                self.cycles.append(component)
+        wave_of = {}
+        created = []    # per wave: objects created by the files placed in it
+        for n, component in enumerate(components):   # dependencies come first
+            deps = {unit_of[d] for path in component for d in self.edges[path]} - {n}
+            wave = max((wave_of[d] for d in deps), default=-1) + 1
+            objects = {obj for path in component for obj in by_path[path].provides
+                       if obj.split(':')[0] in _CONFLICTS}
+            while wave < len(created) and created[wave] & objects:
+                wave += 1
+            if wave == len(created):
+                created.append(set())
+                self.waves.append([])
+            created[wave] |= objects
+            wave_of[n] = wave
+            self.waves[wave].append([by_path[path] for path in component])
+        for wave in self.waves:
+            wave.sort(key=lambda unit: unit[0].order)
+
+    def redefined(self):
+        """Conflicting objects created by more than one file, most contested first."""
+        out = [(obj, ms) for obj, ms in self.producers.items()
+               if len(ms) > 1 and obj.split(':')[0] in _CONFLICTS]
+        return sorted(out, key=lambda item: (-len(item[1]), item[0]))
+
+    def cycle_edges(self, component):
+        members = set(component)
+        return [(path, dep, reasons[0]) for path in component
+                for dep, reasons in self.edges[path].items() if dep in members]
+
+    def to_dict(self):
+        return {
+            'waves': [[[m.path for m in unit] for unit in wave] for wave in self.waves],
+            'edges': {path: {dep: [list(r) for r in reasons] for dep, reasons in deps.items()}
+                      for path, deps in self.edges.items() if deps},
+            'cycles': [{'files': component,
+                        'edges': [{'file': a, 'needs': b, 'object': obj, 'line': line}
+                                  for a, b, (obj, line) in self.cycle_edges(component)]}
+                       for component in self.cycles],
+            'missing': [{'file': m.path, 'line': line, 'object': obj} for m, obj, line in self.missing],
+        }
+
+
+def build(inputs=None, baseline=()):
+    paths = index_mod.expand_inputs(inputs or DEFAULT_INPUTS)
+    if not paths:
+        raise ValueError(f'no SQL files match {" ".join(inputs or DEFAULT_INPUTS)}')
+    base = [extract(path) for path in index_mod.expand_inputs(baseline)]
+    base_paths = {b.path for b in base}
+    migrations = [extract(path, n) for n, path in enumerate(p for p in paths if p not in base_paths)]
+    return Plan(migrations, base)
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def _unit_label(unit):
+    return unit[0].path if len(unit) == 1 else ' -> '.join(m.path for m in unit) + '  (cycle, serial)'
+
+
+def report(plan, verbose=False):
+    files = len(plan.migrations)
+    edges = sum(len(deps) for deps in plan.edges.values())
+    widest = max((len(wave) for wave in plan.waves), default=0)
+    lines = [f'📊 {files} migrations, {edges} dependencies, {len(plan.waves)} waves '
+             f'(widest {widest}), {len(plan.cycles)} cycles, {len(plan.missing)} missing producers']
+    if plan.baseline:
+        lines.append(f'   baseline: {", ".join(b.path for b in plan.baseline)}')
+    if plan.cycles:
+        lines += ['', '❌ Dependency cycles (each runs as one serial unit):']
+        for component in plan.cycles:
+            lines.append('   ' + ' <-> '.join(component))
+            for a, b, (obj, line) in plan.cycle_edges(component):
+                lines.append(f'      {a}:{line} needs {obj} from {b}')
+    if plan.missing:
+        lines += ['', '❌ Missing producers (needed, but no migration creates them):']
+        for m, obj, line in plan.missing:
+            lines.append(f'   {m.path}:{line}  {obj}')
+    redefined = plan.redefined()
+    if redefined:
+        lines += ['', f'⚠ {len(redefined)} objects are created by more than one file; '
+                      'the last wave that creates one wins:']
+        for obj, ms in redefined[:None if verbose else 10]:
+            lines.append(f'   {obj:<50} {len(ms)} files')
+        if not verbose and len(redefined) > 10:
+            lines.append(f'   ... {len(redefined) - 10} more (--verbose)')
+    lines += ['', '📋 Waves (files in a wave are independent of each other):']
+    for n, wave in enumerate(plan.waves, 1):
+        lines.append(f'   wave {n}:')
+        for unit in wave:
+            deps = sorted({d for m in unit for d in plan.edges[m.path]} - {m.path for m in unit})
+            lines.append(f'      {_unit_label(unit)}' + (f'   <- {", ".join(deps)}' if deps and verbose else ''))
+    return '\n'.join(lines)
+
+
+def render_markdown(plan):
+    out = ['# Database Migration Order', '',
+           'Generated by `PYTHONPATH=scripts python3 -m pgtools plan --format markdown` from what each file',
+           'creates and references. Do not edit by hand; re-run the planner after adding a migration.', '',
+           'Files within a wave do not depend on each other and can run in any order or concurrently.',
+           'Run every wave before starting the next.', '']
+    if plan.baseline:
+        out += [f'Run first: {", ".join(f"`{b.path}`" for b in plan.baseline)}', '']
+    step = 0
+    for n, wave in enumerate(plan.waves, 1):
+        out += [f'## Wave {n}', '']
+        for unit in wave:
+            for m in unit:
+                step += 1
+                deps = sorted({d for d in plan.edges[m.path]})
+                note = f' (after {", ".join(f"`{os.path.basename(d)}`" for d in deps)})' if deps else ''
+                cyc = ' (dependency cycle: run these in this order)' if len(unit) > 1 and m is unit[0] else ''
+                out.append(f'{step}. **`{m.path}`**{note}{cyc}')
+        out.append('')
+    if plan.cycles or plan.missing:
+        out += ['## Problems', '']
+        for component in plan.cycles:
+            out.append(f'- Cycle: {" <-> ".join(f"`{p}`" for p in component)}')
+        for m, obj, line in plan.missing:
+            out.append(f'- `{m.path}:{line}` needs `{obj}`, which no migration creates')
+        out.append('')
+    return '\n'.join(out)
+
+
+def render_psql(plan, output_dir='.'):
+    out = [policy_mod.header(
+        'MIGRATION PLAN (generated by pgtools plan)',
+        [f'{len(plan.migrations)} migrations in {len(plan.waves)} waves, in dependency order.',
+         'Run with psql -f; \\ir paths are relative to this file. Each wave can also run',
+         'concurrently with pgtools plan --dsn.'],
+    ).rstrip('\n'), '', '\\set ON_ERROR_STOP on']
+    for b in plan.baseline:
+        out.append(f'\\ir {os.path.relpath(b.path, output_dir)}')
+    for n, wave in enumerate(plan.waves, 1):
+        out += ['', f'-- wave {n}']
+        for unit in wave:
+            out += [f'\\ir {os.path.relpath(m.path, output_dir)}' for m in unit]
+    out.append(policy_mod.footer(f'COMPLETED: {len(plan.migrations)} migrations').rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+def run_plan(dsn, plan, jobs, progress=None):
+    """Run the waves in order, each wave's units concurrently; stops after a failed wave.
+
+    Returns [(path, seconds, error or None)].
+    """
+    from . import db
+
+    results = []
+    pool = db.Pool(dsn, jobs)
+
+    def run_unit(unit):
+        out = []
+        conn = pool.acquire()
+        broken = False
+        try:
+            for m in unit:
+                started = time.perf_counter()
+                try:
+                    db.run_files(conn, [m.path])
+                    out.append((m.path, time.perf_counter() - started, None))
+                except Exception as e:
+                    broken = db.is_connection_error(e)
+                    out.append((m.path, time.perf_counter() - started, str(e).strip()))
+                    break
+        finally:
+            pool.release(conn, broken)
+        return out
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for n, wave in enumerate(plan.waves, 1):
+                wave_results = [r for unit_results in executor.map(run_unit, wave) for r in unit_results]
+                results += wave_results
+                if progress:
+                    progress(n, wave_results)
+                if any(error for _, _, error in wave_results):
+                    break
+    finally:
+        pool.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools plan',
+        description='Order migrations by what they create and reference; group them into concurrent waves.')
+    parser.add_argument('inputs', nargs='*', metavar='GLOB',
+                        help='migration files/globs (default: database/*.sql supabase/migrations/*.sql)')
+    parser.add_argument('--baseline', action='append', metavar='GLOB',
+                        help='schema loaded before the first wave (repeatable; default: production_schema.sql)')
+    parser.add_argument('--no-baseline', action='store_true',
+                        help='plan from an empty database: the migrations must create everything')
+    parser.add_argument('--format', choices=('text', 'markdown', 'psql', 'json'), default='text')
+    parser.add_argument('-o', '--output', help='write the plan here instead of stdout')
+    parser.add_argument('-v', '--verbose', action='store_true', help='list every redefinition and dependency')
+    parser.add_argument('--strict', action='store_true', help='exit 1 on cycles or missing producers')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--dsn', help="run the plan against this database (--dsn '' for $DATABASE_URL)")
+    target.add_argument('--local', action='store_true', help='run the plan on a throwaway local Postgres')
+    parser.add_argument('--pg-bindir', help='directory with initdb/pg_ctl for --local')
+    parser.add_argument('--shim', action='store_true',
+                        help='create the Supabase auth schema/roles first (implied by --local)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 4,
+                        help='concurrent files per wave (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    try:
+        baseline = [] if args.no_baseline else args.baseline or DEFAULT_BASELINE
+        plan = build(args.inputs, baseline)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    if args.format == 'json':
+        text = json.dumps(plan.to_dict(), indent=2) + '\n'
+    elif args.format == 'markdown':
+        text = render_markdown(plan)
+    elif args.format == 'psql':
+        text = render_psql(plan, os.path.dirname(os.path.abspath(args.output)) if args.output else '.')
+    else:
+        text = report(plan, args.verbose) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print(f'✓ Generated {args.output} ({len(plan.migrations)} migrations, {len(plan.waves)} waves)',
+              file=sys.stderr)
+    elif args.dsn is None and not args.local:
+        sys.stdout.write(text)
+    problems = bool(plan.cycles or plan.missing)
+
+    if args.dsn is not None or args.local:
+        from . import db
+        local = None
+        try:
+            if args.local:
+                local = db.LocalPostgres(args.pg_bindir, max_connections=args.jobs + 10).start()
+                dsn = local.dsn
+                print(f'✓ Started local Postgres on port {local.port}')
+            else:
+                dsn = db.resolve_dsn(args.dsn or None)
+            conn = db.connect(dsn)
+            try:
+                if args.shim or args.local:
+                    db.execute(conn, db.SUPABASE_SHIM)
+                for path, seconds in db.run_files(conn, [b.path for b in plan.baseline]):
+                    print(f'✓ Ran {path} ({seconds:.2f}s)')
+            finally:
+                conn.close()
+
+            def progress(n, wave_results):
+                print(f'   wave {n}/{len(plan.waves)}:')
+                for path, seconds, error in wave_results:
+                    print(f'      {"❌" if error else "✓"} {path} ({seconds:.2f}s)' + (f': {error}' if error else ''))
+
+            started = time.perf_counter()
+            results = run_plan(dsn, plan, args.jobs, progress)
+            wall = time.perf_counter() - started
+        except (db.DatabaseError, OSError) as e:
+            print(f'❌ {e}', file=sys.stderr)
+            return 1
+        finally:
+            if local is not None:
+                local.stop()
+        busy = sum(seconds for _, seconds, _ in results)
+        failed = [path for path, _, error in results if error]
+        print(f'\n📊 {len(results) - len(failed)}/{len(plan.migrations)} migrations ran in {wall:.2f}s wall, '
+              f'{busy:.2f}s of file time (parallelism {busy / wall if wall else 0:.1f}x)')
+        if failed:
+            return 1
+    return 1 if args.strict and problems else 0
@@ -0,0 +1,443 @@
+"""
+RLS policy compiler: one parser for every policy export we produce.
+
+Reads any of
+  * JSON arrays from scripts/get-all-rls-policies-json.sql   ({"policy_sql": ...})
+  * JSON arrays from scripts/generate-rls-policies.sql       ({"create_policy_statement": ...})
+  * raw pg_policies rows from scripts/get-rls-policies.sql   ({"policyname": ..., "qual": ...})
+  * our own ``compile --format json`` output
+  * plain SQL (production_schema.sql, database/*.sql), including DO blocks
+into Policy records, and renders them back out as SQL.
+
+Python API:
+    from pgtools import policies
+    for p in policies.load('policies.json'):
+        print(p.table, p.name, p.using)
+
+CLI (run from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools compile policies.json -o database/add-all-rls-policies.sql
+    PYTHONPATH=scripts python3 -m pgtools compile production_schema.sql --format json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from . import sql
+from .jsonstream import iter_json_array
+
+COMMANDS = ('ALL', 'SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+RULE = '-- ' + '=' * 76
+
+
+class Policy:
+    """One row of pg_policies. ``using``/``with_check`` exclude the outer parens."""
+
+    __slots__ = ('schema', 'table', 'name', 'permissive', 'command', 'roles',
+                 'using', 'with_check')
+
+    def __init__(self, schema, table, name, permissive=True, command='ALL',
+                 roles=('public',), using=None, with_check=None):
+        self.schema = schema
+        self.table = table
+        self.name = name
+        self.permissive = permissive
+        self.command = command
+        self.roles = tuple(roles) or ('public',)
+        self.using = using
+        self.with_check = with_check
+
+    def _astuple(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, Policy):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self):
+        return hash(self._astuple())
+
+    def __repr__(self):
+        return f'Policy({self.schema}.{self.table}, {self.name!r}, {self.command})'
+
+    @property
+    def key(self):
+        """Identity of the policy in the catalog: (schema, table, name)."""
+        return (self.schema, self.table, self.name)
+
+    @property
+    def qualified_table(self):
+        return sql.qualified(self.schema, self.table)
+
+    def replace(self, **changes):
+        values = {slot: getattr(self, slot) for slot in self.__slots__}
+        values.update(changes)
+        return Policy(**values)
+
+    def to_dict(self):
+        return {slot: list(self.roles) if slot == 'roles' else getattr(self, slot)
+                for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{slot: data[slot] for slot in cls.__slots__ if slot in data})
+
+    def create_sql(self, indent=''):
+        """Bare CREATE POLICY statement, terminated with a semicolon."""
+        step = indent + '    '
+        lines = [
+            f'{indent}CREATE POLICY {sql.quote_ident_always(self.name)} ON {self.qualified_table}',
+            f'{step}AS {"PERMISSIVE" if self.permissive else "RESTRICTIVE"}',
+            f'{step}FOR {self.command}',
+            f'{step}TO {", ".join(role_sql(r) for r in self.roles)}',
+        ]
+        if self.using is not None:
+            lines.append(f'{step}USING ({self.using})')
+        if self.with_check is not None:
+            lines.append(f'{step}WITH CHECK ({self.with_check})')
+        return '\n'.join(lines) + ';'
+
+    def guarded_sql(self):
+        """CREATE POLICY inside a DO block that skips missing tables and existing policies."""
+        schema = sql.quote_literal(self.schema)
+        table = sql.quote_literal(self.table)
+        create = self.create_sql(indent=' ' * 12)
+        body = (
+            '\nBEGIN\n'
+            f'    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_schema = {schema} AND table_name = {table}) THEN\n'
+            f'        IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE schemaname = {schema} AND tablename = {table} AND policyname = {sql.quote_literal(self.name)}) THEN\n'
+            f'{create}\n'
+            '        END IF;\n'
+            '    END IF;\n'
+            'END '
+        )
+        return f'DO {sql.dollar_quote(body)};'
+
+    def drop_sql(self):
+        return f'DROP POLICY IF EXISTS {sql.quote_ident_always(self.name)} ON {self.qualified_table};'
+
+
+def batched_sql(table_policies):
+    """One DO block creating every missing policy of a single table.
+
+    The table is resolved once and its existing policy names are loaded with
+    one catalog query, instead of two lookups per policy as in guarded_sql().
+    """
+    first = table_policies[0]
+    relation = sql.quote_literal(first.qualified_table)
+    lines = [
+        '',
+        'DECLARE',
+        f'    rel regclass := to_regclass({relation});',
+        '    existing name[];',
+        'BEGIN',
+        '    IF rel IS NULL THEN',
+        f'        RAISE NOTICE {sql.quote_literal("Skipping missing table " + first.qualified_table)};',
+        '        RETURN;',
+        '    END IF;',
+        "    SELECT coalesce(array_agg(polname), '{}') INTO existing FROM pg_policy WHERE polrelid = rel;",
+    ]
+    for policy in table_policies:
+        lines += [
+            '',
+            f'    IF NOT ({sql.quote_literal(policy.name)} = ANY (existing)) THEN',
+            policy.create_sql(indent=' ' * 8),
+            '    END IF;',
+        ]
+    lines.append('END ')
+    return f'DO {sql.dollar_quote(chr(10).join(lines))};'
+
+
+def group_by_table(policies):
+    """Policies grouped per table in first-seen order; later duplicate names are dropped."""
+    tables = {}
+    for policy in policies:
+        tables.setdefault((policy.schema, policy.table), {}).setdefault(policy.name, policy)
+    return [list(named.values()) for named in tables.values()]
+
+
+def role_sql(role):
+    return role if role == 'public' else sql.quote_ident(role)
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def parse_sql(text):
+    """Return every CREATE POLICY in ``text``, looking inside DO blocks too."""
+    return [item for op, item in parse_sql_ops(text) if op == 'create']
+
+
+def parse_sql_ops(text):
+    """Yield ('create', Policy) and ('drop', key) in script order, including DO blocks."""
+    for stmt in sql.split_statements(text):
+        tokens = stmt.tokens
+        if tokens[0].is_kw('DO'):
+            for tok in tokens[1:]:
+                if tok.kind == sql.DOLLAR:
+                    yield from parse_sql_ops(sql.dollar_body(tok))
+            continue
+        i = sql.find_keywords(tokens, 'CREATE', 'POLICY')
+        if i != -1:
+            yield 'create', parse_create_policy(stmt.text, tokens, i)
+            continue
+        i = sql.find_keywords(tokens, 'DROP', 'POLICY')
+        if i != -1:
+            i += 2
+            if sql.find_keywords(tokens[i:i + 2], 'IF', 'EXISTS') == 0:
+                i += 2
+            if i + 2 < len(tokens) and sql.is_name(tokens[i]) and tokens[i + 1].is_kw('ON'):
+                (schema, table), _ = sql.parse_qualified_name(tokens, i + 2)
+                yield 'drop', (schema, table, sql.ident_value(tokens[i]))
+
+
+def replay(*paths):
+    """Final policy set after running the given SQL files in order (CREATE and DROP POLICY)."""
+    current = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        for op, item in parse_sql_ops(text):
+            if op == 'create':
+                current[item.key] = item
+            else:
+                current.pop(item, None)
+    return list(current.values())
+
+
+def parse_create_policy(text, tokens, i):
+    """Parse ``CREATE POLICY ...`` starting at ``tokens[i]``."""
+    i += 2
+    if i >= len(tokens) or not sql.is_name(tokens[i]):
+        raise sql.SQLSyntaxError('CREATE POLICY without a name')
+    name = sql.ident_value(tokens[i])
+    i += 1
+    if i >= len(tokens) or not tokens[i].is_kw('ON'):
+        raise sql.SQLSyntaxError(f'policy {name!r}: expected ON')
+    (schema, table), i = sql.parse_qualified_name(tokens, i + 1)
+
+    permissive = True
+    command = 'ALL'
+    roles = []
+    using = with_check = None
+    n = len(tokens)
+    while i < n:
+        tok = tokens[i]
+        if tok.is_kw('AS') and i + 1 < n:
+            permissive = not tokens[i + 1].is_kw('RESTRICTIVE')
+            i += 2
+        elif tok.is_kw('FOR') and i + 1 < n:
+            command = tokens[i + 1].upper
+            i += 2
+        elif tok.is_kw('TO'):
+            i += 1
+            while i < n and not tokens[i].is_kw('USING', 'WITH'):
+                if tokens[i].kind in (sql.WORD, sql.QIDENT, sql.STRING):
+                    roles.append(sql.ident_value(tokens[i]))
+                i += 1
+        elif tok.is_kw('USING'):
+            using, i = _paren_expr(text, tokens, i + 1, name)
+        elif tok.is_kw('WITH') and i + 1 < n and tokens[i + 1].is_kw('CHECK'):
+            with_check, i = _paren_expr(text, tokens, i + 2, name)
+        else:
+            raise sql.SQLSyntaxError(f'policy {name!r}: unexpected {tok.text!r}')
+    if command not in COMMANDS:
+        raise sql.SQLSyntaxError(f'policy {name!r}: unknown command {command!r}')
+    return Policy(schema, table, name, permissive, command, roles, using, with_check)
+
+
+def _paren_expr(text, tokens, i, name):
+    if i >= len(tokens) or not tokens[i].is_op('('):
+        raise sql.SQLSyntaxError(f'policy {name!r}: expected ( after USING/WITH CHECK')
+    close = sql.matching_paren(tokens, i)
+    return text[tokens[i].end:tokens[close].start].strip(), close + 1
+
+
+def from_record(record):
+    """Build a Policy from one element of a JSON policy export."""
+    statement = record.get('policy_sql') or record.get('create_policy_statement')
+    if statement:
+        found = parse_sql(statement)
+        if len(found) != 1:
+            raise sql.SQLSyntaxError(f'expected one CREATE POLICY in record, found {len(found)}')
+        return found[0]
+    if 'table' in record and 'name' in record:
+        # Our own --format json output
+        return Policy.from_dict(record)
+    if 'policyname' in record:
+        roles = record.get('roles') or ['public']
+        if isinstance(roles, str):
+            roles = [r.strip().strip('"') for r in roles.strip('{}').split(',') if r.strip()]
+        return Policy(
+            record.get('schemaname') or 'public',
+            record['tablename'],
+            record['policyname'],
+            (record.get('permissive') or 'PERMISSIVE').upper() != 'RESTRICTIVE',
+            (record.get('cmd') or 'ALL').upper(),
+            roles,
+            record.get('qual'),
+            record.get('with_check'),
+        )
+    return None
+
+
+def iter_json(stream):
+    """Yield policies from a JSON export one element at a time."""
+    for record in iter_json_array(stream):
+        policy = from_record(record)
+        if policy is not None:
+            yield policy
+
+
+def iter_policies(path):
+    """Yield the policies in a JSON export or SQL file ('-' reads stdin)."""
+    if path == '-':
+        stream = sys.stdin
+    else:
+        stream = open(path, 'r', encoding='utf-8')
+    with stream:
+        head = stream.read(1)
+        while head and head.isspace():
+            head = stream.read(1)
+        if head == '[':
+            yield from iter_json(_Prefixed(head, stream))
+        else:
+            yield from parse_sql(head + stream.read())
+
+
+class _Prefixed:
+    """Text stream with some already-consumed characters pushed back."""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if self.prefix:
+            data, self.prefix = self.prefix, ''
+            return data
+        return self.stream.read(size)
+
+
+def load(*paths):
+    """Parse every given export/SQL file into one list of policies."""
+    return [policy for path in paths for policy in iter_policies(path)]
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+FORMATS = ('guarded', 'batched', 'plain', 'json')
+
+
+def header(title, *sections):
+    """Banner comment in the style of the hand-written database/*.sql files."""
+    out = [RULE, f'-- {title}', RULE]
+    for lines in sections:
+        out += [f'-- {line}' for line in lines]
+        out.append(RULE)
+    return '\n'.join(out) + '\n\n'
+
+
+def footer(text):
+    return f'\n\n{RULE}\n-- {text}\n{RULE}\n'
+
+
+def render(policy, fmt='guarded'):
+    if fmt == 'plain':
+        return policy.create_sql()
+    return policy.guarded_sql()
+
+
+def write_script(policies, out, fmt='guarded', title='ADD ALL RLS POLICIES TO DATABASE'):
+    """Stream policies to ``out`` as a SQL script (or JSON); returns the count."""
+    count = 0
+    if fmt == 'json':
+        out.write('[')
+        for count, policy in enumerate(policies, 1):
+            out.write(',\n  ' if count > 1 else '\n  ')
+            out.write(json.dumps(policy.to_dict()))
+        out.write('\n]\n')
+        return count
+
+    out.write(script_header(fmt, title))
+    for n, unit in enumerate(units(policies, fmt)):
+        if n:
+            out.write('\n\n')
+        out.write(render_unit(unit, fmt))
+        count += len(unit)
+    out.write(footer(f'COMPLETED: {count} policies'))
+    return count
+
+
+def script_header(fmt='guarded', title='ADD ALL RLS POLICIES TO DATABASE'):
+    sections = [['This script adds all RLS policies from production',
+                 'Run this in your Supabase SQL Editor']]
+    if fmt == 'guarded':
+        sections.append(['Note: Policies are wrapped in DO blocks with existence checks',
+                         'to prevent errors if tables or policies already exist'])
+    elif fmt == 'batched':
+        sections.append(['Note: One DO block per table checks the table once and loads its',
+                         'existing policy names in a single query; present ones are skipped'])
+    return header(title, *sections)
+
+
+def units(policies, fmt='guarded'):
+    """Lists of policies rendered together: one per table when batched, else one each."""
+    if fmt == 'batched':
+        return iter(group_by_table(policies))
+    return ([policy] for policy in policies)
+
+
+def render_unit(unit, fmt='guarded'):
+    if fmt == 'batched':
+        return f'{RULE}\n-- TABLE: {unit[0].table}\n{RULE}\n' + batched_sql(unit)
+    return render(unit[0], fmt)
+
+
+def compile_file(inputs, output_path, fmt='guarded', title='ADD ALL RLS POLICIES TO DATABASE'):
+    """Parse ``inputs`` and write them to ``output_path`` ('-' for stdout)."""
+    policies = (p for path in inputs for p in iter_policies(path))
+    if output_path == '-':
+        return write_script(policies, sys.stdout, fmt, title)
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w') as out:
+        return write_script(policies, out, fmt, title)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools compile',
+        description='Parse RLS policy exports (JSON or SQL) and emit one normalized script.')
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help="policy JSON exports or SQL files ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=FORMATS, default='guarded',
+                        help='guarded DO blocks, one DO block per table (batched), '
+                             'plain CREATE POLICY, or JSON records')
+    parser.add_argument('--cache', action='store_true',
+                        help='skip unchanged inputs and reuse cached per-policy fragments (see pgtools cache)')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.cache:
+            from . import cache
+            result = cache.compile_file(args.inputs, args.output, args.format)
+            count = result.count
+        else:
+            count = compile_file(args.inputs, args.output, args.format)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    if args.cache and args.output != '-':
+        print(f'✓ {result.summary()}')
+    elif args.output != '-':
+        print(f'✓ Generated {args.output} with {count} policies')
+    return 0
@@ -0,0 +1,352 @@
+"""
+Per-row RLS cost analyzer and initplan rewriter.
+
+Postgres evaluates a policy expression for every row a query scans. Bare
+``auth.uid()`` calls, subqueries that reference the outer row and calls to
+VOLATILE functions therefore cost once per row, while a scalar sub-select
+such as ``(select auth.uid())`` or ``(SELECT EXISTS (...))`` becomes an
+initplan that runs once per statement and is cached.
+
+This module flags those patterns, ranks the policies by table size class and
+can emit an ALTER POLICY script that
+  * wraps every bare auth.uid()/auth.jwt()/auth.role()/current_setting() as
+    ``(select ...)``
+  * hoists uncorrelated EXISTS checks (the usual "is admin" subquery) into
+    ``(SELECT EXISTS (...))``
+Neither rewrite changes what the policy allows.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools rls-cost production_schema.sql
+    PYTHONPATH=scripts python3 -m pgtools rls-cost policies.json --schema production_schema.sql \\
+        --rewrite database/rls-initplan-rewrite.sql
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+
+from . import diff as diff_mod
+from . import policies as policy_mod
+from . import sql
+
+AUTH_FUNCTIONS = {('auth', 'uid'), ('auth', 'jwt'), ('auth', 'role'), ('auth', 'email'),
+                  ('pg_catalog', 'current_setting'), ('public', 'current_setting')}
+
+# Schemas whose qualifier never refers to a row alias
+_SCHEMAS = frozenset({'public', 'auth', 'extensions', 'pg_catalog', 'storage'})
+
+BARE_AUTH = 'bare_auth_call'
+CORRELATED = 'correlated_subquery'
+UNHOISTED = 'uncached_subquery'
+VOLATILE = 'volatile_function'
+
+# Rough per-row cost of each finding, relative to one cached comparison
+WEIGHTS = {BARE_AUTH: 3, CORRELATED: 5, UNHOISTED: 1, VOLATILE: 4}
+
+LABELS = {
+    BARE_AUTH: 'bare auth call',
+    CORRELATED: 'correlated subquery',
+    UNHOISTED: 'uncached subquery',
+    VOLATILE: 'volatile function call',
+}
+
+SIZE_CLASSES = {'large': 100, 'medium': 10, 'small': 1}
+
+# Tables we know are big or grow with every sale
+LARGE_TABLES = frozenset('''
+    orders tickets order_items payments transactions events ticket_types
+    contacts notifications email_tracking_events user_event_interactions
+    communication_messages sms_usage_log promoter_clicks waitlist followers
+    reviews custom_field_responses event_views analytics_events
+'''.split())
+_LARGE_SUFFIXES = ('_events', '_logs', '_log', '_messages', '_interactions',
+                   '_readings', '_clicks', '_views', '_history', '_audit')
+_SMALL_HINTS = ('countries', 'currencies', 'categories', 'settings', 'features',
+                'templates', 'tiers', 'packages', 'config', 'platform_')
+
+
+def size_class(table, overrides=None):
+    """'large', 'medium' or 'small' for a table, from overrides or name heuristics."""
+    if overrides and table in overrides:
+        value = overrides[table]
+        if isinstance(value, (int, float)):
+            return 'large' if value >= 100_000 else 'medium' if value >= 1_000 else 'small'
+        return value
+    if table in LARGE_TABLES or table.endswith(_LARGE_SUFFIXES):
+        return 'large'
+    if any(hint in table for hint in _SMALL_HINTS):
+        return 'small'
+    return 'medium'
+
+
+def function_volatility(*paths):
+    """Map (schema, name) -> 'VOLATILE'/'STABLE'/'IMMUTABLE' for CREATE FUNCTIONs in SQL files."""
+    result = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        for stmt in sql.split_statements(text):
+            tokens = stmt.tokens
+            i = sql.find_keywords(tokens[:4], 'FUNCTION')
+            if i == -1 or not tokens[0].is_kw('CREATE'):
+                continue
+            try:
+                name, j = sql.parse_qualified_name(tokens, i + 1)
+            except sql.SQLSyntaxError:
+                continue
+            volatility = 'VOLATILE'
+            for tok in tokens[j:]:
+                if tok.is_kw('IMMUTABLE', 'STABLE', 'VOLATILE'):
+                    volatility = tok.upper
+            result[name] = volatility
+    return result
+
+
+def is_subquery(tokens, match, i):
+    """True when the paren at tokens[i] opens a sub-SELECT."""
+    return i in match and i + 1 < len(tokens) and tokens[i + 1].is_kw('SELECT', 'WITH')
+
+
+# Bare words inside a subquery that are syntax, not column references
+_NOT_COLUMNS = frozenset('''
+    join left right inner outer full cross natural is like ilike between similar
+    varying precision zone time timestamp interval nulls first last escape
+    exists over partition row rows
+'''.split())
+_SYNTAX_WORDS = sql.RESERVED | _NOT_COLUMNS
+
+YES, NO, MAYBE = 'yes', 'no', 'maybe'
+
+
+def outer_references(tokens, start, end):
+    """Outer-row references in the subquery tokens[start:end].
+
+    Returns (refs, ambiguous): ``refs`` lists the index of the qualifier token
+    of every ``alias.column`` whose alias is not bound inside the subquery, and
+    ``ambiguous`` is True when an unqualified column could bind to the outer row.
+    """
+    local = set()
+    in_from = False
+    for k in range(start, end):
+        tok = tokens[k]
+        if tok.is_kw('FROM', 'JOIN'):
+            in_from = True
+        elif tok.is_kw('WHERE', 'GROUP', 'ORDER', 'LIMIT', 'HAVING', 'UNION', 'SELECT'):
+            in_from = False
+        elif in_from and sql.is_name(tok):
+            local.add(sql.ident_value(tok))
+
+    refs = []
+    ambiguous = False
+    for k in range(start, end):
+        tok = tokens[k]
+        if not sql.is_name(tok):
+            continue
+        if tok.kind == sql.WORD and tok.text.lower() in _SYNTAX_WORDS:
+            continue
+        if k > start and tokens[k - 1].is_op('.', '::'):
+            continue
+        name = sql.ident_value(tok)
+        if k + 1 < end and tokens[k + 1].is_op('.'):
+            if name not in local and name not in _SCHEMAS:
+                refs.append(k)
+        elif k + 1 < end and tokens[k + 1].is_op('('):
+            continue  # function call
+        elif name not in local:
+            ambiguous = True
+    return refs, ambiguous
+
+
+def correlation(tokens, start, end):
+    """Whether the subquery tokens[start:end] references the outer row: YES, NO or MAYBE."""
+    refs, ambiguous = outer_references(tokens, start, end)
+    if refs:
+        return YES
+    return MAYBE if ambiguous else NO
+
+
+def _call_name(tokens, i):
+    """(schema, name) of a call whose name token is tokens[i], qualifying bare names."""
+    name = sql.ident_value(tokens[i])
+    if i >= 2 and tokens[i - 1].is_op('.') and sql.is_name(tokens[i - 2]):
+        return (sql.ident_value(tokens[i - 2]), name)
+    if name == 'current_setting':
+        return ('pg_catalog', name)
+    return ('public', name)
+
+
+def _wrapped(tokens, match, start, close):
+    """True when tokens[start..close] already sits alone inside ``(SELECT ...)``."""
+    return (start >= 2 and tokens[start - 1].is_kw('SELECT') and tokens[start - 2].is_op('(')
+            and match.get(start - 2) == close + 1)
+
+
+def analyze_expr(text, volatility=None):
+    """Return (findings Counter, rewritten text or None) for one policy expression."""
+    findings = Counter()
+    if not text:
+        return findings, None
+    volatility = volatility or {}
+    tokens = sql.tokenize(text)
+    match = sql.paren_map(tokens)
+
+    subqueries = [(i, match[i]) for i in range(len(tokens)) if is_subquery(tokens, match, i)]
+    correlated = {i: correlation(tokens, i + 1, close) for i, close in subqueries}
+
+    def enclosing(k):
+        return [i for i, close in subqueries if i < k < close]
+
+    edits = []   # (offset, order, text); closers sort before openers at one offset
+    for k, tok in enumerate(tokens):
+        if k + 1 >= len(tokens) or not sql.is_name(tok) or not tokens[k + 1].is_op('('):
+            continue
+        close = match.get(k + 1)
+        if close is None:
+            continue
+        if tok.is_kw('EXISTS'):
+            if is_subquery(tokens, match, k + 1) and correlated[k + 1] == NO \
+                    and not enclosing(k) and not _wrapped(tokens, match, k, close):
+                findings[UNHOISTED] += 1
+                edits.append((tok.start, 1, '(SELECT '))
+                edits.append((tokens[close].end, 0, ')'))
+            continue
+        if tok.kind == sql.WORD and tok.text.lower() in sql.RESERVED:
+            continue
+        name = _call_name(tokens, k)
+        start = k - 2 if k >= 2 and tokens[k - 1].is_op('.') else k
+        outer = enclosing(start)
+        if name in AUTH_FUNCTIONS:
+            if _wrapped(tokens, match, start, close):
+                continue
+            if not outer:
+                findings[BARE_AUTH] += 1
+            edits.append((tokens[start].start, 1, '(select '))
+            edits.append((tokens[close].end, 0, ')'))
+        elif volatility.get(name) == 'VOLATILE' and not any(correlated[i] == YES for i in outer):
+            findings[VOLATILE] += 1
+
+    # EXISTS/IN/ANY sub-selects that depend on the outer row are re-run per row
+    findings[CORRELATED] += sum(1 for i, _ in subqueries if correlated[i] == YES)
+    findings = +findings
+
+    if not edits:
+        return findings, None
+    edits.sort()
+    out = []
+    pos = 0
+    for offset, _, insert in edits:
+        out.append(text[pos:offset])
+        out.append(insert)
+        pos = offset
+    out.append(text[pos:])
+    return findings, ''.join(out)
+
+
+class PolicyCost:
+    __slots__ = ('policy', 'size', 'findings', 'score', 'rewritten')
+
+    def __init__(self, policy, size, findings, rewritten):
+        self.policy = policy
+        self.size = size
+        self.findings = findings
+        self.score = SIZE_CLASSES[size] * sum(WEIGHTS[k] * n for k, n in findings.items())
+        self.rewritten = rewritten
+
+    def describe(self):
+        return ', '.join(f'{n}× {LABELS[k]}' for k, n in sorted(self.findings.items()))
+
+    def to_dict(self):
+        return {
+            'table': self.policy.table,
+            'policy': self.policy.name,
+            'command': self.policy.command,
+            'size': self.size,
+            'score': self.score,
+            'findings': dict(self.findings),
+            'rewritable': self.rewritten is not None,
+        }
+
+
+def analyze(policy_list, volatility=None, sizes=None):
+    """Cost every policy; returns PolicyCost list, most expensive first."""
+    results = []
+    for policy in policy_list:
+        using_findings, using = analyze_expr(policy.using, volatility)
+        check_findings, check = analyze_expr(policy.with_check, volatility)
+        rewritten = None
+        if using is not None or check is not None:
+            rewritten = policy.replace(using=using or policy.using,
+                                       with_check=check or policy.with_check)
+        results.append(PolicyCost(policy, size_class(policy.table, sizes),
+                                  using_findings + check_findings, rewritten))
+    results.sort(key=lambda c: (-c.score, c.policy.key))
+    return results
+
+
+def render_rewrite(costs):
+    """ALTER POLICY script applying every initplan rewrite, in one transaction."""
+    rewrites = [c for c in costs if c.rewritten is not None]
+    out = [policy_mod.header(
+        'RLS INITPLAN REWRITE (generated by pgtools rls-cost)',
+        [f'{len(rewrites)} policies rewritten to cache auth calls and uncorrelated',
+         'subqueries per statement. Policy semantics are unchanged.'],
+    ).rstrip('\n'), '', 'BEGIN;', '']
+    for cost in sorted(rewrites, key=lambda c: c.policy.key):
+        out += [diff_mod.alter_sql(cost.policy, cost.rewritten), '']
+    out += ['COMMIT;', '']
+    return '\n'.join(out)
+
+
+def render_report(costs, limit=None):
+    flagged = [c for c in costs if c.findings]
+    lines = [f'📊 RLS per-row cost: {len(costs)} policies, {len(flagged)} with per-row work, '
+             f'{sum(1 for c in costs if c.rewritten)} rewritable', '']
+    if not flagged:
+        return '\n'.join(lines)
+    width = max(len(c.policy.table) for c in flagged)
+    lines.append(f'{"rank":>4}  {"score":>5}  {"size":<6}  {"table".ljust(width)}  policy / findings')
+    for rank, cost in enumerate(flagged[:limit], 1):
+        lines.append(f'{rank:>4}  {cost.score:>5}  {cost.size:<6}  {cost.policy.table.ljust(width)}  '
+                     f'{cost.policy.name} [{cost.policy.command}]')
+        lines.append(f'{"":>4}  {"":>5}  {"":<6}  {"".ljust(width)}    {cost.describe()}')
+    return '\n'.join(lines)
+
+
+def load_sizes(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools rls-cost',
+        description='Flag per-row RLS work, rank it by table size and emit an initplan rewrite.')
+    parser.add_argument('inputs', nargs='*', default=['production_schema.sql'],
+                        help='policy exports or SQL files (default: production_schema.sql)')
+    parser.add_argument('--schema', action='append', default=None,
+                        help='SQL file(s) with CREATE FUNCTION definitions (default: production_schema.sql)')
+    parser.add_argument('--sizes', help='JSON map of table -> size class or row count')
+    parser.add_argument('--rewrite', metavar='FILE', help='write the ALTER POLICY rewrite script here')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--limit', type=int, default=None, help='show only the top N policies')
+    args = parser.parse_args(argv)
+
+    try:
+        volatility = function_volatility(*(args.schema or ['production_schema.sql']))
+        sizes = load_sizes(args.sizes) if args.sizes else None
+        costs = analyze(policy_mod.load(*args.inputs), volatility, sizes)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    if args.json:
+        json.dump([c.to_dict() for c in costs if c.findings][:args.limit], sys.stdout, indent=2)
+        print()
+    else:
+        print(render_report(costs, args.limit))
+    if args.rewrite:
+        with open(args.rewrite, 'w') as f:
+            f.write(render_rewrite(costs))
+        print(f'✓ Generated {args.rewrite}', file=sys.stderr)
+    return 0
@@ -0,0 +1,331 @@
+"""
+Small PostgreSQL lexer shared by the pgtools modules.
+
+Knows just enough SQL to split scripts into statements and to walk their
+tokens safely: string literals, quoted identifiers, dollar-quoted bodies and
+comments are never mistaken for code.
+"""
+
+import re
+from typing import NamedTuple
+
+WORD = 'word'        # unquoted identifier or keyword
+QIDENT = 'qident'    # "quoted identifier"
+STRING = 'string'    # 'literal', E'literal'
+DOLLAR = 'dollar'    # $tag$ ... $tag$
+NUMBER = 'number'
+PARAM = 'param'      # $1
+OP = 'op'            # operators and punctuation
+
+_WORD_RE = re.compile(r'[A-Za-z_\u0080-\uffff][A-Za-z0-9_$\u0080-\uffff]*')
+_NUMBER_RE = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_DOLLAR_TAG_RE = re.compile(r'\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$')
+_PARAM_RE = re.compile(r'\$\d+')
+_OP_CHARS = set('+-*/<>=~!@#%^&|`?')
+_PUNCT = set('(),;[]{}.:')
+
+# Keywords that must be quoted when used as identifiers in generated SQL
+RESERVED = frozenset('''
+    all analyse analyze and any array as asc asymmetric both case cast check
+    collate column constraint create current_catalog current_date current_role
+    current_time current_timestamp current_user default deferrable desc
+    distinct do else end except false fetch for foreign from grant group having
+    in initially intersect into lateral leading limit localtime localtimestamp
+    not null offset on only or order placing primary references returning
+    select session_user some symmetric table then to trailing true union unique
+    user using variadic when where window with
+'''.split())
+
+_SIMPLE_IDENT_RE = re.compile(r'[a-z_][a-z0-9_$]*\Z')
+
+
+class SQLSyntaxError(ValueError):
+    pass
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+    @property
+    def upper(self):
+        """Keyword form of a bare word, '' for anything else."""
+        return self.text.upper() if self.kind == WORD else ''
+
+    def is_kw(self, *words):
+        return self.kind == WORD and self.text.upper() in words
+
+    def is_op(self, *ops):
+        return self.kind == OP and self.text in ops
+
+
+def tokenize(text, start=0, end=None):
+    """Return the tokens of ``text`` (comments and whitespace dropped)."""
+    end = len(text) if end is None else end
+    tokens = []
+    append = tokens.append
+    i = start
+    while i < end:
+        c = text[i]
+        if c.isspace():
+            i += 1
+            continue
+        if c == '-' and text.startswith('--', i):
+            nl = text.find('\n', i)
+            i = end if nl == -1 or nl > end else nl + 1
+            continue
+        if c == '/' and text.startswith('/*', i):
+            i = _skip_block_comment(text, i, end)
+            continue
+        if c == "'" or (c in 'eEbBxXnNuU' and i + 1 < end and text[i + 1] == "'"):
+            j = _scan_string(text, i + 1 if c != "'" else i, end, backslash=c in 'eE')
+            append(Token(STRING, text[i:j], i, j))
+            i = j
+            continue
+        if c == '"':
+            j = i + 1
+            while True:
+                j = text.find('"', j)
+                if j == -1 or j >= end:
+                    raise SQLSyntaxError(f'unterminated quoted identifier at offset {i}')
+                if j + 1 < end and text[j + 1] == '"':
+                    j += 2
+                    continue
+                j += 1
+                break
+            append(Token(QIDENT, text[i:j], i, j))
+            i = j
+            continue
+        if c == '$':
+            m = _DOLLAR_TAG_RE.match(text, i, end)
+            if m:
+                tag = m.group()
+                close = text.find(tag, m.end(), end)
+                if close == -1:
+                    raise SQLSyntaxError(f'unterminated dollar quote {tag} at offset {i}')
+                j = close + len(tag)
+                append(Token(DOLLAR, text[i:j], i, j))
+                i = j
+                continue
+            m = _PARAM_RE.match(text, i, end)
+            if m:
+                append(Token(PARAM, m.group(), i, m.end()))
+                i = m.end()
+                continue
+        if c.isdigit() or (c == '.' and i + 1 < end and text[i + 1].isdigit()):
+            m = _NUMBER_RE.match(text, i, end)
+            append(Token(NUMBER, m.group(), i, m.end()))
+            i = m.end()
+            continue
+        m = _WORD_RE.match(text, i, end)
+        if m:
+            append(Token(WORD, m.group(), i, m.end()))
+            i = m.end()
+            continue
+        if c == ':' and text.startswith('::', i):
+            append(Token(OP, '::', i, i + 2))
+            i += 2
+            continue
+        if c in _PUNCT:
+            append(Token(OP, c, i, i + 1))
+            i += 1
+            continue
+        if c in _OP_CHARS:
+            j = i + 1
+            while (j < end and text[j] in _OP_CHARS
+                   and not text.startswith('--', j) and not text.startswith('/*', j)):
+                j += 1
+            append(Token(OP, text[i:j], i, j))
+            i = j
+            continue
+        # Anything else (stray backslash commands, odd bytes) is kept verbatim
+        append(Token(OP, c, i, i + 1))
+        i += 1
+    return tokens
+
+
+def _skip_block_comment(text, i, end):
+    depth = 0
+    while i < end:
+        if text.startswith('/*', i):
+            depth += 1
+            i += 2
+        elif text.startswith('*/', i):
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    raise SQLSyntaxError('unterminated block comment')
+
+
+def _scan_string(text, i, end, backslash=False):
+    # text[i] is the opening quote; returns the offset just past the close
+    j = i + 1
+    while j < end:
+        c = text[j]
+        if backslash and c == '\\':
+            j += 2
+            continue
+        if c == "'":
+            if j + 1 < end and text[j + 1] == "'":
+                j += 2
+                continue
+            return j + 1
+        j += 1
+    raise SQLSyntaxError(f'unterminated string literal at offset {i}')
+
+
+class Statement(NamedTuple):
+    text: str
+    tokens: list
+    start: int
+    end: int
+
+    @property
+    def sql(self):
+        """Source text of the statement without the trailing semicolon."""
+        if not self.tokens:
+            return ''
+        return self.text[self.tokens[0].start:self.tokens[-1].end]
+
+
+def split_statements(text):
+    """Split a SQL script into statements on top-level semicolons."""
+    tokens = tokenize(text)
+    statements = []
+    current = []
+    for tok in tokens:
+        if tok.kind == OP and tok.text == ';':
+            if current:
+                statements.append(Statement(text, current, current[0].start, tok.end))
+            current = []
+        else:
+            current.append(tok)
+    if current:
+        statements.append(Statement(text, current, current[0].start, current[-1].end))
+    return statements
+
+
+def ident_value(tok):
+    """Identifier name as Postgres stores it: folded unless quoted."""
+    if tok.kind == QIDENT:
+        return tok.text[1:-1].replace('""', '"')
+    if tok.kind == STRING:
+        return string_value(tok)
+    return tok.text.lower()
+
+
+def string_value(tok):
+    text = tok.text
+    if text[0] != "'":
+        text = text[1:]
+    return text[1:-1].replace("''", "'")
+
+
+def dollar_body(tok):
+    """Contents of a dollar-quoted token without its delimiters."""
+    tag_end = tok.text.index('$', 1) + 1
+    return tok.text[tag_end:len(tok.text) - tag_end]
+
+
+def is_name(tok):
+    return tok.kind in (WORD, QIDENT)
+
+
+def parse_qualified_name(tokens, i, default_schema='public'):
+    """Parse ``[schema.]name`` at ``tokens[i]``; returns ((schema, name), next_i)."""
+    if i >= len(tokens) or not is_name(tokens[i]):
+        raise SQLSyntaxError('expected a name')
+    first = ident_value(tokens[i])
+    i += 1
+    if i + 1 < len(tokens) and tokens[i].is_op('.') and is_name(tokens[i + 1]):
+        return (first, ident_value(tokens[i + 1])), i + 2
+    return (default_schema, first), i
+
+
+def matching_paren(tokens, i):
+    """Index of the token closing the bracket at ``tokens[i]``."""
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    opener = tokens[i].text
+    closer = pairs[opener]
+    depth = 0
+    for j in range(i, len(tokens)):
+        tok = tokens[j]
+        if tok.kind != OP:
+            continue
+        if tok.text == opener:
+            depth += 1
+        elif tok.text == closer:
+            depth -= 1
+            if depth == 0:
+                return j
+    raise SQLSyntaxError(f'unbalanced {opener!r}')
+
+
+def paren_map(tokens):
+    """Map the index of every '(' to the index of its closing ')'."""
+    match = {}
+    stack = []
+    for i, tok in enumerate(tokens):
+        if tok.is_op('('):
+            stack.append(i)
+        elif tok.is_op(')') and stack:
+            match[stack.pop()] = i
+    return match
+
+
+def split_commas(tokens, start, end):
+    """Yield (start, end) index ranges of the top-level comma-separated items in tokens[start:end]."""
+    depth = 0
+    begin = start
+    for k in range(start, end):
+        tok = tokens[k]
+        if tok.is_op('(', '['):
+            depth += 1
+        elif tok.is_op(')', ']'):
+            depth -= 1
+        elif depth == 0 and tok.is_op(','):
+            yield begin, k
+            begin = k + 1
+    if begin < end:
+        yield begin, end
+
+
+def find_keywords(tokens, *words, start=0):
+    """Index where the keyword sequence ``words`` starts, or -1."""
+    n = len(words)
+    for i in range(start, len(tokens) - n + 1):
+        if all(tokens[i + k].is_kw(words[k]) for k in range(n)):
+            return i
+    return -1
+
+
+def quote_ident(name):
+    if _SIMPLE_IDENT_RE.match(name) and name not in RESERVED:
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def qualified(schema, name):
+    return f'{quote_ident(schema)}.{quote_ident(name)}'
+
+
+def dollar_quote(body, tag=''):
+    """Wrap ``body`` in a dollar quote whose tag does not occur inside it."""
+    n = 0
+    while f'${tag}$' in body:
+        n += 1
+        tag = f'q{n}'
+    return f'${tag}${body}${tag}$'
+
+
+def quote_ident_always(name):
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,353 @@
+"""
+Migration squasher: one idempotent schema script for the final state.
+
+A new branch database is brought up by replaying production_schema.sql, the
+database/*.sql fix-up files and supabase/migrations in order, and much of
+that is churn: tables created and then altered, functions replaced five
+times, policies dropped and recreated. This replays the same files into the
+schema catalog (pgtools.catalog) and writes only what is left at the end,
+in dependency order:
+
+    extensions, sequences
+    functions                      check_function_bodies is off, as in pg_dump
+    tables                         columns, PRIMARY KEY / UNIQUE / CHECK inline
+    functions over row types       RETURNS SETOF <table> and friends
+    views                          ordered by the views they select from
+    foreign keys                   after every table exists
+    indexes, triggers
+    row level security, policies   one batched DO block per table
+    comments
+
+Every statement is idempotent (IF NOT EXISTS, OR REPLACE, guarded DO
+blocks), so the script can be re-run. The result is replayed into a fresh
+catalog and compared with the original; differences are reported.
+
+By default the inputs are production_schema.sql followed by the migrations
+in the order ``pgtools plan`` computes. Data statements (INSERT, UPDATE,
+seed files) are not part of the catalog and are not carried over.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools squash -o database/squashed_schema.sql
+    PYTHONPATH=scripts python3 -m pgtools squash production_schema.sql supabase/migrations/*.sql -o /tmp/schema.sql
+"""
+
+import argparse
+import sys
+
+from . import catalog as catalog_mod
+from . import index as index_mod
+from . import plan as plan_mod
+from . import policies as policy_mod
+from . import sql
+
+# Schemas Supabase creates; everything else gets CREATE SCHEMA IF NOT EXISTS
+_PLATFORM_SCHEMAS = frozenset(('public', 'auth', 'storage', 'extensions', 'cron', 'net', 'vault',
+                               'pg_catalog', 'graphql', 'realtime'))
+
+
+def default_inputs():
+    """production_schema.sql, then the migrations in planned order."""
+    plan = plan_mod.build(None, plan_mod.DEFAULT_BASELINE)
+    return [b.path for b in plan.baseline] + [m.path for wave in plan.waves for unit in wave for m in unit]
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _arg_sql(arg):
+    mode, name, type_, default = arg
+    out = '' if mode == 'IN' else mode + ' '
+    if name:
+        out += sql.quote_ident(name) + ' '
+    out += type_
+    if default is not None:
+        out += f' DEFAULT {default}'
+    return out
+
+
+def function_sql(function):
+    """CREATE OR REPLACE for the function's final state, ALTERs included."""
+    head = (f'CREATE OR REPLACE {function.kind.upper()} {sql.qualified(function.schema, function.name)}'
+            f'({", ".join(_arg_sql(a) for a in function.args)})')
+    lines = [head]
+    if function.kind == 'function' and function.returns:
+        lines.append(f'RETURNS {function.returns}')
+    lines.append(f'LANGUAGE {function.language or "sql"}')
+    flags = []
+    if function.volatility != 'VOLATILE':
+        flags.append(function.volatility)
+    if function.strict:
+        flags.append('STRICT')
+    if function.leakproof:
+        flags.append('LEAKPROOF')
+    if function.security_definer:
+        flags.append('SECURITY DEFINER')
+    if function.parallel != 'UNSAFE':
+        flags.append(f'PARALLEL {function.parallel}')
+    if flags:
+        lines.append(' '.join(flags))
+    for name, value in function.config.items():
+        lines.append(f'SET {name} FROM CURRENT' if value == 'FROM CURRENT' else f'SET {name} = {value}')
+    body = function.body or ''
+    if body.lstrip().upper().startswith('BEGIN ATOMIC'):
+        lines.append(body + ';')
+    else:
+        lines.append(f'AS {sql.dollar_quote(body)};')
+    return '\n'.join(lines)
+
+
+def table_sql(table):
+    parts = ['    ' + column.sql() for column in table.columns.values()]
+    for constraint in table.constraints.values():
+        if constraint.kind != catalog_mod.FOREIGN:
+            parts.append(f'    CONSTRAINT {sql.quote_ident(constraint.name)} {constraint.definition()}')
+    out = f'CREATE TABLE IF NOT EXISTS {sql.qualified(*table.key)} (\n' + ',\n'.join(parts) + '\n)'
+    if table.partition_by:
+        out += f' PARTITION BY {table.partition_by}'
+    return out + ';'
+
+
+def foreign_keys_sql(table, constraints):
+    """One DO block adding the table's missing foreign keys."""
+    relation = sql.quote_literal(sql.qualified(*table.key))
+    lines = ['', 'BEGIN']
+    for constraint in constraints:
+        lines += [
+            f'    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = {relation}::regclass '
+            f'AND conname = {sql.quote_literal(constraint.name)}) THEN',
+            f'        ALTER TABLE {sql.qualified(*table.key)} ADD CONSTRAINT {sql.quote_ident(constraint.name)} '
+            f'{constraint.definition()};',
+            '    END IF;',
+        ]
+    lines.append('END ')
+    return f'DO {sql.dollar_quote(chr(10).join(lines))};'
+
+
+def index_sql(index):
+    return index.sql().replace('INDEX ', 'INDEX IF NOT EXISTS ', 1) + ';'
+
+
+def trigger_sql(trigger):
+    return (f'DROP TRIGGER IF EXISTS {sql.quote_ident(trigger.name)} ON {sql.qualified(trigger.schema, trigger.table)};\n'
+            f'{trigger.sql()};')
+
+
+def view_sql(view):
+    name = sql.qualified(view.schema, view.name)
+    if view.materialized:
+        return f'CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS\n{view.query};'
+    return f'CREATE OR REPLACE VIEW {name} AS\n{view.query};'
+
+
+def _relation_types(function, relations):
+    """Tables/views named in the function's argument or return types."""
+    types = [t for t in function.arg_types] + [function.returns or '']
+    found = set()
+    for type_ in types:
+        name = type_.replace('SETOF ', '').replace('[]', '').strip().strip('"')
+        key = catalog_mod.Catalog._key(name)
+        if key in relations:
+            found.add(key)
+    return found
+
+
+def _view_order(views):
+    """Views with the views they select from first (input order otherwise)."""
+    deps = {}
+    for key, view in views.items():
+        refs = index_mod.references(sql.tokenize(view.query), set())
+        deps[key] = [other for other in views if other != key and
+                     't:' + index_mod._qname(*other) in refs]
+    out, state = [], {}
+
+    def visit(key):
+        if state.get(key) == 2:
+            return
+        if state.get(key) == 1:
+            return   # cycle: Postgres would reject it too; keep input order
+        state[key] = 1
+        for dep in deps[key]:
+            visit(dep)
+        state[key] = 2
+        out.append(key)
+
+    for key in views:
+        visit(key)
+    return out
+
+
+def _comments(catalog):
+    out = []
+    for table in catalog.tables.values():
+        name = sql.qualified(*table.key)
+        if table.comment is not None:
+            out.append(f'COMMENT ON TABLE {name} IS {sql.quote_literal(table.comment)};')
+        for column in table.columns.values():
+            if column.comment is not None:
+                out.append(f'COMMENT ON COLUMN {name}.{sql.quote_ident(column.name)} IS '
+                           f'{sql.quote_literal(column.comment)};')
+    for view in catalog.views.values():
+        if view.comment is not None:
+            kind = 'MATERIALIZED VIEW' if view.materialized else 'VIEW'
+            out.append(f'COMMENT ON {kind} {sql.qualified(view.schema, view.name)} IS '
+                       f'{sql.quote_literal(view.comment)};')
+    for function in catalog.functions.values():
+        if function.comment is not None:
+            out.append(f'COMMENT ON {function.kind.upper()} {function.signature} IS '
+                       f'{sql.quote_literal(function.comment)};')
+    return out
+
+
+def sections(catalog):
+    """[(title, [statement, ...])] in dependency order."""
+    relations = set(catalog.tables) | set(catalog.views)
+    early, on_tables, on_views = [], [], []
+    for function in catalog.functions.values():
+        refs = _relation_types(function, relations)
+        if not refs:
+            early.append(function)
+        elif refs & set(catalog.views):
+            on_views.append(function)
+        else:
+            on_tables.append(function)
+
+    schemas = sorted({key[0] for key in list(catalog.tables) + list(catalog.views) + list(catalog.functions)}
+                     - _PLATFORM_SCHEMAS)
+    sequences = sorted({col.default.split("'")[1] for table in catalog.tables.values()
+                        for col in table.columns.values()
+                        if col.default and col.default.startswith("nextval('")})
+    out = [
+        ('EXTENSIONS AND SCHEMAS',
+         [f'CREATE EXTENSION IF NOT EXISTS {sql.quote_ident_always(name)}'
+          + ('' if schema == 'public' else f' WITH SCHEMA {sql.quote_ident(schema)}') + ';'
+          for name, schema in sorted(catalog.extensions.items())]
+         + [f'CREATE SCHEMA IF NOT EXISTS {sql.quote_ident(s)};' for s in schemas]
+         + [f'CREATE SEQUENCE IF NOT EXISTS {s};' for s in sequences]),
+        ('FUNCTIONS', [function_sql(f) for f in early]),
+        ('TABLES', [table_sql(t) for t in catalog.tables.values()]),
+        ('FUNCTIONS OVER TABLE ROW TYPES', [function_sql(f) for f in on_tables]),
+        ('VIEWS', [view_sql(catalog.views[key]) for key in _view_order(catalog.views)]
+         + [function_sql(f) for f in on_views]),
+        ('FOREIGN KEYS', [foreign_keys_sql(t, t.foreign_keys) for t in catalog.tables.values() if t.foreign_keys]),
+        ('INDEXES', [index_sql(i) for i in catalog.indexes() if i.constraint is None]),
+        ('TRIGGERS', [trigger_sql(t) for t in catalog.triggers()]),
+        ('ROW LEVEL SECURITY',
+         [f'ALTER TABLE {sql.qualified(*t.key)} ENABLE ROW LEVEL SECURITY;'
+          for t in catalog.tables.values() if t.rls_enabled]
+         + [f'ALTER TABLE {sql.qualified(*t.key)} FORCE ROW LEVEL SECURITY;'
+            for t in catalog.tables.values() if t.rls_forced]
+         + [policy_mod.batched_sql(list(t.policies.values())) for t in catalog.tables.values() if t.policies]),
+        ('COMMENTS', _comments(catalog)),
+    ]
+    return [(title, statements) for title, statements in out if statements]
+
+
+def render(catalog, inputs):
+    summary = catalog.summary()
+    out = [policy_mod.header(
+        'SQUASHED SCHEMA (generated by pgtools squash)',
+        [f'Final state of {len(inputs)} files: {summary["tables"]} tables, {summary["functions"]} functions,',
+         f'{summary["views"]} views, {summary["indexes"]} indexes, {summary["triggers"]} triggers, '
+         f'{summary["policies"]} policies.',
+         'Idempotent: safe to re-run. Schema only; seed data is not included.'],
+    ).rstrip('\n'), '', 'BEGIN;', '', 'SET LOCAL check_function_bodies = false;']
+    for title, statements in sections(catalog):
+        out += ['', policy_mod.RULE, f'-- {title}', policy_mod.RULE, '']
+        out.append('\n\n'.join(statements))
+    out += ['', 'COMMIT;']
+    out.append(policy_mod.footer(f'COMPLETED: schema squashed from {len(inputs)} files').rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+# ---------------------------------------------------------------------------
+# Verification
+# ---------------------------------------------------------------------------
+
+def _function_state(function):
+    return (function.returns, function.language and function.language.lower(), function.volatility,
+            function.security_definer, function.parallel, function.strict, tuple(sorted(function.config.items())),
+            (function.body or '').strip())
+
+
+def differences(original, squashed):
+    """What the squashed script's catalog gets wrong compared with the replayed one."""
+    out = []
+    for direction, a, b in (('missing', original, squashed), ('extra', squashed, original)):
+        for kind, names in catalog_mod.missing(a, b).items():
+            out += [f'{direction} {kind[:-1]} {name}' for name in names]
+    for key, table in original.tables.items():
+        other = squashed.tables.get(key)
+        if other is None:
+            continue
+        for name, column in table.columns.items():
+            if name in other.columns and other.columns[name].sql() != column.sql():
+                out.append(f'column {table.name}.{name}: {column.sql()} -> {other.columns[name].sql()}')
+        for name, constraint in table.constraints.items():
+            theirs = other.constraints.get(name)
+            if theirs is None or theirs.definition() != constraint.definition():
+                out.append(f'constraint {table.name}.{name}')
+        for name, index in table.indexes.items():
+            theirs = other.indexes.get(name)
+            if theirs is None or theirs.sql() != index.sql():
+                out.append(f'index {name}')
+        for name, policy in table.policies.items():
+            if name in other.policies and other.policies[name] != policy:
+                out.append(f'policy {name!r} on {table.name}')
+        if (table.rls_enabled, table.rls_forced) != (other.rls_enabled, other.rls_forced):
+            out.append(f'row level security on {table.name}')
+    for key, function in original.functions.items():
+        theirs = squashed.functions.get(key)
+        if theirs is not None and _function_state(theirs) != _function_state(function):
+            out.append(f'function {function.signature}')
+    return out
+
+
+def _statement_count(paths):
+    total = 0
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            total += sum(1 for _ in sql.split_statements(f.read()))
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools squash',
+        description='Replay migrations into the schema catalog and emit one idempotent script of the final state.')
+    parser.add_argument('inputs', nargs='*', metavar='GLOB',
+                        help='SQL files/globs in run order (default: production_schema.sql, then the migrations '
+                             'in pgtools plan order)')
+    parser.add_argument('-o', '--output', help='write the script here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    try:
+        paths = index_mod.expand_inputs(args.inputs) if args.inputs else default_inputs()
+        if not paths:
+            raise ValueError(f'no SQL files match {" ".join(args.inputs)}')
+        original = catalog_mod.load(paths)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    script = render(original, paths)
+    squashed = catalog_mod.Catalog()
+    squashed.apply_sql(script, args.output or '<squashed>')
+    diffs = differences(original, squashed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(script)
+    else:
+        sys.stdout.write(script)
+    before = _statement_count(paths)
+    after = sum(1 for _ in sql.split_statements(script))
+    print(f'✓ Squashed {len(paths)} files, {before} statements -> {after} statements'
+          + (f' into {args.output}' if args.output else ''), file=sys.stderr)
+    if diffs:
+        print(f'⚠ {len(diffs)} differences between the replayed and the squashed schema:', file=sys.stderr)
+        for diff in diffs[:50]:
+            print(f'   {diff}', file=sys.stderr)
+        return 1
+    print('✓ Replaying the squashed script gives the same catalog', file=sys.stderr)
+    return 0
@@ -0,0 +1,777 @@
+"""
+Synthetic dataset generator with COPY-format output.
+
+database/seed-essential-data.sql and scripts/seed-test-data.js insert a few
+hundred rows; nothing realistic exists to load test against. This generates
+organizers, events, ticket types, orders, tickets, contacts and email
+tracking events at any scale (--orders 1e6 and beyond), together with the
+auth.users / profiles rows they point at, as Postgres COPY text.
+
+Every row is a pure function of (seed, table, row number): ids are hashed
+from the row number, and a child recomputes the parent attributes it needs
+(an order's event, buyer and line items) instead of looking them up. Each
+table is therefore cut into independent chunks that a process pool
+generates in any order, memory stays bounded by the chunk size, and the
+same seed and scale always give the same dataset, so one table can be
+regenerated later and still match the rest.
+
+Columns come from the schema catalog: generated columns the schema does
+not have are dropped, NOT NULL columns without a default that the model
+does not know get a filler value by type, status values are taken from the
+CHECK constraints, and strings are cut to the varchar length. Everything
+else is left to the column defaults.
+
+Output is either one psql-ready script on stdout (COPY ... FROM stdin per
+table) or, with -o DIR, one file per chunk plus load.sql (sequential) and
+load.sh (the chunks of each table in parallel, tables in foreign-key order).
+Both load with session_replication_role = replica, so row triggers (contact
+sync, counters, automations) do not run; the denormalized counters are
+recomputed at the end instead.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools synth --orders 10000 | psql "$DATABASE_URL"
+    PYTHONPATH=scripts python3 -m pgtools synth --orders 1e6 -o /tmp/ticketrack-1m
+    DATABASE_URL=... JOBS=8 sh /tmp/ticketrack-1m/load.sh
+    PYTHONPATH=scripts python3 -m pgtools synth --orders 1e6 --tables public.tickets -o /tmp/tickets-only
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from . import catalog as catalog_mod
+from . import sql
+
+# Tables in foreign-key order, with the unit each one is generated per
+TABLES = (
+    ('auth.users', 'users'),
+    ('public.profiles', 'users'),
+    ('public.organizers', 'organizers'),
+    ('public.events', 'events'),
+    ('public.ticket_types', 'events'),
+    ('public.orders', 'orders'),
+    ('public.tickets', 'orders'),
+    ('public.contacts', 'orders'),
+    ('public.email_tracking_events', 'orders'),
+)
+
+# auth.users is owned by Supabase and not in the catalog: the columns both it
+# and the db.SUPABASE_SHIM version have
+_AUTH_USERS = ('id', 'email', 'raw_user_meta_data', 'created_at')
+
+# Scale, relative to --orders
+ORDERS_PER_EVENT = 100
+EVENTS_PER_ORGANIZER = 5
+ORDERS_PER_BUYER = 3
+
+CHUNK = 20_000          # units per task
+_DAY = 86_400
+
+# (country, currency, cities, price unit, weight)
+COUNTRIES = (
+    ('NG', 'NGN', ('Lagos', 'Abuja', 'Port Harcourt', 'Ibadan', 'Enugu'), 1000, 60),
+    ('GH', 'GHS', ('Accra', 'Kumasi', 'Takoradi'), 10, 12),
+    ('KE', 'KES', ('Nairobi', 'Mombasa', 'Kisumu'), 100, 10),
+    ('ZA', 'ZAR', ('Johannesburg', 'Cape Town', 'Durban'), 10, 6),
+    ('GB', 'GBP', ('London', 'Manchester', 'Birmingham'), 1, 6),
+    ('US', 'USD', ('New York', 'Houston', 'Atlanta'), 1, 6),
+)
+_PAYSTACK = ('NGN', 'GHS', 'KES', 'ZAR')
+
+FIRST_NAMES = '''
+    Adebayo Chidinma Oluwaseun Ngozi Emeka Aisha Yusuf Fatima Chukwuemeka Amara Obiora Tochukwu
+    Adaeze Ikenna Chiamaka Nneka Chinedu Adeola Kunle Tunde Bukola Folake Kwame Ama Kofi Akosua
+    Wanjiru Otieno Achieng Thabo Lerato Sipho James Sarah Michael Grace David Mary
+'''.split()
+LAST_NAMES = '''
+    Okonkwo Adeyemi Ibrahim Okafor Mohammed Eze Bello Abubakar Nwachukwu Obi Chukwu Okoro Ogbonna
+    Nwosu Igwe Amadi Mensah Boateng Owusu Asante Kamau Mwangi Odhiambo Ndlovu Dlamini Smith Johnson
+'''.split()
+_EVENT_WORDS = ('Lagos', 'Naija', 'Afro', 'Summer', 'Annual', 'International', 'Ultimate', 'City', 'Island')
+_EVENT_KINDS = ('Music Festival', 'Tech Conference', 'Comedy Night', 'Art Exhibition', 'Food Fair',
+                'Networking Mixer', 'Fashion Week', 'Gospel Concert', 'Workshop', 'Beach Party')
+_CATEGORIES = ('music', 'conference', 'party', 'workshop', 'networking', 'comedy', 'art', 'food')
+_TICKET_NAMES = ('Regular', 'VIP', 'Early Bird', 'VVIP', 'Table for 4', 'Student')
+_PRICE_STEPS = (5, 10, 15, 20, 25, 50, 100)
+_DEVICES = ('mobile', 'desktop', 'tablet')
+_CLIENTS = ('Gmail', 'Apple Mail', 'Outlook', 'Yahoo Mail')
+
+# Preferred status mix; values a CHECK constraint does not allow are dropped
+_EVENT_STATUS = {'published': 75, 'completed': 15, 'draft': 5, 'cancelled': 5}
+_ORDER_STATUS = {'completed': 85, 'pending': 6, 'failed': 4, 'refunded': 3, 'cancelled': 2}
+_VERIFICATION = {'bronze': 60, 'silver': 30, 'gold': 10}
+_TICKETS_PER_ORDER = {1: 60, 2: 25, 3: 10, 4: 5}
+_TRACKING_PER_CONTACT = {0: 30, 1: 35, 2: 20, 3: 10, 4: 5}
+
+_MASK = (1 << 64) - 1
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+_CHECK_VALUE_RE = re.compile(r"'((?:[^']|'')*)'")
+_LENGTH_RE = re.compile(r'character(?: varying)?\((\d+)\)')
+
+
+class _Rng:
+    """splitmix64: cheap to seed per row, which random.Random is not."""
+    __slots__ = ('state',)
+
+    def __init__(self, seed, salt, n):
+        self.state = (seed * 0x9E3779B97F4A7C15 ^ salt * 0xC2B2AE3D27D4EB4F ^ n) & _MASK
+
+    def next(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & _MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+        return z ^ (z >> 31)
+
+    def random(self):
+        return (self.next() >> 11) * (1.0 / (1 << 53))
+
+    def below(self, n):
+        return self.next() % n
+
+    def choice(self, seq):
+        return seq[self.next() % len(seq)]
+
+    def skewed(self, n, power=2.0):
+        """0..n-1, low numbers more likely (popular events, busy organizers)."""
+        return min(n - 1, int(n * self.random() ** power))
+
+    def weighted(self, weights):
+        """A key of ``weights`` ({value: weight}), by weight."""
+        total = sum(weights.values())
+        point = self.random() * total
+        for value, weight in weights.items():
+            point -= weight
+            if point < 0:
+                return value
+        return value
+
+    def uuid(self):
+        h = f'{self.next():016x}{self.next():016x}'
+        return f'{h[:8]}-{h[8:12]}-4{h[13:16]}-{"89ab"[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}'
+
+
+@lru_cache(maxsize=None)
+def _salt(name):
+    value = 0
+    for ch in name:
+        value = (value * 131 + ord(ch)) & _MASK
+    return value
+
+
+def _ts(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S+00')
+
+
+def _money(value):
+    return f'{value:.2f}'
+
+
+def allowed_values(table, column):
+    """Values a CHECK constraint on ``column`` alone allows, or None."""
+    for constraint in table.constraints.values():
+        if constraint.kind != catalog_mod.CHECK or not constraint.expr:
+            continue
+        words = {t.text.lower() for t in sql.tokenize(constraint.expr) if t.kind in (sql.WORD, sql.QIDENT)}
+        if column in words and not words & {c for c in table.columns if c != column}:
+            values = [v.replace("''", "'") for v in _CHECK_VALUE_RE.findall(constraint.expr)]
+            if values:
+                return frozenset(values)
+    return None
+
+
+def _filler(type_):
+    """Value for a NOT NULL column without default that the model does not generate."""
+    if type_ == 'uuid':
+        return lambda rng, n: rng.uuid()
+    if type_ in ('integer', 'bigint', 'smallint') or type_.startswith('numeric') or type_ in ('real',
+                                                                                              'double precision'):
+        return lambda rng, n: 0
+    if type_ == 'boolean':
+        return lambda rng, n: False
+    if type_.startswith('timestamp') or type_ == 'date':
+        return lambda rng, n: _ts(0)
+    if type_ in ('json', 'jsonb'):
+        return lambda rng, n: '{}'
+    if type_.endswith('[]'):
+        return lambda rng, n: '{}'
+    return lambda rng, n: f'synthetic-{n}'
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+class Model:
+    """Deterministic rows for every table, from the scale, seed and catalog."""
+
+    def __init__(self, catalog, orders, seed=1, start='2025-01-01', days=365):
+        self.seed = seed
+        self.orders = orders
+        self.events = max(1, orders // ORDERS_PER_EVENT)
+        self.organizers = max(1, self.events // EVENTS_PER_ORGANIZER)
+        self.buyers = max(1, orders // ORDERS_PER_BUYER)
+        self.users = self.organizers + self.buyers
+        self.start = datetime.strptime(start, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+        self.days = days
+        self.now = self.start + days * _DAY
+        self.columns = {}         # table -> [column]
+        self.fillers = {}         # table -> {column: filler}
+        self.lengths = {}         # table -> [max length or None], per column
+        self.notes = []
+        self.allowed = {}
+        for name, _ in TABLES:
+            self._columns(catalog, name)
+        self._event_cache = {}
+
+    @property
+    def units(self):
+        return {'users': self.users, 'organizers': self.organizers, 'events': self.events, 'orders': self.orders}
+
+    def _columns(self, catalog, name):
+        generated = list(self.row_keys(name))
+        if name == 'auth.users':
+            self.columns[name] = generated
+            self.fillers[name] = {}
+            self.lengths[name] = [None] * len(generated)
+            return
+        table = catalog.table(name)
+        if table is None:
+            raise ValueError(f'{name} is not in the catalog; pass --input with the schema that creates it')
+        missing = [c for c in generated if c not in table.columns]
+        if missing:
+            self.notes.append(f'{name}: not in the schema, skipped: {", ".join(missing)}')
+        fillers = {c.name: _filler(c.type) for c in table.columns.values()
+                   if c.not_null and c.default is None and not c.generated and not c.identity
+                   and c.name not in generated}
+        if fillers:
+            self.notes.append(f'{name}: filler values for {", ".join(fillers)}')
+        columns = [c for c in table.columns if c in generated or c in fillers]
+        self.columns[name] = columns
+        self.fillers[name] = fillers
+        self.lengths[name] = [int(m.group(1)) if (m := _LENGTH_RE.fullmatch(table.columns[c].type)) else None
+                              for c in columns]
+        for column in columns:
+            values = allowed_values(table, column)
+            if values:
+                self.allowed[(name, column)] = values
+
+    def _pick(self, rng, table, column, weights):
+        allowed = self.allowed.get((table, column))
+        if allowed:
+            weights = {k: w for k, w in weights.items() if k in allowed} or dict.fromkeys(sorted(allowed), 1)
+        return rng.weighted(weights)
+
+    @staticmethod
+    def row_keys(name):
+        """The columns the model generates for a table."""
+        return {
+            'auth.users': _AUTH_USERS,
+            'public.profiles': ('id', 'email', 'full_name', 'first_name', 'last_name', 'phone', 'country_code',
+                                'role', 'city', 'is_verified', 'created_at', 'updated_at'),
+            'public.organizers': ('id', 'user_id', 'business_name', 'business_email', 'business_phone',
+                                  'email', 'phone', 'country_code', 'is_verified', 'verification_level',
+                                  'verified_at', 'is_active', 'kyc_status', 'kyc_verified', 'payout_currency',
+                                  'location', 'created_at', 'updated_at'),
+            'public.events': ('id', 'organizer_id', 'country_code', 'title', 'slug', 'description', 'venue_name',
+                              'venue_address', 'city', 'start_date', 'end_date', 'status', 'is_free',
+                              'total_capacity', 'category', 'currency', 'created_at', 'updated_at',
+                              'published_at'),
+            'public.ticket_types': ('id', 'event_id', 'name', 'price', 'currency', 'quantity_available',
+                                    'max_per_order', 'sort_order', 'is_active', 'created_at', 'updated_at'),
+            'public.orders': ('id', 'order_number', 'user_id', 'event_id', 'organizer_id', 'status', 'subtotal',
+                              'platform_fee', 'tax_amount', 'total_amount', 'currency', 'payment_method',
+                              'payment_reference', 'payment_provider', 'paid_at', 'buyer_name', 'buyer_email',
+                              'buyer_phone', 'created_at', 'updated_at'),
+            'public.tickets': ('id', 'event_id', 'ticket_type_id', 'user_id', 'order_id', 'attendee_name',
+                               'attendee_email', 'attendee_phone', 'ticket_code', 'quantity', 'unit_price',
+                               'total_price', 'currency', 'payment_reference', 'payment_status', 'payment_method',
+                               'status', 'is_checked_in', 'checked_in_at', 'created_at', 'updated_at'),
+            'public.contacts': ('id', 'organizer_id', 'email', 'phone', 'full_name', 'source_type', 'source_id',
+                                'first_contact_at', 'last_contact_at', 'total_events_attended', 'total_spent',
+                                'created_at', 'updated_at'),
+            'public.email_tracking_events': ('id', 'tracking_id', 'event_type', 'link_url', 'recipient_email',
+                                             'contact_id', 'organizer_id', 'first_event_at', 'last_event_at',
+                                             'device_type', 'email_client', 'country', 'city', 'created_at'),
+        }[name]
+
+    # -- ids --------------------------------------------------------------
+
+    def uid(self, kind, n):
+        return _Rng(self.seed, _salt(kind), n).uuid()
+
+    def _rng(self, kind, n):
+        return _Rng(self.seed, _salt(kind) + 1, n)
+
+    # -- entities ---------------------------------------------------------
+
+    def user(self, u):
+        rng = self._rng('users', u)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        country = rng.weighted({c: c[4] for c in COUNTRIES})
+        return {
+            'id': self.uid('users', u),
+            'first': first, 'last': last, 'name': f'{first} {last}',
+            'email': f'{first}.{last}.{u}@example.com'.lower(),
+            'phone': f'+2348{u:09d}',
+            'country': country,
+            'city': rng.choice(country[2]),
+            'created': self.start - rng.random() * 365 * _DAY,
+        }
+
+    def organizer(self, o):
+        rng = self._rng('organizers', o)
+        owner = self.user(o)
+        return {
+            'id': self.uid('organizers', o),
+            'owner': owner,
+            'name': f'{rng.choice(_EVENT_WORDS)} {rng.choice(_EVENT_KINDS).split()[0]} {rng.choice(("Hub", "Live", "Events", "Collective", "Entertainment"))}',
+            'country': owner['country'],
+            'created': owner['created'] + rng.random() * 30 * _DAY,
+            'rng': rng,
+        }
+
+    def event(self, e):
+        cached = self._event_cache.get(e)
+        if cached is not None:
+            return cached
+        rng = self._rng('events', e)
+        o = rng.skewed(self.organizers)
+        organizer = self.organizer(o)
+        country = organizer['country']
+        start = self.start + rng.random() * self.days * _DAY
+        start -= start % 1800
+        types = []
+        for k in range(1 + rng.below(4)):
+            price = 0 if k == 0 and rng.random() < 0.05 else country[3] * rng.choice(_PRICE_STEPS) * (k + 1)
+            types.append((e * 4 + k, _TICKET_NAMES[k if k else 0] if k else 'Regular', price,
+                          100 * (1 + rng.below(20))))
+        event = {
+            'id': self.uid('events', e),
+            'organizer': o,
+            'organizer_id': organizer['id'],
+            'country': country,
+            'city': rng.choice(country[2]),
+            'title': f'{rng.choice(_EVENT_WORDS)} {rng.choice(_EVENT_KINDS)} {datetime.fromtimestamp(start, timezone.utc).year}',
+            'category': rng.choice(_CATEGORIES),
+            'start': start,
+            'created': start - (7 + rng.random() * 113) * _DAY,
+            'status': self._pick(rng, 'public.events', 'status', _EVENT_STATUS),
+            'types': types,
+        }
+        if len(self._event_cache) > 65_536:
+            self._event_cache.clear()
+        self._event_cache[e] = event
+        return event
+
+    def order(self, i):
+        rng = self._rng('orders', i)
+        event = self.event(rng.skewed(self.events, 1.5))
+        buyer = self.user(self.organizers + rng.below(self.buyers))
+        created = event['created'] + rng.random() * max(event['start'] - event['created'], 3600)
+        items = []
+        for j in range(rng.weighted(_TICKETS_PER_ORDER)):
+            n, _, price, _ = rng.choice(event['types'])
+            items.append((i * 4 + j, n, price))
+        subtotal = sum(price for _, _, price in items)
+        fee = round(subtotal * 0.05, 2)
+        return {
+            'n': i,
+            'id': self.uid('orders', i),
+            'event': event,
+            'buyer': buyer,
+            'created': created,
+            'status': self._pick(rng, 'public.orders', 'status', _ORDER_STATUS),
+            'items': items,
+            'subtotal': subtotal,
+            'fee': fee,
+            'total': subtotal + fee,
+            'reference': f'ps_{rng.next():016x}',
+            'rng': rng,
+        }
+
+    # -- rows -------------------------------------------------------------
+
+    def rows(self, name, start, stop):
+        """Rows of ``name`` for units start..stop-1, as dicts."""
+        return getattr(self, '_rows_' + name.rpartition('.')[2])(start, stop)
+
+    def _rows_users(self, start, stop):
+        for u in range(start, stop):
+            user = self.user(u)
+            yield {'id': user['id'], 'email': user['email'],
+                   'raw_user_meta_data': json.dumps({'full_name': user['name']}),
+                   'created_at': _ts(user['created'])}
+
+    def _rows_profiles(self, start, stop):
+        for u in range(start, stop):
+            user = self.user(u)
+            yield {'id': user['id'], 'email': user['email'], 'full_name': user['name'], 'first_name': user['first'],
+                   'last_name': user['last'], 'phone': user['phone'], 'country_code': user['country'][0],
+                   'role': 'organizer' if u < self.organizers else 'user', 'city': user['city'],
+                   'is_verified': True, 'created_at': _ts(user['created']), 'updated_at': _ts(user['created'])}
+
+    def _rows_organizers(self, start, stop):
+        for o in range(start, stop):
+            org = self.organizer(o)
+            rng = org['rng']
+            verified = rng.random() < 0.6
+            owner = org['owner']
+            created = _ts(org['created'])
+            yield {'id': org['id'], 'user_id': owner['id'], 'business_name': org['name'],
+                   'business_email': f'hello+{o}@example.com', 'business_phone': owner['phone'],
+                   'email': owner['email'], 'phone': owner['phone'], 'country_code': org['country'][0],
+                   'is_verified': verified,
+                   'verification_level': self._pick(rng, 'public.organizers', 'verification_level', _VERIFICATION)
+                   if verified else None,
+                   'verified_at': created if verified else None, 'is_active': True,
+                   'kyc_status': 'approved' if verified else 'pending', 'kyc_verified': verified,
+                   'payout_currency': org['country'][1], 'location': owner['city'],
+                   'created_at': created, 'updated_at': created}
+
+    def _rows_events(self, start, stop):
+        for e in range(start, stop):
+            event = self.event(e)
+            slug = re.sub(r'[^a-z0-9]+', '-', event['title'].lower()).strip('-')
+            free = all(price == 0 for _, _, price, _ in event['types'])
+            created = _ts(event['created'])
+            yield {'id': event['id'], 'organizer_id': event['organizer_id'], 'country_code': event['country'][0],
+                   'title': event['title'], 'slug': f'{slug}-{e}',
+                   'description': f'{event["title"]} in {event["city"]}.',
+                   'venue_name': f'{event["city"]} Event Centre', 'venue_address': f'{1 + e % 200} Main Road, '
+                                                                                    f'{event["city"]}',
+                   'city': event['city'], 'start_date': _ts(event['start']),
+                   'end_date': _ts(event['start'] + 5 * 3600), 'status': event['status'], 'is_free': free,
+                   'total_capacity': sum(t[3] for t in event['types']), 'category': event['category'],
+                   'currency': event['country'][1], 'created_at': created, 'updated_at': created,
+                   'published_at': created if event['status'] != 'draft' else None}
+
+    def _rows_ticket_types(self, start, stop):
+        for e in range(start, stop):
+            event = self.event(e)
+            created = _ts(event['created'])
+            for k, (n, name, price, quantity) in enumerate(event['types']):
+                yield {'id': self.uid('ticket_types', n), 'event_id': event['id'], 'name': name,
+                       'price': _money(price), 'currency': event['country'][1], 'quantity_available': quantity,
+                       'max_per_order': 10, 'sort_order': k, 'is_active': True, 'created_at': created,
+                       'updated_at': created}
+
+    def _rows_orders(self, start, stop):
+        for i in range(start, stop):
+            order = self.order(i)
+            event, buyer = order['event'], order['buyer']
+            currency = event['country'][1]
+            completed = order['status'] == 'completed'
+            created = _ts(order['created'])
+            yield {'id': order['id'], 'order_number': f'TR{i:010d}', 'user_id': buyer['id'],
+                   'event_id': event['id'], 'organizer_id': event['organizer_id'], 'status': order['status'],
+                   'subtotal': _money(order['subtotal']), 'platform_fee': _money(order['fee']),
+                   'tax_amount': '0.00', 'total_amount': _money(order['total']), 'currency': currency,
+                   'payment_method': 'card', 'payment_reference': order['reference'],
+                   'payment_provider': 'paystack' if currency in _PAYSTACK else 'stripe',
+                   'paid_at': _ts(order['created'] + 60) if completed else None, 'buyer_name': buyer['name'],
+                   'buyer_email': buyer['email'], 'buyer_phone': buyer['phone'], 'created_at': created,
+                   'updated_at': created}
+
+    def _rows_tickets(self, start, stop):
+        for i in range(start, stop):
+            order = self.order(i)
+            event, buyer, rng = order['event'], order['buyer'], order['rng']
+            completed = order['status'] == 'completed'
+            attended = completed and event['start'] < self.now
+            created = _ts(order['created'])
+            for n, tt, price in order['items']:
+                checked_in = attended and rng.random() < 0.7
+                yield {'id': self.uid('tickets', n), 'event_id': event['id'],
+                       'ticket_type_id': self.uid('ticket_types', tt), 'user_id': buyer['id'],
+                       'order_id': order['id'], 'attendee_name': buyer['name'], 'attendee_email': buyer['email'],
+                       'attendee_phone': buyer['phone'], 'ticket_code': f'TKT-{n:010X}', 'quantity': 1,
+                       'unit_price': _money(price), 'total_price': _money(price),
+                       'currency': event['country'][1], 'payment_reference': order['reference'],
+                       'payment_status': order['status'], 'payment_method': 'card',
+                       'status': 'active' if completed else 'cancelled', 'is_checked_in': checked_in,
+                       'checked_in_at': _ts(event['start'] + rng.random() * 3 * 3600) if checked_in else None,
+                       'created_at': created, 'updated_at': created}
+
+    def _rows_contacts(self, start, stop):
+        for i in range(start, stop):
+            order = self.order(i)
+            if order['status'] != 'completed':
+                continue
+            buyer = order['buyer']
+            created = _ts(order['created'])
+            yield {'id': self.uid('contacts', i), 'organizer_id': order['event']['organizer_id'],
+                   'email': buyer['email'], 'phone': buyer['phone'], 'full_name': buyer['name'],
+                   'source_type': 'ticket', 'source_id': self.uid('tickets', order['items'][0][0]),
+                   'first_contact_at': created, 'last_contact_at': created, 'total_events_attended': 1,
+                   'total_spent': _money(order['total']), 'created_at': created, 'updated_at': created}
+
+    def _rows_email_tracking_events(self, start, stop):
+        for i in range(start, stop):
+            order = self.order(i)
+            if order['status'] != 'completed':
+                continue
+            rng = self._rng('email_tracking_events', i)
+            buyer, event = order['buyer'], order['event']
+            for m in range(rng.weighted(_TRACKING_PER_CONTACT)):
+                click = m > 0 and rng.random() < 0.4
+                at = _ts(order['created'] + rng.random() * 30 * _DAY)
+                yield {'id': self.uid('email_tracking_events', i * 8 + m), 'tracking_id': f'trk_{i:x}_{m}',
+                       'event_type': 'click' if click else 'open',
+                       'link_url': f'https://ticketrack.com/e/{event["id"]}' if click else None,
+                       'recipient_email': buyer['email'], 'contact_id': self.uid('contacts', i),
+                       'organizer_id': event['organizer_id'], 'first_event_at': at, 'last_event_at': at,
+                       'device_type': rng.choice(_DEVICES), 'email_client': rng.choice(_CLIENTS),
+                       'country': buyer['country'][0], 'city': buyer['city'], 'created_at': at}
+
+    # -- COPY text --------------------------------------------------------
+
+    def copy_text(self, name, start, stop):
+        """COPY text of ``name`` for units start..stop-1; returns (rows, text)."""
+        columns = self.columns[name]
+        fillers = self.fillers[name]
+        lengths = self.lengths[name]
+        kind = name.rpartition('.')[2]
+        lines = []
+        for row in self.rows(name, start, stop):
+            if fillers:
+                rng = _Rng(self.seed, _salt(kind) + 2, len(lines) + start)
+                for column, filler in fillers.items():
+                    row[column] = filler(rng, start + len(lines))
+            fields = []
+            for column, length in zip(columns, lengths):
+                value = row.get(column)
+                if value is None:
+                    fields.append('\\N')
+                elif value is True:
+                    fields.append('t')
+                elif value is False:
+                    fields.append('f')
+                elif type(value) is str:
+                    fields.append((value[:length] if length else value).translate(_ESCAPES))
+                else:
+                    fields.append(str(value))
+            lines.append('\t'.join(fields))
+        return len(lines), '\n'.join(lines) + '\n' if lines else ''
+
+
+def copy_command(model, name, source='stdin'):
+    columns = ', '.join(sql.quote_ident(c) for c in model.columns[name])
+    schema, _, table = name.partition('.')
+    return f'COPY {sql.qualified(schema, table)} ({columns}) FROM {source}'
+
+
+FINISH_SQL = """\
+-- Denormalized counters the skipped row triggers would have kept
+UPDATE public.ticket_types tt SET quantity_sold = s.n
+FROM (SELECT ticket_type_id, count(*) AS n FROM public.tickets
+      WHERE payment_status = 'completed' GROUP BY ticket_type_id) s
+WHERE tt.id = s.ticket_type_id;
+
+UPDATE public.events e SET tickets_sold = s.n, total_revenue = s.revenue
+FROM (SELECT event_id, count(*) AS n, sum(total_price) AS revenue FROM public.tickets
+      WHERE payment_status = 'completed' GROUP BY event_id) s
+WHERE e.id = s.event_id;
+
+UPDATE public.organizers o SET total_events = s.events, total_tickets_sold = s.tickets, total_revenue = s.revenue
+FROM (SELECT organizer_id, count(*) AS events, sum(tickets_sold) AS tickets, sum(total_revenue) AS revenue
+      FROM public.events GROUP BY organizer_id) s
+WHERE o.id = s.organizer_id;
+
+ANALYZE auth.users, public.profiles, public.organizers, public.events, public.ticket_types,
+        public.orders, public.tickets, public.contacts, public.email_tracking_events;
+"""
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+_MODEL = None
+
+
+def _init_worker(model):
+    global _MODEL
+    _MODEL = model
+
+
+def _generate(name, start, stop, path):
+    """Worker task: one chunk, written to ``path`` or returned as text."""
+    rows, text = _MODEL.copy_text(name, start, stop)
+    if path is None:
+        return rows, text
+    data = text.encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+    return rows, len(data)
+
+
+def chunks(model, name, unit, chunk=CHUNK):
+    total = model.units[unit]
+    return [(start, min(start + chunk, total)) for start in range(0, total, chunk)]
+
+
+def _ordered(pool, name, spans, paths, window):
+    """Results of the chunk tasks in order, with at most ``window`` in flight."""
+    pending = deque()
+    tasks = iter(zip(spans, paths))
+    for (start, stop), path in tasks:
+        pending.append(pool.submit(_generate, name, start, stop, path))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class Stats:
+    __slots__ = ('table', 'rows', 'bytes', 'parts', 'seconds')
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.bytes = 0
+        self.parts = []
+        self.seconds = 0.0
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def generate(model, tables, out=None, jobs=None, chunk=CHUNK, progress=None):
+    """Generate ``tables`` into directory ``out`` (or stdout); returns [Stats]."""
+    jobs = jobs or os.cpu_count() or 4
+    results = []
+    stream = sys.stdout
+    if out is None:
+        stream.write("SET session_replication_role = replica;\nSET synchronous_commit = off;\n\n")
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(model,)) as pool:
+        for name, unit in TABLES:
+            if name not in tables:
+                continue
+            stats = Stats(name)
+            started = time.monotonic()
+            spans = chunks(model, name, unit, chunk)
+            if out is not None:
+                os.makedirs(os.path.join(out, name), exist_ok=True)
+                paths = [os.path.join(out, name, f'{k:05d}.copy') for k in range(len(spans))]
+                stats.parts = [os.path.relpath(p, out) for p in paths]
+            else:
+                paths = [None] * len(spans)
+                stream.write(copy_command(model, name) + ';\n')
+            for rows, data in _ordered(pool, name, spans, paths, 2 * jobs):
+                stats.rows += rows
+                if out is None:
+                    stream.write(data)
+                    stats.bytes += len(data)
+                else:
+                    stats.bytes += data
+            if out is None:
+                stream.write('\\.\n\n')
+            stats.seconds = time.monotonic() - started
+            results.append(stats)
+            if progress:
+                progress(stats)
+    if out is None:
+        stream.write('RESET session_replication_role;\n\n' + FINISH_SQL)
+    else:
+        _write_loaders(model, out, results)
+    return results
+
+
+def _write_loaders(model, out, results):
+    with open(os.path.join(out, 'finish.sql'), 'w') as f:
+        f.write(FINISH_SQL)
+    lines = ['-- cd DIR && psql -f load.sql: every chunk in one session, tables in foreign-key order',
+             '\\set ON_ERROR_STOP on', 'SET session_replication_role = replica;',
+             'SET synchronous_commit = off;', '']
+    for stats in results:
+        for part in stats.parts:
+            lines.append('\\' + copy_command(model, stats.table, sql.quote_literal(part)))
+    lines += ['', 'RESET session_replication_role;', '\\ir finish.sql', '']
+    with open(os.path.join(out, 'load.sql'), 'w') as f:
+        f.write('\n'.join(lines))
+    script = ['#!/bin/sh',
+              '# Loads the chunks of each table in parallel ($JOBS psql sessions), tables in foreign-key order.',
+              'set -e', ': "${DATABASE_URL:?set DATABASE_URL}"', 'JOBS=${JOBS:-4}', 'cd "$(dirname "$0")"',
+              "export PGOPTIONS='-c session_replication_role=replica -c synchronous_commit=off'", '']
+    for stats in results:
+        command = copy_command(model, stats.table, "'\\''{}'\\''")
+        script.append(f'echo "{stats.table}"')
+        script.append(f"ls {stats.table}/*.copy | xargs -P \"$JOBS\" -I{{}} "
+                      f"psql \"$DATABASE_URL\" -q -v ON_ERROR_STOP=1 -c '\\{command}'")
+    script += ['', 'PGOPTIONS= psql "$DATABASE_URL" -q -v ON_ERROR_STOP=1 -f finish.sql', '']
+    path = os.path.join(out, 'load.sh')
+    with open(path, 'w') as f:
+        f.write('\n'.join(script))
+    os.chmod(path, 0o755)
+    with open(os.path.join(out, 'manifest.json'), 'w') as f:
+        json.dump({'seed': model.seed, 'orders': model.orders, 'units': model.units,
+                   'columns': model.columns, 'tables': [s.to_dict() for s in results]}, f, indent=2)
+
+
+def _count(text):
+    return int(float(text))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools synth',
+        description='Generate a referentially consistent synthetic dataset as COPY text.')
+    parser.add_argument('--orders', type=_count, default=10_000,
+                        help='orders to generate; everything else scales with it (default: 10000, 1e6 works)')
+    parser.add_argument('--seed', type=int, default=1, help='same seed and scale, same dataset (default: 1)')
+    parser.add_argument('--start', default='2025-01-01', help='first event date (default: 2025-01-01)')
+    parser.add_argument('--days', type=int, default=365, help='days the events are spread over (default: 365)')
+    parser.add_argument('--tables', action='append', metavar='TABLE',
+                        help='only these tables (repeatable; parents must be loaded with the same seed/scale)')
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='schema SQL for the catalog (default: all repo SQL)')
+    parser.add_argument('-o', '--output', metavar='DIR',
+                        help='write chunk files, load.sql and load.sh here (default: one script on stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 4,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk', type=int, default=CHUNK, help=f'units per task (default: {CHUNK})')
+    args = parser.parse_args(argv)
+
+    names = [name for name, _ in TABLES]
+    tables = set(names)
+    if args.tables:
+        tables = {t if '.' in t else f'public.{t}' for t in args.tables}
+        unknown = tables - set(names)
+        if unknown:
+            print(f'❌ unknown table {", ".join(sorted(unknown))} (one of {", ".join(names)})', file=sys.stderr)
+            return 2
+    try:
+        catalog = catalog_mod.load(args.inputs)
+        model = Model(catalog, args.orders, args.seed, args.start, args.days)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    for note in model.notes:
+        print(f'⚠ {note}', file=sys.stderr)
+    print(f'📋 {args.orders:,} orders, {model.events:,} events, {model.organizers:,} organizers, '
+          f'{model.users:,} users; {args.jobs} workers', file=sys.stderr)
+
+    def progress(stats):
+        rate = stats.rows / stats.seconds if stats.seconds else 0
+        print(f'   ✓ {stats.table:<30} {stats.rows:>12,} rows {stats.bytes / 1e6:>9.1f} MB '
+              f'{stats.seconds:>7.1f}s  {rate:>10,.0f} rows/s', file=sys.stderr)
+
+    started = time.monotonic()
+    try:
+        results = generate(model, tables, args.output, args.jobs, args.chunk, progress)
+    except OSError as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    total = sum(s.bytes for s in results)
+    print(f'✓ {sum(s.rows for s in results):,} rows, {total / 1e6:,.1f} MB in '
+          f'{time.monotonic() - started:.1f}s', file=sys.stderr)
+    if args.output:
+        print(f'✓ Generated {args.output} (load.sql, load.sh)', file=sys.stderr)
+    return 0
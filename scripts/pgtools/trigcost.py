@@ -0,0 +1,632 @@
+"""
+Trigger chain and per-row cost analyzer.
+
+An INSERT into ``tickets`` is one statement from the app's point of view, but
+every ROW trigger on the table runs its function once per row, each of those
+functions runs its own SELECT/UPDATE statements, and any DML they issue fires
+the triggers and foreign-key actions of the tables it touches. This module
+resolves that chain from the schema catalog for every table and DML event:
+
+  * ROW triggers that fire (UPDATE OF column lists are matched against the SET
+    list of the statement that caused them, TG_OP branches against the event)
+  * the statements each trigger function runs, including the functions it
+    calls, and the DML they issue, followed recursively
+  * foreign-key work: one RI check per foreign key on INSERT, one RI action
+    per referencing key on DELETE, ON DELETE CASCADE / SET NULL cascades
+  * index entries written by every INSERT in the chain
+
+and ranks the result as a "cost of one row" report. Chains that come back to
+a table/event already being processed are flagged as loops, statements inside
+a FOR/WHILE/LOOP body as per-iteration. AFTER ROW triggers that issue queries
+are listed as candidates for statement-level triggers with transition tables
+(``REFERENCING NEW TABLE AS ...``), which do the same work once per statement.
+
+Counts are upper bounds: the dearest branch of every IF/CASE is counted, loop
+bodies once per row.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools trigger-cost
+    PYTHONPATH=scripts python3 -m pgtools trigger-cost --tree tickets:INSERT
+    PYTHONPATH=scripts python3 -m pgtools trigger-cost --event INSERT --limit 10 --json
+"""
+
+import argparse
+import itertools
+import json
+import sys
+
+from . import catalog as catalog_mod
+from . import index as index_mod
+from . import sql
+
+EVENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+LOOP = 'loop'
+CASCADE = 'cascade'
+IN_LOOP = 'per-iteration DML'
+DYNAMIC = 'dynamic SQL'
+CONDITIONAL = 'conditional'
+RECURSIVE = 'recursive call'
+
+_VERBS = frozenset({'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'PERFORM', 'EXECUTE', 'WITH'})
+# plpgsql words that end a statement fragment (a condition, a loop header...)
+_BOUNDARIES = frozenset({'THEN', 'ELSE', 'LOOP', 'BEGIN', 'DECLARE', 'EXCEPTION'})
+# Words in front of UPDATE/DELETE that make it something other than DML
+_NOT_DML = frozenset({'FOR', 'KEY', 'ON', 'DO', 'BEFORE', 'AFTER', 'OR', 'OF'})
+_SET_END = frozenset({'WHERE', 'FROM', 'RETURNING'})
+
+_MAX_DEPTH = 16
+
+
+class Step:
+    """One SQL statement in a function body."""
+    __slots__ = ('text', 'line', 'is_query', 'dml', 'calls', 'in_loop', 'conditional', 'events', 'dynamic',
+                 'branch')
+
+    def __init__(self, text, line):
+        self.text = text
+        self.line = line
+        self.is_query = False
+        self.dml = []           # (event, (schema, table), columns or None, conditional)
+        self.calls = []         # (schema, name) of called functions
+        self.in_loop = False
+        self.conditional = False
+        self.events = None      # TG_OP values this statement is limited to, None for any
+        self.dynamic = False
+        self.branch = ()        # ((IF/CASE id, branch number), ...) from the outermost IF in
+
+
+class _Frame:
+    __slots__ = ('kind', 'events', 'id', 'branch')
+
+    def __init__(self, kind, events=None, id=0):
+        self.kind = kind        # 'block' / 'if' / 'loop' / 'case' / 'handler'
+        self.events = events
+        self.id = id
+        self.branch = 0
+
+
+def _table(tokens, i):
+    if i < len(tokens) and tokens[i].is_kw('ONLY'):
+        i += 1
+    try:
+        return sql.parse_qualified_name(tokens, i)
+    except sql.SQLSyntaxError:
+        return None, i
+
+
+def _set_columns(tokens, i):
+    """Columns assigned by the SET list starting at tokens[i] (just after SET)."""
+    end = i
+    depth = 0
+    while end < len(tokens):
+        tok = tokens[end]
+        if tok.is_op('(', '['):
+            depth += 1
+        elif tok.is_op(')', ']'):
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0 and (tok.is_kw(*_SET_END) or tok.is_op(';')):
+            break
+        end += 1
+    columns = []
+    for start, stop in sql.split_commas(tokens, i, end):
+        if start >= stop:
+            continue
+        if tokens[start].is_op('('):
+            close = sql.matching_paren(tokens, start)
+            columns += [sql.ident_value(t) for t in tokens[start + 1:close] if sql.is_name(t)]
+        elif sql.is_name(tokens[start]):
+            columns.append(sql.ident_value(tokens[start]))
+    return tuple(columns)
+
+
+def dml_targets(tokens):
+    """(event, table, columns, conditional) for every INSERT/UPDATE/DELETE in ``tokens``."""
+    out = []
+    for i, tok in enumerate(tokens):
+        prev = tokens[i - 1] if i else None
+        if tok.is_kw('INSERT') and i + 1 < len(tokens) and tokens[i + 1].is_kw('INTO'):
+            table, j = _table(tokens, i + 2)
+            if table is None:
+                continue
+            out.append(('INSERT', table, None, False))
+            k = sql.find_keywords(tokens, 'DO', 'UPDATE', 'SET', start=j)
+            if k >= 0 and sql.find_keywords(tokens, 'ON', 'CONFLICT', start=j) >= 0:
+                out.append(('UPDATE', table, _set_columns(tokens, k + 3), True))
+        elif tok.is_kw('UPDATE') and not (prev is not None and prev.is_kw(*_NOT_DML)):
+            table, j = _table(tokens, i + 1)
+            if table is None:
+                continue
+            k = sql.find_keywords(tokens, 'SET', start=j)
+            columns = _set_columns(tokens, k + 1) if 0 <= k <= j + 2 else None
+            out.append(('UPDATE', table, columns, False))
+        elif tok.is_kw('DELETE') and not (prev is not None and prev.is_kw(*_NOT_DML)) \
+                and i + 1 < len(tokens) and tokens[i + 1].is_kw('FROM'):
+            table, _ = _table(tokens, i + 2)
+            if table is not None:
+                out.append(('DELETE', table, None, False))
+    return out
+
+
+def _tg_op_events(tokens):
+    """TG_OP values a condition compares against, None when it does not test TG_OP."""
+    events = set()
+    for i, tok in enumerate(tokens[:-2]):
+        if tok.is_kw('TG_OP') and tokens[i + 1].is_op('=') and tokens[i + 2].kind == sql.STRING:
+            events.add(sql.string_value(tokens[i + 2]).upper())
+        elif tok.is_kw('TG_OP') and tokens[i + 1].is_kw('IN') and tokens[i + 2].is_op('('):
+            close = sql.matching_paren(tokens, i + 2)
+            events.update(sql.string_value(t).upper() for t in tokens[i + 3:close] if t.kind == sql.STRING)
+    return frozenset(events) if events else None
+
+
+def _segments(tokens):
+    """Split a function body into (tokens, boundary) fragments at ';' and plpgsql block words."""
+    out = []
+    start = 0
+    depth = 0
+    case_depth = 0
+    for i, tok in enumerate(tokens):
+        if tok.is_op('(', '['):
+            depth += 1
+        elif tok.is_op(')', ']'):
+            depth -= 1
+        elif depth:
+            continue
+        elif tok.is_kw('CASE') and i > start:
+            case_depth += 1            # CASE expression inside a statement
+        elif tok.is_kw('END') and case_depth and not (i + 1 < len(tokens) and tokens[i + 1].is_kw('CASE')):
+            case_depth -= 1
+        elif tok.is_op(';'):
+            out.append((tokens[start:i], ';'))
+            start = i + 1
+        elif tok.upper in _BOUNDARIES and not case_depth:
+            if tok.is_kw('LOOP') and i and tokens[i - 1].is_kw('END'):
+                continue
+            out.append((tokens[start:i], tok.upper))
+            start = i + 1
+    if start < len(tokens):
+        out.append((tokens[start:], ';'))
+    return out
+
+
+def analyze_body(body):
+    """Statements of a plpgsql or SQL function body, with loop/branch context."""
+    tokens = sql.tokenize(body)
+    stack = [_Frame('block')]
+    steps = []
+    ids = itertools.count(1)
+    for fragment, boundary in _segments(tokens):
+        head = fragment[0] if fragment else None
+        if head is not None and head.is_kw('END'):
+            if len(stack) > 1:
+                stack.pop()
+            continue
+        top = stack[-1]
+        if head is not None and head.is_kw('ELSIF', 'ELSEIF') and top.kind == 'if':
+            top.events = _tg_op_events(fragment)
+            top.branch += 1
+        elif head is not None and head.is_kw('WHEN') and top.kind == 'case' and boundary == 'THEN':
+            top.branch += 1
+        elif boundary == 'ELSE' and top.kind in ('if', 'case'):
+            top.events = None
+            top.branch += 1
+        if fragment:
+            step = _step(body, fragment, stack)
+            if step is not None:
+                steps.append(step)
+        if boundary == 'THEN' and head is not None and head.is_kw('IF'):
+            stack.append(_Frame('if', _tg_op_events(fragment), next(ids)))
+        elif head is not None and head.is_kw('CASE'):
+            stack.append(_Frame('case', None, next(ids)))
+        elif boundary == 'LOOP':
+            stack.append(_Frame('loop'))
+        elif boundary == 'BEGIN':
+            stack.append(_Frame('block'))
+        elif boundary == 'EXCEPTION':
+            stack[-1].kind = 'handler'
+    return steps
+
+
+def _step(body, fragment, stack):
+    head = fragment[0]
+    if head.is_kw('DECLARE'):
+        return None
+    step = Step(body[head.start:fragment[-1].end], body.count('\n', 0, head.start) + 1)
+    step.dml = dml_targets(fragment)
+    step.dynamic = head.is_kw('EXECUTE') or (head.is_kw('RETURN') and len(fragment) > 1
+                                              and fragment[1].is_kw('QUERY') and len(fragment) > 2
+                                              and fragment[2].is_kw('EXECUTE'))
+    keys = index_mod.references(fragment, set())
+    step.calls = sorted(catalog_mod.Catalog._key(k[3:]) for k in keys if k.startswith('fn:'))
+    step.is_query = bool(step.dml) or step.dynamic or any(t.upper in _VERBS for t in fragment)
+    if not (step.is_query or step.calls):
+        return None
+    step.in_loop = any(f.kind == 'loop' for f in stack)
+    step.conditional = any(f.kind in ('if', 'case', 'handler') for f in stack)
+    step.branch = tuple((f.id, f.branch) for f in stack if f.kind in ('if', 'case'))
+    for frame in stack:
+        if frame.events is not None:
+            step.events = frame.events if step.events is None else step.events & frame.events
+    return step
+
+
+def _branch_total(items, level=0):
+    """Sum of (branch, cost) items, counting only the dearest branch of each IF/CASE."""
+    total = 0
+    groups = {}
+    for branch, cost in items:
+        if len(branch) <= level:
+            total += cost
+        else:
+            frame, number = branch[level]
+            groups.setdefault(frame, {}).setdefault(number, []).append((branch, cost))
+    for arms in groups.values():
+        total += max(_branch_total(arm, level + 1) for arm in arms.values())
+    return total
+
+
+class Node:
+    """One step of a resolved chain: a table event, a trigger or a function."""
+    __slots__ = ('kind', 'label', 'statements', 'index_writes', 'children', 'flags', 'source', 'branches')
+
+    def __init__(self, kind, label, source=None):
+        self.kind = kind                # 'event' / 'trigger' / 'function' / 'fk'
+        self.label = label
+        self.statements = 0
+        self.index_writes = 0
+        self.children = []
+        self.flags = set()
+        self.source = source
+        self.branches = None            # function nodes: (branch, statements, children) per step
+
+    def total(self):
+        if self.branches is None:
+            return self.statements + sum(child.total() for child in self.children)
+        return _branch_total([(branch, own + sum(child.total() for child in children))
+                              for branch, own, children in self.branches])
+
+    def total_index_writes(self):
+        return self.index_writes + sum(child.total_index_writes() for child in self.children)
+
+    def walk(self, depth=0):
+        yield self, depth
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def to_dict(self):
+        out = {'kind': self.kind, 'label': self.label, 'statements': self.statements}
+        if self.index_writes:
+            out['index_writes'] = self.index_writes
+        if self.flags:
+            out['flags'] = sorted(self.flags)
+        if self.source:
+            out['source'] = self.source
+        if self.children:
+            out['children'] = [child.to_dict() for child in self.children]
+        return out
+
+
+class Analyzer:
+    """Resolves trigger chains against one catalog; function bodies are parsed once."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._steps = {}
+        self._functions = {}
+        for function in catalog.functions.values():
+            self._functions.setdefault((function.schema, function.name), function)
+        self._referencing = {}
+        for table, fk in catalog.foreign_keys():
+            if fk.ref_table:
+                self._referencing.setdefault(catalog_mod.Catalog._key(fk.ref_table), []).append((table, fk))
+
+    def steps(self, function):
+        key = function.key
+        if key not in self._steps:
+            body = function.body or ''
+            self._steps[key] = analyze_body(body) if function.language in ('plpgsql', 'sql') else []
+        return self._steps[key]
+
+    def function(self, name):
+        return self._functions.get(name)
+
+    def row_triggers(self, table, event, columns):
+        fired = []
+        for trigger in table.triggers.values():
+            if trigger.level != 'ROW' or event not in trigger.events:
+                continue
+            if event == 'UPDATE' and trigger.update_columns and columns is not None \
+                    and not set(trigger.update_columns) & set(columns):
+                continue
+            fired.append(trigger)
+        order = {'BEFORE': 0, 'INSTEAD OF': 0, 'AFTER': 1}
+        return sorted(fired, key=lambda t: (order.get(t.timing, 1), t.name))
+
+    def chain(self, key, event, columns=None, stack=()):
+        """Node for one row of ``event`` on table ``key``."""
+        table = self.catalog.tables.get(key)
+        cols = f' OF {", ".join(columns)}' if columns and event == 'UPDATE' else ''
+        node = Node('event', f'{key[1]} {event}{cols}')
+        if table is None:
+            return node
+        if (key, event) in stack:
+            node.flags.add(LOOP)
+            return node
+        if len(stack) >= _MAX_DEPTH:
+            return node
+        stack = stack + ((key, event),)
+        if event == 'INSERT':
+            node.index_writes = len(table.indexes)
+        self._fk_work(node, table, event, columns, stack)
+        for trigger in self.row_triggers(table, event, columns):
+            node.children.append(self._trigger(trigger, event, stack))
+        return node
+
+    def _fk_work(self, node, table, event, columns, stack):
+        if event in ('INSERT', 'UPDATE'):
+            checked = [fk for fk in table.foreign_keys if event == 'INSERT'
+                       or (columns is not None and set(fk.columns) & set(columns))]
+            if checked:
+                fk_node = Node('fk', f'{len(checked)} RI check{"s" if len(checked) != 1 else ""} '
+                                     f'(SELECT ... FOR KEY SHARE on the referenced rows)')
+                fk_node.statements = len(checked)
+                node.children.append(fk_node)
+        if event != 'DELETE':
+            return
+        for child, fk in self._referencing.get(table.key, ()):
+            action = fk.on_delete or 'NO ACTION'
+            fk_node = Node('fk', f'{child.name}.{fk.name} ON DELETE {action}', fk.source)
+            fk_node.statements = 1
+            if action == 'CASCADE':
+                fk_node.flags.add(CASCADE)
+                fk_node.children.append(self.chain(child.key, 'DELETE', None, stack))
+            elif action in ('SET NULL', 'SET DEFAULT'):
+                fk_node.flags.add(CASCADE)
+                fk_node.children.append(self.chain(child.key, 'UPDATE', fk.columns, stack))
+            node.children.append(fk_node)
+
+    def _trigger(self, trigger, event, stack):
+        fname = sql.qualified(*trigger.function)
+        node = Node('trigger', f'{trigger.timing} ROW {trigger.name} -> {fname}()', trigger.source)
+        if trigger.when:
+            node.flags.add(CONDITIONAL)
+        function = self.function(trigger.function)
+        if function is not None:
+            node.children.append(self._function(function, event, stack, ()))
+        return node
+
+    def _function(self, function, event, stack, calls):
+        node = Node('function', function.signature, function.source)
+        if function.key in calls:
+            node.flags.add(RECURSIVE)
+            return node
+        calls = calls + (function.key,)
+        node.branches = []
+        for step in self.steps(function):
+            if event is not None and step.events is not None and event not in step.events:
+                continue
+            first = len(node.children)
+            if step.is_query:
+                node.statements += 1
+            if step.dynamic:
+                node.flags.add(DYNAMIC)
+            for dml_event, target, columns, upsert in step.dml:
+                child = self.chain(target, dml_event, columns, stack)
+                if step.in_loop:
+                    child.flags.add(IN_LOOP)
+                if step.conditional or upsert:
+                    child.flags.add(CONDITIONAL)
+                node.children.append(child)
+            for name in step.calls:
+                callee = self.function(name)
+                if callee is not None:
+                    child = self._function(callee, None, stack, calls)
+                    if step.in_loop:
+                        child.flags.add(IN_LOOP)
+                    if step.conditional:
+                        child.flags.add(CONDITIONAL)
+                    node.children.append(child)
+            node.branches.append((step.branch, int(step.is_query), node.children[first:]))
+        return node
+
+
+def _trigger_depth(node):
+    below = max((_trigger_depth(child) for child in node.children), default=0)
+    return below + (node.kind == 'trigger')
+
+
+class Cost:
+    """Summary of one table/event chain."""
+    __slots__ = ('table', 'event', 'tree', 'statements', 'fk_statements', 'triggers', 'index_writes',
+                 'depth', 'tables', 'flags')
+
+    def __init__(self, table, event, tree):
+        self.table = table
+        self.event = event
+        self.tree = tree
+        self.statements = tree.total()
+        self.fk_statements = sum(n.statements for n, _ in tree.walk() if n.kind == 'fk')
+        self.triggers = sum(1 for n, _ in tree.walk() if n.kind == 'trigger')
+        self.index_writes = tree.total_index_writes()
+        self.depth = _trigger_depth(tree)
+        self.tables = sorted({n.label.split()[0] for n, _ in tree.walk() if n.kind == 'event'} - {table.name})
+        self.flags = set()
+        for n, _ in tree.walk():
+            self.flags |= n.flags
+
+    def to_dict(self, tree=False):
+        out = {
+            'table': f'{self.table.schema}.{self.table.name}',
+            'event': self.event,
+            'statements_per_row': self.statements,
+            'fk_statements': self.fk_statements,
+            'triggers_fired': self.triggers,
+            'index_writes': self.index_writes,
+            'depth': self.depth,
+            'tables_touched': self.tables,
+            'flags': sorted(self.flags),
+        }
+        if tree:
+            out['chain'] = self.tree.to_dict()
+        return out
+
+
+def analyze(catalog, events=EVENTS):
+    analyzer = Analyzer(catalog)
+    costs = []
+    for table in catalog.tables.values():
+        for event in events:
+            cost = Cost(table, event, analyzer.chain(table.key, event))
+            if cost.statements or cost.triggers:
+                costs.append(cost)
+    costs.sort(key=lambda c: (-c.statements, -c.triggers, c.table.name, EVENTS.index(c.event)))
+    return analyzer, costs
+
+
+class Candidate:
+    """A ROW trigger whose per-row queries a statement-level trigger would batch."""
+    __slots__ = ('trigger', 'statements', 'notes')
+
+    def __init__(self, trigger, statements, notes):
+        self.trigger = trigger
+        self.statements = statements
+        self.notes = notes
+
+    def to_dict(self):
+        return {'table': self.trigger.table, 'trigger': self.trigger.name,
+                'function': sql.qualified(*self.trigger.function), 'events': list(self.trigger.events),
+                'statements_per_row': self.statements, 'notes': self.notes, 'source': self.trigger.source}
+
+
+def candidates(analyzer):
+    """AFTER ROW triggers that query or modify other tables, with what a conversion has to handle."""
+    out = []
+    for trigger in analyzer.catalog.triggers():
+        if trigger.level != 'ROW' or trigger.timing != 'AFTER':
+            continue
+        function = analyzer.function(trigger.function)
+        if function is None:
+            continue
+        table = analyzer.catalog.tables.get((trigger.schema, trigger.table))
+        statements = max(analyzer._trigger(trigger, event, ((table.key, event),)).total()
+                         for event in trigger.events)
+        if not statements:
+            continue
+        notes = []
+        if len(trigger.events) > 1:
+            notes.append('transition tables need one trigger per event: split '
+                         + ' / '.join(trigger.events))
+        if trigger.update_columns:
+            notes.append('transition tables cannot be used with UPDATE OF: filter changed rows '
+                         'by joining OLD TABLE to NEW TABLE')
+        if trigger.when:
+            notes.append(f'move WHEN ({trigger.when}) into the set-based query')
+        if any(step.in_loop for step in analyzer.steps(function)):
+            notes.append('loop body becomes one INSERT ... SELECT / UPDATE ... FROM')
+        if any(step.dynamic for step in analyzer.steps(function)):
+            notes.append('dynamic SQL: review by hand')
+        out.append(Candidate(trigger, statements, notes))
+    out.sort(key=lambda c: (-c.statements, c.trigger.table, c.trigger.name))
+    return out
+
+
+def render_tree(cost):
+    lines = [f'🌳 {cost.table.name} {cost.event}: {cost.statements} statements per row, '
+             f'{cost.index_writes} index entries']
+    for node, depth in cost.tree.walk():
+        if depth == 0:
+            continue
+        extra = []
+        if node.statements:
+            extra.append(f'{node.statements} stmt{"s" if node.statements != 1 else ""}')
+        if node.index_writes:
+            extra.append(f'{node.index_writes} index entries')
+        extra += sorted(node.flags)
+        suffix = f'  [{", ".join(extra)}]' if extra else ''
+        lines.append(f'{"   " * depth}{node.label}{suffix}')
+    return '\n'.join(lines)
+
+
+def report(costs, candidate_list, limit=None):
+    shown = costs[:limit] if limit else costs
+    with_triggers = sum(1 for c in costs if c.triggers)
+    lines = [f'📊 {len(costs)} table events with per-row work, {with_triggers} of them fire triggers', '',
+             f'   {"table event":<44} {"stmts":>5} {"fk":>4} {"trg":>4} {"idx":>4} {"depth":>5}  flags']
+    for cost in shown:
+        name = f'{cost.table.name} {cost.event}'
+        lines.append(f'   {name:<44} {cost.statements:>5} {cost.fk_statements:>4} {cost.triggers:>4} '
+                     f'{cost.index_writes:>4} {cost.depth:>5}  {", ".join(sorted(cost.flags))}')
+    if limit and len(costs) > limit:
+        lines.append(f'   ... {len(costs) - limit} more (--limit 0 shows all)')
+    lines += ['', 'stmts: statements per row (triggers, functions, RI work); fk: of which foreign-key work;',
+              'trg: ROW triggers fired; idx: index entries written; depth: trigger nesting.']
+    if candidate_list:
+        lines += ['', f'📋 {len(candidate_list)} AFTER ROW triggers to convert to statement-level '
+                      f'(REFERENCING NEW/OLD TABLE):']
+        for cand in candidate_list:
+            trigger = cand.trigger
+            lines.append(f'   {trigger.table}.{trigger.name} -> {trigger.function[1]}(): '
+                         f'{cand.statements} statement{"s" if cand.statements != 1 else ""} per row  ({trigger.source})')
+            for note in cand.notes:
+                lines.append(f'      - {note}')
+    return '\n'.join(lines)
+
+
+def _parse_target(text):
+    name, _, event = text.partition(':')
+    event = event.upper()
+    if event and event not in EVENTS:
+        raise ValueError(f'unknown event {event!r} (expected one of {", ".join(EVENTS)})')
+    return catalog_mod.Catalog._key(name), (event,) if event else EVENTS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools trigger-cost',
+        description='Resolve trigger chains per table and event and rank the per-row cost.')
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='schema SQL files/globs in run order (default: production_schema.sql, '
+                             'database/*.sql, supabase/migrations/*.sql)')
+    parser.add_argument('--event', choices=EVENTS, action='append',
+                        help='only rank these events (default: all)')
+    parser.add_argument('--tree', metavar='TABLE[:EVENT]', action='append',
+                        help='print the resolved chain for a table (and event)')
+    parser.add_argument('--limit', type=int, default=25, help='rows in the ranking (0: all, default 25)')
+    parser.add_argument('--json', action='store_true', help='print the ranking (with chains) as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = catalog_mod.load(args.inputs)
+        targets = [_parse_target(t) for t in args.tree or ()]
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    analyzer, costs = analyze(catalog, tuple(args.event or EVENTS))
+    if targets:
+        for key, events in targets:
+            table = catalog.tables.get(key)
+            if table is None:
+                print(f'❌ unknown table {key[0]}.{key[1]}', file=sys.stderr)
+                return 1
+            for event in events:
+                cost = Cost(table, event, analyzer.chain(key, event))
+                if args.json:
+                    json.dump(cost.to_dict(tree=True), sys.stdout, indent=2)
+                    print()
+                else:
+                    print(render_tree(cost) + '\n')
+        return 0
+
+    candidate_list = candidates(analyzer)
+    if args.json:
+        json.dump({'ranking': [c.to_dict(tree=True) for c in costs[:args.limit or None]],
+                   'statement_level_candidates': [c.to_dict() for c in candidate_list]},
+                  sys.stdout, indent=2)
+        print()
+    else:
+        print(report(costs, candidate_list, args.limit or None))
+    return 0
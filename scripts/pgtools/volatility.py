@@ -0,0 +1,473 @@
+"""
+Function volatility and parallel-safety auditor.
+
+CREATE FUNCTION defaults to VOLATILE PARALLEL UNSAFE, and almost every
+function in production_schema.sql and database/*.sql kept the default. That
+costs more than it looks: a VOLATILE function in a policy is re-evaluated for
+every row instead of once per statement, a VOLATILE SQL function is never
+inlined, and one PARALLEL UNSAFE call anywhere in a query (including its RLS
+policies) rules out a parallel plan.
+
+This module reads each function body from the schema catalog and infers the
+strictest label it can safely carry:
+
+  * VOLATILE   - writes (INSERT/UPDATE/DELETE, DDL, row locks), dynamic
+                 EXECUTE, or calls a volatile function (nextval, random, ...)
+  * STABLE     - reads tables or session state (now(), current_setting,
+                 auth.uid()), or calls a function that is not known IMMUTABLE
+  * IMMUTABLE  - depends on its arguments only
+
+  * PARALLEL UNSAFE     - writes, sequences, advisory locks, dynamic SQL
+  * PARALLEL RESTRICTED - plpgsql EXCEPTION blocks (subtransactions), random()
+  * PARALLEL SAFE       - everything else
+
+Labels propagate through calls until nothing changes, so a helper is never
+marked stricter than what it calls. Trigger functions are skipped: their
+labels do not affect planning. The output is an ALTER FUNCTION script and a
+report of the policies and views that call each function. Functions whose
+declared label is stricter than their body allows (say, STABLE but writing)
+are listed separately as corrections.
+
+Usage (from the repo root):
+    PYTHONPATH=scripts python3 -m pgtools volatility
+    PYTHONPATH=scripts python3 -m pgtools volatility -o database/function-volatility.sql
+    PYTHONPATH=scripts python3 -m pgtools volatility --json
+"""
+
+import argparse
+import json
+import sys
+
+from . import catalog as catalog_mod
+from . import index as index_mod
+from . import policies as policy_mod
+from . import sql
+from . import trigcost
+
+VOLATILITY = ('IMMUTABLE', 'STABLE', 'VOLATILE')
+PARALLEL = ('SAFE', 'RESTRICTED', 'UNSAFE')
+
+# Built-ins by what they force on a caller; anything unlisted counts as STABLE / SAFE
+_VOLATILE_CALLS = frozenset('''
+    random setseed nextval setval currval lastval gen_random_uuid uuid_generate_v1 uuid_generate_v4
+    clock_timestamp timeofday pg_notify set_config pg_sleep txid_current pg_advisory_lock
+    pg_advisory_xact_lock pg_try_advisory_lock pg_try_advisory_xact_lock pg_advisory_unlock
+    dblink dblink_exec http http_get http_post http_request net.http_get net.http_post
+'''.split())
+_UNSAFE_CALLS = frozenset('''
+    nextval setval currval lastval set_config pg_notify txid_current pg_advisory_lock
+    pg_advisory_xact_lock pg_try_advisory_lock pg_try_advisory_xact_lock pg_advisory_unlock
+    dblink dblink_exec http http_get http_post http_request net.http_get net.http_post
+'''.split())
+_RESTRICTED_CALLS = frozenset({'random', 'setseed'})
+_IMMUTABLE_CALLS = frozenset('''
+    lower upper length char_length octet_length substring substr replace regexp_replace
+    regexp_match regexp_matches regexp_split_to_array trim btrim ltrim rtrim split_part md5
+    sha256 encode decode position strpos left right lpad rpad initcap reverse repeat translate
+    starts_with abs round ceil ceiling floor mod power sqrt sign trunc div array_length
+    array_position array_positions array_remove array_append array_prepend array_cat
+    array_upper array_lower cardinality unnest jsonb_typeof jsonb_array_length jsonb_extract_path
+    jsonb_extract_path_text json_extract_path_text jsonb_strip_nulls jsonb_set jsonb_insert
+    jsonb_exists num_nonnulls num_nulls filter count sum avg min max array_agg string_agg
+    bool_and bool_or every
+'''.split())
+# Session-dependent words that are not written as calls
+_STABLE_WORDS = frozenset({'CURRENT_TIMESTAMP', 'CURRENT_DATE', 'CURRENT_TIME', 'LOCALTIMESTAMP',
+                           'LOCALTIME', 'CURRENT_USER', 'SESSION_USER', 'CURRENT_ROLE', 'USER'})
+# Types whose casts and arithmetic read TimeZone / DateStyle
+_TIME_WORDS = frozenset({'TIMESTAMPTZ', 'TIMESTAMP', 'DATE', 'INTERVAL', 'ZONE', 'TIME'})
+_DDL_HEADS = frozenset({'CREATE', 'ALTER', 'DROP', 'TRUNCATE', 'GRANT', 'REVOKE', 'COPY',
+                        'NOTIFY', 'LOCK', 'REFRESH', 'VACUUM', 'ANALYZE', 'CLUSTER', 'REINDEX'})
+
+
+class Facts:
+    """What a function body does, before looking at the functions it calls."""
+    __slots__ = ('volatility', 'parallel', 'reasons', 'calls')
+
+    def __init__(self):
+        self.volatility = 'IMMUTABLE'
+        self.parallel = 'SAFE'
+        self.reasons = []           # (label, why)
+        self.calls = set()          # (schema, name) of catalog functions called
+
+    def need(self, volatility=None, parallel=None, why=''):
+        if volatility and VOLATILITY.index(volatility) > VOLATILITY.index(self.volatility):
+            self.volatility = volatility
+        if parallel and PARALLEL.index(parallel) > PARALLEL.index(self.parallel):
+            self.parallel = parallel
+        label = volatility or f'PARALLEL {parallel}'
+        if why and (label, why) not in self.reasons:
+            self.reasons.append((label, why))
+
+
+def _call_name(key):
+    """'fn:auth.uid' -> 'auth.uid'; 'fn:nextval' -> 'nextval'."""
+    return key[3:].lower()
+
+
+def _variables(function, tokens):
+    """Argument names, DECLAREd names and SELECT ... INTO targets: words that look like tables."""
+    names = {arg[1].lower() for arg in function.args if arg[1]}
+    declaring = False
+    start = True
+    for i, tok in enumerate(tokens):
+        if tok.is_kw('DECLARE'):
+            declaring = start = True
+        elif tok.is_kw('BEGIN'):
+            declaring = False
+        elif declaring and start and sql.is_name(tok):
+            names.add(sql.ident_value(tok))
+            start = False
+        elif tok.is_op(';'):
+            start = True
+        elif tok.is_kw('INTO') and i and not tokens[i - 1].is_kw('INSERT', 'MERGE'):
+            k = i + 1
+            if k < len(tokens) and tokens[k].is_kw('STRICT'):
+                k += 1
+            while k < len(tokens) and sql.is_name(tokens[k]):
+                names.add(sql.ident_value(tokens[k]))
+                if k + 1 < len(tokens) and tokens[k + 1].is_op(','):
+                    k += 2
+                else:
+                    break
+    return names
+
+
+def body_facts(function, catalog_names):
+    """Facts for one function; ``catalog_names`` resolves called names to (schema, name)."""
+    facts = Facts()
+    body = function.body or ''
+    tokens = sql.tokenize(body)
+    for event, table, _, _ in trigcost.dml_targets(tokens):
+        facts.need('VOLATILE', 'UNSAFE', f'{event} {table[1]}')
+    for stmt in sql.split_statements(body):
+        head = next((t for t in stmt.tokens if not t.is_kw('BEGIN', 'THEN', 'ELSE', 'LOOP')), None)
+        if head is not None and head.upper in _DDL_HEADS:
+            facts.need('VOLATILE', 'UNSAFE', f'{head.upper} statement')
+    for i, tok in enumerate(tokens):
+        upper = tok.upper
+        if upper == 'EXECUTE':
+            facts.need('VOLATILE', 'UNSAFE', 'dynamic EXECUTE')
+        elif upper == 'FOR' and i + 1 < len(tokens) and (
+                tokens[i + 1].is_kw('UPDATE', 'SHARE')
+                or tokens[i + 1].is_kw('NO') and i + 2 < len(tokens) and tokens[i + 2].is_kw('KEY')):
+            facts.need('VOLATILE', 'UNSAFE', 'row lock (FOR UPDATE/SHARE)')
+        elif upper == 'EXCEPTION' and function.language == 'plpgsql':
+            facts.need(parallel='RESTRICTED', why='EXCEPTION block (subtransaction)')
+        elif upper in _STABLE_WORDS:
+            facts.need('STABLE', why=upper)
+        elif upper in _TIME_WORDS:
+            facts.need('STABLE', why=f'{upper.lower()} arithmetic depends on TimeZone')
+    keys = index_mod.references(tokens, set())
+    variables = _variables(function, tokens)
+    for i, tok in enumerate(tokens[:-1]):     # also FROM lists references() reads as expressions
+        nxt = tokens[i + 1]
+        if tok.is_kw('FROM', 'JOIN') and sql.is_name(nxt) and nxt.upper not in sql.RESERVED \
+                and not (i + 2 < len(tokens) and tokens[i + 2].is_op('(')):
+            keys.add('t:' + sql.ident_value(nxt))
+    for key in sorted(keys):
+        if key.startswith('t:') and key[2:] not in variables:
+            facts.need('STABLE', why=f'reads {key[2:]}')
+        elif key.startswith('fn:'):
+            name = _call_name(key)
+            resolved = catalog_names.get(name)
+            if resolved is not None:
+                if resolved != (function.schema, function.name):
+                    facts.calls.add(resolved)
+                continue
+            base = name.rpartition('.')[2]
+            if name in _VOLATILE_CALLS or base in _VOLATILE_CALLS:
+                facts.need('VOLATILE', why=f'{name}()')
+            elif name not in _IMMUTABLE_CALLS:
+                facts.need('STABLE', why=f'{name}()')
+            if name in _UNSAFE_CALLS or base in _UNSAFE_CALLS:
+                facts.need(parallel='UNSAFE', why=f'{name}()')
+            elif base in _RESTRICTED_CALLS:
+                facts.need(parallel='RESTRICTED', why=f'{name}()')
+    return facts
+
+
+class Verdict:
+    """Declared and inferred labels of one function."""
+    __slots__ = ('function', 'volatility', 'parallel', 'reasons', 'policies', 'views', 'callers',
+                 'inlinable')
+
+    def __init__(self, function, facts):
+        self.function = function
+        self.volatility = facts.volatility
+        self.parallel = facts.parallel
+        self.reasons = list(facts.reasons)
+        self.policies = []
+        self.views = []
+        self.callers = []
+        self.inlinable = False
+
+    @property
+    def tighter(self):
+        """Labels to set because the body allows stricter ones than declared."""
+        f = self.function
+        out = {}
+        if VOLATILITY.index(self.volatility) < VOLATILITY.index(f.volatility):
+            out['volatility'] = self.volatility
+        if PARALLEL.index(self.parallel) < PARALLEL.index(f.parallel):
+            out['parallel'] = self.parallel
+        return out
+
+    @property
+    def looser(self):
+        """Labels to set because the declared ones are wrong."""
+        f = self.function
+        out = {}
+        if VOLATILITY.index(self.volatility) > VOLATILITY.index(f.volatility):
+            out['volatility'] = self.volatility
+        if PARALLEL.index(self.parallel) > PARALLEL.index(f.parallel):
+            out['parallel'] = self.parallel
+        return out
+
+    def alter_sql(self, changes):
+        parts = []
+        if 'volatility' in changes:
+            parts.append(changes['volatility'])
+        if 'parallel' in changes:
+            parts.append(f'PARALLEL {changes["parallel"]}')
+        return f'ALTER FUNCTION {self.function.signature} {" ".join(parts)};'
+
+    def restore_sql(self, changes):
+        f = self.function
+        parts = []
+        if 'volatility' in changes:
+            parts.append(f.volatility)
+        if 'parallel' in changes:
+            parts.append(f'PARALLEL {f.parallel}')
+        return f'ALTER FUNCTION {f.signature} {" ".join(parts)};'
+
+    def why(self, label=None):
+        """Reasons behind the inferred volatility (or one label); table reads before calls."""
+        wanted = label or self.volatility
+        reasons = [why for lab, why in self.reasons if lab == wanted]
+        return sorted(reasons, key=lambda why: why.endswith('()'))[:3]
+
+    def to_dict(self):
+        f = self.function
+        return {
+            'function': f.signature,
+            'declared': {'volatility': f.volatility, 'parallel': f.parallel},
+            'inferred': {'volatility': self.volatility, 'parallel': self.parallel},
+            'change': self.tighter,
+            'correction': self.looser,
+            'reasons': [f'{label}: {why}' for label, why in self.reasons],
+            'inlinable': self.inlinable,
+            'policies': self.policies,
+            'views': self.views,
+            'callers': self.callers,
+            'source': f.source,
+        }
+
+
+def _is_trigger(function):
+    return (function.returns or '').lower() in ('trigger', 'event_trigger')
+
+
+def _catalog_names(catalog):
+    names = {}
+    for function in catalog.functions.values():
+        qualified = index_mod._qname(function.schema, function.name)
+        names.setdefault(qualified, (function.schema, function.name))
+        names.setdefault(f'{function.schema}.{function.name}', (function.schema, function.name))
+    return names
+
+
+def _inlinable(function, volatility):
+    """Whether the planner can inline a scalar SQL function carrying ``volatility``."""
+    if function.language != 'sql' or function.security_definer or function.config:
+        return False
+    if volatility == 'VOLATILE' or (function.returns or '').lower().startswith(('setof', 'table')):
+        return False
+    statements = sql.split_statements(function.body or '')
+    return len(statements) == 1 and statements[0].tokens[0].is_kw('SELECT')
+
+
+def infer(catalog):
+    """Verdict per non-trigger function, with labels propagated through calls."""
+    names = _catalog_names(catalog)
+    by_name = {}
+    facts = {}
+    for function in catalog.functions.values():
+        by_name.setdefault((function.schema, function.name), []).append(function)
+        facts[function.key] = body_facts(function, names) if function.language in ('sql', 'plpgsql') \
+            else None
+    verdicts = {}
+    for function in catalog.functions.values():
+        fact = facts[function.key]
+        if fact is None:            # C / internal: trust the declaration
+            fact = Facts()
+            fact.need(function.volatility, function.parallel, 'declared')
+        verdicts[function.key] = Verdict(function, fact)
+
+    changed = True
+    while changed:
+        changed = False
+        for key, verdict in verdicts.items():
+            fact = facts[key]
+            if fact is None:
+                continue
+            for callee_name in fact.calls:
+                for callee in by_name.get(callee_name, ()):
+                    other = verdicts[callee.key]
+                    name = callee.name
+                    if VOLATILITY.index(other.volatility) > VOLATILITY.index(verdict.volatility):
+                        verdict.volatility = other.volatility
+                        verdict.reasons.append((other.volatility, f'calls {name}()'))
+                        changed = True
+                    if PARALLEL.index(other.parallel) > PARALLEL.index(verdict.parallel):
+                        verdict.parallel = other.parallel
+                        verdict.reasons.append((f'PARALLEL {other.parallel}', f'calls {name}()'))
+                        changed = True
+                    if verdict.function.name not in other.callers:
+                        other.callers.append(verdict.function.name)
+
+    for verdict in verdicts.values():
+        verdict.inlinable = _inlinable(verdict.function, verdict.volatility)
+    _users(catalog, verdicts, names, by_name)
+    return [v for v in verdicts.values() if not _is_trigger(v.function)]
+
+
+def _users(catalog, verdicts, names, by_name):
+    """Fill in the policies and views that call each function."""
+    def called(text):
+        keys = index_mod.references(sql.tokenize(text), set())
+        for key in keys:
+            if key.startswith('fn:') and _call_name(key) in names:
+                yield from by_name[names[_call_name(key)]]
+
+    for policy in catalog.policies():
+        label = f'{policy.table}.{policy.name}'
+        for expr in (policy.using, policy.with_check):
+            for function in called(expr or ''):
+                users = verdicts[function.key].policies
+                if label not in users:
+                    users.append(label)
+    for view in catalog.views.values():
+        for function in called(view.query or ''):
+            users = verdicts[function.key].views
+            if view.name not in users:
+                users.append(view.name)
+
+
+def _labels(changes):
+    return ' '.join(v if k == 'volatility' else f'PARALLEL {v}' for k, v in changes.items())
+
+
+def _benefits(verdict):
+    out = []
+    if verdict.policies:
+        out.append(f'{len(verdict.policies)} polic{"ies" if len(verdict.policies) != 1 else "y"}')
+    if verdict.views:
+        out.append(f'{len(verdict.views)} view{"s" if len(verdict.views) != 1 else ""}')
+    if verdict.inlinable and VOLATILITY.index(verdict.volatility) < VOLATILITY.index(verdict.function.volatility):
+        out.append('inlinable')
+    return out
+
+
+def _ranked(verdicts):
+    return sorted(verdicts, key=lambda v: (-len(v.policies) - len(v.views), v.function.name))
+
+
+def render(verdicts):
+    changes = [v for v in _ranked(verdicts) if v.tighter]
+    corrections = [v for v in _ranked(verdicts) if v.looser]
+    out = [policy_mod.header(
+        'FUNCTION VOLATILITY / PARALLEL SAFETY (generated by pgtools volatility)',
+        [f'{len(changes)} functions get stricter labels inferred from their bodies,',
+         f'{len(corrections)} get corrected labels their bodies need.',
+         'ALTER FUNCTION leaves the body and grants alone. Each statement is',
+         'preceded by the one that restores the old labels.'],
+    ).rstrip('\n'), '', 'BEGIN;']
+    for title, items, attr in (('Stricter labels', changes, 'tighter'),
+                               ('Corrections: declared stricter than the body allows', corrections, 'looser')):
+        if not items:
+            continue
+        out += ['', f'-- {title}']
+        for verdict in items:
+            delta = getattr(verdict, attr)
+            f = verdict.function
+            why = '; '.join(verdict.why()) or 'depends on its arguments only'
+            users = ', '.join(_benefits(verdict))
+            out += ['', f'-- {f.name}: {f.volatility} PARALLEL {f.parallel} -> {_labels(delta)} ({why})'
+                        + (f'; used by {users}' if users else ''),
+                    f'-- defined at {f.source}',
+                    f'-- restore: {verdict.restore_sql(delta)}',
+                    verdict.alter_sql(delta)]
+    out += ['', 'COMMIT;']
+    out.append(policy_mod.footer(f'COMPLETED: {len(changes) + len(corrections)} functions relabelled')
+               .rstrip('\n'))
+    return '\n'.join(out) + '\n'
+
+
+def report(verdicts, verbose=False):
+    changes = [v for v in _ranked(verdicts) if v.tighter]
+    corrections = [v for v in _ranked(verdicts) if v.looser]
+    counts = {label: sum(1 for v in verdicts if v.volatility == label) for label in VOLATILITY}
+    safe = sum(1 for v in verdicts if v.parallel == 'SAFE')
+    lines = [f'📊 {len(verdicts)} functions (trigger functions skipped): {counts["IMMUTABLE"]} can be IMMUTABLE, '
+             f'{counts["STABLE"]} STABLE, {counts["VOLATILE"]} must stay VOLATILE; {safe} PARALLEL SAFE',
+             f'   {len(changes)} to relabel, {len(corrections)} declared stricter than their bodies allow', '']
+    width = max((len(v.function.name) for v in changes + corrections), default=0)
+    for verdict in changes:
+        f = verdict.function
+        lines.append(f'   {f.name.ljust(width)}  {f.volatility[:4]}/{f.parallel[:4]} -> '
+                     f'{_labels(verdict.tighter):<30} {", ".join(_benefits(verdict))}')
+        if verbose:
+            lines.append(f'   {"".ljust(width)}  because: {"; ".join(verdict.why()) or "argument-only"}')
+    if corrections:
+        lines += ['', '⚠ Declared stricter than the body allows:']
+        for verdict in corrections:
+            f = verdict.function
+            lines.append(f'   {f.name.ljust(width)}  {f.volatility}/PARALLEL {f.parallel} -> '
+                         f'{_labels(verdict.looser)}  ({"; ".join(verdict.why())})')
+
+    users = [v for v in changes if v.policies or v.views]
+    if users:
+        lines += ['', '📋 Policies and views that benefit:']
+        for verdict in users:
+            lines.append(f'   {verdict.function.name} ({_labels(verdict.tighter)}):')
+            if verdict.policies:
+                shown = verdict.policies if verbose else verdict.policies[:6]
+                more = len(verdict.policies) - len(shown)
+                lines.append(f'      policies: {", ".join(shown)}' + (f' (+{more} more)' if more else ''))
+            if verdict.views:
+                lines.append(f'      views: {", ".join(verdict.views)}')
+    lines += ['', 'STABLE lets a policy evaluate (select f(...)) once per statement as an initplan;',
+              'PARALLEL SAFE keeps parallel scans possible on the tables these policies protect.']
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='pgtools volatility',
+        description='Infer the strictest safe volatility / parallel safety per function; emit ALTER FUNCTION.')
+    parser.add_argument('--input', action='append', dest='inputs', metavar='GLOB',
+                        help='schema SQL files/globs in run order (default: production_schema.sql, '
+                             'database/*.sql, supabase/migrations/*.sql)')
+    parser.add_argument('-o', '--output', help='write the ALTER FUNCTION script here')
+    parser.add_argument('--json', action='store_true', help='print every verdict as JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show reasons and every policy')
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = catalog_mod.load(args.inputs)
+    except (ValueError, OSError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    verdicts = infer(catalog)
+    if args.json:
+        json.dump([v.to_dict() for v in _ranked(verdicts)], sys.stdout, indent=2)
+        print()
+    else:
+        print(report(verdicts, args.verbose))
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(render(verdicts))
+        print(f'✓ Generated {args.output}', file=sys.stderr)
+    return 0